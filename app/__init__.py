@@ -1,20 +1,50 @@
+import asyncio
+
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 from .config import Config
+from .database import engine_options
 import os
 
 # Initialize extensions before creating app instance
 db = SQLAlchemy()
 migrate = Migrate()
 
+
+class App(Flask):
+    def async_to_sync(self, func):
+        """
+        Run an async view to completion in a WSGI worker.
+        
+        Each call gets an event loop of its own (asgiref's when installed,
+        asyncio.run otherwise), so the HTTP pools opened on it are closed
+        before it ends. Served through asgi.py the views run on the server's
+        loop instead and keep their pools.
+        """
+        from app.services.async_routing import close_async_clients
+        
+        async def run(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                await close_async_clients()
+        
+        try:
+            from asgiref.sync import async_to_sync
+        except ImportError:
+            return lambda *args, **kwargs: asyncio.run(run(*args, **kwargs))
+        return async_to_sync(run)
+
+
 def create_app(config_class=Config):
     # Create and configure Flask application
-    app = Flask(__name__)
+    app = App(__name__)
     app.config.from_object(config_class)
     
     # Initialize extensions with app instance
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
     db.init_app(app)
     migrate.init_app(app, db)
     CORS(app)
@@ -30,4 +60,13 @@ def create_app(config_class=Config):
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # Compress large JSON, CSV and matrix responses
+    from app.services.encoding import compress_response
+    app.after_request(compress_response)
+    
+    # Register CLI commands
+    from app.cli import pois_cli, screenshots_cli
+    app.cli.add_command(screenshots_cli)
+    app.cli.add_command(pois_cli)
+    
     return app
\ No newline at end of file
@@ -0,0 +1,267 @@
+"""
+ASGI front of the Flask application.
+
+Async views (isochrones, isochrone batches, travel times) run directly on
+the server's event loop, so one worker keeps many upstream calls in flight
+at once and reuses one connection pool for all of them. Every other view
+is synchronous and runs through the WSGI interface on a bounded thread
+pool. Responses are sent chunk by chunk as they are produced, so streamed
+exports and listings never sit in memory whole. Request bodies are read
+before any view runs, so they are capped here (ASGI_MAX_BODY_BYTES) and
+refused with 413 as soon as they grow past it.
+
+Served by any ASGI server through the module next to run.py:
+
+    uvicorn asgi:application --workers 4
+"""
+import asyncio
+import io
+import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from inspect import iscoroutinefunction
+
+from flask import request
+from werkzeug.exceptions import HTTPException
+
+from app.services.async_routing import close_async_clients
+
+# Request bodies larger than this are spooled to a temporary file
+SPOOL_BYTES = 1024 * 1024
+# Response chunks a synchronous view may produce ahead of the client
+STREAM_CHUNKS = 8
+
+
+class AsgiApp:
+    """ASGI callable serving a Flask application"""
+
+    def __init__(self, flask_app, max_threads=None, max_body_bytes=None):
+        """
+        Args:
+            flask_app (Flask): Application to serve
+            max_threads (int): Threads running synchronous views, ASGI_WSGI_THREADS by default
+            max_body_bytes (int): Largest request body accepted, ASGI_MAX_BODY_BYTES by default
+        """
+        config = flask_app.config
+        self.flask_app = flask_app
+        self.max_threads = max_threads or config.get('ASGI_WSGI_THREADS', 16)
+        # By default the largest body a view accepts: a base64 screenshot upload with its metadata
+        self.max_body_bytes = (max_body_bytes or config.get('ASGI_MAX_BODY_BYTES')
+                               or config.get('SCREENSHOT_MAX_BYTES', 64 * 1024 * 1024) * 4 // 3
+                               + config.get('SCREENSHOT_MAX_METADATA_BYTES', 4 * 1024 * 1024))
+        self._executor = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise NotImplementedError(f"Unsupported ASGI scope type {scope['type']}")
+
+        body = None
+        if _content_length(scope) <= self.max_body_bytes:
+            body = await _read_body(receive, self.max_body_bytes)
+        if body is None:
+            await _send_json(send, 413, {'success': False,
+                                         'error': f"Request body exceeds {self.max_body_bytes} bytes"})
+            return
+
+        environ = _environ(scope, body)
+        if self._async_view(environ) is not None:
+            await self._dispatch(environ, send)
+        else:
+            await self._call_wsgi(environ, send)
+
+    def _async_view(self, environ):
+        """The coroutine view the request is routed to, None for sync views and routing errors"""
+        try:
+            endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None
+        view = self.flask_app.view_functions.get(endpoint)
+        return view if iscoroutinefunction(view) else None
+
+    async def _dispatch(self, environ, send):
+        """Run an async view in a request context, as Flask's full_dispatch_request does for sync ones"""
+        app = self.flask_app
+        with app.request_context(environ):
+            try:
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await app.view_functions[request.url_rule.endpoint](**request.view_args)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                response = app.handle_exception(e)
+            try:
+                await send(_start_message(response.status_code, response.headers.to_wsgi_list()))
+                for chunk in response.iter_encoded():
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                await send({'type': 'http.response.body', 'body': b''})
+            finally:
+                response.close()
+
+    async def _call_wsgi(self, environ, send):
+        """Run a synchronous view on the thread pool and send its response while it is produced"""
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue(maxsize=STREAM_CHUNKS)
+        stopped = threading.Event()
+        worker = loop.run_in_executor(self._get_executor(), _run_wsgi, self.flask_app, environ,
+                                      loop, messages, stopped)
+        try:
+            while True:
+                message = await messages.get()
+                if isinstance(message, BaseException):
+                    raise message
+                await send(message)
+                if message['type'] == 'http.response.body' and not message.get('more_body'):
+                    break
+        finally:
+            # A worker waiting for room to hand over a chunk nobody will send sees it is stopped
+            stopped.set()
+            while not messages.empty():
+                messages.get_nowait()
+        await worker
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_async_clients()
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix='wsgi')
+        return self._executor
+
+
+async def _read_body(receive, max_bytes):
+    """The request body in a spooled temporary file, None as soon as it exceeds max_bytes"""
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    size = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > max_bytes:
+            body.close()
+            return None
+        body.write(chunk)
+        more_body = message.get('more_body', False)
+    body.seek(0)
+    return body
+
+
+def _content_length(scope):
+    """The Content-Length the client declared, 0 when it sent none"""
+    for name, value in scope.get('headers', []):
+        if name.lower() == b'content-length':
+            try:
+                return int(value)
+            except ValueError:
+                return 0
+    return 0
+
+
+def _start_message(status, headers):
+    return {
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    }
+
+
+async def _send_json(send, status, data):
+    body = json.dumps(data).encode('utf-8')
+    await send(_start_message(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))]))
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _environ(scope, body):
+    """WSGI environ of an ASGI HTTP scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    body.seek(0, io.SEEK_END)
+    length = body.tell()
+    body.seek(0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _run_wsgi(flask_app, environ, loop, messages, stopped):
+    """
+    Run a WSGI call on this thread, handing its response to the event loop as ASGI messages.
+
+    The body is iterated here, where a streamed view keeps its request
+    context, and each chunk waits for room in messages, so a slow client
+    holds the view back instead of its output piling up.
+    """
+    def hand_over(message):
+        asyncio.run_coroutine_threadsafe(messages.put(message), loop).result()
+        return not stopped.is_set()
+
+    started = []
+
+    def start_response(status, headers, exc_info=None):
+        started[:] = [_start_message(int(status.split(' ', 1)[0]), headers)]
+
+    try:
+        result = flask_app(environ, start_response)
+        start_sent = False
+        try:
+            for chunk in result:
+                if not chunk:
+                    continue
+                if not start_sent:
+                    start_sent = True
+                    if not hand_over(started[0]):
+                        return
+                if not hand_over({'type': 'http.response.body', 'body': chunk, 'more_body': True}):
+                    return
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        if not start_sent:
+            hand_over(started[0])
+        hand_over({'type': 'http.response.body', 'body': b''})
+    except Exception as e:
+        if not stopped.is_set():
+            hand_over(e)
@@ -0,0 +1,57 @@
+import os
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+screenshots_cli = AppGroup('screenshots', help='Manage the screenshot catalog.')
+
+
+@screenshots_cli.command('backfill')
+@click.option('--directory', default=None, help='Screenshot folder, defaults to locals/map_screenshots.')
+def backfill_command(directory):
+    """Register screenshots saved before the catalog existed"""
+    from app.services.screenshot_catalog import backfill
+    directory = directory or os.path.join(current_app.root_path, 'locals', 'map_screenshots')
+    count = backfill(directory)
+    click.echo(f"Registered {count} screenshots from {directory}")
+
+
+pois_cli = AppGroup('pois', help='Bulk import and export points of interest.')
+
+
+@pois_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson', 'geojson']), default=None,
+              help='Defaults to the file extension.')
+@click.option('--operation', type=click.Choice(['create', 'update', 'delete']), default='create')
+@click.option('--batch-size', type=int, default=None, help='Records per insert statement.')
+def import_pois_command(path, fmt, operation, batch_size):
+    """Create, update or delete POIs from a CSV, NDJSON or GeoJSON file"""
+    from app.services.poi_bulk import bulk_apply, detect_format, read_records
+    fmt = fmt or detect_format(filename=path)
+    if fmt is None:
+        raise click.UsageError("Cannot tell the format from the file name, pass --format")
+    with open(path, 'rb') as f:
+        report = bulk_apply(read_records(f, fmt), operation, batch_size=batch_size)
+    click.echo(f"{report.created} created, {report.updated} updated, {report.deleted} deleted, "
+               f"{report.rejected} rejected in {report.seconds:.2f} s ({report.rows_per_second:.0f} rows/s)")
+    for error in report.errors:
+        click.echo(f"  record {error['record']}: {error['error']}", err=True)
+
+
+@pois_cli.command('export')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson', 'geojson']), default=None,
+              help='Defaults to the file extension.')
+def export_pois_command(path, fmt):
+    """Write every POI to a CSV, NDJSON or GeoJSON file, '-' for stdout"""
+    from app.models.poi import POI_FIELDS
+    from app.services.poi_bulk import detect_format, export_fields, export_query, export_records
+    fmt = fmt or detect_format(filename=path)
+    if fmt is None:
+        raise click.UsageError("Cannot tell the format from the file name, pass --format")
+    fields = export_fields(POI_FIELDS, fmt)
+    with click.open_file(path, 'w', encoding='utf-8') as f:
+        for chunk in export_records(export_query(fields), fmt, fields):
+            f.write(chunk)
@@ -11,6 +11,19 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Database engine tuning (see app/database.py)
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'true').lower() == 'true'  # run the pragmas below on connect
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', 'true').lower() == 'true'  # readers do not block on writers
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')  # FULL for fsync on every commit
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))  # page cache per connection
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # bytes, 0 disables
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5))  # seconds a writer waits for the lock
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))  # server databases only
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))  # seconds
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds, below the server's idle timeout
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    
     # External API credentials
     MAP_API_KEY = os.environ.get('MAP_API_KEY')
     FOURSQUARE_API_KEY = os.environ.get('FOURSQUARE_API_KEY') or 'fsq3UNI6ZxxsJMSZPXlqzK+mq9kMJPpR/HWocd0Ot9XpkbM='
@@ -18,4 +31,140 @@ class Config:
     GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY') or ''
     
     # Feature flags
-    USE_REAL_TIME_TRAFFIC = os.environ.get('USE_REAL_TIME_TRAFFIC', 'true').lower() == 'true'
\ No newline at end of file
+    USE_REAL_TIME_TRAFFIC = os.environ.get('USE_REAL_TIME_TRAFFIC', 'true').lower() == 'true'
+    
+    # OpenRouteService HTTP client (one keep-alive pool per worker process)
+    ORS_BASE_URL = os.environ.get('ORS_BASE_URL') or 'https://api.openrouteservice.org'
+    ORS_POOL_SIZE = int(os.environ.get('ORS_POOL_SIZE', 10))
+    ORS_CONNECT_TIMEOUT = float(os.environ.get('ORS_CONNECT_TIMEOUT', 3.05))  # seconds
+    ORS_READ_TIMEOUT = float(os.environ.get('ORS_READ_TIMEOUT', 30))  # seconds
+    ORS_MAX_RETRIES = int(os.environ.get('ORS_MAX_RETRIES', 3))
+    ORS_BACKOFF_FACTOR = float(os.environ.get('ORS_BACKOFF_FACTOR', 0.5))  # seconds, doubled per retry
+    ORS_MAX_BACKOFF = float(os.environ.get('ORS_MAX_BACKOFF', 10))  # seconds
+    ORS_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('ORS_CIRCUIT_FAILURE_THRESHOLD', 5))
+    ORS_CIRCUIT_RESET_TIMEOUT = float(os.environ.get('ORS_CIRCUIT_RESET_TIMEOUT', 30))  # seconds
+    
+    # Upstream quota shared by every worker of the host (see app/services/rate_limiter.py)
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_PATH = os.environ.get('RATE_LIMIT_PATH')  # Defaults to app/locals/rate_limit.sqlite, '' for this process only
+    # Calls per minute and per day for each ORS endpoint (free plan)
+    RATE_LIMITS = {
+        'isochrones': (int(os.environ.get('RATE_LIMIT_ISOCHRONES_PER_MINUTE', 20)),
+                       int(os.environ.get('RATE_LIMIT_ISOCHRONES_PER_DAY', 500))),
+        'matrix': (int(os.environ.get('RATE_LIMIT_MATRIX_PER_MINUTE', 40)),
+                   int(os.environ.get('RATE_LIMIT_MATRIX_PER_DAY', 500)))
+    }
+    RATE_LIMIT_BACKGROUND_RESERVE = float(os.environ.get('RATE_LIMIT_BACKGROUND_RESERVE', 0.2))  # share kept for interactive calls
+    RATE_LIMIT_INTERACTIVE_WAIT = float(os.environ.get('RATE_LIMIT_INTERACTIVE_WAIT', 5))  # seconds queued for quota
+    RATE_LIMIT_BACKGROUND_WAIT = float(os.environ.get('RATE_LIMIT_BACKGROUND_WAIT', 120))  # seconds queued for quota
+    
+    # Travel-time backend: 'ors' (remote OpenRouteService) or 'local' (imported road graph)
+    ROUTING_BACKEND = os.environ.get('ROUTING_BACKEND', 'ors')
+    ROAD_GRAPH_PATH = os.environ.get('ROAD_GRAPH_PATH')  # .npz from app.services.road_graph, or an .osm extract
+    ISOCHRONE_ALPHA_METERS = float(os.environ.get('ISOCHRONE_ALPHA_METERS', 300))  # concave hull detail of local isochrones
+    
+    # Travel-time matrix tiling (per-request limits of the routing provider)
+    MATRIX_MAX_LOCATIONS = int(os.environ.get('MATRIX_MAX_LOCATIONS', 50))
+    MATRIX_MAX_ROUTES = int(os.environ.get('MATRIX_MAX_ROUTES', 3500))  # sources × destinations
+    MATRIX_MAX_WORKERS = int(os.environ.get('MATRIX_MAX_WORKERS', 4))  # concurrent tile requests
+    
+    # Straight-line travel-time estimates used when no routing backend answers
+    FALLBACK_SPEEDS_KMH = {
+        'driving-car': float(os.environ.get('FALLBACK_SPEED_DRIVING_CAR', 50)),
+        'cycling-regular': float(os.environ.get('FALLBACK_SPEED_CYCLING_REGULAR', 15)),
+        'foot-walking': float(os.environ.get('FALLBACK_SPEED_FOOT_WALKING', 5))
+    }
+    FALLBACK_MATRIX_METHOD = os.environ.get('FALLBACK_MATRIX_METHOD', 'equirectangular')  # or 'haversine'
+    FALLBACK_MATRIX_FLOAT32 = os.environ.get('FALLBACK_MATRIX_FLOAT32', 'false').lower() == 'true'
+    FALLBACK_MATRIX_CHUNK_ROWS = int(os.environ.get('FALLBACK_MATRIX_CHUNK_ROWS', 1024))  # bounds temporaries for large N
+    
+    # Time-deformed layout solver (see app/services/layout.py)
+    LAYOUT_METHOD = os.environ.get('LAYOUT_METHOD', 'auto')  # auto, classical, landmark, smacof or sklearn
+    LAYOUT_MAX_ITER = int(os.environ.get('LAYOUT_MAX_ITER', 300))
+    LAYOUT_TOLERANCE = float(os.environ.get('LAYOUT_TOLERANCE', 1e-4))  # relative stress improvement
+    LAYOUT_TIME_BUDGET = float(os.environ.get('LAYOUT_TIME_BUDGET', 5))  # seconds of SMACOF, 0 for no limit
+    LAYOUT_LANDMARKS = int(os.environ.get('LAYOUT_LANDMARKS', 64))
+    
+    # Solved layouts reused when a new POI set overlaps a previous one
+    LAYOUT_STORE_ENABLED = os.environ.get('LAYOUT_STORE_ENABLED', 'true').lower() == 'true'
+    LAYOUT_STORE_PATH = os.environ.get('LAYOUT_STORE_PATH')  # Defaults to app/locals/layouts, '' for memory only
+    LAYOUT_STORE_ENTRIES = int(os.environ.get('LAYOUT_STORE_ENTRIES', 200))
+    LAYOUT_STORE_MIN_OVERLAP = float(os.environ.get('LAYOUT_STORE_MIN_OVERLAP', 0.5))  # shared fraction of the new POIs
+    LAYOUT_REFINE_ITER = int(os.environ.get('LAYOUT_REFINE_ITER', 5))  # full SMACOF passes after placing new POIs
+    
+    # Routed matrices reused when the exact same POI list is deformed again
+    MATRIX_STORE_ENABLED = os.environ.get('MATRIX_STORE_ENABLED', 'true').lower() == 'true'
+    MATRIX_STORE_PATH = os.environ.get('MATRIX_STORE_PATH')  # Defaults to app/locals/matrices, '' for memory only
+    MATRIX_STORE_MEMORY_ENTRIES = int(os.environ.get('MATRIX_STORE_MEMORY_ENTRIES', 64))
+    MATRIX_STORE_ENTRIES = int(os.environ.get('MATRIX_STORE_ENTRIES', 1000))
+    
+    # Screenshot warped onto the time layout (see app/services/warp.py)
+    MAP_WARP_ENABLED = os.environ.get('MAP_WARP_ENABLED', 'true').lower() == 'true'
+    MAP_WARP_GRID = int(os.environ.get('MAP_WARP_GRID', 64))  # Grid cells per side the spline is evaluated on
+    MAP_WARP_SMOOTHING = float(os.environ.get('MAP_WARP_SMOOTHING', 0.0))  # 0 passes exactly through every POI
+    MAP_WARP_CACHE_ENTRIES = int(os.environ.get('MAP_WARP_CACHE_ENTRIES', 32))  # Fields kept in process
+    
+    # Rendered time-deformed maps, content addressed (see app/services/artifact_cache.py)
+    ARTIFACT_CACHE_ENABLED = os.environ.get('ARTIFACT_CACHE_ENABLED', 'true').lower() == 'true'
+    ARTIFACT_CACHE_PATH = os.environ.get('ARTIFACT_CACHE_PATH')  # Defaults to app/locals/artifacts
+    ARTIFACT_CACHE_MAX_BYTES = int(os.environ.get('ARTIFACT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    
+    # Background jobs for /api/deform-map/<id>?async=true
+    DEFORM_JOB_EXECUTOR = os.environ.get('DEFORM_JOB_EXECUTOR', 'process')  # 'process' or 'thread'
+    DEFORM_JOB_WORKERS = int(os.environ.get('DEFORM_JOB_WORKERS', 2))  # jobs running at once per request worker
+    DEFORM_JOB_MAX_PENDING = int(os.environ.get('DEFORM_JOB_MAX_PENDING', 32))  # further submissions get 503
+    DEFORM_JOB_DB_PATH = os.environ.get('DEFORM_JOB_DB_PATH')  # Defaults to app/locals/jobs.sqlite
+    DEFORM_JOB_KEEP = int(os.environ.get('DEFORM_JOB_KEEP', 1000))  # finished jobs kept for polling
+    
+    # Screenshot uploads (streamed to disk in chunks)
+    SCREENSHOT_MAX_BYTES = int(os.environ.get('SCREENSHOT_MAX_BYTES', 64 * 1024 * 1024))
+    SCREENSHOT_MAX_METADATA_BYTES = int(os.environ.get('SCREENSHOT_MAX_METADATA_BYTES', 4 * 1024 * 1024))
+    SCREENSHOT_CHUNK_SIZE = int(os.environ.get('SCREENSHOT_CHUNK_SIZE', 64 * 1024))
+    
+    # POI spatial queries (see app/services/poi_index.py)
+    POI_INDEX_MAX_AGE = float(os.environ.get('POI_INDEX_MAX_AGE', 300))  # seconds before reloading writes of other workers
+    TRAVEL_TIME_PREFILTER_SPEED_KMH = float(os.environ.get('TRAVEL_TIME_PREFILTER_SPEED_KMH', 130))  # straight-line upper bound for max_minutes
+    
+    # Bulk POI import (see app/services/poi_bulk.py)
+    POI_BULK_BATCH_SIZE = int(os.environ.get('POI_BULK_BATCH_SIZE', 1000))  # records validated and inserted per statement
+    POI_BULK_COMMIT_ROWS = int(os.environ.get('POI_BULK_COMMIT_ROWS', 20000))  # rows written per transaction
+    
+    # Response compression (brotli when installed and accepted, gzip otherwise)
+    RESPONSE_COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION_ENABLED', 'true').lower() == 'true'
+    RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024))  # smaller bodies are sent as is
+    RESPONSE_COMPRESSION_LEVEL = int(os.environ.get('RESPONSE_COMPRESSION_LEVEL', 6))
+    
+    # Isochrone simplification for requests that pass the map zoom
+    ISOCHRONE_SIMPLIFY_ENABLED = os.environ.get('ISOCHRONE_SIMPLIFY_ENABLED', 'true').lower() == 'true'
+    ISOCHRONE_SIMPLIFY_PIXELS = float(os.environ.get('ISOCHRONE_SIMPLIFY_PIXELS', 0.5))  # tolerance in screen pixels
+    
+    # Travel-time fields behind /api/isochrones/field (see app/services/time_field.py)
+    TIME_FIELD_PATH = os.environ.get('TIME_FIELD_PATH')  # Defaults to app/locals/time_fields, '' for memory only
+    TIME_FIELD_GRID = int(os.environ.get('TIME_FIELD_GRID', 96))  # samples per side, routed once per field
+    TIME_FIELD_MAX_REQUESTS = int(os.environ.get('TIME_FIELD_MAX_REQUESTS', 4))  # remote requests per field, shrinks the grid
+    TIME_FIELD_MIN_MINUTES = int(os.environ.get('TIME_FIELD_MIN_MINUTES', 15))  # smallest extent, doubled as needed
+    TIME_FIELD_MEMORY_ENTRIES = int(os.environ.get('TIME_FIELD_MEMORY_ENTRIES', 32))
+    TIME_FIELD_ENTRIES = int(os.environ.get('TIME_FIELD_ENTRIES', 500))
+    # Straight-line speed sizing the extent; travel beyond it counts as unreachable
+    TIME_FIELD_SPEEDS_KMH = {
+        'driving-car': float(os.environ.get('TIME_FIELD_SPEED_DRIVING_CAR', 60)),
+        'cycling-regular': float(os.environ.get('TIME_FIELD_SPEED_CYCLING_REGULAR', 18)),
+        'foot-walking': float(os.environ.get('TIME_FIELD_SPEED_FOOT_WALKING', 6))
+    }
+    
+    # Multi-origin isochrones behind /api/isochrones/batch
+    ISOCHRONE_MAX_LOCATIONS = int(os.environ.get('ISOCHRONE_MAX_LOCATIONS', 5))  # origins per ORS request (its limit)
+    ISOCHRONE_BATCH_WORKERS = int(os.environ.get('ISOCHRONE_BATCH_WORKERS', 4))  # upstream requests in parallel
+    ISOCHRONE_BATCH_MAX_ORIGINS = int(os.environ.get('ISOCHRONE_BATCH_MAX_ORIGINS', 500))  # per API request
+    
+    # ASGI entry point (asgi.py): synchronous views run on this many threads per worker
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 16))
+    ASGI_MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 0))  # 0 fits the largest screenshot upload
+    
+    # Isochrone response cache (in-process LRU backed by SQLite)
+    ISOCHRONE_CACHE_ENABLED = os.environ.get('ISOCHRONE_CACHE_ENABLED', 'true').lower() == 'true'
+    ISOCHRONE_CACHE_PATH = os.environ.get('ISOCHRONE_CACHE_PATH')  # Defaults to app/locals/isochrone_cache.sqlite
+    ISOCHRONE_CACHE_TTL = int(os.environ.get('ISOCHRONE_CACHE_TTL', 6 * 60 * 60))  # seconds
+    ISOCHRONE_CACHE_MEMORY_ENTRIES = int(os.environ.get('ISOCHRONE_CACHE_MEMORY_ENTRIES', 256))
+    ISOCHRONE_CACHE_DISK_ENTRIES = int(os.environ.get('ISOCHRONE_CACHE_DISK_ENTRIES', 10000))
+    ISOCHRONE_CACHE_PRECISION = int(os.environ.get('ISOCHRONE_CACHE_PRECISION', 4))  # ~11 m
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Database engine settings derived from Config.
+
+SQLite files are switched to write-ahead logging, so readers are not
+blocked while a worker writes and writers queue on a busy timeout instead
+of failing with "database is locked"; the remaining pragmas trade a
+little durability on power loss (synchronous=NORMAL) for fewer fsyncs and
+keep more of the file in memory. Server databases get a sized connection
+pool that recycles and pre-pings connections.
+"""
+import sqlite3
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    Options already set in config['SQLALCHEMY_ENGINE_OPTIONS'] take precedence.
+    """
+    uri = config.get('SQLALCHEMY_DATABASE_URI') or 'sqlite://'
+    if is_sqlite(uri):
+        options = {
+            'connect_args': {
+                'timeout': config.get('SQLITE_BUSY_TIMEOUT', 5),
+                # Connections move between the threads of a threaded server
+                'check_same_thread': False
+            }
+        }
+    else:
+        options = {
+            'pool_size': config.get('DB_POOL_SIZE', 10),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)
+        }
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def sqlite_pragmas(config):
+    """The PRAGMA statements run on every new SQLite connection, in order"""
+    if not config.get('SQLITE_TUNING', True):
+        return []
+    pragmas = []
+    if config.get('SQLITE_WAL', True):
+        pragmas.append('PRAGMA journal_mode=WAL')
+    pragmas += [
+        f"PRAGMA synchronous={config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        # Negative values are KiB rather than pages
+        f"PRAGMA cache_size=-{int(config.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))}",
+        f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+        f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT', 5) * 1000)}",
+        'PRAGMA temp_store=MEMORY'
+    ]
+    return pragmas
+
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Run the SQLite pragmas of the current app on every new connection.
+
+    Attached to the Engine class rather than to an engine, which Flask-SQLAlchemy
+    creates lazily and exposes differently across versions; other databases
+    and connections opened outside an app context are left alone.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection) or not has_app_context():
+        return
+    pragmas = sqlite_pragmas(current_app.config)
+    if not pragmas:
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in pragmas:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
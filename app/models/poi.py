@@ -1,6 +1,9 @@
 from app import db
 from datetime import datetime
 
+# Columns exposed by the API, in output order
+POI_FIELDS = ('id', 'name', 'latitude', 'longitude', 'category', 'description', 'travel_time', 'updated_at')
+
 class PointOfInterest(db.Model):
     # Database columns
     id = db.Column(db.Integer, primary_key=True)
@@ -10,6 +13,12 @@ class PointOfInterest(db.Model):
     category = db.Column(db.String(50))
     description = db.Column(db.Text)
     travel_time = db.Column(db.Integer, default=10)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # UTC
+    
+    # Bounding-box queries range-scan this index
+    __table_args__ = (
+        db.Index('ix_point_of_interest_lat_lng', 'latitude', 'longitude'),
+    )
     
     def __repr__(self):
         return f'<PointOfInterest {self.name}>'
@@ -23,5 +32,26 @@ class PointOfInterest(db.Model):
             'longitude': self.longitude,
             'category': self.category,
             'description': self.description,
-            'travel_time': self.travel_time
-        }
\ No newline at end of file
+            'travel_time': self.travel_time,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class PoiTombstone(db.Model):
+    """Deleted POI ids, so updated_since queries can report deletions"""
+    poi_id = db.Column(db.Integer, primary_key=True)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)  # UTC
+    
+    def __repr__(self):
+        return f'<PoiTombstone {self.poi_id}>'
+
+@db.event.listens_for(PointOfInterest, 'after_delete')
+def _record_deletion(mapper, connection, target):
+    tombstones = PoiTombstone.__table__
+    connection.execute(tombstones.delete().where(tombstones.c.poi_id == target.id))
+    connection.execute(tombstones.insert().values(poi_id=target.id, deleted_at=datetime.utcnow()))
+
+@db.event.listens_for(PointOfInterest, 'after_insert')
+def _clear_tombstone(mapper, connection, target):
+    # SQLite may hand out the id of a deleted row again
+    tombstones = PoiTombstone.__table__
+    connection.execute(tombstones.delete().where(tombstones.c.poi_id == target.id))
\ No newline at end of file
@@ -0,0 +1,44 @@
+from app import db
+from datetime import datetime
+
+class Screenshot(db.Model):
+    """A saved map screenshot; the PNG and JSON sidecar live in locals/map_screenshots"""
+    # Database columns
+    id = db.Column(db.String(100), primary_key=True)  # File name without extension
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    poi_count = db.Column(db.Integer, nullable=False, default=0)
+    north = db.Column(db.Float)
+    south = db.Column(db.Float)
+    east = db.Column(db.Float)
+    west = db.Column(db.Float)
+    deformed = db.Column(db.Boolean, nullable=False, default=False)
+    deformed_at = db.Column(db.DateTime)
+
+    # Newest-first keyset pagination walks this index
+    __table_args__ = (
+        db.Index('ix_screenshot_created_at_id', 'created_at', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<Screenshot {self.id}>'
+
+    @property
+    def bounds(self):
+        if self.north is None:
+            return {}
+        return {
+            'northEast': {'lat': self.north, 'lng': self.east},
+            'southWest': {'lat': self.south, 'lng': self.west}
+        }
+
+    def to_dict(self):
+        # Same shape as the directory listing it replaces
+        return {
+            'id': self.id,
+            'name': f"Map {self.id[-6:]}",
+            'filename': f"{self.id}.png",
+            'timestamp': self.created_at.strftime('%Y%m%d-%H%M%S'),
+            'poiCount': self.poi_count,
+            'timeDeformed': self.deformed,
+            'bounds': self.bounds
+        }
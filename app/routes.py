@@ -3,6 +3,7 @@ from flask import request, jsonify, Blueprint, render_template, current_app
 import os
 import base64
 from datetime import datetime
+from app.services.routing_client import get_routing_client, CircuitOpenError
 
 from app import create_app
 app = create_app()
@@ -24,8 +25,8 @@ def isochrones_proxy():
         data = request.json
         
         # Forward to external API
-        response = requests.post(
-            'https://api.openrouteservice.org/v2/isochrones/driving-car',
+        response = get_routing_client().post(
+            '/v2/isochrones/driving-car',
             json=data,
             headers={
                 'Accept': 'application/json, application/geo+json',
@@ -37,6 +38,9 @@ def isochrones_proxy():
         # Return API response to client
         return response.json(), response.status_code
         
+    except CircuitOpenError as e:
+        # Upstream is known to be down, fail fast instead of waiting on it
+        return jsonify({"error": str(e)}), 503
     except requests.exceptions.RequestException as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1,8 +1,19 @@
-from flask import Blueprint, jsonify, request, current_app, send_file
+from flask import Blueprint, Response, jsonify, request, current_app, send_file, stream_with_context
+from werkzeug.security import safe_join
 from app import db
-from app.models.poi import PointOfInterest
-from app.services.travel_time_service import get_travel_times
+from app.models.poi import POI_FIELDS, PointOfInterest, PoiTombstone
+from app.services.travel_time_service import get_travel_times_async
+from app.services.poi_bulk import (EXPORT_MIMETYPES, FORMATS as BULK_FORMATS, bulk_apply, detect_format,
+                                   export_fields, export_query, export_records, read_records)
+from app.services.encoding import NPY_MIMETYPE, encode_isochrones, npy_bytes
+from app.services.poi_index import get_poi_index
+from app.services.screenshot_catalog import DEFAULT_PAGE_SIZE, list_screenshots, parse_bbox
+from sqlalchemy.exc import OperationalError
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+import asyncio
 import json
+import math
 import os
 import requests
 import logging
@@ -12,11 +23,179 @@ logging.basicConfig(level=logging.DEBUG)
 
 api_bp = Blueprint('api', __name__)
 
+MAX_POI_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500  # Rows fetched from the database cursor at a time
+MAX_MATRIX_POIS = 1000
+
 @api_bp.route('/pois', methods=['GET'])
 def get_pois():
-    # Retrieve all POIs from database
-    pois = PointOfInterest.query.all()
-    return jsonify([poi.to_dict() for poi in pois])
+    """
+    Retrieve POIs, all of them or only those in a viewport or around a point.
+    
+    Query parameters:
+    - bbox: 'west,south,east,north', only POIs inside it
+    - near: 'lat,lng' with radius (meters) and/or k; the POIs within radius
+      or the k nearest, closest first, each with its distance_m
+    - limit, cursor: pages in id order; the cursor of the next page is sent
+      in the X-Next-Cursor header and a Link rel="next" header
+    - fields: comma-separated subset of POI_FIELDS
+    - format: 'json' (default) or 'ndjson', one object per line
+    - updated_since: ISO timestamp (UTC); only POIs changed since then,
+      answered as {'pois': [...], 'deleted': [ids]} (NDJSON: one
+      {'id', 'deleted': true} line per deletion)
+    
+    Rows are serialized while they are read from the database, so memory use
+    does not grow with the table. Every listing carries X-Sync-Time, the
+    updated_since value that fetches the changes made after it.
+    """
+    try:
+        bbox = parse_bbox(request.args['bbox']) if request.args.get('bbox') else None
+        near = _parse_point(request.args['near']) if request.args.get('near') else None
+        radius = request.args.get('radius', type=float)
+        k = request.args.get('k', type=int)
+        fields = _parse_fields(request.args.get('fields'))
+        limit = request.args.get('limit', type=int)
+        cursor = int(request.args['cursor']) if request.args.get('cursor') else None
+        since = _parse_since(request.args['updated_since']) if request.args.get('updated_since') else None
+        output_format = request.args.get('format', 'json')
+        if output_format not in ('json', 'ndjson'):
+            raise ValueError("format must be 'json' or 'ndjson'")
+        if limit is not None and not 1 <= limit <= MAX_POI_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_POI_PAGE_SIZE}")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    sync_time = datetime.utcnow()
+    query = PointOfInterest.query
+    if bbox is not None:
+        query = _filter_bbox(query, bbox)
+    if near is not None:
+        return _nearest_pois(query, near, radius, k, fields, in_bbox=bbox is not None)
+    if radius is not None or k is not None:
+        return jsonify({'error': 'radius and k require near=lat,lng'}), 400
+    
+    if since is not None:
+        query = query.filter(PointOfInterest.updated_at >= since)
+    if cursor is not None:
+        query = query.filter(PointOfInterest.id > cursor)
+    columns = [getattr(PointOfInterest, field) for field in fields]
+    if 'id' not in fields:
+        columns.append(PointOfInterest.id)  # The page cursor
+    query = query.with_entities(*columns).order_by(PointOfInterest.id)
+    
+    headers = {'X-Sync-Time': sync_time.isoformat()}
+    if limit is not None:
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            args = request.args.copy()
+            args['cursor'] = str(rows[-1].id)
+            headers['X-Next-Cursor'] = args['cursor']
+            headers['Link'] = f'<{request.base_url}?{urlencode(list(args.items(multi=True)))}>; rel="next"'
+    else:
+        rows = query.yield_per(STREAM_BATCH_SIZE)
+    
+    # Deletions are reported once, with the first page
+    deleted = []
+    if since is not None and cursor is None:
+        deleted = [poi_id for poi_id, in db.session.query(PoiTombstone.poi_id).filter(PoiTombstone.deleted_at >= since)]
+    
+    items = (dict(zip(fields, (_json_value(value) for value in row))) for row in rows)
+    if output_format == 'ndjson':
+        return Response(stream_with_context(_ndjson_lines(items, deleted)),
+                        mimetype='application/x-ndjson', headers=headers)
+    if since is not None:
+        return jsonify({'pois': list(items), 'deleted': deleted}), 200, headers
+    return Response(stream_with_context(_json_array(items)), mimetype='application/json', headers=headers)
+
+def _nearest_pois(query, near, radius, k, fields, in_bbox=False):
+    if radius is None and k is None:
+        return jsonify({'error': 'near requires radius or k'}), 400
+    
+    # With a bbox the k nearest may lie outside it, so rank everything in range first
+    hits = get_poi_index().nearest(near[0], near[1], k=None if in_bbox else k, radius=radius)
+    pois = _pois_by_id(query, [poi_id for poi_id, _ in hits])
+    results = []
+    for poi_id, distance in hits:
+        if poi_id in pois:
+            poi = pois[poi_id].to_dict()
+            results.append(dict({field: poi[field] for field in fields}, distance_m=round(distance, 1)))
+            if k is not None and len(results) == k:
+                break
+    return jsonify(results)
+
+def _parse_fields(text):
+    if not text:
+        return POI_FIELDS
+    fields = tuple(field.strip() for field in text.split(',') if field.strip())
+    unknown = [field for field in fields if field not in POI_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"fields must be a subset of {', '.join(POI_FIELDS)}")
+    return fields
+
+def _parse_since(text):
+    """ISO timestamp to a naive UTC datetime, as stored in updated_at"""
+    try:
+        since = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError("updated_since must be an ISO 8601 timestamp")
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _json_array(items):
+    yield '['
+    for i, item in enumerate(items):
+        yield (',' if i else '') + json.dumps(item)
+    yield ']'
+
+def _ndjson_lines(items, deleted=()):
+    for item in items:
+        yield json.dumps(item) + '\n'
+    for poi_id in deleted:
+        yield json.dumps({'id': poi_id, 'deleted': True}) + '\n'
+
+def _parse_point(text):
+    """'lat,lng' to a tuple of floats"""
+    try:
+        lat, lng = (float(part) for part in text.split(','))
+    except ValueError:
+        raise ValueError("near must be 'lat,lng'")
+    return lat, lng
+
+def _filter_bbox(query, bbox):
+    west, south, east, north = bbox
+    query = query.filter(PointOfInterest.latitude.between(south, north))
+    if west <= east:
+        return query.filter(PointOfInterest.longitude.between(west, east))
+    # The box crosses the antimeridian
+    return query.filter((PointOfInterest.longitude >= west) | (PointOfInterest.longitude <= east))
+
+def _pois_by_id(query, ids, chunk_size=500):
+    """{id: POI} for the ids that query also matches, fetched in chunks to stay under SQL parameter limits"""
+    pois = {}
+    for start in range(0, len(ids), chunk_size):
+        for poi in query.filter(PointOfInterest.id.in_(ids[start:start + chunk_size])):
+            pois[poi.id] = poi
+    return pois
+
+def _destination_pois(origin_lat, origin_lng, max_minutes=None, k=None):
+    """
+    The POIs to time from the origin: those a straight line at the prefilter
+    speed reaches within max_minutes, or the k nearest, or all of them.
+    """
+    if max_minutes is None and k is None:
+        return PointOfInterest.query.all()
+    radius = None
+    if max_minutes is not None:
+        speed_kmh = current_app.config.get('TRAVEL_TIME_PREFILTER_SPEED_KMH', 130)
+        radius = max_minutes * 60 * speed_kmh / 3.6
+    hits = get_poi_index().nearest(origin_lat, origin_lng, k=k, radius=radius)
+    by_id = _pois_by_id(PointOfInterest.query, [poi_id for poi_id, _ in hits])
+    return [by_id[poi_id] for poi_id, _ in hits if poi_id in by_id]
 
 @api_bp.route('/pois', methods=['POST'])
 def create_poi():
@@ -34,6 +213,49 @@ def create_poi():
     db.session.commit()
     return jsonify(new_poi.to_dict()), 201
 
+@api_bp.route('/pois/bulk', methods=['POST', 'PUT', 'DELETE'])
+def bulk_pois():
+    """
+    Create (POST), update (PUT) or delete (DELETE) many POIs in one request.
+    
+    The body is CSV, NDJSON or GeoJSON, named by ?format= or the Content-Type,
+    and is read as a stream in batches. Updates change only the fields a
+    record carries; deletes need only the id. Rejected records are listed in
+    the report with their 1-based position, the rest are written.
+    """
+    operation = {'POST': 'create', 'PUT': 'update', 'DELETE': 'delete'}[request.method]
+    fmt = request.args.get('format') or detect_format(request.mimetype)
+    if fmt not in BULK_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(BULK_FORMATS)}"}), 400
+    
+    try:
+        report = bulk_apply(read_records(request.stream, fmt), operation)
+    except ValueError as e:
+        # The document itself could not be parsed (a FeatureCollection that is not JSON)
+        return jsonify({'error': str(e)}), 400
+    logging.info("Bulk %s of %d POIs took %.2f s (%.0f rows/s)",
+                 operation, report.rows, report.seconds, report.rows_per_second)
+    return jsonify(dict(report.to_dict(), success=report.rejected == 0))
+
+@api_bp.route('/pois/export', methods=['GET'])
+def export_pois():
+    """
+    Stream every POI as CSV, NDJSON or GeoJSON (?format=, default ndjson).
+    
+    Accepts the same fields parameter as the listing.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    try:
+        if fmt not in BULK_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(BULK_FORMATS)}")
+        fields = export_fields(_parse_fields(request.args.get('fields')), fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rows = export_query(fields, STREAM_BATCH_SIZE)
+    return Response(stream_with_context(export_records(rows, fmt, fields)), mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename=pois.{fmt}'})
+
 @api_bp.route('/pois/<int:poi_id>', methods=['GET'])
 def get_poi(poi_id):
     # Retrieve specific POI by ID
@@ -65,7 +287,7 @@ def delete_poi(poi_id):
     return jsonify({'result': 'success'}), 200
 
 @api_bp.route('/travel-times', methods=['GET'])
-def travel_times():
+async def travel_times():
     # Get origin coordinates from request
     origin_lat = request.args.get('origin_lat', type=float)
     origin_lng = request.args.get('origin_lng', type=float)
@@ -82,8 +304,10 @@ def travel_times():
         except:
             return jsonify({'error': 'Invalid destinations format'}), 400
     else:
-        # Use all POIs as destinations if none specified
-        pois = PointOfInterest.query.all()
+        # Use the POIs as destinations if none specified; the queries run on
+        # a worker thread so the event loop keeps serving other requests
+        pois = await asyncio.to_thread(_destination_pois, origin_lat, origin_lng,
+                                       request.args.get('max_minutes', type=float), request.args.get('k', type=int))
         destinations = [{'id': poi.id, 'name': poi.name, 'lat': poi.latitude, 'lng': poi.longitude} for poi in pois]
     
     # Determine whether to return isochrones or point-to-point times
@@ -91,15 +315,15 @@ def travel_times():
     
     if use_isochrones:
         # Get isochrones (time-based polygons)
-        times = get_travel_times(origin_lat, origin_lng)
+        times = await get_travel_times_async(origin_lat, origin_lng)
     else:
         # Get specific travel times to destinations
-        times = get_travel_times(origin_lat, origin_lng, destinations)
+        times = await get_travel_times_async(origin_lat, origin_lng, destinations)
     
     return jsonify(times)
 
 @api_bp.route('/isochrones', methods=['GET'])
-def isochrones():
+async def isochrones():
     # Get origin coordinates
     origin_lat = request.args.get('origin_lat', type=float)
     origin_lng = request.args.get('origin_lng', type=float)
@@ -117,23 +341,202 @@ def isochrones():
     except:
         travel_times = [5, 10, 15]
     
-    from app.services.travel_time_service import get_isochrones
-    isochrone_data = get_isochrones(origin_lat, origin_lng, travel_times, travel_mode)
+    # Optional map zoom, simplifies the polygons to what is visible at it
+    zoom = request.args.get('zoom', type=int)
+    
+    # Geometry encoding, GeoJSON coordinates or polyline strings per ring
+    fmt = request.args.get('format', 'geojson')
+    if fmt not in ('geojson', 'polyline'):
+        return jsonify({'error': 'format must be geojson or polyline'}), 400
+    
+    from app.services.travel_time_service import get_isochrones_async
+    isochrone_data = await get_isochrones_async(origin_lat, origin_lng, travel_times, travel_mode, zoom=zoom)
+    if isochrone_data.get('retry_after') is not None:
+        return _rate_limited(isochrone_data)
+    
+    if fmt == 'polyline' and 'features' in isochrone_data:
+        isochrone_data = encode_isochrones(isochrone_data, request.args.get('precision', 5, type=int))
+    return jsonify(isochrone_data)
+
+@api_bp.route('/matrix', methods=['GET'])
+def poi_matrix():
+    """
+    Travel times in seconds between POIs, ?ids=1,2,3 in that order or every POI by id.
+    
+    Returns {'ids', 'durations'} as JSON (null for unroutable pairs), or with
+    ?format=npy or Accept: application/x-npy a float32 .npy buffer (NaN for
+    unroutable pairs) whose row order is given in the X-Poi-Ids header.
+    """
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = 'npy' if request.accept_mimetypes.best_match(['application/json', NPY_MIMETYPE]) == NPY_MIMETYPE else 'json'
+    if fmt not in ('json', 'npy'):
+        return jsonify({'error': 'format must be json or npy'}), 400
+    
+    ids_param = request.args.get('ids')
+    if ids_param:
+        try:
+            ids = [int(poi_id) for poi_id in ids_param.split(',')]
+        except ValueError:
+            return jsonify({'error': 'ids must be comma separated integers'}), 400
+        by_id = _pois_by_id(PointOfInterest.query, list(set(ids)))
+        missing = [poi_id for poi_id in ids if poi_id not in by_id]
+        if missing:
+            return jsonify({'error': f"unknown POI ids: {', '.join(map(str, missing))}"}), 404
+        pois = [by_id[poi_id] for poi_id in ids]
+    else:
+        pois = PointOfInterest.query.order_by(PointOfInterest.id).limit(MAX_MATRIX_POIS + 1).all()
+    if len(pois) > MAX_MATRIX_POIS:
+        return jsonify({'error': f'at most {MAX_MATRIX_POIS} POIs per matrix'}), 400
+    
+    from app.services.routing_backend import get_routing_backend
+    from app.services.routing_client import RoutingServiceError
+    points = [{'lat': poi.latitude, 'lng': poi.longitude} for poi in pois]
+    try:
+        durations = get_routing_backend().matrix(points, points, request.args.get('mode', 'driving-car'))
+    except RoutingServiceError as e:
+        return jsonify({'error': str(e)}), 502
+    
+    ids = [poi.id for poi in pois]
+    if fmt == 'npy':
+        response = Response(npy_bytes(durations), mimetype=NPY_MIMETYPE)
+        response.headers['X-Poi-Ids'] = ','.join(map(str, ids))
+        return response
+    rows = [[None if value != value else float(value) for value in row] for row in durations.tolist()]
+    return jsonify({'ids': ids, 'durations': rows})
+
+def _rate_limited(data):
+    """429 telling the client when the routing quota frees up again"""
+    return jsonify(data), 429, {'Retry-After': str(math.ceil(data['retry_after']))}
+
+@api_bp.route('/isochrones/field', methods=['GET'])
+def field_isochrones():
+    """
+    Isochrones from the cached travel-time field around the origin.
+    
+    Takes the parameters of /isochrones. Only the first request for an
+    origin and mode reaches the routing backend, so clients can call it on
+    every slider move.
+    """
+    origin_lat = request.args.get('origin_lat', type=float)
+    origin_lng = request.args.get('origin_lng', type=float)
+    if origin_lat is None or origin_lng is None:
+        return jsonify({'error': 'Origin coordinates required'}), 400
+    
+    try:
+        travel_times = [int(t) for t in request.args.get('times', '5,10').split(',')]
+    except ValueError:
+        return jsonify({'error': 'times must be comma separated minutes'}), 400
+    if min(travel_times) <= 0:
+        return jsonify({'error': 'times must be positive'}), 400
+    
+    fmt = request.args.get('format', 'geojson')
+    if fmt not in ('geojson', 'polyline'):
+        return jsonify({'error': 'format must be geojson or polyline'}), 400
+    
+    from app.services.travel_time_service import get_field_isochrones
+    isochrone_data = get_field_isochrones(origin_lat, origin_lng, travel_times, request.args.get('mode', 'driving-car'),
+                                          zoom=request.args.get('zoom', type=int))
+    if isochrone_data.get('retry_after') is not None:
+        return _rate_limited(isochrone_data)
     
+    if fmt == 'polyline' and 'features' in isochrone_data:
+        isochrone_data = encode_isochrones(isochrone_data, request.args.get('precision', 5, type=int))
     return jsonify(isochrone_data)
 
+@api_bp.route('/isochrones/batch', methods=['POST'])
+async def batch_isochrones():
+    """
+    Isochrones for many origins in one request.
+    
+    Takes a JSON body with 'origins' ([{id, lat, lng}]) and/or 'poi_ids',
+    plus 'times', 'mode', 'zoom' and 'format' as for /isochrones. Duplicate
+    origins are computed once and the rest are packed into as few upstream
+    requests as the routing backend allows. Every feature carries the
+    'origin_id' it belongs to (POIs use 'poi:<id>'), and 'errors' lists the
+    origins whose batch failed.
+    """
+    data = request.get_json(silent=True) or {}
+    origins = data.get('origins') or []
+    poi_ids = data.get('poi_ids') or []
+    if not isinstance(origins, list) or not isinstance(poi_ids, list):
+        return jsonify({'error': 'origins and poi_ids must be lists'}), 400
+    
+    try:
+        origins = [{'id': origin.get('id', index), 'lat': float(origin['lat']), 'lng': float(origin['lng'])}
+                   for index, origin in enumerate(origins)]
+        poi_ids = [int(poi_id) for poi_id in poi_ids]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return jsonify({'error': 'origins need numeric lat and lng, poi_ids must be integers'}), 400
+    if poi_ids:
+        by_id = await asyncio.to_thread(_pois_by_id, PointOfInterest.query, list(set(poi_ids)))
+        missing = [poi_id for poi_id in poi_ids if poi_id not in by_id]
+        if missing:
+            return jsonify({'error': f'Unknown POI ids: {missing[:10]}'}), 404
+        origins += [{'id': f'poi:{poi_id}', 'lat': by_id[poi_id].latitude, 'lng': by_id[poi_id].longitude}
+                    for poi_id in poi_ids]
+    if not origins:
+        return jsonify({'error': 'origins or poi_ids required'}), 400
+    max_origins = current_app.config.get('ISOCHRONE_BATCH_MAX_ORIGINS', 500)
+    if len(origins) > max_origins:
+        return jsonify({'error': f'At most {max_origins} origins per request'}), 400
+    
+    try:
+        travel_times = [int(t) for t in data.get('times', [5, 10, 15])]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'times must be a list of minutes'}), 400
+    if not travel_times or min(travel_times) <= 0:
+        return jsonify({'error': 'times must be positive'}), 400
+    
+    fmt = data.get('format', 'geojson')
+    if fmt not in ('geojson', 'polyline'):
+        return jsonify({'error': 'format must be geojson or polyline'}), 400
+    zoom = data.get('zoom')
+    if zoom is not None and not isinstance(zoom, int):
+        return jsonify({'error': 'zoom must be an integer'}), 400
+    
+    from app.services.travel_time_service import get_isochrones_batch_async
+    isochrone_data = await get_isochrones_batch_async(origins, travel_times, data.get('mode', 'driving-car'),
+                                                      zoom=zoom)
+    
+    if fmt == 'polyline' and 'features' in isochrone_data:
+        isochrone_data = encode_isochrones(isochrone_data, int(data.get('precision', 5)))
+    return jsonify(isochrone_data)
+
+@api_bp.route('/isochrones/cache', methods=['GET'])
+def isochrone_cache_stats():
+    """Report hit/miss counters and sizes of the isochrone cache"""
+    if not current_app.config.get('ISOCHRONE_CACHE_ENABLED', True):
+        return jsonify({'enabled': False})
+    from app.services.isochrone_cache import get_isochrone_cache
+    return jsonify(dict(get_isochrone_cache().stats(), enabled=True))
+
+@api_bp.route('/rate-limit', methods=['GET'])
+def rate_limit_stats():
+    """Remaining upstream routing budget shared by the workers of this host"""
+    from app.services.rate_limiter import get_rate_limiter
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(limiter.stats(), enabled=True))
+
 @api_bp.route('/deform-map/<screenshot_id>', methods=['GET'])
 def deform_map(screenshot_id):
-    """Generate a time-deformed map for a given screenshot ID"""
+    """
+    Generate a time-deformed map for a given screenshot ID.
+    
+    With ?async=true the work is queued and 202 is returned at once with a job
+    whose status is polled at /api/deform-jobs/<job_id>.
+    """
     try:
         print(f"\n=== Starting time-deformed map generation for {screenshot_id} ===\n")
         
         # Import map deformer service
-        from app.services.map_deformer import generate_time_deformed_map
+        from app.services.map_deformer import deform_screenshot
         
         # Get API key from configuration
         api_key = current_app.config.get('TRAVEL_TIME_API_KEY')
-        if not api_key:
+        if not api_key and current_app.config.get('ROUTING_BACKEND', 'ors') != 'local':
             return jsonify({'success': False, 'error': 'No API key configured'}), 500
             
         # Find screenshot files in locals directory
@@ -154,27 +557,21 @@ def deform_map(screenshot_id):
                 'error': 'Need at least 2 POIs to create a time-deformed map'
             }), 400
 
+        if request.args.get('async', 'false').lower() == 'true':
+            from app.services.job_queue import QueueFullError, get_job_queue
+            # Identical in-flight requests share one job; edits to the screenshot start a new one
+            key = f"deform:{screenshot_id}:{os.path.getmtime(json_path)}:{os.path.getmtime(png_path)}"
+            try:
+                job, created = get_job_queue().submit(key, deform_screenshot, screenshot_id, api_key)
+            except QueueFullError as e:
+                response = jsonify({'success': False, 'error': str(e)})
+                response.headers['Retry-After'] = '5'
+                return response, 503
+            return jsonify(_job_payload(job, deduplicated=not created)), 202
+
         # Generate the time-deformed map
-        try:
-            # Try API-based approach first
-            output_path = generate_time_deformed_map(screenshot_id, api_key)
-        except Exception as api_error:
-            print(f"API approach failed: {str(api_error)}")
-            print("Falling back to distance-based calculation...")
-            
-            # Use fallback method
-            from app.services.map_deformer import MapDeformer
-            deformer = MapDeformer(None)
-            output_path = deformer.create_time_deformed_map(json_path, output_dir=locals_dir)
-        
-        # Get filename for response
-        filename = os.path.basename(output_path)
-        
-        return jsonify({
-            'success': True,
-            'filename': filename,
-            'url': f"/api/map-image/{filename}"
-        })
+        result = deform_screenshot(screenshot_id, api_key)
+        return jsonify({'success': True, **result})
         
     except Exception as e:
         import traceback
@@ -182,44 +579,81 @@ def deform_map(screenshot_id):
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@api_bp.route('/deform-jobs/<job_id>', methods=['GET'])
+def deform_job_status(job_id):
+    """Report the status of a queued time-deformed map job"""
+    from app.services.job_queue import get_job_queue
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify(_job_payload(job))
+
+@api_bp.route('/deform-jobs/<job_id>/result', methods=['GET'])
+def deform_job_result(job_id):
+    """Return the map of a finished job, 202 while it is still pending"""
+    from app.services.job_queue import DONE, FAILED, get_job_queue
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job['status'] == DONE:
+        return jsonify({'success': True, **job['result']})
+    if job['status'] == FAILED:
+        return jsonify({'success': False, 'error': job['error']}), 500
+    response = jsonify(_job_payload(job))
+    response.headers['Retry-After'] = '1'
+    return response, 202
+
+def _job_payload(job, deduplicated=False):
+    payload = {
+        'success': job['status'] != 'failed',
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': f"/api/deform-jobs/{job['id']}",
+        'result_url': f"/api/deform-jobs/{job['id']}/result",
+        'deduplicated': deduplicated
+    }
+    if job['result']:
+        payload.update(job['result'])
+    if job['error']:
+        payload['error'] = job['error']
+    return payload
+
 @api_bp.route('/screenshots', methods=['GET'])
 def get_screenshots():
-    """Get all available map screenshots"""
+    """
+    List map screenshots, newest first, one page at a time.
+    
+    Query parameters:
+    - limit: page size (default 50, at most 200)
+    - cursor: the next_cursor of the previous page
+    - bbox: 'west,south,east,north', only screenshots whose bounds intersect it
+    """
     try:
-        # Find screenshots directory
-        screenshots_dir = os.path.join(os.path.dirname(__file__), '..', 'locals', 'map_screenshots')
-        screenshots = []
-        
-        # Find all JSON metadata files
-        for filename in os.listdir(screenshots_dir):
-            if filename.endswith('.json'):
-                screenshot_id = os.path.splitext(filename)[0]
-                json_path = os.path.join(screenshots_dir, filename)
-                png_path = os.path.join(screenshots_dir, f"{screenshot_id}.png")
-                timedeformed_path = os.path.join(screenshots_dir, f"{screenshot_id}-timedeformed.png")
-                
-                if os.path.exists(png_path):
-                    # Load metadata from JSON
-                    with open(json_path, 'r') as f:
-                        data = json.load(f)
-                    
-                    screenshots.append({
-                        'id': screenshot_id,
-                        'name': f"Map {screenshot_id[-6:]}",
-                        'filename': f"{screenshot_id}.png",
-                        'timestamp': data.get('timestamp', ''),
-                        'poiCount': len(data.get('pois', [])),
-                        'timeDeformed': os.path.exists(timedeformed_path)
-                    })
-        
-        # Sort by timestamp (newest first)
-        screenshots.sort(key=lambda x: x['timestamp'], reverse=True)
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        bbox = parse_bbox(request.args['bbox']) if request.args.get('bbox') else None
+        try:
+            screenshots, next_cursor = list_screenshots(limit, request.args.get('cursor'), bbox)
+        except OperationalError:
+            # Catalog table not created yet (flask db upgrade), list the directory instead
+            db.session.rollback()
+            logging.warning("Screenshot catalog unavailable, scanning the screenshot directory")
+            return jsonify({
+                'success': True,
+                'screenshots': _scan_screenshots(),
+                'next_cursor': None
+            })
         
         return jsonify({
             'success': True,
-            'screenshots': screenshots
+            'screenshots': [screenshot.to_dict() for screenshot in screenshots],
+            'next_cursor': next_cursor
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -228,31 +662,60 @@ def get_screenshots():
             'error': str(e)
         }), 500
 
+def _scan_screenshots():
+    """All screenshots found in the screenshot directory, for databases without the catalog table"""
+    screenshots_dir = os.path.join(current_app.root_path, 'locals', 'map_screenshots')
+    screenshots = []
+    for filename in os.listdir(screenshots_dir):
+        if filename.endswith('.json'):
+            screenshot_id = os.path.splitext(filename)[0]
+            png_path = os.path.join(screenshots_dir, f"{screenshot_id}.png")
+            timedeformed_path = os.path.join(screenshots_dir, f"{screenshot_id}-timedeformed.png")
+            if os.path.exists(png_path):
+                with open(os.path.join(screenshots_dir, filename), 'r') as f:
+                    data = json.load(f)
+                screenshots.append({
+                    'id': screenshot_id,
+                    'name': f"Map {screenshot_id[-6:]}",
+                    'filename': f"{screenshot_id}.png",
+                    'timestamp': data.get('timestamp', ''),
+                    'poiCount': len(data.get('pois', [])),
+                    'timeDeformed': os.path.exists(timedeformed_path)
+                })
+    screenshots.sort(key=lambda x: x['timestamp'], reverse=True)
+    return screenshots
+
 @api_bp.route('/map-image/<filename>', methods=['GET'])
 def serve_map_image(filename):
-    """Serve image files from either static or locals directories"""
+    """
+    Serve image files from the static, locals or artifact directories.
+    
+    Responses carry ETag and Last-Modified headers and answer conditional
+    requests with 304. Rendered artifacts are named after their content key, so
+    they can be cached by clients indefinitely.
+    """
     try:
-        # Check static directory first
-        static_dir = os.path.join(current_app.root_path, 'static', 'map_screenshots')
-        static_path = os.path.join(static_dir, filename)
-        
-        if os.path.exists(static_path):
-            return send_file(static_path)
-            
-        # If not found, check locals directory
-        locals_dir = os.path.join(current_app.root_path, 'locals', 'map_screenshots')
-        locals_path = os.path.join(locals_dir, filename)
+        directories = [
+            os.path.join(current_app.root_path, 'static', 'map_screenshots'),
+            os.path.join(current_app.root_path, 'locals', 'map_screenshots')
+        ]
+        for directory in directories:
+            path = safe_join(directory, filename)
+            if path and os.path.isfile(path):
+                return send_file(path, conditional=True, etag=True)
         
-        if os.path.exists(locals_path):
-            # Copy to static for caching
-            os.makedirs(static_dir, exist_ok=True)
-            import shutil
-            shutil.copy2(locals_path, static_path)
-            print(f"Copied {locals_path} to {static_path}")
-            return send_file(locals_path)
+        from app.services.artifact_cache import get_artifact_cache
+        artifacts = get_artifact_cache()
+        if artifacts is not None:
+            path = safe_join(artifacts.directory, filename)
+            if path and os.path.isfile(path):
+                key = os.path.splitext(filename)[0]
+                response = send_file(path, conditional=True, etag=key, max_age=365 * 24 * 60 * 60)
+                response.cache_control.immutable = True
+                return response
             
         return "Image not found", 404
         
     except Exception as e:
         print(f"Error serving image: {str(e)}")
-        return str(e), 500
\ No newline at end of file
+        return str(e), 500
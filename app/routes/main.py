@@ -1,9 +1,17 @@
 import requests
 from flask import request, jsonify, Blueprint, render_template, current_app
 from app.config import Config
+from app.services.rate_limiter import RateLimitExceeded
+from app.services.routing_client import get_routing_client, CircuitOpenError
 import os
+import io
+import json
 import base64
 from datetime import datetime
+from werkzeug.exceptions import BadRequest, HTTPException, RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+from app.services.screenshot_catalog import register_screenshot
+from app.services.uploads import LimitedFile, discard_upload, finish_upload, part_path, stream_to_file
 
 # Create blueprint for main routes
 main_bp = Blueprint('main', __name__)
@@ -24,8 +32,8 @@ def isochrones_proxy():
         data = request.json
         
         # Make request to external API
-        response = requests.post(
-            'https://api.openrouteservice.org/v2/isochrones/driving-car',
+        response = get_routing_client().post(
+            '/v2/isochrones/driving-car',
             json=data,
             headers={
                 'Accept': 'application/json, application/geo+json',
@@ -37,45 +45,73 @@ def isochrones_proxy():
         # Return API response to client
         return response.json(), response.status_code
         
+    except RateLimitExceeded as e:
+        # The shared quota is spent, tell the client when to come back
+        return jsonify({"error": str(e)}), 429, {'Retry-After': str(int(e.retry_after) + 1)}
+    except CircuitOpenError as e:
+        # Upstream is known to be down, fail fast instead of waiting on it
+        return jsonify({"error": str(e)}), 503
     except requests.exceptions.RequestException as e:
         return jsonify({"error": str(e)}), 500
     
 @main_bp.route('/save-screenshot', methods=['POST'])
 def save_screenshot():
+    """
+    Save a map screenshot and its POI metadata.
+    
+    The image may be sent as:
+    - multipart/form-data with a 'metadata' JSON field and an 'image' PNG part
+    - a raw image/png body with the metadata JSON in the X-Screenshot-Metadata header
+    - the original JSON body carrying a base64 data URL in 'imageData'
+    
+    Binary uploads are streamed to disk in chunks and refused with 413 as soon
+    as they exceed SCREENSHOT_MAX_BYTES.
+    """
     try:
-        # Extract image data from request
-        data = request.json
-        image_data = data['imageData'].split(',')[1]
-        
-        # Get POI coordinates and bounds
-        poi_coords = data.get('pois', [])
-        bounds_coords = data.get('bounds', {})
-        
         # Create directory for screenshots
         screenshot_dir = os.path.join(current_app.root_path, 'locals', 'map_screenshots')
         os.makedirs(screenshot_dir, exist_ok=True)
         
         # Create unique filename with timestamp
         timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
-        filename = f'map-screenshot-{timestamp}.png'
+        base_name = _reserve_screenshot_name(screenshot_dir, f'map-screenshot-{timestamp}')
+        filename = f'{base_name}.png'
         filepath = os.path.join(screenshot_dir, filename)
         
-        # Save the image
-        with open(filepath, 'wb') as f:
-            f.write(base64.b64decode(image_data))
+        max_bytes = current_app.config.get('SCREENSHOT_MAX_BYTES')
+        chunk_size = current_app.config.get('SCREENSHOT_CHUNK_SIZE', 64 * 1024)
+        try:
+            if request.mimetype == 'multipart/form-data':
+                metadata = _save_multipart_screenshot(filepath, max_bytes, chunk_size)
+            elif request.mimetype in ('image/png', 'application/octet-stream'):
+                metadata = _parse_metadata(request.headers.get('X-Screenshot-Metadata'))
+                if max_bytes and request.content_length and request.content_length > max_bytes:
+                    raise RequestEntityTooLarge(f"Screenshot exceeds {max_bytes} bytes")
+                stream_to_file(request.stream, filepath, max_bytes, chunk_size)
+            else:
+                metadata = _save_data_url_screenshot(filepath, max_bytes)
+        except BaseException:
+            # Give the reserved name back
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+            raise
         
         # Save metadata in JSON file
-        metadata_filename = f'map-screenshot-{timestamp}.json'
+        metadata_filename = f'{base_name}.json'
         metadata_filepath = os.path.join(screenshot_dir, metadata_filename)
         
         with open(metadata_filepath, 'w') as f:
-            import json
             json.dump({
                 'timestamp': timestamp,
-                'pois': poi_coords,
-                'bounds': bounds_coords
+                'pois': metadata.get('pois', []),
+                'bounds': metadata.get('bounds', {})
             }, f, indent=2)
         
+        # Index it for /api/screenshots
+        register_screenshot(base_name, timestamp, metadata.get('pois', []), metadata.get('bounds', {}))
+        
         return jsonify({
             'success': True, 
             'message': f'Screenshot saved as {filename}',
@@ -83,6 +119,11 @@ def save_screenshot():
             'metadata': metadata_filename
         })
         
+    except HTTPException as e:
+        return jsonify({
+            'success': False,
+            'error': e.description
+        }), e.code
     except Exception as e:
         print(f"Screenshot error: {str(e)}")
         return jsonify({
@@ -90,6 +131,73 @@ def save_screenshot():
             'error': str(e)
         }), 500
 
+def _reserve_screenshot_name(directory, base_name):
+    """
+    base_name, or base_name-N when a screenshot was already saved in the same second.
+
+    The name is claimed by creating an empty PNG with O_EXCL, so concurrent
+    uploads never pick the same one; the upload later replaces that file.
+    """
+    candidate = base_name
+    suffix = 1
+    while True:
+        try:
+            os.close(os.open(os.path.join(directory, f'{candidate}.png'), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return candidate
+        except FileExistsError:
+            suffix += 1
+            candidate = f'{base_name}-{suffix}'
+
+def _parse_metadata(text):
+    if not text:
+        return {}
+    try:
+        metadata = json.loads(text)
+    except ValueError:
+        raise BadRequest("Screenshot metadata must be JSON")
+    if not isinstance(metadata, dict):
+        raise BadRequest("Screenshot metadata must be a JSON object")
+    return metadata
+
+def _save_multipart_screenshot(filepath, max_bytes, chunk_size):
+    """Stream the 'image' part straight into the screenshot file and return the metadata"""
+    uploads = []
+    
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        if uploads:
+            raise BadRequest("Only one image part is accepted")
+        uploads.append(LimitedFile(part_path(filepath), max_bytes))
+        return uploads[0]
+    
+    try:
+        _, form, files = parse_form_data(
+            request.environ,
+            stream_factory=stream_factory,
+            max_form_memory_size=current_app.config.get('SCREENSHOT_MAX_METADATA_BYTES', 4 * 1024 * 1024),
+            silent=False
+        )
+        if 'image' not in files or not uploads:
+            raise BadRequest("Missing 'image' part")
+        metadata = _parse_metadata(form.get('metadata'))
+        finish_upload(uploads[0], filepath)
+    except BaseException:
+        for upload in uploads:
+            discard_upload(upload)
+        raise
+    return metadata
+
+def _save_data_url_screenshot(filepath, max_bytes):
+    """The original JSON form: {'imageData': 'data:image/png;base64,...', 'pois': [...], 'bounds': {...}}"""
+    # Base64 inflates the image by 4/3, leave room for the POI metadata
+    if max_bytes and request.content_length and request.content_length > max_bytes * 4 // 3 + 4 * 1024 * 1024:
+        raise RequestEntityTooLarge(f"Screenshot exceeds {max_bytes} bytes")
+    data = request.get_json()
+    image_data = data['imageData']
+    image = base64.b64decode(image_data[image_data.index(',') + 1:])
+    del data['imageData'], image_data
+    stream_to_file(io.BytesIO(image), filepath, max_bytes, require_png=False)
+    return data
+
 @main_bp.route('/time-deformed')
 def time_deformed():
     """Time-deformed maps page"""
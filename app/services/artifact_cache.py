@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from flask import current_app, has_app_context
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 hex digest of a file's content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_key(pois, bounds, travel_mode, matrix_source, image_size, renderer_version, image_digest=None,
+                 render_options=None, precision=6):
+    """
+    Content address of a rendered map.
+
+    Everything the rendered image depends on goes into the key: POI positions
+    (in request order, since labels follow it), the map bounds, the travel
+    mode, which backend produced the travel times, the canvas size, the
+    screenshot content (file_digest), the renderer version and the render
+    settings read from the config (render_options).
+    """
+    payload = {
+        'pois': [[round(float(p['lat']), precision), round(float(p['lng']), precision)] for p in pois],
+        'bounds': {
+            corner: [round(float(bounds.get(corner, {}).get('lat', 0)), precision),
+                     round(float(bounds.get(corner, {}).get('lng', 0)), precision)]
+            for corner in ('northEast', 'southWest')
+        },
+        'mode': travel_mode,
+        'source': matrix_source,
+        'size': list(image_size),
+        'image': image_digest,
+        'renderer': renderer_version,
+        'options': render_options or {}
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ArtifactCache:
+    """
+    Content-addressed store of rendered images.
+
+    Files are named after their key, so an identical request finds its output
+    without rendering, and a key never maps to different content. The folder
+    is capped in bytes; the least recently used files are removed first.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, suffix='.png'):
+        """
+        Args:
+            directory (str): Folder holding the artifacts
+            max_bytes (int): Size cap of the folder
+            suffix (str): File extension of the artifacts
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        """Return the artifact path for key, or None; a hit marks the file as recently used"""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._counters['misses'] += 1
+            return None
+        with self._lock:
+            self._counters['hits'] += 1
+        return path
+
+    def put(self, key, write):
+        """Store the file written by write(path) under key and return the artifact path"""
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self._lock:
+            self._counters['stores'] += 1
+            self._evict(keep=path)
+        return path
+
+    def publish(self, key, output_path):
+        """
+        Make output_path an alias of the artifact for key.
+
+        A hard link is used where the file system allows it so no bytes are
+        copied; the previous output_path is replaced atomically.
+        """
+        tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            os.link(self.path(key), tmp_path)
+        except OSError:
+            shutil.copyfile(self.path(key), tmp_path)
+        os.replace(tmp_path, output_path)
+        return output_path
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        files = self._files()
+        stats['entries'] = len(files)
+        stats['bytes'] = sum(size for _, size, _ in files)
+        return stats
+
+    def _files(self):
+        """(path, size, last used) of every artifact"""
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict(self, keep=None):
+        files = sorted(self._files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self._counters['evictions'] += 1
+
+
+def get_artifact_cache():
+    """Return the artifact cache of the current application, None when disabled or outside one"""
+    if not has_app_context():
+        return None
+    config = current_app.config
+    if not config.get('ARTIFACT_CACHE_ENABLED', True):
+        return None
+    cache = current_app.extensions.get('artifact_cache')
+    if cache is None:
+        directory = config.get('ARTIFACT_CACHE_PATH') or os.path.join(current_app.root_path, 'locals', 'artifacts')
+        cache = ArtifactCache(directory, max_bytes=config.get('ARTIFACT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+        current_app.extensions['artifact_cache'] = cache
+    return cache
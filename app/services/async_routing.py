@@ -0,0 +1,138 @@
+"""
+Asyncio access to the routing service.
+
+AsyncRoutingClient awaits upstream calls instead of blocking the worker,
+so one event loop can keep many of them in flight. It shares base URL,
+timeouts, retries, circuit breaker and rate limiter with the synchronous
+RoutingClient it wraps. With httpx installed it keeps its own pooled
+httpx.AsyncClient; without it every call runs the wrapped client on a
+worker thread, which still lets fan-outs proceed concurrently.
+
+Clients belong to the event loop that created them, see get_async_routing_client.
+"""
+import asyncio
+import weakref
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from app.services.routing_client import RETRY_STATUSES, CircuitOpenError, RoutingClient, get_routing_client
+
+
+class AsyncRoutingClient:
+    """
+    Awaitable counterpart of RoutingClient with the same retry semantics.
+    """
+
+    def __init__(self, client):
+        """
+        Args:
+            client (RoutingClient): Synchronous client whose settings, breaker and limiter are shared
+        """
+        self.client = client
+        self._http = None
+        if httpx is not None:
+            connect_timeout, read_timeout = client.timeout
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=client.pool_size, max_keepalive_connections=client.pool_size)
+            )
+
+    async def post(self, path, json=None, headers=None, timeout=None):
+        """POST to the routing service and return the final response, as RoutingClient.post"""
+        if self._http is None:
+            return await asyncio.to_thread(self.client.post, path, json=json, headers=headers, timeout=timeout)
+
+        client = self.client
+        url = path if path.startswith('http') else client.base_url + path
+        if timeout is not None:
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0]) if isinstance(timeout, tuple) else timeout
+        else:
+            timeout = httpx.USE_CLIENT_DEFAULT
+        if client.rate_limiter is not None:
+            from app.services.rate_limiter import bucket_for
+            bucket = bucket_for(url)
+
+        for attempt in range(client.max_retries + 1):
+            # Before the quota, as in RoutingClient.post
+            if not client.circuit_breaker.allow_request():
+                raise CircuitOpenError(f"Routing service unavailable, circuit open for {url}")
+            if client.rate_limiter is not None:
+                try:
+                    # The limiter sleeps while it waits for quota, so it gets a thread
+                    await asyncio.to_thread(client.rate_limiter.acquire, bucket)
+                except BaseException:
+                    client.circuit_breaker.release_trial()
+                    raise
+
+            last_attempt = attempt == client.max_retries
+            try:
+                response = await self._http.post(url, json=json, headers=headers, timeout=timeout)
+            except (httpx.ConnectError, httpx.TimeoutException):
+                client.circuit_breaker.record_failure()
+                if last_attempt:
+                    raise
+                await asyncio.sleep(client._backoff(attempt))
+                continue
+            except asyncio.CancelledError:
+                # The caller gave up, which says nothing about the upstream; just end a half-open trial
+                client.circuit_breaker.release_trial()
+                raise
+            except Exception:
+                # Any other error still ends a half-open trial, or the breaker never closes again
+                client.circuit_breaker.record_failure()
+                raise
+
+            if response.status_code >= 500:
+                client.circuit_breaker.record_failure()
+            else:
+                client.circuit_breaker.record_success()
+
+            if response.status_code == 429 and client.rate_limiter is not None:
+                pause = RoutingClient._retry_after(response)
+                client.rate_limiter.penalize(bucket, pause if pause is not None else client._backoff(attempt))
+
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+
+            delay = client._backoff(attempt)
+            retry_after = RoutingClient._retry_after(response)
+            if retry_after is not None:
+                if retry_after > client.max_backoff:
+                    return response
+                delay = max(delay, retry_after)
+            await asyncio.sleep(delay)
+
+        return response
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+
+
+# Event loop -> {RoutingClient: AsyncRoutingClient}
+_loop_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_routing_client(client=None):
+    """
+    Return the async client of the running event loop wrapping client.
+
+    client defaults to get_routing_client(). Connections cannot move between
+    event loops, so each loop gets its own pool.
+    """
+    client = client or get_routing_client()
+    clients = _loop_clients.setdefault(asyncio.get_running_loop(), {})
+    async_client = clients.get(client)
+    if async_client is None:
+        async_client = clients[client] = AsyncRoutingClient(client)
+    return async_client
+
+
+async def close_async_clients():
+    """Close the pools opened on the running event loop, before it ends"""
+    clients = _loop_clients.pop(asyncio.get_running_loop(), {})
+    for async_client in clients.values():
+        await async_client.aclose()
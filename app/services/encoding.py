@@ -0,0 +1,124 @@
+"""
+Compact encodings for API responses.
+
+Isochrone rings can be sent as encoded polylines (the Google polyline
+algorithm: deltas between consecutive points, zigzag-encoded and written
+as base64-like varints) and matrices as .npy buffers of little-endian
+float32 that np.load reads without parsing. Large textual responses are
+compressed with brotli when the client accepts it and the optional
+brotli package is installed, gzip otherwise.
+"""
+import gzip
+import io
+
+import numpy as np
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+NPY_MIMETYPE = 'application/x-npy'
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/geo+json', 'text/csv', NPY_MIMETYPE)
+
+# Varint chunks of 5 bits cover any 64-bit zigzag value
+_MAX_CHUNKS = 13
+
+
+def encode_polyline(coordinates, precision=5):
+    """
+    Encode [lng, lat] pairs (GeoJSON order) as a polyline string.
+
+    The string holds (lat, lng) pairs, as the format expects, rounded to
+    precision decimals.
+    """
+    points = np.asarray(coordinates, dtype=float).reshape(-1, 2)[:, ::-1]
+    values = np.round(points * 10 ** precision).astype(np.int64)
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    zigzag = (deltas << 1) ^ (deltas >> 63)
+
+    shifted = zigzag[:, None] >> (np.arange(_MAX_CHUNKS) * 5)
+    lengths = np.maximum((shifted > 0).sum(axis=1), 1)
+    position = np.arange(_MAX_CHUNKS)
+    chunks = (shifted & 0x1f) | np.where(position < lengths[:, None] - 1, 0x20, 0)
+    return (chunks[position < lengths[:, None]] + 63).astype(np.uint8).tobytes().decode('ascii')
+
+
+def decode_polyline(text, precision=5):
+    """Decode a polyline string back to [lng, lat] pairs"""
+    values = []
+    value = shift = 0
+    for byte in text.encode('ascii'):
+        byte -= 63
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if not byte & 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    points = np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return points[:, ::-1].tolist()
+
+
+def encode_isochrones(isochrones, precision=5):
+    """
+    Replace every polygon ring in a FeatureCollection with its polyline string.
+
+    Geometries keep their type and nesting; they gain an 'encoding' member
+    naming the format. Returns a new FeatureCollection.
+    """
+    features = []
+    for feature in isochrones.get('features', []):
+        geometry = feature.get('geometry')
+        if geometry and geometry.get('type') in ('Polygon', 'MultiPolygon'):
+            polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+            encoded = [[encode_polyline(ring, precision) for ring in polygon] for polygon in polygons]
+            feature = dict(feature)
+            feature['geometry'] = {
+                'type': geometry['type'],
+                'encoding': f'polyline{precision}',
+                'coordinates': encoded if geometry['type'] == 'MultiPolygon' else encoded[0]
+            }
+        features.append(feature)
+
+    encoded = dict(isochrones)
+    encoded['features'] = features
+    return encoded
+
+
+def npy_bytes(matrix):
+    """A matrix as a .npy buffer of little-endian float32"""
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(matrix, dtype='<f4'), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def compress_response(response):
+    """
+    after_request hook compressing large buffered responses.
+
+    Streamed responses, errors and already encoded bodies are left alone.
+    """
+    config = current_app.config
+    if (not config.get('RESPONSE_COMPRESSION_ENABLED', True)
+            or response.direct_passthrough or response.is_streamed
+            or not 200 <= response.status_code < 300
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < config.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024):
+        return response
+
+    level = config.get('RESPONSE_COMPRESSION_LEVEL', 6)
+    if brotli is not None and request.accept_encodings['br']:
+        response.set_data(brotli.compress(data, quality=min(level, 11)))
+        response.headers['Content-Encoding'] = 'br'
+    elif request.accept_encodings['gzip']:
+        response.set_data(gzip.compress(data, compresslevel=level))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,292 @@
+"""
+Planar geometry helpers for isochrone polygons.
+
+Coordinates are NumPy arrays of (x, y) pairs in a projected, metric space;
+callers convert to and from longitude/latitude.
+"""
+import numpy as np
+from scipy.spatial import Delaunay, QhullError
+
+
+def delaunay_triangles(xy):
+    """
+    Delaunay triangulation of xy as an (M, 3) index array, counter-clockwise.
+
+    Returns an empty array when the points are too few or all collinear.
+    """
+    if len(xy) < 3:
+        return np.empty((0, 3), dtype=np.int64)
+    try:
+        triangles = Delaunay(xy).simplices
+    except QhullError:
+        return np.empty((0, 3), dtype=np.int64)
+
+    a, b, c = xy[triangles[:, 0]], xy[triangles[:, 1]], xy[triangles[:, 2]]
+    clockwise = _cross(b - a, c - a) < 0
+    triangles[clockwise] = triangles[clockwise][:, [0, 2, 1]]
+    return triangles
+
+
+def circumradii(xy, triangles):
+    """Circumradius of every triangle, inf for degenerate ones"""
+    a, b, c = xy[triangles[:, 0]], xy[triangles[:, 1]], xy[triangles[:, 2]]
+    ab = np.linalg.norm(b - a, axis=1)
+    bc = np.linalg.norm(c - b, axis=1)
+    ca = np.linalg.norm(a - c, axis=1)
+    area2 = np.abs(_cross(b - a, c - a))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        radii = ab * bc * ca / (2 * area2)
+    radii[~np.isfinite(radii)] = np.inf
+    return radii
+
+
+def triangles_to_polygons(xy, triangles):
+    """
+    Merge counter-clockwise triangles into polygons.
+
+    Returns a list of (exterior, holes) where exterior is a closed
+    counter-clockwise ring of xy indices and holes is a list of closed
+    clockwise rings.
+    """
+    if len(triangles) == 0:
+        return []
+
+    # Directed edges of every triangle; an edge is on the boundary when its
+    # reverse does not belong to another kept triangle
+    edges = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    n = int(xy.shape[0])
+    forward = edges[:, 0].astype(np.int64) * n + edges[:, 1]
+    backward = edges[:, 1].astype(np.int64) * n + edges[:, 0]
+    boundary = edges[~np.isin(forward, backward)]
+
+    outgoing = {}
+    for start, end in boundary.tolist():
+        outgoing.setdefault(start, []).append(end)
+
+    rings = []
+    while outgoing:
+        first = next(iter(outgoing))
+        ring = [first]
+        current = first
+        while True:
+            targets = outgoing[current]
+            nxt = targets.pop()
+            if not targets:
+                del outgoing[current]
+            ring.append(nxt)
+            if nxt == first:
+                break
+            current = nxt
+            if current not in outgoing:
+                # Open chain, cannot happen for a valid triangle set
+                break
+        if len(ring) >= 4 and ring[0] == ring[-1]:
+            rings.append(ring)
+
+    exteriors = []
+    holes = []
+    for ring in rings:
+        (exteriors if ring_area(xy[ring]) > 0 else holes).append(ring)
+    exteriors.sort(key=lambda ring: -ring_area(xy[ring]))
+
+    polygons = [(ring, []) for ring in exteriors]
+    for hole in holes:
+        point = xy[hole[0]]
+        for exterior, exterior_holes in polygons:
+            if point_in_ring(point, xy[exterior]):
+                exterior_holes.append(hole)
+                break
+    return polygons
+
+
+def ring_area(ring):
+    """Signed area of a closed ring, positive when counter-clockwise"""
+    x = ring[:, 0]
+    y = ring[:, 1]
+    return 0.5 * float(np.sum(x[:-1] * y[1:] - x[1:] * y[:-1]))
+
+
+def point_in_ring(point, ring):
+    """Even-odd ray casting test of one point against a closed ring"""
+    x, y = point
+    x1, y1 = ring[:-1, 0], ring[:-1, 1]
+    x2, y2 = ring[1:, 0], ring[1:, 1]
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_at_y = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return bool(np.count_nonzero(crosses & (x < x_at_y)) % 2)
+
+
+def simplify_ring(ring, tolerance):
+    """
+    Douglas-Peucker simplification of a closed ring.
+
+    Vertices closer than tolerance to the simplified outline are dropped.
+    The ring is split at the vertex farthest from its start so both halves
+    have distinct end points. Returns a boolean mask over the vertices of
+    ring; the first and last vertex are always kept.
+    """
+    n = len(ring)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    if n < 4:
+        keep[:] = True
+        return keep
+
+    far = int(np.argmax(np.linalg.norm(ring - ring[0], axis=1)))
+    keep[far] = True
+    stack = [(0, far), (far, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = _segment_distances(ring[start + 1:end], ring[start], ring[end])
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = start + 1 + index
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+
+def contour_rings(values, level):
+    """
+    Closed outlines of the region where values <= level, by marching squares.
+
+    values is a 2-D grid; NaN and inf count as outside, and so does
+    everything beyond the grid, so every outline closes. Crossings are
+    placed by linear interpolation along cell edges, at the midpoint when
+    one side is not finite. Saddle cells are resolved by the mean of their
+    corners. Rings are returned as closed (k, 2) arrays of (column, row)
+    positions, unoriented and unnested (see nest_rings).
+    """
+    grid = np.full((values.shape[0] + 2, values.shape[1] + 2), np.inf)
+    grid[1:-1, 1:-1] = np.where(np.isnan(values), np.inf, values)
+    inside = grid <= level
+    rows, cols = grid.shape
+
+    # Crossing position along every horizontal edge (i, j)-(i, j+1) and
+    # vertical edge (i, j)-(i+1, j), as a fraction from the first corner
+    def fraction(a, b):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = (level - a) / (b - a)
+        return np.where(np.isfinite(a) & np.isfinite(b), np.clip(t, 0, 1), 0.5)
+
+    horizontal = fraction(grid[:, :-1], grid[:, 1:])
+    vertical = fraction(grid[:-1], grid[1:])
+    num_horizontal = rows * (cols - 1)
+
+    i, j = np.meshgrid(np.arange(rows - 1), np.arange(cols - 1), indexing='ij')
+    top = i * (cols - 1) + j
+    bottom = top + cols - 1
+    left = num_horizontal + i * cols + j
+    right = left + 1
+
+    tl, tr = inside[:-1, :-1], inside[:-1, 1:]
+    br, bl = inside[1:, 1:], inside[1:, :-1]
+    cuts = np.stack([tl != tr, tr != br, br != bl, bl != tl], axis=-1)
+    edges = np.stack([top, right, bottom, left], axis=-1)
+    count = cuts.sum(axis=-1)
+
+    # Cells crossed twice hold one segment between their two cut edges
+    single = count == 2
+    pairs = edges[single][cuts[single]].reshape(-1, 2)
+
+    # Saddles are crossed on all four edges; when the centre is inside the
+    # two inside corners are joined, otherwise they are cut off separately
+    saddle = count == 4
+    if saddle.any():
+        corners = np.stack([grid[:-1, :-1], grid[:-1, 1:], grid[1:, 1:], grid[1:, :-1]], axis=-1)[saddle]
+        centre_inside = corners.mean(axis=1) <= level
+        cut_off_tl = tl[saddle] != centre_inside
+        top_, right_, bottom_, left_ = edges[saddle].T
+        pairs = np.concatenate([
+            pairs,
+            np.where(cut_off_tl[:, None], np.stack([left_, top_], axis=1), np.stack([top_, right_], axis=1)),
+            np.where(cut_off_tl[:, None], np.stack([right_, bottom_], axis=1), np.stack([bottom_, left_], axis=1))
+        ])
+    if not len(pairs):
+        return []
+
+    # Every crossed edge is shared by exactly two segments; walk from
+    # segment to segment through them
+    ends = pairs.ravel()
+    order = np.argsort(ends, kind='stable')
+    mate = np.empty_like(order)
+    mate[order[0::2]] = order[1::2]
+    mate[order[1::2]] = order[0::2]
+
+    edge_i = np.where(ends < num_horizontal, ends // (cols - 1), (ends - num_horizontal) // cols)
+    edge_j = np.where(ends < num_horizontal, ends % (cols - 1), (ends - num_horizontal) % cols)
+    t = np.where(ends < num_horizontal, horizontal.ravel()[np.minimum(ends, num_horizontal - 1)],
+                 vertical.ravel()[np.clip(ends - num_horizontal, 0, vertical.size - 1)])
+    points = np.column_stack([
+        edge_j + np.where(ends < num_horizontal, t, 0),
+        edge_i + np.where(ends < num_horizontal, 0, t)
+    ]) - 1
+
+    rings = []
+    visited = np.zeros(len(pairs), dtype=bool)
+    mate = mate.tolist()
+    for start in range(len(pairs)):
+        if visited[start]:
+            continue
+        slots = []
+        slot = 2 * start
+        while True:
+            visited[slot // 2] = True
+            slots.append(slot)
+            slot = mate[slot ^ 1]
+            if slot // 2 == start:
+                break
+        slots.append(slots[0])
+        rings.append(points[slots])
+    return rings
+
+
+def nest_rings(rings):
+    """
+    Group non-crossing closed rings into polygons.
+
+    Rings inside an even number of others are exteriors, the rest are
+    holes of the smallest exterior around them. Returns (exterior, holes)
+    pairs, exteriors counter-clockwise and holes clockwise.
+    """
+    areas = [abs(ring_area(ring)) for ring in rings]
+    containers = [
+        [k for k, other in enumerate(rings) if k != index and point_in_ring(ring[0], other)]
+        for index, ring in enumerate(rings)
+    ]
+
+    def oriented(ring, counter_clockwise):
+        return ring if (ring_area(ring) > 0) == counter_clockwise else ring[::-1]
+
+    polygons = {}
+    for index, ring in enumerate(rings):
+        if len(containers[index]) % 2 == 0:
+            polygons[index] = (oriented(ring, True), [])
+    for index, ring in enumerate(rings):
+        if len(containers[index]) % 2 == 1:
+            outer = min((k for k in containers[index] if k in polygons), key=lambda k: areas[k])
+            polygons[outer][1].append(oriented(ring, False))
+    return list(polygons.values())
+
+
+def meters_per_pixel(zoom, latitude):
+    """Ground resolution of a 256 px Web Mercator tile at zoom and latitude"""
+    return 156543.03392 * np.cos(np.radians(latitude)) / 2 ** zoom
+
+
+def _segment_distances(points, a, b):
+    """Distance of every point to the segment a-b"""
+    ab = b - a
+    length2 = float(ab @ ab)
+    if length2 == 0:
+        return np.linalg.norm(points - a, axis=1)
+    t = np.clip((points - a) @ ab / length2, 0, 1)
+    return np.linalg.norm(points - (a + t[:, None] * ab), axis=1)
+
+
+def _cross(u, v):
+    return u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
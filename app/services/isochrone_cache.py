@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class IsochroneCache:
+    """
+    Two-level cache for isochrone responses.
+
+    Entries live in an in-process LRU dictionary backed by a SQLite table so
+    they survive restarts and are shared between workers on the same host.
+    Every entry carries its own expiry time and both levels are size bounded.
+    """
+
+    def __init__(self, db_path=None, max_memory_entries=256, max_disk_entries=10000,
+                 ttl=6 * 60 * 60, precision=4):
+        """
+        Args:
+            db_path (str): SQLite file for the persistent layer, None for memory only
+            max_memory_entries (int): Maximum number of entries kept in process
+            max_disk_entries (int): Maximum number of entries kept in SQLite
+            ttl (int): Default time to live of an entry in seconds
+            precision (int): Decimal places origin coordinates are rounded to
+        """
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.precision = precision
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expired': 0
+        }
+
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS isochrone_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_isochrone_cache_accessed_at "
+                "ON isochrone_cache (accessed_at)"
+            )
+            self._conn.commit()
+
+    def make_key(self, origin_lat, origin_lng, travel_mode, travel_times, namespace='ors', zoom=None):
+        """
+        Build a cache key from a quantized origin, travel mode and sorted ranges.
+
+        Origins closer than the configured precision share a key, and the
+        order in which ranges were requested does not matter. Geometries
+        simplified for a map zoom level are keyed separately per zoom.
+        """
+        lat = round(float(origin_lat), self.precision)
+        lng = round(float(origin_lng), self.precision)
+        ranges = ','.join(str(t) for t in sorted(set(travel_times)))
+        key = f"{namespace}:{travel_mode}:{lat:.{self.precision}f}:{lng:.{self.precision}f}:{ranges}"
+        if zoom is not None:
+            key += f":z{int(zoom)}"
+        return key
+
+    def get(self, key):
+        """Return the cached value for key or None on a miss"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return value
+                # Expired in memory, drop it and fall through to disk
+                del self._memory[key]
+                self._counters['expired'] += 1
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM isochrone_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    raw_value, expires_at = row
+                    if expires_at > now:
+                        self._conn.execute(
+                            "UPDATE isochrone_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._conn.commit()
+                        value = json.loads(raw_value)
+                        self._remember(key, expires_at, value)
+                        self._counters['disk_hits'] += 1
+                        return value
+                    self._conn.execute("DELETE FROM isochrone_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._counters['expired'] += 1
+
+            self._counters['misses'] += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        """Store a JSON-serializable value under key"""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self._counters['stores'] += 1
+
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO isochrone_cache (key, value, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, separators=(',', ':')), expires_at, now)
+                )
+                # Drop expired rows and anything beyond the size bound, least recently used first
+                self._conn.execute("DELETE FROM isochrone_cache WHERE expires_at <= ?", (now,))
+                cursor = self._conn.execute(
+                    "DELETE FROM isochrone_cache WHERE key IN ("
+                    "SELECT key FROM isochrone_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+                self._counters['evictions'] += max(cursor.rowcount, 0)
+                self._conn.commit()
+
+    def clear(self):
+        """Remove every entry from both levels"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM isochrone_cache")
+                self._conn.commit()
+
+    def stats(self):
+        """Return hit/miss counters and current sizes"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+            if self._conn is not None:
+                stats['disk_entries'] = self._conn.execute(
+                    "SELECT COUNT(*) FROM isochrone_cache"
+                ).fetchone()[0]
+
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _remember(self, key, expires_at, value):
+        """Insert into the in-process LRU, evicting the oldest entries (lock must be held)"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._counters['evictions'] += 1
+
+
+def get_isochrone_cache():
+    """Return the isochrone cache for the current application, creating it on first use"""
+    cache = current_app.extensions.get('isochrone_cache')
+    if cache is None:
+        config = current_app.config
+        db_path = config.get('ISOCHRONE_CACHE_PATH')
+        if db_path is None:
+            db_path = os.path.join(current_app.root_path, 'locals', 'isochrone_cache.sqlite')
+        cache = IsochroneCache(
+            db_path=db_path or None,
+            max_memory_entries=config.get('ISOCHRONE_CACHE_MEMORY_ENTRIES', 256),
+            max_disk_entries=config.get('ISOCHRONE_CACHE_DISK_ENTRIES', 10000),
+            ttl=config.get('ISOCHRONE_CACHE_TTL', 6 * 60 * 60),
+            precision=config.get('ISOCHRONE_CACHE_PRECISION', 4)
+        )
+        current_app.extensions['isochrone_cache'] = cache
+    return cache
@@ -0,0 +1,342 @@
+import json
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app, has_app_context
+
+from app.services.rate_limiter import BACKGROUND, request_priority
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+IN_FLIGHT = (QUEUED, RUNNING)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the pending limit is reached"""
+
+
+class JobStore:
+    """
+    Job records in SQLite.
+
+    Every request worker of the host reads and writes the same file, so a
+    status poll may land on a different worker than the one that accepted
+    the job.
+    """
+
+    def __init__(self, db_path=None):
+        """
+        Args:
+            db_path (str): SQLite file, None keeps the records in memory for this process only
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path or ':memory:', timeout=5, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, key TEXT NOT NULL, status TEXT NOT NULL, "
+            "result TEXT, error TEXT, pid INTEGER, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_key_status ON jobs (key, status)")
+        self._conn.commit()
+
+    def create(self, key):
+        """Insert a queued job unless one with the same key is in flight; returns (job, created)"""
+        with self._lock, self._conn:
+            # Take the write lock before the check, so another worker cannot insert the same key in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            existing = self._in_flight(key)
+            if existing is not None:
+                return existing, False
+            job_id = uuid.uuid4().hex
+            self._conn.execute(
+                "INSERT INTO jobs (id, key, status, pid, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, key, QUEUED, os.getpid(), time.time())
+            )
+        return self.get(job_id), True
+
+    def find_in_flight(self, key):
+        """Return the queued or running job with key, or None"""
+        with self._lock, self._conn:
+            return self._in_flight(key)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def mark_running(self, job_id):
+        self._update(job_id, status=RUNNING, started_at=time.time())
+
+    def mark_done(self, job_id, result):
+        self._update(job_id, status=DONE, result=json.dumps(result), finished_at=time.time())
+
+    def mark_failed(self, job_id, error):
+        self._update(job_id, status=FAILED, error=str(error), finished_at=time.time())
+
+    def count_in_flight(self, pid=None):
+        query = "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)"
+        params = list(IN_FLIGHT)
+        if pid is not None:
+            query += " AND pid = ?"
+            params.append(pid)
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def prune(self, keep):
+        """Delete all but the newest keep finished jobs"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND id NOT IN ("
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY finished_at DESC LIMIT ?)",
+                (DONE, FAILED, DONE, FAILED, keep)
+            )
+
+    def _in_flight(self, key):
+        rows = self._conn.execute(
+            "SELECT * FROM jobs WHERE key = ? AND status IN (?, ?) ORDER BY created_at", (key, *IN_FLIGHT)
+        ).fetchall()
+        for row in rows:
+            job = self._to_dict(row)
+            if _process_alive(row[5]):
+                return job
+            # The process that accepted the job exited before finishing it
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (FAILED, 'Worker exited before the job finished', time.time(), job['id'])
+            )
+        return None
+
+    def _update(self, job_id, **fields):
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    @staticmethod
+    def _to_dict(row):
+        job_id, key, status, result, error, _, created_at, started_at, finished_at = row
+        return {
+            'id': job_id,
+            'key': key,
+            'status': status,
+            'result': json.loads(result) if result else None,
+            'error': error,
+            'created_at': created_at,
+            'started_at': started_at,
+            'finished_at': finished_at
+        }
+
+
+class JobQueue:
+    """
+    Runs slow work off the request thread on a bounded local pool.
+
+    Jobs with the same key are deduplicated while one is queued or running,
+    at most max_workers run at once and at most max_pending may wait; beyond
+    that submit raises QueueFullError. With use_processes the work runs in a
+    process pool whose workers build their own application from
+    worker_config, so CPU-bound rendering does not compete for the GIL.
+    """
+
+    def __init__(self, store, max_workers=2, max_pending=32, use_processes=True,
+                 worker_config=None, keep_finished=1000):
+        """
+        Args:
+            store (JobStore): Where job records live
+            max_workers (int): Jobs running at the same time
+            max_pending (int): Jobs accepted but not finished before submissions are refused
+            use_processes (bool): Run jobs in worker processes instead of threads
+            worker_config (dict): Config values for the application built in each worker process
+            keep_finished (int): Finished job records kept for status polling
+        """
+        self.store = store
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self.worker_config = worker_config or {}
+        self.keep_finished = keep_finished
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def submit(self, key, func, *args):
+        """
+        Queue func(*args) unless a job with key is already in flight.
+
+        func must be a module-level function when processes are used. In
+        thread mode it runs inside the submitting application's context.
+        Returns (job, created).
+        """
+        executor = self._get_executor()
+        with self._lock:
+            existing = self.store.find_in_flight(key)
+            if existing is not None:
+                return existing, False
+            if self.store.count_in_flight(os.getpid()) >= self.max_pending:
+                raise QueueFullError(f"{self.max_pending} jobs already pending")
+            job, created = self.store.create(key)
+        if not created:
+            return job, False
+
+        try:
+            try:
+                future = self._submit_to(executor, job['id'], func, args)
+            except BrokenProcessPool:
+                # A worker died since the last submission, retry once on a fresh pool
+                self._discard_executor(executor)
+                executor = self._get_executor()
+                future = self._submit_to(executor, job['id'], func, args)
+        except Exception as e:
+            self.store.mark_failed(job['id'], e)
+            raise
+        future.add_done_callback(lambda done: self._finish(job['id'], executor, done))
+        return job, True
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    def _submit_to(self, executor, job_id, func, args):
+        if self.use_processes:
+            return executor.submit(_run_in_worker, self.store.db_path, job_id, func, args)
+        app = current_app._get_current_object() if has_app_context() else None
+        return executor.submit(_run_in_thread, app, self.store, job_id, func, args)
+
+    def _finish(self, job_id, executor, future):
+        try:
+            self.store.mark_done(job_id, future.result())
+        except BrokenProcessPool:
+            # Every job of the pool fails this way, the next submission builds a new one
+            self.store.mark_failed(job_id, 'Worker process exited before the job finished')
+            self._discard_executor(executor)
+        except Exception as e:
+            self.store.mark_failed(job_id, e)
+        self.store.prune(self.keep_finished)
+
+    def _discard_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self):
+        with self._lock:
+            # A forked request worker cannot use its parent's pool
+            if self._executor is None or self._pid != os.getpid():
+                if self.use_processes:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_worker,
+                        initargs=(self.worker_config,)
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='deform-job')
+                self._pid = os.getpid()
+            return self._executor
+
+
+def _process_alive(pid):
+    if pid is None or pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+_worker_app = None
+_worker_store = None
+
+
+def _init_worker(config):
+    """Build the application once per worker process and keep its context pushed"""
+    global _worker_app
+    from app import create_app
+    from app.config import Config
+    _worker_app = create_app(type('WorkerConfig', (Config,), dict(config)))
+    _worker_app.app_context().push()
+
+
+def _run_in_worker(db_path, job_id, func, args):
+    global _worker_store
+    if db_path:
+        if _worker_store is None:
+            _worker_store = JobStore(db_path)
+        _worker_store.mark_running(job_id)
+    # Jobs leave part of the routing quota to interactive requests
+    with request_priority(BACKGROUND):
+        return func(*args)
+
+
+def _run_in_thread(app, store, job_id, func, args):
+    store.mark_running(job_id)
+    with request_priority(BACKGROUND):
+        if app is None:
+            return func(*args)
+        with app.app_context():
+            return func(*args)
+
+
+def picklable_config(config):
+    """The upper-case settings of a Flask config that can be sent to worker processes"""
+    values = {}
+    for name, value in config.items():
+        if not name.isupper():
+            continue
+        try:
+            pickle.dumps(value)
+        except Exception:
+            continue
+        values[name] = value
+    return values
+
+
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the deform job queue of the current application, creating it on first use"""
+    queue = current_app.extensions.get('deform_job_queue')
+    if queue is None:
+        with _queue_lock:
+            queue = current_app.extensions.get('deform_job_queue')
+            if queue is None:
+                config = current_app.config
+                db_path = config.get('DEFORM_JOB_DB_PATH')
+                if db_path is None:
+                    db_path = os.path.join(current_app.root_path, 'locals', 'jobs.sqlite')
+                use_processes = config.get('DEFORM_JOB_EXECUTOR', 'process') == 'process'
+                queue = JobQueue(
+                    JobStore(db_path or None),
+                    max_workers=config.get('DEFORM_JOB_WORKERS', 2),
+                    max_pending=config.get('DEFORM_JOB_MAX_PENDING', 32),
+                    use_processes=use_processes,
+                    worker_config=picklable_config(config) if use_processes else None,
+                    keep_finished=config.get('DEFORM_JOB_KEEP', 1000)
+                )
+                current_app.extensions['deform_job_queue'] = queue
+    return queue
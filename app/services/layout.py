@@ -0,0 +1,316 @@
+"""
+2D layouts whose distances approximate a travel-time matrix.
+
+Solvers, from cheapest to most accurate:
+
+- classical: closed-form MDS from the top two eigenvectors of the double
+  centered squared distances
+- landmark: classical MDS on a maxmin subset of landmarks, every other point
+  placed by distance-based triangulation; only needs the landmark columns
+- smacof: iterative stress majorization with an iteration, tolerance and wall
+  time budget, warm-started from a reference layout (normally the geographic
+  positions) so repeated runs give the same picture
+- incremental: new points placed into a previously solved layout by local
+  stress minimization (extend_layout)
+
+All solvers return a LayoutResult with Kruskal's stress-1 and the wall time so
+callers can choose a method per problem size.
+"""
+import time
+import warnings
+
+import numpy as np
+from scipy.linalg import eigh
+from scipy.sparse.linalg import eigsh
+from scipy.spatial.distance import cdist
+
+METHODS = ('auto', 'classical', 'landmark', 'smacof', 'sklearn')
+
+# Above this many points 'auto' starts SMACOF from landmark MDS instead of classical MDS
+CLASSICAL_MAX_POINTS = 1000
+
+# Above this many points eigenpairs come from Lanczos iteration instead of a dense solver
+DENSE_EIGEN_MAX_POINTS = 300
+
+
+class LayoutResult:
+    """Coordinates in the units of the dissimilarities, with quality and cost"""
+
+    def __init__(self, coords, stress, seconds, method, iterations=0):
+        self.coords = coords
+        self.stress = stress
+        self.seconds = seconds
+        self.method = method
+        self.iterations = iterations
+
+    def __repr__(self):
+        return (f"LayoutResult(method={self.method!r}, points={len(self.coords)}, "
+                f"stress={self.stress:.4f}, seconds={self.seconds:.3f}, iterations={self.iterations})")
+
+
+def compute_layout(dissimilarities, method='auto', reference=None, max_iter=300, eps=1e-4,
+                   time_budget=None, n_landmarks=64):
+    """
+    Lay out points in 2D so their distances approximate the dissimilarities.
+
+    Args:
+        dissimilarities (ndarray): N×N travel times, symmetrized before use
+        method (str): One of METHODS. 'auto' runs SMACOF warm-started from the
+            reference, or from classical/landmark MDS without one
+        reference (ndarray): Optional N×2 positions (e.g. geographic) used as the
+            SMACOF warm start and to rotate/reflect the result into the same frame
+        max_iter (int): SMACOF iteration budget
+        eps (float): Stop SMACOF when the relative stress improvement drops below this
+        time_budget (float): Stop SMACOF after this many seconds
+        n_landmarks (int): Landmarks used by landmark MDS
+
+    Returns:
+        LayoutResult
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown layout method: {method}")
+
+    started = time.perf_counter()
+    delta = _symmetric(dissimilarities)
+    n = len(delta)
+    if reference is not None:
+        reference = np.asarray(reference, dtype=float)
+
+    iterations = 0
+    if n < 3:
+        coords = classical_mds(delta)
+    elif method == 'classical':
+        coords = classical_mds(delta)
+    elif method == 'landmark':
+        coords = landmark_mds(delta, n_landmarks)
+    elif method == 'sklearn':
+        coords = _sklearn_mds(delta)
+    else:
+        if method == 'smacof' or reference is not None:
+            init = scaled_reference(reference, delta) if reference is not None else classical_mds(delta)
+        elif n <= CLASSICAL_MAX_POINTS:
+            init = classical_mds(delta)
+        else:
+            init = landmark_mds(delta, n_landmarks)
+        deadline = started + time_budget if time_budget else None
+        coords, iterations = smacof(delta, init, max_iter=max_iter, eps=eps, deadline=deadline)
+
+    if reference is not None:
+        coords = procrustes_align(coords, reference)
+    return LayoutResult(coords, stress(coords, delta), time.perf_counter() - started,
+                        method, iterations)
+
+
+def extend_layout(dissimilarities, coords, fixed, max_iter=100, eps=1e-4, refine_iter=0):
+    """
+    Place new points into an existing layout.
+
+    Rows of coords where fixed is True keep their solved positions. Every other
+    point starts at the distance-weighted mean of its three closest fixed
+    points and is moved by local stress majorization against all other points,
+    which costs O(new × N) per iteration instead of a full O(N²) solve.
+
+    Args:
+        dissimilarities (ndarray): N×N travel times, symmetrized before use
+        coords (ndarray): N×2 positions, only the fixed rows are read
+        fixed (ndarray): N booleans marking points already laid out
+        max_iter (int): Iteration budget for placing the new points
+        eps (float): Stop when the relative local stress improvement drops below this
+        refine_iter (int): Full SMACOF iterations run afterwards to lightly
+            adjust every point, 0 keeps the fixed points where they are
+
+    Returns:
+        LayoutResult
+    """
+    started = time.perf_counter()
+    delta = _symmetric(dissimilarities)
+    fixed = np.asarray(fixed, dtype=bool)
+    anchors = np.flatnonzero(fixed)
+    free = np.flatnonzero(~fixed)
+    if len(anchors) < 2:
+        return compute_layout(delta, max_iter=max_iter, eps=eps)
+
+    coords = np.array(coords, dtype=float)
+    iterations = 0
+    if len(free):
+        k = min(3, len(anchors))
+        to_anchors = delta[np.ix_(free, anchors)]
+        nearest = np.argsort(to_anchors, axis=1)[:, :k]
+        weights = 1.0 / (np.take_along_axis(to_anchors, nearest, axis=1) + 1e-9)
+        coords[free] = (weights[:, :, None] * coords[anchors[nearest]]).sum(axis=1) / weights.sum(axis=1)[:, None]
+        iterations = _place_free_points(delta, coords, free, max_iter, eps)
+
+    if refine_iter:
+        coords, refined = smacof(delta, coords, max_iter=refine_iter, eps=eps)
+        iterations += refined
+    return LayoutResult(coords, stress(coords, delta), time.perf_counter() - started,
+                        'incremental', iterations)
+
+
+def classical_mds(delta):
+    """Torgerson MDS: coordinates from the top two eigenpairs of -1/2 J D² J"""
+    n = len(delta)
+    if n < 2:
+        return np.zeros((n, 2))
+    squared = delta ** 2
+    b = -0.5 * (squared - squared.mean(axis=0)[None, :] - squared.mean(axis=1)[:, None] + squared.mean())
+    values, vectors = _top_eigenpairs(b)
+    coords = np.zeros((n, 2))
+    coords[:, :len(values)] = vectors * np.sqrt(np.maximum(values, 0))
+    return _fix_signs(coords)
+
+
+def landmark_mds(delta, n_landmarks=64):
+    """
+    Landmark MDS (de Silva & Tenenbaum).
+
+    Only the rows and columns of delta belonging to the landmarks are read, so
+    the cost is O(N·k) after the k×k eigendecomposition.
+    """
+    n = len(delta)
+    if n <= n_landmarks:
+        return classical_mds(delta)
+
+    landmarks = maxmin_landmarks(delta, n_landmarks)
+    squared = delta[np.ix_(landmarks, landmarks)] ** 2
+    mean = squared.mean(axis=0)
+    b = -0.5 * (squared - mean[None, :] - squared.mean(axis=1)[:, None] + squared.mean())
+    values, vectors = _top_eigenpairs(b)
+    values = np.maximum(values, 1e-12)
+
+    # Triangulate every point from its squared distances to the landmarks
+    pseudo_inverse = vectors / np.sqrt(values)
+    coords = -0.5 * (delta[:, landmarks] ** 2 - mean[None, :]) @ pseudo_inverse
+    return _fix_signs(coords)
+
+
+def maxmin_landmarks(delta, count):
+    """Deterministic farthest-point selection of landmark indices, starting from point 0"""
+    landmarks = [0]
+    nearest = delta[0].copy()
+    for _ in range(1, min(count, len(delta))):
+        nxt = int(np.argmax(nearest))
+        landmarks.append(nxt)
+        np.minimum(nearest, delta[nxt], out=nearest)
+    return np.array(landmarks)
+
+
+def smacof(delta, init, max_iter=300, eps=1e-4, deadline=None):
+    """
+    Unweighted SMACOF iterations from init.
+
+    Each Guttman transform is O(N²); iteration stops at max_iter, at the
+    deadline (time.perf_counter() value) or when the relative stress
+    improvement falls below eps. Returns (coords, iterations).
+    """
+    n = len(delta)
+    coords = np.array(init, dtype=float)
+    previous = None
+    iteration = 0
+    for iteration in range(1, max_iter + 1):
+        distances = _pairwise(coords)
+        raw = float(np.sum((distances - delta) ** 2)) / 2
+        if previous is not None and previous - raw < eps * previous:
+            break
+        previous = raw
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(distances > 0, delta / distances, 0.0)
+        np.fill_diagonal(ratio, 0.0)
+        # B(X)·X without building B: diag(sum ratio)·X - ratio·X
+        coords = (ratio.sum(axis=1)[:, None] * coords - ratio @ coords) / n
+
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+    return coords, iteration
+
+
+def _place_free_points(delta, coords, free, max_iter, eps):
+    """Majorize the stress of the free rows of coords in place, all other rows held fixed"""
+    n = len(delta)
+    rows = delta[free]
+    previous = None
+    iteration = 0
+    for iteration in range(1, max_iter + 1):
+        distances = cdist(coords[free], coords)
+        local = float(np.sum((distances - rows) ** 2))
+        if previous is not None and previous - local < eps * previous:
+            break
+        previous = local
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(distances > 0, rows / distances, 0.0)
+        ratio[np.arange(len(free)), free] = 0.0
+        others = coords.sum(axis=0)[None, :] - coords[free]
+        coords[free] = (others + ratio.sum(axis=1)[:, None] * coords[free] - ratio @ coords) / (n - 1)
+    return iteration
+
+
+def stress(coords, delta):
+    """Kruskal's stress-1 of a layout, 0 for a perfect embedding"""
+    distances = _pairwise(coords)
+    total = float(np.sum(delta ** 2))
+    if total == 0:
+        return 0.0
+    return float(np.sqrt(np.sum((distances - delta) ** 2) / total))
+
+
+def scaled_reference(reference, delta):
+    """The reference positions centered and scaled to best fit the dissimilarities"""
+    coords = reference - reference.mean(axis=0)
+    distances = _pairwise(coords)
+    norm = float(np.sum(distances ** 2))
+    if norm == 0:
+        return classical_mds(delta)
+    return coords * (float(np.sum(distances * delta)) / norm)
+
+
+def procrustes_align(coords, reference):
+    """
+    Rotate and reflect coords to best match reference, keeping their scale.
+
+    The result is centered on the reference centroid.
+    """
+    centered = coords - coords.mean(axis=0)
+    target = reference - reference.mean(axis=0)
+    u, _, vt = np.linalg.svd(centered.T @ target)
+    return centered @ (u @ vt) + reference.mean(axis=0)
+
+
+def _top_eigenpairs(b):
+    """The two largest eigenpairs of a symmetric matrix, largest first"""
+    n = len(b)
+    if n > DENSE_EIGEN_MAX_POINTS:
+        # Lanczos only touches b through products, far cheaper than a full decomposition
+        values, vectors = eigsh(b, k=2, which='LA', v0=np.ones(n))
+    else:
+        k = min(2, n)
+        values, vectors = eigh(b, subset_by_index=[n - k, n - 1])
+    order = np.argsort(values)[::-1]
+    return values[order], vectors[:, order]
+
+
+def _sklearn_mds(delta):
+    """sklearn's randomly initialized SMACOF, kept for comparison"""
+    from sklearn.manifold import MDS
+    with warnings.catch_warnings():
+        # Parameter names and defaults are changing between sklearn releases
+        warnings.simplefilter('ignore', FutureWarning)
+        return MDS(n_components=2, dissimilarity='precomputed', random_state=42).fit_transform(delta)
+
+
+def _symmetric(matrix):
+    matrix = np.asarray(matrix, dtype=float)
+    delta = (matrix + matrix.T) / 2
+    np.fill_diagonal(delta, 0.0)
+    return delta
+
+
+def _pairwise(coords):
+    return cdist(coords, coords)
+
+
+def _fix_signs(coords):
+    """Make eigenvector signs deterministic: the largest coordinate of each axis is positive"""
+    largest = coords[np.argmax(np.abs(coords), axis=0), [0, 1]]
+    return coords * np.where(largest < 0, -1.0, 1.0)
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from flask import current_app, has_app_context
+
+
+class LayoutMatch:
+    """
+    A stored layout sharing POIs with a new request.
+
+    new_index[k] and old_index[k] are the positions of the k-th shared POI in
+    the new POI list and in the stored entry.
+    """
+
+    def __init__(self, entry_id, matrix, coords, new_index, old_index, num_points):
+        self.entry_id = entry_id
+        self.matrix = matrix
+        self.coords = coords
+        self.new_index = new_index
+        self.old_index = old_index
+        self.num_points = num_points
+
+    @property
+    def num_new(self):
+        return self.num_points - len(self.new_index)
+
+    def known_matrix(self):
+        """N×N travel times of the new POI list, NaN where no stored value exists"""
+        known = np.full((self.num_points, self.num_points), np.nan)
+        known[np.ix_(self.new_index, self.new_index)] = self.matrix[np.ix_(self.old_index, self.old_index)]
+        return known
+
+    def known_coords(self):
+        """(N×2 coordinates, N fixed flags) with the stored positions of shared POIs"""
+        coords = np.zeros((self.num_points, 2))
+        fixed = np.zeros(self.num_points, dtype=bool)
+        coords[self.new_index] = self.coords[self.old_index]
+        fixed[self.new_index] = True
+        return coords, fixed
+
+
+class LayoutStore:
+    """
+    Solved travel-time matrices and layouts of previously deformed POI sets.
+
+    Each entry is one compressed .npz file holding the POI positions, the
+    routed matrix and the raw layout coordinates. A small in-process index of
+    rounded POI positions finds the stored entry sharing the most POIs with a
+    new request, so only the rows and columns of added POIs need routing and
+    only those points need placing.
+    """
+
+    def __init__(self, directory=None, max_entries=200, precision=5):
+        """
+        Args:
+            directory (str): Folder for the .npz entries, None to keep them in memory only
+            max_entries (int): Maximum number of entries; the oldest are removed first
+            precision (int): Decimal places POI coordinates are rounded to when matching
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.precision = precision
+        self._index = None
+        self._memory = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def point_keys(self, pois):
+        return [(round(float(p['lat']), self.precision), round(float(p['lng']), self.precision)) for p in pois]
+
+    def find(self, pois, travel_mode, backend, min_overlap=0.5):
+        """
+        Return the LayoutMatch sharing the most POIs, or None.
+
+        Only entries routed with the same travel mode and backend are considered,
+        and at least min_overlap of the new POIs (and two POIs) must be shared.
+        """
+        keys = self.point_keys(pois)
+        best = None
+        with self._lock:
+            for entry_id, (mode, name, positions) in self._load_index().items():
+                if mode != travel_mode or name != backend:
+                    continue
+                shared = [(i, positions[key]) for i, key in enumerate(keys) if key in positions]
+                if best is None or len(shared) > len(best[1]):
+                    best = (entry_id, shared)
+
+        if best is None or len(best[1]) < 2 or len(best[1]) < min_overlap * len(keys):
+            return None
+        entry_id, shared = best
+        data = self._read(entry_id)
+        if data is None:
+            return None
+        new_index, old_index = (np.array(column) for column in zip(*shared))
+        return LayoutMatch(entry_id, data['matrix'], data['coords'], new_index, old_index, len(keys))
+
+    def save(self, pois, travel_mode, backend, matrix, coords):
+        """Store a routed matrix and its raw layout; returns the entry id"""
+        keys = self.point_keys(pois)
+        digest = hashlib.sha1(repr((travel_mode, backend, keys)).encode('utf-8')).hexdigest()
+        data = {
+            'lats': np.array([key[0] for key in keys]),
+            'lngs': np.array([key[1] for key in keys]),
+            'matrix': np.asarray(matrix, dtype=float),
+            'coords': np.asarray(coords, dtype=float),
+            'travel_mode': np.array(travel_mode),
+            'backend': np.array(backend)
+        }
+        with self._lock:
+            index = self._load_index()
+            if self.directory:
+                path = self._path(digest)
+                tmp_path = path + '.tmp.npz'
+                np.savez_compressed(tmp_path, **data)
+                os.replace(tmp_path, path)
+            else:
+                self._memory[digest] = data
+            index.pop(digest, None)
+            index[digest] = (travel_mode, backend, {key: i for i, key in enumerate(keys)})
+            while len(index) > self.max_entries:
+                self._remove(next(iter(index)))
+        return digest
+
+    def clear(self):
+        with self._lock:
+            for entry_id in list(self._load_index()):
+                self._remove(entry_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load_index())
+
+    def _load_index(self):
+        """Index of entry id -> (travel mode, backend, {point key: row}), oldest first"""
+        if self._index is not None:
+            return self._index
+        self._index = OrderedDict()
+        if not self.directory:
+            return self._index
+
+        paths = [
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.endswith('.npz') and not name.endswith('.tmp.npz')
+        ]
+        for path in sorted(paths, key=os.path.getmtime):
+            try:
+                with np.load(path) as data:
+                    keys = zip(data['lats'].tolist(), data['lngs'].tolist())
+                    self._index[os.path.basename(path)[:-4]] = (
+                        str(data['travel_mode']), str(data['backend']),
+                        {key: i for i, key in enumerate(keys)}
+                    )
+            except (OSError, ValueError, KeyError):
+                # Unreadable leftovers are ignored and overwritten eventually
+                continue
+        return self._index
+
+    def _read(self, entry_id):
+        if not self.directory:
+            return self._memory.get(entry_id)
+        try:
+            with np.load(self._path(entry_id)) as data:
+                return {'matrix': data['matrix'], 'coords': data['coords']}
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _remove(self, entry_id):
+        self._index.pop(entry_id, None)
+        self._memory.pop(entry_id, None)
+        if self.directory:
+            try:
+                os.remove(self._path(entry_id))
+            except OSError:
+                pass
+
+    def _path(self, entry_id):
+        return os.path.join(self.directory, entry_id + '.npz')
+
+
+def get_layout_store():
+    """Return the layout store of the current application, None when disabled or outside one"""
+    if not has_app_context():
+        return None
+    config = current_app.config
+    if not config.get('LAYOUT_STORE_ENABLED', True):
+        return None
+    store = current_app.extensions.get('layout_store')
+    if store is None:
+        directory = config.get('LAYOUT_STORE_PATH')
+        if directory is None:
+            directory = os.path.join(current_app.root_path, 'locals', 'layouts')
+        store = LayoutStore(
+            directory=directory or None,
+            max_entries=config.get('LAYOUT_STORE_ENTRIES', 200)
+        )
+        current_app.extensions['layout_store'] = store
+    return store
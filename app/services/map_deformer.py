@@ -1,108 +1,148 @@
 import os
 import json
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
-import requests
+from PIL import Image, ImageDraw
 import traceback
-try:
-    from sklearn.manifold import MDS
-except ImportError:
-    print("Warning: Some advanced modules not found. Installing required packages...")
-    import subprocess
-    subprocess.check_call(["pip", "install", "scikit-learn", "scipy"])
-    from sklearn.manifold import MDS
-from datetime import datetime
+from flask import current_app, has_app_context
+from app.services.artifact_cache import artifact_key, file_digest, get_artifact_cache
+from app.services.distance_matrix import fallback_time_matrix
+from app.services.layout import compute_layout, extend_layout
+from app.services.layout_store import get_layout_store
+from app.services.matrix_store import get_matrix_store
+from app.services.renderer import (BACKGROUND, PANEL_GAP, TITLES, canvas_background, draw_gradient_lines,
+                                   draw_panel_frame, format_travel_times, load_font, numbered_marker,
+                                   paste_centered, text_sprite)
+from app.services.routing_backend import ORSBackend, get_local_backend, get_routing_backend
+from app.services.screenshot_catalog import mark_deformed
+from app.services.warp import warp_field, warp_screenshot
+
+# Bump whenever a change to the drawing code alters the rendered images, so
+# cached artifacts from the previous renderer are not served
+RENDERER_VERSION = 3
+
+
+def render_options(config):
+    """The config settings the rendered image depends on, part of its artifact key"""
+    return {
+        'warp': bool(config.get('MAP_WARP_ENABLED', True)),
+        'warp_grid': int(config.get('MAP_WARP_GRID', 64)),
+        'warp_smoothing': float(config.get('MAP_WARP_SMOOTHING', 0.0))
+    }
+
 
 class MapDeformer:
     """Creates time-deformed maps where distance represents travel time rather than physical distance"""
     
-    def __init__(self, api_key=None):
-        """Initialize with API key for OpenRouteService"""
+    def __init__(self, api_key=None, client=None, backend=None):
+        """Initialize with API key for OpenRouteService, or an explicit travel-time backend"""
         self.api_key = api_key
+        self.client = client
+        self.backend = backend
+        self.last_layout = None
+        self.last_matrix_source = None
+        self.last_artifact_key = None
+        self.last_cache_hit = False
         self.font_path = os.path.join(os.path.dirname(__file__), '..', 'static', 'fonts', 'arial.ttf')
         if not os.path.exists(self.font_path):
             # Use default system font if custom font not available
             self.font_path = None
     
-    def get_travel_times_matrix(self, pois):
-        """Get matrix of travel times between POIs using OpenRouteService API"""
-        url = "https://api.openrouteservice.org/v2/matrix/driving-car"
-        
+    def get_routing_backend(self):
+        """Return the travel-time backend this deformer routes with"""
+        if self.backend is not None:
+            return self.backend
         if not self.api_key:
-            raise ValueError("API key is required for travel time matrix calculation")
-            
-        # Format API key with Bearer prefix if needed
-        auth_header = self.api_key
-        if not self.api_key.startswith('Bearer '):
-            auth_header = f'Bearer {self.api_key}'
+            # Without a key only a local road graph can answer
+            backend = get_local_backend()
+            if backend is None:
+                raise ValueError("API key is required for travel time matrix calculation")
+            return backend
+        if self.client is not None:
+            return ORSBackend(self.api_key, client=self.client)
+        return get_routing_backend(api_key=self.api_key)
+    
+    def get_travel_times_matrix(self, pois, known=None, with_estimates=True):
+        """
+        Get matrix of travel times between POIs from the configured backend.
         
-        headers = {
-            'Authorization': auth_header,
-            'Accept': 'application/json, application/geo+json',
-            'Content-Type': 'application/json; charset=utf-8'
-        }
+        Cells already present (not NaN) in known are kept and not requested again.
+        Unroutable pairs are estimated from straight-line distance, or left NaN
+        when with_estimates is False.
+        """
+        backend = self.get_routing_backend()
         
         # Debug logging
-        print(f"Making API request to {url}")
-        print(f"Headers: {headers}")
-        
-        # Convert POIs to format required by ORS (lng, lat)
-        locations = [[poi['lng'], poi['lat']] for poi in pois]
+        print(f"Requesting {len(pois)}x{len(pois)} travel time matrix from {backend.name} backend")
         
-        body = {
-            "locations": locations,
-            "metrics": ["duration"],
-            "sources": list(range(len(locations))),
-            "destinations": list(range(len(locations)))
-        }
-        
-        print(f"Request body: {json.dumps(body)}")
-        
-        # Make request with more detailed error handling
         try:
-            response = requests.post(url, json=body, headers=headers, timeout=30)
-            response_text = response.text
-            response_code = response.status_code
-            
-            print(f"API Response: {response_code}")
-            
-            if response_code == 200:
-                data = response.json()
-                time_matrix = np.array(data['durations'])
-                return time_matrix
-            else:
-                print(f"API Error: {response_code} - {response_text}")
-                
-                # Check for specific error conditions
-                if response_code == 403:
-                    print("Authentication error - check your API key")
-                elif response_code == 429:
-                    print("Rate limit exceeded")
-                    
-                raise Exception(f"API Error {response_code}: {response_text}")
-                
+            # Large POI sets are split into tiles within the provider limits
+            time_matrix = backend.matrix(pois, pois, 'driving-car', known=known)
         except Exception as e:
             print(f"Exception during API call: {e}")
+            if '403' in str(e):
+                print("Authentication error - check your API key")
+            elif '429' in str(e):
+                print("Rate limit exceeded")
             raise
+        
+        self.last_matrix_source = backend.name
+        return self.estimate_unroutable(time_matrix, pois) if with_estimates else time_matrix
     
-    def create_time_deformed_coordinates(self, time_matrix):
-        """Create coordinates where distances represent travel times using MDS"""
+    def estimate_unroutable(self, time_matrix, pois):
+        """
+        time_matrix with its unroutable (NaN) pairs estimated from straight-line distance.
+        
+        Returns a new array when there is anything to fill, so a stored matrix
+        keeps its NaN cells.
+        """
+        unreachable = np.isnan(time_matrix)
+        if not unreachable.any():
+            return time_matrix
+        print(f"{int(unreachable.sum())} unroutable pairs, using distance estimates for them")
+        filled = np.array(time_matrix, dtype=float)
+        filled[unreachable] = self.create_fallback_time_matrix(pois)[unreachable]
+        return filled
+    
+    def create_time_deformed_coordinates(self, time_matrix, reference=None, previous=None):
+        """
+        Create coordinates where distances represent travel times.
+        
+        reference holds the geographic [x, y] positions of the POIs; the layout
+        is warm-started from them and rotated to match, so the time-based view
+        keeps the orientation of the map. previous is a LayoutMatch from the
+        layout store; its points keep their solved positions and only the added
+        POIs are placed. The raw solution is kept in self.last_layout.
+        """
+        self.last_layout = None
         num_points = len(time_matrix)
         if num_points < 2:
             return np.zeros((num_points, 2))
         
         try:
-            # Use MDS (Multidimensional Scaling) to create 2D coordinates from time distances
-            # This properly preserves the relative time distances between all points
-            mds = MDS(n_components=2, dissimilarity='precomputed', random_state=42)
-            
-            # MDS expects a symmetric distance matrix
-            symmetric_matrix = (time_matrix + time_matrix.T) / 2
-            
-            # Apply MDS to get 2D coordinates that preserve time distances
-            coords = mds.fit_transform(symmetric_matrix)
-            
-            print(f"MDS stress (lower is better): {mds.stress_}")
+            config = current_app.config if has_app_context() else {}
+            if previous is not None:
+                coords, fixed = previous.known_coords()
+                result = extend_layout(
+                    time_matrix, coords, fixed,
+                    max_iter=config.get('LAYOUT_MAX_ITER', 300),
+                    eps=config.get('LAYOUT_TOLERANCE', 1e-4),
+                    refine_iter=config.get('LAYOUT_REFINE_ITER', 5)
+                )
+            else:
+                result = compute_layout(
+                    time_matrix,
+                    method=config.get('LAYOUT_METHOD', 'auto'),
+                    reference=reference,
+                    max_iter=config.get('LAYOUT_MAX_ITER', 300),
+                    eps=config.get('LAYOUT_TOLERANCE', 1e-4),
+                    time_budget=config.get('LAYOUT_TIME_BUDGET', 5.0) or None,
+                    n_landmarks=config.get('LAYOUT_LANDMARKS', 64)
+                )
+            self.last_layout = result
+            coords = result.coords
+            
+            print(f"Layout {result.method}: stress {result.stress:.4f} (lower is better), "
+                  f"{result.iterations} iterations in {result.seconds:.3f}s")
             
             # Normalize coordinates to [0,1] range with padding
             padding = 0.15
@@ -138,7 +178,7 @@ class MapDeformer:
             return normalized_coords
             
         except Exception as e:
-            print(f"MDS failed: {e}, falling back to simple spiral layout")
+            print(f"Layout failed: {e}, falling back to simple spiral layout")
             # Fallback to the old spiral method if MDS fails
             return self._create_spiral_coordinates(time_matrix)
 
@@ -194,26 +234,6 @@ class MapDeformer:
         
         return coords
     
-    def draw_gradient_line(self, draw, p1, p2, color1, color2, width=1, segments=10):
-        """Draw a gradient line between two points"""
-        # Draw segments with color gradients
-        for i in range(segments):
-            t1 = i / segments
-            t2 = (i + 1) / segments
-            
-            x1 = int(p1[0] * (1 - t1) + p2[0] * t1)
-            y1 = int(p1[1] * (1 - t1) + p2[1] * t1)
-            x2 = int(p1[0] * (1 - t2) + p2[0] * t2)
-            y2 = int(p1[1] * (1 - t2) + p2[1] * t2)
-            
-            # Interpolate color
-            r = int(color1[0] * (1 - t1) + color2[0] * t1)
-            g = int(color1[1] * (1 - t1) + color2[1] * t1)
-            b = int(color1[2] * (1 - t1) + color2[2] * t1)
-            a = int(color1[3] * (1 - t1) + color2[3] * t1) if len(color1) > 3 and len(color2) > 3 else 255
-            
-            draw.line([(x1, y1), (x2, y2)], fill=(r, g, b, a), width=width)
-
     def create_time_deformed_map(self, json_path, output_dir=None):
         """Create a time-deformed map based on travel times between POIs"""
         # Load the JSON data
@@ -252,22 +272,59 @@ class MapDeformer:
         
         output_path = os.path.join(output_dir, f"{base_name}-timedeformed.png")
         
+        # Identical requests are answered with the image rendered the first time
+        artifacts = get_artifact_cache()
+        with Image.open(image_path) as probe:
+            image_size = probe.size
+        # The time panel shows the screenshot pixels, not just its size
+        image_digest = file_digest(image_path) if artifacts is not None else None
+        self.last_cache_hit = False
+        options = render_options(current_app.config if has_app_context() else {})
+        self.last_artifact_key = artifact_key(pois, bounds, 'driving-car', self.expected_matrix_source(),
+                                              image_size, RENDERER_VERSION, image_digest, options)
+        if artifacts is not None and artifacts.get(self.last_artifact_key):
+            artifacts.publish(self.last_artifact_key, output_path)
+            self.last_cache_hit = True
+            print(f"Reusing rendered map {self.last_artifact_key[:12]} for {base_name}")
+            return output_path
+        
+        # A previously solved layout sharing most of these POIs lets us route
+        # and place only the added ones
+        store = get_layout_store()
+        previous = None
+        backend_name = None
+        
+        # The exact same POI list routed before is never fetched again
+        matrices = get_matrix_store()
+        
         # Get the time matrix - try API first, then fallback to Euclidean
         try:
-            time_matrix = self.get_travel_times_matrix(pois)
-            print("Successfully retrieved time matrix from API")
-            # Save the time matrix for future use
-            self.save_time_matrix(time_matrix, json_path)
+            backend_name = self.get_routing_backend().name
+            if store is not None:
+                previous = store.find(pois, 'driving-car', backend_name,
+                                      min_overlap=current_app.config.get('LAYOUT_STORE_MIN_OVERLAP', 0.5))
+            if previous is not None:
+                print(f"Reusing layout {previous.entry_id[:12]}: {previous.num_new} new of {len(pois)} POIs")
+            matrix_key = matrices.key(pois, 'driving-car', backend_name) if matrices is not None else None
+            routed_matrix = matrices.get(matrix_key) if matrices is not None else None
+            if routed_matrix is not None:
+                print(f"Reusing time matrix {matrix_key[:12]}")
+                self.last_matrix_source = backend_name
+            else:
+                known = previous.known_matrix() if previous else None
+                routed_matrix = self.get_travel_times_matrix(pois, known=known, with_estimates=False)
+                print("Successfully retrieved time matrix from API")
+                if matrices is not None:
+                    routed_matrix = matrices.put(matrix_key, routed_matrix)
+            # The stores keep unroutable pairs as NaN, only this map uses estimates for them
+            time_matrix = self.estimate_unroutable(routed_matrix, pois)
         except Exception as e:
             print(f"Failed to get time matrix from API: {str(e)}")
-            print("Using fallback Euclidean distance calculation")
-            time_matrix = self.create_fallback_time_matrix(pois)
-            # Still save the fallback matrix
-            self.save_time_matrix(time_matrix, json_path)
+            time_matrix = self.create_offline_time_matrix(pois)
+            # Estimated times are neither stored nor mixed with a routed layout
+            previous = None
+            backend_name = None
     
-        # Create time-based coordinates using MDS
-        time_coords = self.create_time_deformed_coordinates(time_matrix)
-        
         # Load the original map image
         original_img = Image.open(image_path)
         width, height = original_img.size
@@ -294,259 +351,136 @@ class MapDeformer:
             original_pixel_coords.append([norm_x, norm_y])
             print(f"POI: ({poi['lat']}, {poi['lng']}) -> normalized: ({norm_x}, {norm_y})")
         
+        # Create time-based coordinates, warm-started from the geographic layout
         # The time_coords are already normalized by create_time_deformed_coordinates
-        # No need for additional normalization - just use them directly
-        print("Using time coordinates directly from MDS")
+        time_coords = self.create_time_deformed_coordinates(time_matrix, reference=np.array(original_pixel_coords),
+                                                            previous=previous)
+        if store is not None and backend_name and self.last_layout is not None:
+            store.save(pois, 'driving-car', backend_name, routed_matrix, self.last_layout.coords)
         
         # Create the deformed map image
-        deformed_image = self.warp_image(original_img, original_pixel_coords, time_coords)
-        
-        # Save the deformed map
-        deformed_image.save(output_path)
+        deformed_image = self.warp_image(original_img, original_pixel_coords, time_coords, time_matrix)
+        
+        # Save the deformed map, keyed by where its travel times actually came from
+        if artifacts is not None:
+            self.last_artifact_key = artifact_key(pois, bounds, 'driving-car', self.last_matrix_source,
+                                                  image_size, RENDERER_VERSION, image_digest, options)
+            artifacts.put(self.last_artifact_key, lambda path: deformed_image.save(path, format='PNG'))
+            artifacts.publish(self.last_artifact_key, output_path)
+        else:
+            deformed_image.save(output_path)
         print(f"Saved time-deformed map to: {output_path}")
         
         return output_path
 
-    def create_fallback_time_matrix(self, pois):
-        """Create a fallback time matrix if the API fails"""
+    def create_offline_time_matrix(self, pois):
+        """Road-network times from the local graph when one is configured, straight-line estimates otherwise"""
+        local = self._offline_backend()
+        if local is not None:
+            try:
+                print("Using local road graph for offline travel times")
+                time_matrix = local.matrix(pois, pois, 'driving-car')
+                self.last_matrix_source = local.name
+                return self.estimate_unroutable(time_matrix, pois)
+            except Exception as e:
+                print(f"Local road graph failed: {e}")
+        
+        print("Using fallback Euclidean distance calculation")
+        self.last_matrix_source = 'estimate'
+        return self.create_fallback_time_matrix(pois)
+
+    def _offline_backend(self):
+        local = get_local_backend()
+        return local if local is not self.backend else None
+
+    def expected_matrix_source(self):
+        """Name of the backend the travel times will come from if nothing fails"""
+        try:
+            return self.get_routing_backend().name
+        except Exception:
+            return 'local' if self._offline_backend() is not None else 'estimate'
+
+    def create_fallback_time_matrix(self, pois, travel_mode='driving-car'):
+        """Create a fallback time matrix from straight-line distances if the API fails"""
         print("Creating fallback time matrix based on Euclidean distance")
         
-        coords = np.array([[p['lat'], p['lng']] for p in pois])
-        dist_matrix = np.zeros((len(pois), len(pois)))
-        
-        for i in range(len(pois)):
-            for j in range(len(pois)):
-                # Simple Haversine-like distance calculation
-                lat1, lon1 = coords[i]
-                lat2, lon2 = coords[j]
-                dx = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
-                dy = lat2 - lat1
-                dist = 111.3 * np.sqrt(dx*dx + dy*dy)  # km
-                # Convert to seconds (assuming 50 km/h)
-                dist_matrix[i, j] = dist * 72  # seconds
-        
-        return dist_matrix
-        
-    def warp_image(self, image, src_points, dst_points):
-        """Create side-by-side visualization of geographic vs time distances"""
+        config = current_app.config if has_app_context() else {}
+        lats = [p['lat'] for p in pois]
+        lngs = [p['lng'] for p in pois]
+        return fallback_time_matrix(
+            lats, lngs, travel_mode,
+            speeds=config.get('FALLBACK_SPEEDS_KMH'),
+            method=config.get('FALLBACK_MATRIX_METHOD', 'equirectangular'),
+            dtype=np.float32 if config.get('FALLBACK_MATRIX_FLOAT32') else np.float64,
+            chunk_size=config.get('FALLBACK_MATRIX_CHUNK_ROWS', 1024)
+        )
+        
+    def warp_image(self, image, src_points, dst_points, time_matrix=None):
+        """
+        Create side-by-side visualization of geographic vs time distances.
+        
+        Edges between consecutive POIs are labelled with their travel time
+        from time_matrix, one minute when it is not given. Unless MAP_WARP_ENABLED
+        is off, the time panel shows the screenshot itself, bent by a thin-plate
+        spline so every POI sits at its time-based position (see app/services/warp.py).
+        All positions are computed with NumPy up front; the static canvas, fonts
+        and sprites come from the renderer caches.
+        """
         width, height = image.size
+        config = current_app.config if has_app_context() else {}
         
-        # Create a wider canvas to hold both visualizations side by side
-        combined_width = width * 2 + 50  # Add 50px spacing between the views
-        result_image = Image.new("RGB", (combined_width, height), (20, 22, 30))
+        # Wider canvas holding both visualizations side by side, grid and titles included
+        result_image = canvas_background(width, height, self.font_path).copy()
         draw = ImageDraw.Draw(result_image)
         
         try:
-            # Add borders around each panel FIRST so they appear behind everything
-            # Left panel border
-            draw.rectangle([(0, 0), (width, height)], fill=None, outline=(80, 80, 100), width=3)
-            # Right panel border
-            draw.rectangle([(width + 50, 0), (width + 50 + width, height)], fill=None, outline=(80, 80, 100), width=3)
-            
-            # DO NOT paste original map image (as per user request)
-            
-            # Convert normalized coordinates [0,1] to pixel coordinates
-            src_pixel_coords = np.array([(x * width, y * height) for x, y in src_points])
-            
-            # Ensure all time-based points stay within bounds of right panel
-            fixed_dst_points = []
-            for x, y in dst_points:
-                # Clamp values to padding distance from edge
-                padding = 0.1  # 10% padding from edges
-                x = max(padding, min(1-padding, x))
-                y = max(padding, min(1-padding, y))
-                fixed_dst_points.append([x, y])
-            
-            dst_pixel_coords = np.array([(x * width, y * height) for x, y in fixed_dst_points])
-            
-            # Try to load font
-            try:
-                font = ImageFont.truetype(self.font_path, 14) if self.font_path else ImageFont.load_default()
-                small_font = ImageFont.truetype(self.font_path, 12) if self.font_path else ImageFont.load_default()
-                title_font = ImageFont.truetype(self.font_path, 18, stroke_width=1) if self.font_path else ImageFont.load_default()
-            except Exception as font_error:
-                print(f"Font error: {font_error}")
-                font = ImageFont.load_default()
-                small_font = ImageFont.load_default()
-                title_font = ImageFont.load_default()
-        
-            # Get travel times
-            num_pois = len(src_points)
-            travel_times = []
-            time_matrix_path = os.path.join(os.path.dirname(__file__), '..', 'locals', 'map_screenshots', 'last_time_matrix.json')
-            
-            if os.path.exists(time_matrix_path):
-                try:
-                    with open(time_matrix_path, 'r') as f:
-                        time_data = json.load(f)
-                        if 'matrix' in time_data:
-                            matrix = time_data['matrix']
-                            for i in range(num_pois):
-                                next_i = (i + 1) % num_pois
-                                if i < len(matrix) and next_i < len(matrix[i]):
-                                    travel_times.append(matrix[i][next_i])
-                                else:
-                                    travel_times.append(60)  # Default 1 minute
-                except Exception as e:
-                    print(f"Error reading time matrix: {e}")
-                    travel_times = [60] * num_pois
-            else:
-                travel_times = [60] * num_pois
-                
-            # Draw subtle grid for both sides (since we removed the map background)
-            for panel_offset in [0, width + 50]:  # Left and right panel positions
-                grid_step = min(width, height) // 20
-                for x in range(0, width, grid_step):
-                    draw.line([(panel_offset + x, 0), (panel_offset + x, height)], fill=(40, 42, 50), width=1)
-                for y in range(0, height, grid_step):
-                    draw.line([(panel_offset, y), (panel_offset + width, y)], fill=(40, 42, 50), width=1)
-            
-            # Add titles for each visualization
-            # Geographic title
-            title_text = "GEOGRAPHIC DISTANCES"
-            text_bbox = draw.textbbox((0, 0), title_text, font=title_font)
-            text_width = text_bbox[2] - text_bbox[0]
-            draw.rectangle((width//2 - text_width//2 - 10, 10, width//2 + text_width//2 + 10, 40), fill=(0, 0, 0, 180))
-            draw.text((width//2 - text_width//2, 15), title_text, fill=(100, 149, 237), font=title_font)
-            
-            # Time-based title
-            title_text = "TIME-BASED DISTANCES"
-            text_bbox = draw.textbbox((0, 0), title_text, font=title_font)
-            text_width = text_bbox[2] - text_bbox[0]
-            draw.rectangle((width + 50 + width//2 - text_width//2 - 10, 10, width + 50 + width//2 + text_width//2 + 10, 40), 
-                          fill=(0, 0, 0, 180))
-            draw.text((width + 50 + width//2 - text_width//2, 15), title_text, fill=(220, 53, 69), font=title_font)
-            
-            # Draw geographic connections (blue lines on the left panel)
-            for i in range(num_pois):
-                next_i = (i + 1) % num_pois
-                src_p1 = tuple(map(int, src_pixel_coords[i]))
-                src_p2 = tuple(map(int, src_pixel_coords[next_i]))
-                
-                try:
-                    self.draw_gradient_line(draw, src_p1, src_p2, 
-                                          (130, 190, 255, 150), (70, 130, 230, 150), 
-                                          width=3)
-                except Exception as gradient_error:
-                    print(f"Gradient error (geo): {gradient_error}")
-                    draw.line([src_p1, src_p2], fill=(100, 149, 237), width=3)
-            
-            # Draw geographic POIs on the left panel
-            for i in range(num_pois):
-                src_x, src_y = map(int, src_pixel_coords[i])
-                
-                # Draw circle with blue outline
-                draw.ellipse((src_x-12, src_y-12, src_x+12, src_y+12), outline=(100, 149, 237), width=2)
-                # Fill with slightly darker blue
-                draw.ellipse((src_x-10, src_y-10, src_x+10, src_y+10), fill=(60, 100, 200))
-                
-                # Add POI number in the circle
-                num_text = f"{i+1}"
-                text_bbox = draw.textbbox((0, 0), num_text, font=small_font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_height = text_bbox[3] - text_bbox[1]
-                draw.text((src_x - text_width/2, src_y - text_height/2), 
-                         num_text, fill=(255, 255, 255), font=small_font)
-                
-            # TIME-BASED VISUALIZATION (RIGHT PANEL)
-            time_panel_offset = width + 50  # Starting X position for time panel
-                
-            # Draw time-based connections with proper deformation
-            for i in range(num_pois):
-                next_i = (i + 1) % num_pois
-                
-                try:
-                    # Offset the coordinates to the right panel
-                    dst_p1 = tuple(map(int, [dst_pixel_coords[i][0] + time_panel_offset, dst_pixel_coords[i][1]]))
-                    dst_p2 = tuple(map(int, [dst_pixel_coords[next_i][0] + time_panel_offset, dst_pixel_coords[next_i][1]]))
-                    
-                    # Draw the red line with gradient
-                    try:
-                        self.draw_gradient_line(draw, dst_p1, dst_p2, 
-                                          (255, 100, 100, 200), (200, 30, 60, 200),
-                                          width=4)
-                    except Exception as gradient_error:
-                        print(f"Gradient error (time): {gradient_error}")
-                        draw.line([dst_p1, dst_p2], fill=(220, 53, 69), width=4)
-                    
-                    # Add travel time label
-                    if i < len(travel_times):
-                        time_seconds = travel_times[i]
-                        
-                        # Calculate midpoint for the label
-                        mid_x = int((dst_p1[0] + dst_p2[0]) / 2)
-                        mid_y = int((dst_p1[1] + dst_p2[1]) / 2)
-                        
-                        # Calculate perpendicular vector for offset
-                        dx = dst_p2[0] - dst_p1[0]
-                        dy = dst_p2[1] - dst_p1[1]
-                        line_length = max(1, np.sqrt(dx*dx + dy*dy))
-                        
-                        # Format time nicely
-                        if isinstance(time_seconds, (int, float)):
-                            if time_seconds < 60:
-                                time_str = f"{int(time_seconds)}s"
-                            else:
-                                minutes = int(time_seconds // 60)
-                                seconds = int(time_seconds % 60)
-                                time_str = f"{minutes}m {seconds}s"
-                        else:
-                            time_str = "?"
-                        
-                        # Offset perpendicular to the line
-                        offset = 15
-                        if abs(dx) > 0 or abs(dy) > 0:
-                            nx = -dy / line_length * offset
-                            ny = dx / line_length * offset
-                            mid_x += int(nx)
-                            mid_y += int(ny)
-                        
-                        # Draw the time label with background
-                        try:
-                            text_bbox = draw.textbbox((0, 0), time_str, font=small_font)
-                            text_width = text_bbox[2] - text_bbox[0]
-                            text_height = text_bbox[3] - text_bbox[1]
-                            
-                            # Background for better visibility
-                            draw.rectangle((mid_x - text_width/2 - 4, 
-                                          mid_y - text_height/2 - 4,
-                                          mid_x + text_width/2 + 4,
-                                          mid_y + text_height/2 + 4),
-                                        fill=(0, 0, 0, 200),
-                                        outline=(255, 255, 255, 150),
-                                        width=1)
-                            
-                            # Draw the time text
-                            draw.text((mid_x - text_width/2, mid_y - text_height/2),
-                                    time_str, fill=(255, 255, 255), font=small_font)
-                        except Exception as text_error:
-                            print(f"Text drawing error: {text_error}")
-                    
-                except Exception as coord_error:
-                    print(f"Time coordinate error: {coord_error}")
-                    
-            # Draw time-based POIs with numbers
-            for i in range(num_pois):
-                try:
-                    # Offset X coordinate to right panel
-                    dst_x = int(dst_pixel_coords[i][0]) + time_panel_offset
-                    dst_y = int(dst_pixel_coords[i][1])
-                    
-                    # Draw circle with red outline
-                    draw.ellipse((dst_x-12, dst_y-12, dst_x+12, dst_y+12), outline=(220, 53, 69), width=2)
-                    # Fill with slightly darker red
-                    draw.ellipse((dst_x-10, dst_y-10, dst_x+10, dst_y+10), fill=(180, 30, 45))
-                    
-                    # Add POI number in the circle
-                    num_text = f"{i+1}"
-                    text_bbox = draw.textbbox((0, 0), num_text, font=small_font)
-                    text_width = text_bbox[2] - text_bbox[0]
-                    text_height = text_bbox[3] - text_bbox[1]
-                    draw.text((dst_x - text_width/2, dst_y - text_height/2), 
-                             num_text, fill=(255, 255, 255), font=small_font)
-                    
-                except Exception as poi_error:
-                    print(f"Time POI error: {poi_error}")
+            # The geographic panel stays a plain grid (as per user request)
+            size = np.array([width, height], dtype=float)
+            src_normalized = np.asarray(src_points, dtype=float).reshape(-1, 2)
+            src_pixel_coords = src_normalized * size
+            # Time-based points stay 10% away from the edges of the right panel
+            dst_normalized = np.clip(np.asarray(dst_points, dtype=float).reshape(-1, 2), 0.1, 0.9)
+            dst_pixel_coords = dst_normalized * size
+            dst_pixel_coords[:, 0] += width + PANEL_GAP
+            
+            options = render_options(config)
+            if options['warp'] and len(src_normalized):
+                field = warp_field(src_normalized, dst_normalized, grid_size=options['warp_grid'],
+                                   smoothing=options['warp_smoothing'])
+                panel = warp_screenshot(image.convert('RGB'), field, (width, height), fillcolor=BACKGROUND)
+                result_image.paste(panel, (width + PANEL_GAP, 0))
+                draw_panel_frame(draw, width + PANEL_GAP, width, height, *TITLES[1], load_font(self.font_path, 18))
+            
+            # Each POI is connected to the next one, closing the loop
+            num_pois = len(src_pixel_coords)
+            following = (np.arange(num_pois) + 1) % num_pois
+            
+            # Travel time of every edge, one minute when unknown
+            travel_times = np.full(num_pois, 60.0)
+            if time_matrix is not None:
+                known = (np.arange(num_pois) < time_matrix.shape[0]) & (following < time_matrix.shape[1])
+                travel_times[known] = np.asarray(time_matrix)[np.flatnonzero(known), following[known]]
+            
+            draw_gradient_lines(draw, src_pixel_coords, src_pixel_coords[following],
+                                (130, 190, 255), (70, 130, 230), width=3)
+            draw_gradient_lines(draw, dst_pixel_coords, dst_pixel_coords[following],
+                                (255, 100, 100), (200, 30, 60), width=4)
+            
+            # Travel time labels beside the midpoint of each time-based edge
+            direction = dst_pixel_coords[following] - dst_pixel_coords
+            length = np.linalg.norm(direction, axis=1, keepdims=True)
+            normal = np.where(length > 0, np.column_stack([-direction[:, 1], direction[:, 0]]) / np.maximum(length, 1), 0)
+            label_points = (dst_pixel_coords + dst_pixel_coords[following]) / 2 + 15 * normal
+            for label, point in zip(format_travel_times(travel_times), label_points):
+                sprite = text_sprite(label, self.font_path, 12, padding=4,
+                                     background=(0, 0, 0), outline=(255, 255, 255))
+                paste_centered(result_image, sprite, point[None])
+            
+            # POI markers with their numbers, above the lines and labels
+            for points, outline, fill in ((src_pixel_coords, (100, 149, 237), (60, 100, 200)),
+                                          (dst_pixel_coords, (220, 53, 69), (180, 30, 45))):
+                for i, point in enumerate(points):
+                    paste_centered(result_image, numbered_marker(outline, fill, i + 1, self.font_path), point[None])
         
         except Exception as e:
             print(f"Error during visualization creation: {e}")
@@ -563,19 +497,6 @@ class MapDeformer:
         # Rough estimate: 100 pixels ≈ 5 minutes (300 seconds)
         return distance_px * 3
 
-    def save_time_matrix(self, time_matrix, json_path):
-        """Save the time matrix for use in visualization"""
-        # Get directory from json_path
-        directory = os.path.dirname(json_path)
-        output_path = os.path.join(directory, 'last_time_matrix.json')
-        
-        # Save the matrix
-        with open(output_path, 'w') as f:
-            json.dump({
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'matrix': time_matrix.tolist()
-            }, f, indent=2)
-    
 def generate_time_deformed_map(screenshot_id, api_key=None):
     """Generate a time-deformed map for a given screenshot ID"""
     try:
@@ -612,4 +533,30 @@ def generate_time_deformed_map(screenshot_id, api_key=None):
         print(f"ERROR generating time-deformed map: {str(e)}")
         import traceback
         traceback.print_exc()
-        raise # Re-raise to let caller handle it
\ No newline at end of file
+        raise # Re-raise to let caller handle it
+
+def deform_screenshot(screenshot_id, api_key=None):
+    """
+    Generate the time-deformed map of a screenshot and return the response payload.
+    
+    Falls back to offline travel times when the configured backend fails.
+    """
+    try:
+        # Try API-based approach first
+        output_path = generate_time_deformed_map(screenshot_id, api_key)
+    except Exception as api_error:
+        print(f"API approach failed: {str(api_error)}")
+        print("Falling back to distance-based calculation...")
+        
+        # Use fallback method
+        locals_dir = os.path.join(os.path.dirname(__file__), '..', 'locals', 'map_screenshots')
+        json_path = os.path.join(locals_dir, f"{screenshot_id}.json")
+        deformer = MapDeformer(None)
+        output_path = deformer.create_time_deformed_map(json_path, output_dir=locals_dir)
+    
+    mark_deformed(screenshot_id)
+    filename = os.path.basename(output_path)
+    return {
+        'filename': filename,
+        'url': f"/api/map-image/{filename}"
+    }
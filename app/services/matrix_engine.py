@@ -0,0 +1,274 @@
+import asyncio
+import contextvars
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from flask import current_app, has_app_context
+
+from app.services.routing_client import RoutingServiceError
+
+# Above this many distinct row patterns the missing cells are fetched as one block
+MAX_PATTERN_GROUPS = 16
+
+
+class MatrixEngine:
+    """
+    Compute N×M travel-time matrices from provider-sized tiles.
+
+    Sources and destinations are split into tiles that respect the provider's
+    per-request limits, tiles are fetched concurrently on a bounded thread pool
+    and stitched into one array. Cells that are already known are never
+    requested again.
+    """
+
+    def __init__(self, max_locations=50, max_routes=3500, max_workers=4):
+        """
+        Args:
+            max_locations (int): Maximum number of locations in one request
+            max_routes (int): Maximum number of sources × destinations in one request
+            max_workers (int): Maximum number of tiles fetched at the same time
+        """
+        self.max_locations = max_locations
+        self.max_routes = max_routes
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def tile_shape(self, n_sources, n_destinations):
+        """Return the (sources, destinations) tile size that needs the fewest requests"""
+        best = None
+        for rows in range(1, min(n_sources, self.max_locations - 1) + 1):
+            cols = min(n_destinations, self.max_locations - rows, self.max_routes // rows)
+            if cols < 1:
+                break
+            count = math.ceil(n_sources / rows) * math.ceil(n_destinations / cols)
+            if best is None or count < best[0]:
+                best = (count, rows, cols)
+        return best[1], best[2]
+
+    def plan(self, n_sources, n_destinations, known=None, symmetric=False):
+        """
+        Split the cells that still need fetching into tiles.
+
+        Returns a list of (row_indices, col_indices) array pairs. Rows are grouped
+        by which of their columns are unknown, so a matrix that only misses a few
+        new rows and columns costs requests for those rows and columns alone.
+        """
+        if known is None:
+            groups = [(np.arange(n_sources), np.arange(n_destinations))]
+        else:
+            missing = np.isnan(known)
+            rows = np.flatnonzero(missing.any(axis=1))
+            if len(rows) == 0:
+                return []
+            patterns = {}
+            for row in rows:
+                patterns.setdefault(missing[row].tobytes(), []).append(row)
+            if len(patterns) > MAX_PATTERN_GROUPS:
+                groups = [(rows, np.flatnonzero(missing.any(axis=0)))]
+            else:
+                groups = [
+                    (np.array(group_rows), np.flatnonzero(missing[group_rows[0]]))
+                    for group_rows in patterns.values()
+                ]
+
+        tiles = []
+        for rows, cols in groups:
+            # A square block sharing its locations is sent once, not twice
+            if (symmetric and np.array_equal(rows, cols)
+                    and len(rows) <= self.max_locations and len(rows) ** 2 <= self.max_routes):
+                tiles.append((rows, cols))
+                continue
+            tile_rows, tile_cols = self.tile_shape(len(rows), len(cols))
+            for i in range(0, len(rows), tile_rows):
+                for j in range(0, len(cols), tile_cols):
+                    tiles.append((rows[i:i + tile_rows], cols[j:j + tile_cols]))
+        return tiles
+
+    def compute(self, sources, destinations, fetch_tile, known=None):
+        """
+        Compute the travel-time matrix between sources and destinations.
+
+        Args:
+            sources (list): Origin points as {'lat', 'lng'} dicts or (lat, lng) pairs
+            destinations (list): Destination points in the same format
+            fetch_tile (callable): fetch_tile(source_points, destination_points) returning
+                a len(sources) × len(destinations) nested list of seconds (None if unreachable)
+            known (ndarray): Optional matrix of already known cells, NaN where unknown
+
+        Returns:
+            ndarray: Travel times in seconds, NaN where no route exists
+        """
+        sources, destinations, matrix, tiles = self._prepare(sources, destinations, known)
+
+        def run(tile):
+            rows, cols = tile
+            values = fetch_tile([sources[i] for i in rows], [destinations[j] for j in cols])
+            return rows, cols, np.array(values, dtype=float)
+
+        if len(tiles) == 1:
+            results = [run(tiles[0])]
+        else:
+            # Each tile runs in a copy of this context, keeping the caller's request priority
+            futures = [self._get_executor().submit(contextvars.copy_context().run, run, tile) for tile in tiles]
+            try:
+                results = [future.result() for future in futures]
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        return self._assemble(matrix, results)
+
+    async def compute_async(self, sources, destinations, fetch_tile, known=None):
+        """
+        Asyncio variant of compute.
+
+        fetch_tile is a coroutine function; at most max_workers tiles are
+        awaited at the same time, all on the running event loop.
+        """
+        sources, destinations, matrix, tiles = self._prepare(sources, destinations, known)
+        slots = asyncio.Semaphore(self.max_workers)
+
+        async def run(tile):
+            rows, cols = tile
+            async with slots:
+                values = await fetch_tile([sources[i] for i in rows], [destinations[j] for j in cols])
+            return rows, cols, np.array(values, dtype=float)
+
+        return self._assemble(matrix, await asyncio.gather(*(run(tile) for tile in tiles)))
+
+    def _prepare(self, sources, destinations, known):
+        """([lng, lat] sources, [lng, lat] destinations, matrix with the known cells, tiles to fetch)"""
+        sources = [_as_lnglat(p) for p in sources]
+        destinations = [_as_lnglat(p) for p in destinations]
+        symmetric = sources == destinations
+
+        if known is not None:
+            matrix = np.array(known, dtype=float, copy=True)
+            if matrix.shape != (len(sources), len(destinations)):
+                raise ValueError("Known matrix shape does not match sources × destinations")
+        else:
+            matrix = np.full((len(sources), len(destinations)), np.nan)
+
+        if not sources or not destinations:
+            return sources, destinations, matrix, []
+        return sources, destinations, matrix, self.plan(len(sources), len(destinations), known, symmetric)
+
+    @staticmethod
+    def _assemble(matrix, results):
+        for rows, cols, values in results:
+            if values.shape != (len(rows), len(cols)):
+                raise RoutingServiceError(
+                    f"Matrix tile has shape {values.shape}, expected {(len(rows), len(cols))}"
+                )
+            matrix[np.ix_(rows, cols)] = values
+
+        return matrix
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='matrix-tile')
+            return self._executor
+
+
+def ors_tile_fetcher(client, api_key, profile='driving-car'):
+    """
+    Return a fetch_tile function backed by the OpenRouteService matrix API.
+
+    Points are passed as [lng, lat] pairs. When a tile's sources and
+    destinations are the same points they are sent only once.
+    """
+    path, headers = _ors_matrix_request(api_key, profile)
+
+    def fetch_tile(source_points, destination_points):
+        response = client.post(path, json=_ors_matrix_body(source_points, destination_points), headers=headers)
+        return _ors_matrix_durations(response)
+
+    return fetch_tile
+
+
+def async_ors_tile_fetcher(client, api_key, profile='driving-car'):
+    """ors_tile_fetcher for MatrixEngine.compute_async, posting through an AsyncRoutingClient"""
+    path, headers = _ors_matrix_request(api_key, profile)
+
+    async def fetch_tile(source_points, destination_points):
+        response = await client.post(path, json=_ors_matrix_body(source_points, destination_points), headers=headers)
+        return _ors_matrix_durations(response)
+
+    return fetch_tile
+
+
+def _ors_matrix_request(api_key, profile):
+    auth_header = api_key if api_key.startswith('Bearer ') else f'Bearer {api_key}'
+    headers = {
+        'Authorization': auth_header,
+        'Accept': 'application/json, application/geo+json',
+        'Content-Type': 'application/json; charset=utf-8'
+    }
+    return f"/v2/matrix/{profile}", headers
+
+
+def _ors_matrix_body(source_points, destination_points):
+    if source_points == destination_points:
+        locations = list(source_points)
+        source_indices = list(range(len(locations)))
+        destination_indices = source_indices
+    else:
+        locations = list(source_points) + list(destination_points)
+        source_indices = list(range(len(source_points)))
+        destination_indices = list(range(len(source_points), len(locations)))
+
+    return {
+        "locations": locations,
+        "metrics": ["duration"],
+        "sources": source_indices,
+        "destinations": destination_indices
+    }
+
+
+def _ors_matrix_durations(response):
+    if response.status_code != 200:
+        raise RoutingServiceError(f"API Error {response.status_code}: {response.text}")
+    return [[np.nan if d is None else d for d in row] for row in response.json()['durations']]
+
+
+_default_engine = None
+
+
+def get_matrix_engine():
+    """
+    Return the matrix engine shared by the current application.
+
+    Outside an application context a process-wide engine with default limits
+    is used instead.
+    """
+    global _default_engine
+
+    if not has_app_context():
+        if _default_engine is None:
+            _default_engine = MatrixEngine()
+        return _default_engine
+
+    engine = current_app.extensions.get('matrix_engine')
+    if engine is None:
+        config = current_app.config
+        engine = MatrixEngine(
+            max_locations=config.get('MATRIX_MAX_LOCATIONS', 50),
+            max_routes=config.get('MATRIX_MAX_ROUTES', 3500),
+            max_workers=config.get('MATRIX_MAX_WORKERS', 4)
+        )
+        current_app.extensions['matrix_engine'] = engine
+    return engine
+
+
+def _as_lnglat(point):
+    """Convert a {'lat', 'lng'} dict or (lat, lng) pair to an ORS [lng, lat] pair"""
+    if isinstance(point, dict):
+        return [float(point['lng']), float(point['lat'])]
+    lat, lng = point
+    return [float(lng), float(lat)]
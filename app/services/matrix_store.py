@@ -0,0 +1,135 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from flask import current_app, has_app_context
+
+
+class MatrixStore:
+    """
+    Routed travel-time matrices keyed by the exact, ordered POI list.
+
+    Each entry is one .npy file of little-endian float64 opened memory-mapped,
+    fronted by an in-process LRU of the most recently used arrays. Unlike
+    LayoutStore, which finds overlapping POI sets, a hit here means the same
+    POIs in the same order, so the matrix is used as is and never refetched.
+    """
+
+    def __init__(self, directory=None, max_memory_entries=64, max_entries=1000, precision=5):
+        """
+        Args:
+            directory (str): Folder for the .npy entries, None to keep them in memory only
+            max_memory_entries (int): Maximum number of arrays kept in process
+            max_entries (int): Maximum number of files on disk; the least recently used are removed first
+            precision (int): Decimal places POI coordinates are rounded to in the key
+        """
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.max_entries = max_entries
+        self.precision = precision
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, pois, travel_mode, backend):
+        """Digest of the rounded POI positions in order, the travel mode and the backend"""
+        points = [(round(float(p['lat']), self.precision), round(float(p['lng']), self.precision)) for p in pois]
+        return hashlib.sha1(repr((travel_mode, backend, points)).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the read-only matrix stored under key, or None"""
+        with self._lock:
+            matrix = self._memory.get(key)
+            if matrix is not None:
+                self._memory.move_to_end(key)
+                return matrix
+            if not self.directory:
+                return None
+            path = self._path(key)
+            try:
+                matrix = np.load(path, mmap_mode='r')
+                # Touched so the least recently used files are evicted first
+                os.utime(path)
+            except (OSError, ValueError):
+                return None
+            self._remember(key, matrix)
+            return matrix
+
+    def put(self, key, matrix):
+        """Store matrix under key and return the stored, read-only array"""
+        matrix = np.ascontiguousarray(matrix, dtype='<f8')
+        with self._lock:
+            if self.directory:
+                path = self._path(key)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, matrix, allow_pickle=False)
+                os.replace(tmp_path, path)
+                self._evict_files()
+                matrix = np.load(path, mmap_mode='r')
+            else:
+                matrix = matrix.copy()
+                matrix.setflags(write=False)
+            self._remember(key, matrix)
+            return matrix
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.directory:
+                for name in os.listdir(self.directory):
+                    if name.endswith('.npy'):
+                        os.remove(os.path.join(self.directory, name))
+
+    def __len__(self):
+        with self._lock:
+            if self.directory:
+                return sum(1 for name in os.listdir(self.directory) if name.endswith('.npy'))
+            return len(self._memory)
+
+    def _remember(self, key, matrix):
+        """Insert into the in-process LRU (lock must be held)"""
+        self._memory[key] = matrix
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_files(self):
+        """Remove the least recently used files beyond max_entries (lock must be held)"""
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.npy')]
+        if len(paths) <= self.max_entries:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_entries]:
+            self._memory.pop(os.path.basename(path)[:-4], None)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npy')
+
+
+def get_matrix_store():
+    """Return the matrix store of the current application, None when disabled or outside one"""
+    if not has_app_context():
+        return None
+    config = current_app.config
+    if not config.get('MATRIX_STORE_ENABLED', True):
+        return None
+    store = current_app.extensions.get('matrix_store')
+    if store is None:
+        directory = config.get('MATRIX_STORE_PATH')
+        if directory is None:
+            directory = os.path.join(current_app.root_path, 'locals', 'matrices')
+        store = MatrixStore(
+            directory=directory or None,
+            max_memory_entries=config.get('MATRIX_STORE_MEMORY_ENTRIES', 64),
+            max_entries=config.get('MATRIX_STORE_ENTRIES', 1000)
+        )
+        current_app.extensions['matrix_store'] = store
+    return store
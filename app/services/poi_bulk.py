@@ -0,0 +1,429 @@
+"""
+Bulk import and export of points of interest.
+
+Imports read CSV, NDJSON or GeoJSON as a stream, validate each batch of
+records with array operations and write it with one executemany statement,
+committing every commit_rows rows, so tens of thousands of POIs take a few
+transactions instead of one round trip and commit each. Exports serialize
+rows while they are read from a server-side cursor.
+"""
+import csv
+import io
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, func, insert, select, update
+
+from app import db
+from app.models.poi import POI_FIELDS, PointOfInterest, PoiTombstone
+
+FORMATS = ('csv', 'ndjson', 'geojson')
+OPERATIONS = ('create', 'update', 'delete')
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/geo+json': 'geojson',
+    'application/geo+json-seq': 'geojson'
+}
+EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.geojson': 'geojson', '.json': 'geojson'}
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson', 'geojson': 'application/geo+json'}
+
+# Column name variants accepted on import
+ALIASES = {'lat': 'latitude', 'lng': 'longitude', 'lon': 'longitude', 'long': 'longitude'}
+WRITABLE = ('name', 'latitude', 'longitude', 'category', 'description', 'travel_time')
+MAX_LENGTHS = {'name': 100, 'category': 50}
+
+
+class BulkReport:
+    """Counts, rejected records and throughput of a bulk operation"""
+
+    def __init__(self, operation, max_errors=100):
+        self.operation = operation
+        self.max_errors = max_errors
+        self.created = 0
+        self.updated = 0
+        self.deleted = 0
+        self.rejected = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def rows(self):
+        return self.created + self.updated + self.deleted + self.rejected
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def reject(self, record_number, message):
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'record': record_number, 'error': message})
+
+    def to_dict(self):
+        return {
+            'operation': self.operation,
+            'created': self.created,
+            'updated': self.updated,
+            'deleted': self.deleted,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1)
+        }
+
+
+def detect_format(content_type=None, filename=None):
+    """The import format for a Content-Type or file name, None when unknown"""
+    if content_type and content_type in CONTENT_TYPES:
+        return CONTENT_TYPES[content_type]
+    if filename:
+        for extension, fmt in EXTENSIONS.items():
+            if filename.lower().endswith(extension):
+                return fmt
+    return None
+
+
+def read_records(stream, fmt):
+    """
+    Records from a binary stream as flat dictionaries, one at a time.
+
+    GeoJSON is read as a stream when it is a sequence of Features, one per
+    line (RFC 8142); a FeatureCollection document is parsed whole. A record
+    that cannot be parsed is yielded as {'_error': message}.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+        for row in reader:
+            yield {key: (value if value != '' else None) for key, value in row.items() if key}
+    elif fmt == 'ndjson':
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield _parse_json_line(line, dict)
+    elif fmt == 'geojson':
+        yield from _read_geojson(stream)
+    else:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}")
+
+
+def _read_geojson(stream):
+    first = stream.readline()
+    try:
+        head = json.loads(first.strip().lstrip(b'\x1e') or b'null')
+    except ValueError:
+        head = None
+    if isinstance(head, dict) and head.get('type') == 'Feature':
+        # One Feature per line
+        yield _from_feature(head)
+        for line in stream:
+            line = line.strip().lstrip(b'\x1e')
+            if line:
+                yield _parse_json_line(line, _from_feature)
+        return
+    document = head if isinstance(head, dict) else json.loads(first + stream.read())
+    features = document.get('features', []) if document.get('type') == 'FeatureCollection' else [document]
+    for feature in features:
+        yield _from_feature(feature)
+
+
+def _parse_json_line(line, convert):
+    try:
+        value = json.loads(line)
+    except ValueError as e:
+        return {'_error': f"Invalid JSON: {e}"}
+    if not isinstance(value, dict):
+        return {'_error': "Expected a JSON object"}
+    return convert(value)
+
+
+def _from_feature(feature):
+    try:
+        lng, lat = feature['geometry']['coordinates'][:2]
+    except (KeyError, TypeError, ValueError):
+        return {'_error': "Feature must have a Point geometry"}
+    record = dict(feature.get('properties') or {})
+    if feature.get('id') is not None:
+        record.setdefault('id', feature['id'])
+    record['latitude'], record['longitude'] = lat, lng
+    return record
+
+
+def _normalize(record):
+    return {ALIASES.get(key.strip().lower(), key.strip().lower()): value for key, value in record.items()}
+
+
+def _floats(values):
+    result = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        try:
+            result[i] = float(value)
+        except (TypeError, ValueError):
+            pass
+    return result
+
+
+def validate_batch(records, require_id=False, require_fields=True):
+    """
+    Check a batch of records at once.
+
+    Args:
+        records (list): Normalized records
+        require_id (bool): Every record must carry a positive integer id
+        require_fields (bool): name, latitude and longitude must be present (creates)
+
+    Returns:
+        np.ndarray: The first error message of each record, None for valid ones
+    """
+    n = len(records)
+    errors = np.full(n, None, dtype=object)
+
+    def flag(mask, message):
+        errors[mask & np.equal(errors, None)] = message
+
+    for i, record in enumerate(records):
+        if record.get('_error'):
+            errors[i] = record['_error']
+
+    if require_id:
+        ids = _floats([r.get('id') for r in records])
+        flag(~np.isfinite(ids) | (ids != np.round(ids)) | (ids < 1), "id must be a positive integer")
+
+    present = {field: np.array([r.get(field) is not None for r in records], dtype=bool) for field in WRITABLE}
+    if require_fields:
+        for field in ('name', 'latitude', 'longitude'):
+            flag(~present[field], f"{field} is required")
+
+    lats = _floats([r.get('latitude') for r in records])
+    lngs = _floats([r.get('longitude') for r in records])
+    flag(present['latitude'] & ~(np.abs(lats) <= 90), "latitude must be a number between -90 and 90")
+    flag(present['longitude'] & ~(np.abs(lngs) <= 180), "longitude must be a number between -180 and 180")
+
+    minutes = _floats([r.get('travel_time') for r in records])
+    flag(present['travel_time'] & ~((minutes > 0) & (minutes == np.round(minutes))),
+         "travel_time must be a positive whole number of minutes")
+
+    for field, limit in MAX_LENGTHS.items():
+        lengths = np.array([len(str(r[field])) if r.get(field) is not None else 0 for r in records])
+        flag(lengths > limit, f"{field} must be at most {limit} characters")
+        if field == 'name':
+            flag(present[field] & (lengths == 0), "name must not be empty")
+    return errors
+
+
+def _row(record, fields):
+    row = {}
+    for field in fields:
+        value = record.get(field)
+        if field in ('latitude', 'longitude'):
+            value = float(value)
+        elif field == 'travel_time':
+            value = int(float(value)) if value is not None else 10
+        elif value is not None:
+            value = str(value)
+        row[field] = value
+    return row
+
+
+def _batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_apply(records, operation='create', batch_size=None, commit_rows=None, max_errors=100):
+    """
+    Create, update or delete POIs from an iterable of records.
+
+    Field names are matched case-insensitively and lat, lng and lon are
+    accepted for latitude and longitude.
+
+    Creates ignore any id. Updates need an id and change only the fields a
+    record carries. Deletes need only the id. Invalid records and ids that
+    do not exist are rejected and reported; the others are written.
+
+    Returns:
+        BulkReport
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown operation '{operation}', expected one of {', '.join(OPERATIONS)}")
+    config = current_app.config if has_app_context() else {}
+    batch_size = batch_size or config.get('POI_BULK_BATCH_SIZE', 1000)
+    commit_rows = commit_rows or config.get('POI_BULK_COMMIT_ROWS', 20000)
+    report = BulkReport(operation, max_errors)
+    write = {'create': _create_batch, 'update': _update_batch, 'delete': _delete_batch}[operation]
+
+    started = time.perf_counter()
+    offset = 0
+    uncommitted = 0
+    try:
+        for batch in _batches(map(_normalize, records), batch_size):
+            if operation == 'delete':
+                # Only the id of a deleted record matters
+                errors = validate_batch([{'id': r.get('id'), '_error': r.get('_error')} for r in batch],
+                                        require_id=True, require_fields=False)
+            else:
+                errors = validate_batch(batch, require_id=operation == 'update',
+                                        require_fields=operation == 'create')
+            for i in np.flatnonzero(np.not_equal(errors, None)):
+                report.reject(offset + int(i) + 1, errors[i])
+            valid = [(offset + int(i) + 1, batch[i]) for i in np.flatnonzero(np.equal(errors, None))]
+            if valid:
+                uncommitted += write(valid, report)
+            offset += len(batch)
+            if uncommitted >= commit_rows:
+                db.session.commit()
+                uncommitted = 0
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        report.seconds = time.perf_counter() - started
+        _invalidate_poi_index()
+    return report
+
+
+def _create_batch(valid, report):
+    table = PointOfInterest.__table__
+    rows = [_row(record, WRITABLE) for _, record in valid]
+    max_id = select(func.coalesce(func.max(table.c.id), 0))
+    before = db.session.execute(max_id).scalar()
+    db.session.execute(insert(table), rows)
+    after = db.session.execute(max_id).scalar()
+    # SQLite may hand out ids of deleted rows again; they are no longer deleted
+    tombstones = PoiTombstone.__table__
+    db.session.execute(tombstones.delete().where(tombstones.c.poi_id > before, tombstones.c.poi_id <= after))
+    report.created += len(rows)
+    return len(rows)
+
+
+def _existing_ids(ids):
+    table = PointOfInterest.__table__
+    return set(db.session.execute(select(table.c.id).where(table.c.id.in_(ids))).scalars())
+
+
+def _current_rows(ids):
+    """The writable fields of the existing POIs among ids, by id"""
+    table = PointOfInterest.__table__
+    statement = select(table.c.id, *(table.c[field] for field in WRITABLE)).where(table.c.id.in_(ids))
+    return {row.id: row._mapping for row in db.session.execute(statement)}
+
+
+def _update_batch(valid, report):
+    table = PointOfInterest.__table__
+    current = _current_rows([int(float(record['id'])) for _, record in valid])
+    groups = {}
+    for number, record in valid:
+        poi_id = int(float(record['id']))
+        if poi_id not in current:
+            report.reject(number, f"No POI with id {poi_id}")
+            continue
+        row = _row(record, [field for field in WRITABLE if record.get(field) is not None])
+        # Only changed fields are written, and a record changing nothing is not an update
+        row = {field: value for field, value in row.items() if value != current[poi_id][field]}
+        if not row:
+            continue
+        fields = tuple(row)
+        row['_id'] = poi_id
+        groups.setdefault(fields, []).append(row)
+
+    written = 0
+    for fields, rows in groups.items():
+        statement = (update(table).where(table.c.id == bindparam('_id'))
+                     .values({field: bindparam(field) for field in fields}))
+        db.session.execute(statement, rows)
+        written += len(rows)
+    report.updated += written
+    return written
+
+
+def _delete_batch(valid, report):
+    table = PointOfInterest.__table__
+    tombstones = PoiTombstone.__table__
+    existing = _existing_ids([int(float(record['id'])) for _, record in valid])
+    ids = []
+    for number, record in valid:
+        poi_id = int(float(record['id']))
+        if poi_id in existing and poi_id not in ids:
+            ids.append(poi_id)
+        elif poi_id not in existing:
+            report.reject(number, f"No POI with id {poi_id}")
+    if ids:
+        db.session.execute(table.delete().where(table.c.id.in_(ids)))
+        db.session.execute(tombstones.delete().where(tombstones.c.poi_id.in_(ids)))
+        now = datetime.utcnow()
+        db.session.execute(insert(tombstones), [{'poi_id': poi_id, 'deleted_at': now} for poi_id in ids])
+    report.deleted += len(ids)
+    return len(ids)
+
+
+def _invalidate_poi_index():
+    # Core statements bypass the ORM hooks that keep the spatial index in sync
+    if has_app_context():
+        index = current_app.extensions.get('poi_index')
+        if index is not None:
+            index.invalidate()
+
+
+def export_records(rows, fmt, fields=POI_FIELDS):
+    """
+    Serialize (field values...) rows to text chunks in fmt.
+
+    GeoJSON is written as one FeatureCollection with the position as a
+    Point geometry and the other fields as properties.
+    """
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(['' if value is None else _json_value(value) for value in row])
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    elif fmt == 'ndjson':
+        for row in rows:
+            yield json.dumps({field: _json_value(value) for field, value in zip(fields, row)}) + '\n'
+    elif fmt == 'geojson':
+        yield '{"type": "FeatureCollection", "features": ['
+        for i, row in enumerate(rows):
+            properties = {field: _json_value(value) for field, value in zip(fields, row)}
+            feature = {
+                'type': 'Feature',
+                'id': properties.get('id'),
+                'geometry': {'type': 'Point',
+                             'coordinates': [properties.pop('longitude', None), properties.pop('latitude', None)]},
+                'properties': properties
+            }
+            yield (',\n' if i else '\n') + json.dumps(feature)
+        yield '\n]}\n'
+    else:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}")
+
+
+def export_fields(fields, fmt):
+    """fields, plus the position GeoJSON needs for its geometry"""
+    if fmt == 'geojson':
+        fields = tuple(fields) + tuple(field for field in ('latitude', 'longitude') if field not in fields)
+    return tuple(fields)
+
+
+def export_query(fields=POI_FIELDS, batch_size=1000):
+    """Rows of fields for every POI in id order, fetched batch_size at a time"""
+    columns = [getattr(PointOfInterest, field) for field in fields]
+    return db.session.query(*columns).order_by(PointOfInterest.id).yield_per(batch_size)
+
+
+def _json_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
@@ -0,0 +1,176 @@
+"""
+In-memory spatial index of points of interest.
+
+POIs are kept as unit vectors on the sphere in a KD-tree, so radius and
+k-nearest queries are exact great-circle searches in O(log n) instead of a
+scan of the whole table. The index is loaded from the database on first
+use and kept in sync with POIs created, moved or deleted through the ORM:
+changes are collected at flush time and applied once the transaction
+commits. Writes made by other worker processes are picked up when the
+index is reloaded after POI_INDEX_MAX_AGE seconds.
+"""
+import threading
+import time
+
+import numpy as np
+from flask import current_app, has_app_context
+from scipy.spatial import cKDTree
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.services.distance_matrix import EARTH_RADIUS_M
+
+
+def to_unit_vectors(lats, lngs):
+    """(N, 3) points on the unit sphere"""
+    phi = np.radians(np.asarray(lats, dtype=float))
+    lam = np.radians(np.asarray(lngs, dtype=float))
+    cos_phi = np.cos(phi)
+    return np.column_stack((cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)))
+
+
+def _chord(meters):
+    return 2.0 * np.sin(np.minimum(meters / EARTH_RADIUS_M, np.pi) / 2.0)
+
+
+def _arc(chords):
+    return 2.0 * EARTH_RADIUS_M * np.arcsin(np.minimum(chords / 2.0, 1.0))
+
+
+class PoiIndex:
+    """
+    KD-tree over POI positions.
+
+    Updates only touch a dictionary; the tree is rebuilt from it on the next
+    query after a change, so bursts of edits cost one rebuild.
+    """
+
+    def __init__(self, max_age=None):
+        """
+        Args:
+            max_age (float): Seconds after which stale() asks for a reload, None to never expire
+        """
+        self.max_age = max_age
+        self.loaded_at = None
+        self._points = {}
+        self._tree = None
+        self._ids = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._points)
+
+    def load(self, rows):
+        """Replace the contents with (id, lat, lng) rows"""
+        with self._lock:
+            self._points = {poi_id: (float(lat), float(lng)) for poi_id, lat, lng in rows}
+            self._tree = None
+            self.loaded_at = time.monotonic()
+
+    def stale(self):
+        if self.loaded_at is None:
+            return True
+        return self.max_age is not None and time.monotonic() - self.loaded_at > self.max_age
+
+    def invalidate(self):
+        """Reload from the database on next use, after writes that bypass the ORM"""
+        self.loaded_at = None
+
+    def upsert(self, poi_id, lat, lng):
+        with self._lock:
+            self._points[poi_id] = (float(lat), float(lng))
+            self._tree = None
+
+    def remove(self, poi_id):
+        with self._lock:
+            if self._points.pop(poi_id, None) is not None:
+                self._tree = None
+
+    def nearest(self, lat, lng, k=None, radius=None):
+        """
+        POIs around (lat, lng), closest first.
+
+        Args:
+            k (int): At most this many POIs
+            radius (float): Only POIs within this many meters
+
+        Returns:
+            list: (poi_id, distance in meters) pairs
+        """
+        tree, ids = self._get_tree()
+        if tree is None or (k is not None and k <= 0):
+            return []
+        center = to_unit_vectors([lat], [lng])[0]
+        limit = _chord(radius) if radius is not None else np.inf
+
+        if k is None:
+            positions = np.asarray(tree.query_ball_point(center, limit), dtype=np.int64)
+            chords = np.linalg.norm(tree.data[positions] - center, axis=1)
+            order = np.argsort(chords, kind='stable')
+            positions, chords = positions[order], chords[order]
+        else:
+            chords, positions = tree.query(center, k=min(k, len(ids)), distance_upper_bound=limit)
+            chords, positions = np.atleast_1d(chords), np.atleast_1d(positions)
+            found = np.isfinite(chords)
+            positions, chords = positions[found], chords[found]
+        return list(zip(ids[positions].tolist(), _arc(chords).tolist()))
+
+    def _get_tree(self):
+        with self._lock:
+            if self._tree is None and self._points:
+                self._ids = np.fromiter(self._points.keys(), dtype=np.int64, count=len(self._points))
+                coords = np.array(list(self._points.values()), dtype=float)
+                self._tree = cKDTree(to_unit_vectors(coords[:, 0], coords[:, 1]))
+            if not self._points:
+                return None, None
+            return self._tree, self._ids
+
+
+def get_poi_index():
+    """Return the POI index of the current application, (re)loading it from the database when needed"""
+    index = current_app.extensions.get('poi_index')
+    if index is None:
+        index = PoiIndex(max_age=current_app.config.get('POI_INDEX_MAX_AGE', 300) or None)
+        current_app.extensions['poi_index'] = index
+    if index.stale():
+        from app import db
+        from app.models.poi import PointOfInterest
+        index.load(db.session.query(PointOfInterest.id, PointOfInterest.latitude, PointOfInterest.longitude))
+    return index
+
+
+# Keep loaded indexes in sync with committed ORM changes
+
+_CHANGES_KEY = 'poi_index_changes'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    from app.models.poi import PointOfInterest
+    changes = session.info.setdefault(_CHANGES_KEY, {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, PointOfInterest):
+            changes[obj.id] = (obj.latitude, obj.longitude)
+    for obj in session.deleted:
+        if isinstance(obj, PointOfInterest):
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if not changes or not has_app_context():
+        return
+    index = current_app.extensions.get('poi_index')
+    if index is None or index.loaded_at is None:
+        return
+    for poi_id, position in changes.items():
+        if position is None:
+            index.remove(poi_id)
+        else:
+            index.upsert(poi_id, *position)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(_CHANGES_KEY, None)
@@ -0,0 +1,291 @@
+"""
+Upstream routing quota shared by every worker process of the host.
+
+Each OpenRouteService endpoint gets a token bucket that refills at its
+per-minute quota, plus a counter of the calls made today against the daily
+quota. The buckets live in one SQLite file and are updated inside
+BEGIN IMMEDIATE transactions, so all gunicorn workers draw from the same
+budget instead of each discovering the limit through a 429.
+
+Callers run at a priority carried in a context variable. Interactive
+requests may use the whole budget; background work (deform jobs) leaves a
+reserve share of it untouched, so a queue of jobs never starves the map.
+A call that finds no token waits for one until its deadline, then fails
+with RateLimitExceeded telling how long until quota is available again.
+"""
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from flask import current_app, has_app_context
+
+from app.services.routing_client import RoutingServiceError
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+_priority = contextvars.ContextVar('routing_priority', default=INTERACTIVE)
+_deadline = contextvars.ContextVar('routing_deadline', default=None)
+
+
+class RateLimitExceeded(RoutingServiceError):
+    """Raised without contacting the upstream when no quota frees up before the deadline"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def request_priority(priority, deadline=None):
+    """
+    Run the upstream calls made inside the block at priority.
+
+    deadline (a time.time() value) bounds how long they queue for quota;
+    None uses the limiter's default wait for the priority.
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+    priority_token = _priority.set(priority)
+    deadline_token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(deadline_token)
+        _priority.reset(priority_token)
+
+
+def current_priority():
+    """(priority, deadline) of the calling context"""
+    return _priority.get(), _deadline.get()
+
+
+def bucket_for(url):
+    """Quota bucket of an upstream URL: the endpoint after the API version ('isochrones', 'matrix')"""
+    parts = urlsplit(url).path.strip('/').split('/')
+    return parts[1] if len(parts) > 1 else parts[0]
+
+
+class RateLimiter:
+    """
+    Token buckets per upstream endpoint, shared through SQLite.
+    """
+
+    def __init__(self, db_path=None, limits=None, reserve=0.2, max_wait=None):
+        """
+        Args:
+            db_path (str): SQLite file, None keeps the buckets in memory for this process only
+            limits (dict): {bucket: (per_minute, per_day)}; None for either means unlimited,
+                           buckets not listed are not limited
+            reserve (float): Share of each quota background calls leave to interactive ones
+            max_wait (dict): {priority: seconds} a call queues for quota when it has no deadline
+        """
+        self.db_path = db_path
+        self.limits = dict(limits or {})
+        self.reserve = reserve
+        self.max_wait = {INTERACTIVE: 5.0, BACKGROUND: 120.0}
+        self.max_wait.update(max_wait or {})
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._counters = {name: {priority: 0 for priority in PRIORITIES}
+                          for name in ('acquired', 'waited', 'rejected')}
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def acquire(self, bucket, priority=None, deadline=None):
+        """
+        Take one call from the bucket's quota, waiting for it until the deadline.
+
+        priority and deadline default to those of the calling context.
+        Raises RateLimitExceeded when the quota cannot be had in time.
+        """
+        if bucket not in self.limits:
+            return
+        context_priority, context_deadline = current_priority()
+        priority = priority or context_priority
+        deadline = deadline or context_deadline or time.time() + self.max_wait[priority]
+
+        waited = False
+        while True:
+            wait = self._take(bucket, priority)
+            if wait == 0:
+                self._count('acquired', priority)
+                return
+            if time.time() + wait > deadline:
+                self._count('rejected', priority)
+                raise RateLimitExceeded(
+                    f"Routing rate limit reached for {bucket}, quota frees up in {wait:.0f} s", retry_after=wait
+                )
+            if not waited:
+                self._count('waited', priority)
+                waited = True
+            # Other workers draw from the same bucket, so check again after at most a second
+            time.sleep(min(wait, 1.0))
+
+    def check(self, bucket, count, priority=None, deadline=None):
+        """
+        Raise RateLimitExceeded unless count calls could be taken from the bucket by the deadline.
+
+        Nothing is taken, so a planned burst of calls is refused up front
+        instead of failing halfway through; other callers may still use the
+        quota first, and each call still acquires its own.
+        """
+        if bucket not in self.limits or count <= 0:
+            return
+        context_priority, context_deadline = current_priority()
+        priority = priority or context_priority
+        deadline = deadline or context_deadline or time.time() + self.max_wait[priority]
+
+        per_minute, per_day = self.limits[bucket]
+        share = 1.0 if priority == INTERACTIVE else 1.0 - self.reserve
+        now = time.time()
+        with self._transaction() as conn:
+            state = self._load(conn, bucket, now)
+        wait = max(state['blocked_until'] - now, 0.0)
+        if per_day is not None and state['day_used'] + count > per_day * share:
+            wait = max(wait, 86400 - now % 86400)
+        elif per_minute is not None:
+            missing = per_minute * (1.0 - share) + count - state['tokens']
+            if missing > 0:
+                wait = max(wait, missing * 60.0 / per_minute)
+        if wait > 0 and now + wait > deadline:
+            self._count('rejected', priority)
+            raise RateLimitExceeded(
+                f"Routing rate limit too low for {count} {bucket} calls, quota frees up in {wait:.0f} s",
+                retry_after=wait
+            )
+
+    def penalize(self, bucket, seconds):
+        """Stop every worker from calling the bucket's endpoint for seconds, after the upstream said 429"""
+        if bucket not in self.limits:
+            return
+        with self._transaction() as conn:
+            state = self._load(conn, bucket, time.time())
+            state['tokens'] = 0.0
+            state['blocked_until'] = max(state['blocked_until'], time.time() + seconds)
+            self._save(conn, bucket, state)
+
+    def stats(self):
+        """Remaining budget per bucket, without consuming any, and this process's counters"""
+        buckets = {}
+        now = time.time()
+        with self._transaction() as conn:
+            for bucket, (per_minute, per_day) in sorted(self.limits.items()):
+                state = self._load(conn, bucket, now)
+                buckets[bucket] = {
+                    'per_minute': per_minute,
+                    'per_day': per_day,
+                    'tokens': None if per_minute is None else int(state['tokens']),
+                    'used_today': state['day_used'],
+                    'remaining_today': None if per_day is None else max(per_day - state['day_used'], 0),
+                    'blocked_for': round(max(state['blocked_until'] - now, 0.0), 1)
+                }
+        with self._lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+        return {'buckets': buckets, 'reserve': self.reserve, 'process': counters}
+
+    def _take(self, bucket, priority):
+        """Take a token and return 0, or return the seconds until one is available to priority"""
+        per_minute, per_day = self.limits[bucket]
+        share = 1.0 if priority == INTERACTIVE else 1.0 - self.reserve
+        now = time.time()
+        with self._transaction() as conn:
+            state = self._load(conn, bucket, now)
+            if now < state['blocked_until']:
+                return state['blocked_until'] - now
+            if per_day is not None and state['day_used'] + 1 > per_day * share:
+                # The daily quota resets at midnight UTC
+                return 86400 - now % 86400
+            if per_minute is not None:
+                floor = per_minute * (1.0 - share)
+                if state['tokens'] - 1 < floor:
+                    return (floor + 1 - state['tokens']) * 60.0 / per_minute
+                state['tokens'] -= 1
+            state['day_used'] += 1
+            self._save(conn, bucket, state)
+            return 0
+
+    def _load(self, conn, bucket, now):
+        """Bucket state refilled up to now"""
+        per_minute, _ = self.limits[bucket]
+        capacity = per_minute or 0
+        day = time.strftime('%Y-%m-%d', time.gmtime(now))
+        row = conn.execute(
+            "SELECT tokens, updated_at, day, day_used, blocked_until FROM buckets WHERE name = ?", (bucket,)
+        ).fetchone()
+        if row is None:
+            return {'tokens': float(capacity), 'updated_at': now, 'day': day, 'day_used': 0, 'blocked_until': 0.0}
+        tokens, updated_at, row_day, day_used, blocked_until = row
+        if per_minute is not None:
+            tokens = min(capacity, tokens + max(now - updated_at, 0.0) * per_minute / 60.0)
+        return {'tokens': tokens, 'updated_at': now, 'day': day,
+                'day_used': day_used if row_day == day else 0, 'blocked_until': blocked_until}
+
+    @staticmethod
+    def _save(conn, bucket, state):
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets (name, tokens, updated_at, day, day_used, blocked_until) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (bucket, state['tokens'], state['updated_at'], state['day'], state['day_used'], state['blocked_until'])
+        )
+
+    @contextmanager
+    def _transaction(self):
+        """Exclusive access to the buckets across threads and processes"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _connection(self):
+        """The connection of this process (lock must be held)"""
+        # A forked worker must not share its parent's SQLite handle
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.db_path or ':memory:', timeout=10, check_same_thread=False,
+                                         isolation_level=None)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, "
+                "day TEXT NOT NULL, day_used INTEGER NOT NULL, blocked_until REAL NOT NULL)"
+            )
+            self._pid = os.getpid()
+        return self._conn
+
+    def _count(self, name, priority):
+        with self._lock:
+            self._counters[name][priority] += 1
+
+
+def get_rate_limiter():
+    """Return the rate limiter of the current application, None outside one or when disabled"""
+    if not has_app_context():
+        return None
+    config = current_app.config
+    if not config.get('RATE_LIMIT_ENABLED', True):
+        return None
+    limiter = current_app.extensions.get('rate_limiter')
+    if limiter is None:
+        db_path = config.get('RATE_LIMIT_PATH')
+        if db_path is None:
+            db_path = os.path.join(current_app.root_path, 'locals', 'rate_limit.sqlite')
+        limiter = current_app.extensions.setdefault('rate_limiter', RateLimiter(
+            db_path=db_path or None,
+            limits=config.get('RATE_LIMITS', {}),
+            reserve=config.get('RATE_LIMIT_BACKGROUND_RESERVE', 0.2),
+            max_wait={INTERACTIVE: config.get('RATE_LIMIT_INTERACTIVE_WAIT', 5.0),
+                      BACKGROUND: config.get('RATE_LIMIT_BACKGROUND_WAIT', 120.0)}
+        ))
+    return limiter
@@ -0,0 +1,152 @@
+"""
+Drawing primitives for the side-by-side time-deformed map.
+
+Fonts, marker and label sprites and the static canvas (background, panel
+borders, grid and titles) are built once and reused across renders. The
+segment endpoints and colours of every gradient edge are computed in one
+NumPy pass and handed to PIL's line drawing as ready-made tuples, and
+markers and labels are pasted as pre-rendered, anti-aliased sprites.
+"""
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+PANEL_GAP = 50  # pixels between the geographic and the time panel
+BACKGROUND = (20, 22, 30)
+BORDER = (80, 80, 100)
+GRID = (40, 42, 50)
+TITLES = (('GEOGRAPHIC DISTANCES', (100, 149, 237)), ('TIME-BASED DISTANCES', (220, 53, 69)))
+
+# Sprites are drawn this much larger and downsampled for smooth edges
+_SUPERSAMPLE = 4
+
+
+@lru_cache(maxsize=32)
+def load_font(font_path, size):
+    """TrueType font at size, Pillow's built-in font when font_path is None or unreadable"""
+    if font_path:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except OSError:
+            pass
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow before 10.1 only has the fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=8)
+def canvas_background(width, height, font_path=None):
+    """
+    The static part of a render for width × height panels.
+
+    Returned images are shared, callers draw on a copy.
+    """
+    image = Image.new('RGB', (width * 2 + PANEL_GAP, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    title_font = load_font(font_path, 18)
+
+    grid_step = max(min(width, height) // 20, 1)
+    for offset, (title, color) in zip((0, width + PANEL_GAP), TITLES):
+        for x in range(0, width, grid_step):
+            draw.line([(offset + x, 0), (offset + x, height)], fill=GRID, width=1)
+        for y in range(0, height, grid_step):
+            draw.line([(offset, y), (offset + width, y)], fill=GRID, width=1)
+        draw_panel_frame(draw, offset, width, height, title, color, title_font)
+    return image
+
+
+def draw_panel_frame(draw, offset, width, height, title, color, font):
+    """Border and boxed title of the panel starting at x = offset"""
+    draw.rectangle([(offset, 0), (offset + width, height)], fill=None, outline=BORDER, width=3)
+
+    text_bbox = draw.textbbox((0, 0), title, font=font)
+    text_width = text_bbox[2] - text_bbox[0]
+    center = offset + width // 2
+    draw.rectangle((center - text_width // 2 - 10, 10, center + text_width // 2 + 10, 40), fill=(0, 0, 0))
+    draw.text((center - text_width // 2, 15), title, fill=color, font=font)
+
+
+@lru_cache(maxsize=16)
+def marker_sprite(outline, fill, radius=12, outline_width=2):
+    """Anti-aliased RGBA disc with an outline ring, 2 * radius + 1 pixels wide"""
+    size = (2 * radius + 1) * _SUPERSAMPLE
+    sprite = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(sprite)
+    draw.ellipse((0, 0, size - 1, size - 1), outline=outline, width=outline_width * _SUPERSAMPLE)
+    inset = outline_width * _SUPERSAMPLE
+    draw.ellipse((inset, inset, size - 1 - inset, size - 1 - inset), fill=fill)
+    return sprite.resize((2 * radius + 1, 2 * radius + 1), Image.LANCZOS)
+
+
+@lru_cache(maxsize=4096)
+def numbered_marker(outline, fill, number, font_path=None):
+    """marker_sprite with number written in its centre"""
+    sprite = marker_sprite(outline, fill).copy()
+    label = text_sprite(str(number), font_path, 12)
+    sprite.alpha_composite(label, tuple((np.array(sprite.size) - label.size) // 2))
+    return sprite
+
+
+@lru_cache(maxsize=4096)
+def text_sprite(text, font_path=None, size=12, fill=(255, 255, 255), padding=0, background=None, outline=None):
+    """Text on a transparent (or background coloured, outlined) RGBA sprite, tightly cropped plus padding"""
+    font = load_font(font_path, size)
+    left, top, right, bottom = font.getbbox(text)
+    width, height = right - left + 2 * padding, bottom - top + 2 * padding
+    sprite = Image.new('RGBA', (max(width, 1), max(height, 1)), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(sprite)
+    if background is not None:
+        draw.rectangle((0, 0, width - 1, height - 1), fill=background, outline=outline, width=1)
+    draw.text((padding - left, padding - top), text, fill=fill, font=font)
+    return sprite
+
+
+def paste_centered(image, sprite, points):
+    """Alpha-composite sprite onto image centred on every (x, y) in points"""
+    half = np.array(sprite.size) // 2
+    for x, y in (np.rint(points).astype(int) - half).tolist():
+        image.paste(sprite, (x, y), sprite)
+
+
+def gradient_segments(starts, ends, color1, color2, segments=10):
+    """
+    Split every line into segments coloured along a gradient, in one NumPy pass.
+
+    Line i runs from starts[i] to ends[i] and its colour changes from
+    color1 to color2 along it. Returns (points, colors): for each segment
+    its integer (x1, y1, x2, y2) and RGB colour, line by line.
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 1, 2)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 1, 2)
+    t = np.arange(segments + 1, dtype=float)[None, :, None] / segments
+    points = (starts * (1 - t) + ends * t).astype(np.int64)
+    points = np.concatenate([points[:, :-1], points[:, 1:]], axis=2).reshape(-1, 4)
+
+    t = t[0, :-1]
+    colors = (np.asarray(color1[:3], dtype=float) * (1 - t) + np.asarray(color2[:3], dtype=float) * t).astype(np.int64)
+    return points, np.tile(colors, (len(starts), 1))
+
+
+def draw_gradient_lines(draw, starts, ends, color1, color2, width=1, segments=10):
+    """Draw gradient lines from starts[i] to ends[i] with PIL, geometry from gradient_segments"""
+    points, colors = gradient_segments(starts, ends, color1, color2, segments)
+    line = draw.line
+    for xy, fill in zip(points.tolist(), map(tuple, colors.tolist())):
+        line(xy, fill=fill, width=width)
+
+
+def format_travel_times(seconds):
+    """Labels like '45s' or '3m 20s' for an array of travel times"""
+    seconds = np.asarray(seconds, dtype=float)
+    labels = []
+    for value in seconds.tolist():
+        if value != value:
+            labels.append('?')
+        elif value < 60:
+            labels.append(f"{int(value)}s")
+        else:
+            labels.append(f"{int(value // 60)}m {int(value % 60)}s")
+    return labels
@@ -0,0 +1,329 @@
+"""
+Road network graph built from an OpenStreetMap extract.
+
+The graph is stored as compact CSR arrays (one set per travel mode) so it can
+be searched with scipy's compiled Dijkstra. Parsing an .osm XML extract is
+slow, so convert it once and load the resulting .npz afterwards:
+
+    python -m app.services.road_graph extract.osm app/locals/road_graph.npz
+"""
+import bz2
+import gzip
+import math
+import sys
+import xml.etree.ElementTree as ET
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+from app.services.distance_matrix import EARTH_RADIUS_M, haversine_meters
+
+TRAVEL_MODES = ('driving-car', 'cycling-regular', 'foot-walking')
+
+# Default speeds in km/h per highway type; a missing type is not routable in that mode
+HIGHWAY_SPEEDS = {
+    'driving-car': {
+        'motorway': 110, 'motorway_link': 60, 'trunk': 90, 'trunk_link': 50,
+        'primary': 65, 'primary_link': 40, 'secondary': 55, 'secondary_link': 40,
+        'tertiary': 45, 'tertiary_link': 30, 'unclassified': 40, 'residential': 30,
+        'living_street': 10, 'service': 20, 'road': 30
+    },
+    'cycling-regular': {
+        'primary': 18, 'primary_link': 18, 'secondary': 18, 'secondary_link': 18,
+        'tertiary': 18, 'tertiary_link': 18, 'unclassified': 16, 'residential': 16,
+        'living_street': 12, 'service': 14, 'road': 15, 'cycleway': 18, 'track': 12,
+        'path': 10
+    },
+    'foot-walking': {
+        'trunk': 5, 'trunk_link': 5, 'primary': 5, 'primary_link': 5, 'secondary': 5,
+        'secondary_link': 5, 'tertiary': 5, 'tertiary_link': 5, 'unclassified': 5,
+        'residential': 5, 'living_street': 5, 'service': 5, 'road': 5, 'pedestrian': 5,
+        'footway': 5, 'path': 4.5, 'steps': 2, 'track': 4.5, 'cycleway': 5
+    }
+}
+
+# Speed in km/h used to reach the nearest graph node from an arbitrary point
+SNAP_SPEEDS = {
+    'driving-car': 20,
+    'cycling-regular': 12,
+    'foot-walking': 5
+}
+
+# Access tags that exclude a way, per mode
+ACCESS_TAGS = {
+    'driving-car': ('access', 'motor_vehicle', 'motorcar'),
+    'cycling-regular': ('access', 'vehicle', 'bicycle'),
+    'foot-walking': ('access', 'foot')
+}
+
+NO_ACCESS = ('no', 'private')
+
+
+class RoadGraph:
+    """Directed road graph in CSR form with one weight array per travel mode"""
+
+    def __init__(self, lats, lngs, modes):
+        """
+        Args:
+            lats (ndarray): Node latitudes
+            lngs (ndarray): Node longitudes
+            modes (dict): travel mode -> (indptr, indices, seconds) CSR arrays
+        """
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self.modes = modes
+        self._csgraphs = {}
+        self._trees = {}
+        self._ref_lat = math.radians(float(np.mean(self.lats))) if len(self.lats) else 0.0
+
+    @property
+    def num_nodes(self):
+        return len(self.lats)
+
+    def num_edges(self, travel_mode):
+        return len(self.modes[travel_mode][1])
+
+    @classmethod
+    def load(cls, path):
+        """Load a graph from a .npz file written by save() or from an .osm XML extract"""
+        if path.endswith('.npz'):
+            data = np.load(path)
+            modes = {}
+            for mode in TRAVEL_MODES:
+                if f'{mode}/indptr' in data:
+                    modes[mode] = (data[f'{mode}/indptr'], data[f'{mode}/indices'], data[f'{mode}/seconds'])
+            return cls(data['lats'], data['lngs'], modes)
+        return cls.from_osm(path)
+
+    def save(self, path):
+        """Write the CSR arrays to a compressed .npz file"""
+        arrays = {'lats': self.lats, 'lngs': self.lngs}
+        for mode, (indptr, indices, seconds) in self.modes.items():
+            arrays[f'{mode}/indptr'] = indptr
+            arrays[f'{mode}/indices'] = indices
+            arrays[f'{mode}/seconds'] = seconds
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def from_osm(cls, path):
+        """
+        Build a graph from an OpenStreetMap XML extract (.osm, .osm.gz or .osm.bz2).
+
+        Only nodes referenced by routable ways are kept. Travel times use the
+        way's maxspeed for cars when present and per-type defaults otherwise.
+        """
+        node_coords = {}
+        ways = []
+
+        with _open_extract(path) as source:
+            for _, element in ET.iterparse(source, events=('end',)):
+                if element.tag == 'node':
+                    node_coords[int(element.get('id'))] = (float(element.get('lat')), float(element.get('lon')))
+                    element.clear()
+                elif element.tag == 'way':
+                    tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+                    if 'highway' in tags:
+                        refs = [int(nd.get('ref')) for nd in element.iter('nd')]
+                        ways.append((refs, tags))
+                    element.clear()
+                elif element.tag == 'relation':
+                    element.clear()
+
+        # Compact node ids to 0..n-1, keeping only routable nodes
+        node_index = {}
+        lats = []
+        lngs = []
+        for refs, _ in ways:
+            for ref in refs:
+                if ref not in node_index and ref in node_coords:
+                    node_index[ref] = len(lats)
+                    lat, lng = node_coords[ref]
+                    lats.append(lat)
+                    lngs.append(lng)
+        lats = np.array(lats)
+        lngs = np.array(lngs)
+
+        edges = {mode: ([], [], []) for mode in TRAVEL_MODES}
+        for refs, tags in ways:
+            refs = [node_index[ref] for ref in refs if ref in node_index]
+            if len(refs) < 2:
+                continue
+            u = np.array(refs[:-1])
+            v = np.array(refs[1:])
+            meters = haversine_meters(lats[u], lngs[u], lats[v], lngs[v])
+
+            for mode in TRAVEL_MODES:
+                speed = _way_speed(tags, mode)
+                if speed is None:
+                    continue
+                seconds = meters / (speed / 3.6)
+                forward, backward = _way_directions(tags, mode)
+                sources, targets, weights = edges[mode]
+                if forward:
+                    sources.append(u)
+                    targets.append(v)
+                    weights.append(seconds)
+                if backward:
+                    sources.append(v)
+                    targets.append(u)
+                    weights.append(seconds)
+
+        modes = {}
+        for mode, (sources, targets, weights) in edges.items():
+            if sources:
+                modes[mode] = build_csr(len(lats), np.concatenate(sources),
+                                        np.concatenate(targets), np.concatenate(weights))
+        return cls(lats, lngs, modes)
+
+    def nearest_nodes(self, lats, lngs, travel_mode):
+        """
+        Snap points to the nearest node usable in travel_mode.
+
+        Returns:
+            tuple: (node indices, distances in meters)
+        """
+        tree, node_ids = self._tree(travel_mode)
+        distances, positions = tree.query(self.project(np.asarray(lats, dtype=float),
+                                                        np.asarray(lngs, dtype=float)))
+        return node_ids[positions], distances
+
+    def travel_times(self, source_nodes, travel_mode, limit=np.inf):
+        """
+        Shortest travel times in seconds from each source node to every node.
+
+        Args:
+            source_nodes (array): Node indices to search from
+            travel_mode (str): One of TRAVEL_MODES
+            limit (float): Stop searching past this many seconds
+
+        Returns:
+            ndarray: len(source_nodes) × num_nodes seconds, inf where unreachable
+        """
+        return dijkstra(self._csgraph(travel_mode), directed=True,
+                        indices=np.atleast_1d(source_nodes), limit=limit)
+
+    def _csgraph(self, travel_mode):
+        if travel_mode not in self.modes:
+            raise ValueError(f"Road graph has no edges for travel mode {travel_mode}")
+        graph = self._csgraphs.get(travel_mode)
+        if graph is None:
+            indptr, indices, seconds = self.modes[travel_mode]
+            graph = csr_matrix((seconds, indices, indptr), shape=(self.num_nodes, self.num_nodes))
+            self._csgraphs[travel_mode] = graph
+        return graph
+
+    def _tree(self, travel_mode):
+        cached = self._trees.get(travel_mode)
+        if cached is None:
+            if travel_mode not in self.modes:
+                raise ValueError(f"Road graph has no edges for travel mode {travel_mode}")
+            indptr, indices, _ = self.modes[travel_mode]
+            # Only nodes with an edge in this mode, in either direction
+            usable = np.zeros(self.num_nodes, dtype=bool)
+            usable[np.flatnonzero(np.diff(indptr))] = True
+            usable[indices] = True
+            node_ids = np.flatnonzero(usable)
+            cached = (cKDTree(self.project(self.lats[node_ids], self.lngs[node_ids])), node_ids)
+            self._trees[travel_mode] = cached
+        return cached
+
+    def edges(self, travel_mode):
+        """Return (sources, targets, seconds) arrays of every edge in travel_mode"""
+        indptr, indices, seconds = self.modes[travel_mode]
+        sources = np.repeat(np.arange(self.num_nodes), np.diff(indptr))
+        return sources, indices, seconds
+
+    def project(self, lats, lngs):
+        """Equirectangular projection to meters around the graph's mean latitude"""
+        x = np.radians(lngs) * math.cos(self._ref_lat) * EARTH_RADIUS_M
+        y = np.radians(lats) * EARTH_RADIUS_M
+        return np.column_stack([x, y])
+
+    def unproject(self, xy):
+        """Inverse of project(), returns (lats, lngs)"""
+        lngs = np.degrees(xy[:, 0] / (math.cos(self._ref_lat) * EARTH_RADIUS_M))
+        lats = np.degrees(xy[:, 1] / EARTH_RADIUS_M)
+        return lats, lngs
+
+
+def build_csr(num_nodes, sources, targets, weights):
+    """
+    Build (indptr, indices, weights) CSR arrays from an edge list.
+
+    Parallel edges are collapsed to the fastest one, since scipy would
+    otherwise add their weights together.
+    """
+    order = np.lexsort((weights, targets, sources))
+    sources, targets, weights = sources[order], targets[order], weights[order]
+    keep = np.ones(len(sources), dtype=bool)
+    keep[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+    sources, targets, weights = sources[keep], targets[keep], weights[keep]
+
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_nodes), out=indptr[1:])
+    return indptr, targets.astype(np.int32), weights.astype(np.float32)
+
+
+def _open_extract(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.pbf'):
+        raise ValueError("PBF extracts are not supported, convert to .osm XML first (e.g. with osmium cat)")
+    return open(path, 'rb')
+
+
+def _way_speed(tags, travel_mode):
+    """Speed in km/h of a way for travel_mode, None if it may not be used"""
+    default = HIGHWAY_SPEEDS[travel_mode].get(tags.get('highway'))
+    if default is None:
+        return None
+    for key in ACCESS_TAGS[travel_mode]:
+        if tags.get(key) in NO_ACCESS:
+            return None
+    if travel_mode == 'driving-car':
+        maxspeed = _parse_maxspeed(tags.get('maxspeed'))
+        if maxspeed:
+            return maxspeed
+    return default
+
+
+def _parse_maxspeed(value):
+    if not value:
+        return None
+    parts = value.split()
+    try:
+        speed = float(parts[0])
+    except ValueError:
+        return None
+    if len(parts) > 1 and parts[1] == 'mph':
+        speed *= 1.609344
+    return speed if speed > 0 else None
+
+
+def _way_directions(tags, travel_mode):
+    """Return (forward, backward) allowed directions of a way for travel_mode"""
+    if travel_mode == 'foot-walking':
+        return True, True
+    oneway = tags.get('oneway')
+    if travel_mode == 'cycling-regular' and tags.get('oneway:bicycle') == 'no':
+        return True, True
+    if oneway in ('yes', 'true', '1') or tags.get('junction') == 'roundabout':
+        return True, False
+    if oneway == '-1':
+        return False, True
+    return True, True
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python -m app.services.road_graph <extract.osm> <graph.npz>")
+        sys.exit(1)
+    graph = RoadGraph.from_osm(sys.argv[1])
+    graph.save(sys.argv[2])
+    print(f"Saved {graph.num_nodes} nodes to {sys.argv[2]}")
+    for mode in graph.modes:
+        print(f"  {mode}: {graph.num_edges(mode)} edges")
@@ -0,0 +1,348 @@
+import asyncio
+import os
+import threading
+
+import numpy as np
+from flask import current_app, has_app_context
+
+from app.services.geometry import circumradii, delaunay_triangles, triangles_to_polygons
+from app.services.async_routing import get_async_routing_client
+from app.services.matrix_engine import async_ors_tile_fetcher, get_matrix_engine, ors_tile_fetcher
+from app.services.rate_limiter import bucket_for
+from app.services.road_graph import RoadGraph, SNAP_SPEEDS
+from app.services.routing_client import get_routing_client, RoutingServiceError
+
+
+class RoutingBackend:
+    """
+    Interface of a travel-time provider.
+
+    Points are {'lat', 'lng'} dicts or (lat, lng) pairs, times are seconds.
+    Failures are raised as RoutingServiceError.
+    """
+
+    name = None
+    # Origins one isochrones_batch call accepts
+    max_isochrone_locations = 1
+
+    def isochrones(self, origin_lat, origin_lng, ranges, travel_mode='driving-car'):
+        """
+        Return a GeoJSON FeatureCollection with one polygon per range.
+
+        Features carry the ORS properties 'group_index', 'value' (seconds) and
+        'center', in ascending range order.
+        """
+        raise NotImplementedError(f"{self.name} backend does not compute isochrones")
+
+    def isochrones_batch(self, origins, ranges, travel_mode='driving-car'):
+        """
+        Return one isochrones() FeatureCollection per (lat, lng) origin, in order.
+
+        At most max_isochrone_locations origins are passed per call; this
+        default computes them one by one.
+        """
+        return [self.isochrones(lat, lng, ranges, travel_mode) for lat, lng in origins]
+
+    def matrix(self, sources, destinations, travel_mode='driving-car', known=None):
+        """Return a len(sources) × len(destinations) array of seconds, NaN if unreachable"""
+        raise NotImplementedError
+
+    def matrix_requests(self, n_sources, n_destinations):
+        """Upstream requests a matrix of this size costs, 0 for backends without a request quota"""
+        return 0
+
+    # Awaitable variants. These defaults run the blocking methods on a worker
+    # thread; backends that talk to the network override them natively.
+
+    async def isochrones_async(self, origin_lat, origin_lng, ranges, travel_mode='driving-car'):
+        return await asyncio.to_thread(self.isochrones, origin_lat, origin_lng, ranges, travel_mode)
+
+    async def isochrones_batch_async(self, origins, ranges, travel_mode='driving-car'):
+        return await asyncio.to_thread(self.isochrones_batch, origins, ranges, travel_mode)
+
+    async def matrix_async(self, sources, destinations, travel_mode='driving-car', known=None):
+        return await asyncio.to_thread(self.matrix, sources, destinations, travel_mode, known)
+
+
+class ORSBackend(RoutingBackend):
+    """Travel times from the remote OpenRouteService API"""
+
+    name = 'ors'
+
+    def __init__(self, api_key, client=None, engine=None, max_isochrone_locations=None):
+        if not api_key:
+            raise RoutingServiceError("No travel time API key configured")
+        self.api_key = api_key
+        self.client = client or get_routing_client()
+        self.engine = engine or get_matrix_engine()
+        if max_isochrone_locations is None:
+            config = current_app.config if has_app_context() else {}
+            max_isochrone_locations = config.get('ISOCHRONE_MAX_LOCATIONS', 5)
+        self.max_isochrone_locations = max_isochrone_locations
+
+    def isochrones(self, origin_lat, origin_lng, ranges, travel_mode='driving-car'):
+        return self._post_isochrones([[origin_lng, origin_lat]], ranges, travel_mode)
+
+    def isochrones_batch(self, origins, ranges, travel_mode='driving-car'):
+        """All origins in one request; the features are split by their group_index"""
+        response = self._post_isochrones([[lng, lat] for lat, lng in origins], ranges, travel_mode)
+        return self._split_groups(response, len(origins))
+
+    async def isochrones_async(self, origin_lat, origin_lng, ranges, travel_mode='driving-car'):
+        return await self._post_isochrones_async([[origin_lng, origin_lat]], ranges, travel_mode)
+
+    async def isochrones_batch_async(self, origins, ranges, travel_mode='driving-car'):
+        response = await self._post_isochrones_async([[lng, lat] for lat, lng in origins], ranges, travel_mode)
+        return self._split_groups(response, len(origins))
+
+    def matrix(self, sources, destinations, travel_mode='driving-car', known=None):
+        self._check_quota(len(sources), len(destinations), travel_mode, known)
+        fetch_tile = ors_tile_fetcher(self.client, self.api_key, travel_mode)
+        return self.engine.compute(sources, destinations, fetch_tile, known=known)
+
+    async def matrix_async(self, sources, destinations, travel_mode='driving-car', known=None):
+        await asyncio.to_thread(self._check_quota, len(sources), len(destinations), travel_mode, known)
+        fetch_tile = async_ors_tile_fetcher(get_async_routing_client(self.client), self.api_key, travel_mode)
+        return await self.engine.compute_async(sources, destinations, fetch_tile, known=known)
+
+    def matrix_requests(self, n_sources, n_destinations):
+        return len(self.engine.plan(n_sources, n_destinations))
+
+    def _check_quota(self, n_sources, n_destinations, travel_mode, known=None):
+        """Refuse a matrix whose tiles the rate limit cannot serve before any of them is sent"""
+        limiter = self.client.rate_limiter
+        if limiter is not None:
+            tiles = self.engine.plan(n_sources, n_destinations, known)
+            limiter.check(bucket_for(f"{self.client.base_url}/v2/matrix/{travel_mode}"), len(tiles))
+
+    @staticmethod
+    def _split_groups(response, count):
+        collections = [dict(response, features=[]) for _ in range(count)]
+        for feature in response.get('features', []):
+            group = (feature.get('properties') or {}).get('group_index', 0)
+            if not 0 <= group < count:
+                raise RoutingServiceError(f"Isochrone feature for unknown location {group}")
+            # Each origin's features are numbered as if requested alone
+            feature = dict(feature, properties=dict(feature['properties'], group_index=0))
+            collections[group]['features'].append(feature)
+        return collections
+
+    def _post_isochrones(self, locations, ranges, travel_mode):
+        response = self.client.post("/v2/isochrones/" + travel_mode, json=self._isochrone_body(locations, ranges),
+                                    headers=self._headers())
+        return self._isochrone_response(response)
+
+    async def _post_isochrones_async(self, locations, ranges, travel_mode):
+        response = await get_async_routing_client(self.client).post(
+            "/v2/isochrones/" + travel_mode, json=self._isochrone_body(locations, ranges), headers=self._headers()
+        )
+        return self._isochrone_response(response)
+
+    def _headers(self):
+        return {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json; charset=utf-8'
+        }
+
+    @staticmethod
+    def _isochrone_body(locations, ranges):
+        return {
+            "locations": locations,  # Note: ORS uses [lng, lat] format
+            "range": ranges,
+            "attributes": ["total_pop"],
+            "location_type": "start",
+            "range_type": "time"
+        }
+
+    @staticmethod
+    def _isochrone_response(response):
+        if response.status_code != 200:
+            raise RoutingServiceError(f"API Error: {response.status_code} - {response.text}")
+        return response.json()
+
+
+class LocalGraphBackend(RoutingBackend):
+    """
+    Travel times from shortest-path searches over an imported road graph.
+
+    Points are snapped to the nearest node usable in the travel mode and the
+    straight-line distance to that node is added at SNAP_SPEEDS.
+    """
+
+    name = 'local'
+
+    # Sources searched per Dijkstra call, bounds the size of the distance block
+    SOURCE_CHUNK = 16
+
+    def __init__(self, graph, alpha_meters=300.0):
+        """
+        Args:
+            graph (RoadGraph): Imported road network
+            alpha_meters (float): Smallest circumradius of a triangle left out of an
+                isochrone polygon; larger values give smoother, less concave shapes
+        """
+        self.graph = graph
+        self.alpha_meters = alpha_meters
+
+    def isochrones(self, origin_lat, origin_lng, ranges, travel_mode='driving-car'):
+        """
+        Compute every band from one shortest-path tree.
+
+        A single search runs out to the largest range. Reached nodes plus the
+        points where each band's time runs out along an edge are triangulated
+        once, and each band keeps the triangles whose corners are all reached
+        within its range and whose circumradius is below the alpha radius.
+        """
+        graph = self.graph
+        ranges = sorted(ranges)
+        speed = SNAP_SPEEDS[travel_mode] / 3.6
+        nodes, snap = graph.nearest_nodes([origin_lat], [origin_lng], travel_mode)
+        offset = snap[0] / speed
+
+        times = graph.travel_times(nodes[:1], travel_mode, limit=max(ranges[-1] - offset, 0))[0] + offset
+        reached = np.flatnonzero(np.isfinite(times))
+        node_xy = graph.project(graph.lats[reached], graph.lngs[reached])
+
+        # Points where each band's time runs out part way along an edge
+        sources, targets, seconds = graph.edges(travel_mode)
+        start_times = times[sources]
+        frontier_xy = []
+        frontier_values = []
+        for value in ranges:
+            partial = (start_times <= value) & (times[targets] > value)
+            if not partial.any():
+                continue
+            fraction = ((value - start_times[partial]) / seconds[partial])[:, None]
+            a = graph.project(graph.lats[sources[partial]], graph.lngs[sources[partial]])
+            b = graph.project(graph.lats[targets[partial]], graph.lngs[targets[partial]])
+            frontier_xy.append(a + np.clip(fraction, 0, 1) * (b - a))
+            frontier_values.append(np.full(partial.sum(), float(value)))
+
+        xy = np.concatenate([node_xy] + frontier_xy)
+        values = np.concatenate([times[reached]] + frontier_values)
+
+        triangles = delaunay_triangles(xy)
+        small = circumradii(xy, triangles) < self._alpha(xy, triangles)
+        triangle_times = values[triangles].max(axis=1) if len(triangles) else np.empty(0)
+
+        center = [float(graph.lngs[nodes[0]]), float(graph.lats[nodes[0]])]
+        features = []
+        for value in ranges:
+            polygons = triangles_to_polygons(xy, triangles[small & (triangle_times <= value)])
+            features.append({
+                'type': 'Feature',
+                'properties': {'group_index': 0, 'value': value, 'center': center},
+                'geometry': self._geometry(xy, polygons, center)
+            })
+        return {'type': 'FeatureCollection', 'features': features}
+
+    def _alpha(self, xy, triangles):
+        """Alpha radius, widened where the network is sparser than the configured value"""
+        if not len(triangles):
+            return self.alpha_meters
+        edge_lengths = np.linalg.norm(xy[triangles[:, 0]] - xy[triangles[:, 1]], axis=1)
+        return max(self.alpha_meters, 2.0 * float(np.median(edge_lengths)))
+
+    def _geometry(self, xy, polygons, center):
+        """GeoJSON Polygon/MultiPolygon in [lng, lat] from rings of xy indices"""
+        def ring_coords(ring):
+            lats, lngs = self.graph.unproject(xy[ring])
+            return [[round(float(lng), 6), round(float(lat), 6)] for lat, lng in zip(lats, lngs)]
+
+        if not polygons:
+            # Nothing reachable beyond the snapped node itself
+            return {'type': 'Polygon', 'coordinates': [[center, center, center, center]]}
+
+        coordinates = [
+            [ring_coords(exterior)] + [ring_coords(hole) for hole in holes]
+            for exterior, holes in polygons
+        ]
+        if len(coordinates) == 1:
+            return {'type': 'Polygon', 'coordinates': coordinates[0]}
+        return {'type': 'MultiPolygon', 'coordinates': coordinates}
+
+    def matrix(self, sources, destinations, travel_mode='driving-car', known=None):
+        src_lats, src_lngs = _split_points(sources)
+        dst_lats, dst_lngs = _split_points(destinations)
+        matrix = np.full((len(sources), len(destinations)), np.nan)
+        if not len(sources) or not len(destinations):
+            return matrix
+
+        speed = SNAP_SPEEDS[travel_mode] / 3.6
+        src_nodes, src_snap = self.graph.nearest_nodes(src_lats, src_lngs, travel_mode)
+        dst_nodes, dst_snap = self.graph.nearest_nodes(dst_lats, dst_lngs, travel_mode)
+
+        rows = np.arange(len(sources))
+        if known is not None:
+            known = np.asarray(known, dtype=float)
+            rows = np.flatnonzero(np.isnan(known).any(axis=1))
+            matrix[:] = known
+
+        # Each distinct source node is searched once
+        unique_nodes, inverse = np.unique(src_nodes[rows], return_inverse=True)
+        for start in range(0, len(unique_nodes), self.SOURCE_CHUNK):
+            chunk = unique_nodes[start:start + self.SOURCE_CHUNK]
+            seconds = self.graph.travel_times(chunk, travel_mode)[:, dst_nodes]
+            for offset in range(len(chunk)):
+                chunk_rows = rows[inverse == start + offset]
+                values = seconds[offset][None, :] + src_snap[chunk_rows][:, None] / speed + dst_snap[None, :] / speed
+                if known is not None:
+                    values = np.where(np.isnan(known[chunk_rows]), values, known[chunk_rows])
+                matrix[chunk_rows] = values
+
+        matrix[np.isinf(matrix)] = np.nan
+        return matrix
+
+
+_graph_lock = threading.Lock()
+
+
+def get_local_backend():
+    """
+    Return the local road-graph backend, or None when no graph is configured.
+
+    The graph is loaded once per application and shared between requests.
+    """
+    if not has_app_context():
+        return None
+    backend = current_app.extensions.get('local_routing_backend')
+    if backend is not None:
+        return backend
+
+    path = current_app.config.get('ROAD_GRAPH_PATH')
+    if not path or not os.path.exists(path):
+        return None
+
+    with _graph_lock:
+        backend = current_app.extensions.get('local_routing_backend')
+        if backend is None:
+            backend = LocalGraphBackend(
+                RoadGraph.load(path),
+                alpha_meters=current_app.config.get('ISOCHRONE_ALPHA_METERS', 300.0)
+            )
+            current_app.extensions['local_routing_backend'] = backend
+    return backend
+
+
+def get_routing_backend(api_key=None):
+    """
+    Return the configured travel-time backend.
+
+    ROUTING_BACKEND selects 'ors' (default) or 'local'. The ORS backend uses
+    api_key, falling back to TRAVEL_TIME_API_KEY.
+    """
+    if has_app_context():
+        if current_app.config.get('ROUTING_BACKEND', 'ors') == 'local':
+            backend = get_local_backend()
+            if backend is None:
+                raise RoutingServiceError("Local routing backend selected but ROAD_GRAPH_PATH is not available")
+            return backend
+        api_key = api_key or current_app.config.get('TRAVEL_TIME_API_KEY')
+    return ORSBackend(api_key)
+
+
+def _split_points(points):
+    """Return (lats, lngs) arrays from {'lat', 'lng'} dicts or (lat, lng) pairs"""
+    lats = np.array([p['lat'] if isinstance(p, dict) else p[0] for p in points], dtype=float)
+    lngs = np.array([p['lng'] if isinstance(p, dict) else p[1] for p in points], dtype=float)
+    return lats, lngs
@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app, has_app_context
+
+# Statuses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class RoutingServiceError(requests.exceptions.RequestException):
+    """Raised when the routing service cannot produce a usable response"""
+
+
+class CircuitOpenError(RoutingServiceError):
+    """Raised without contacting the upstream while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Fail fast while the upstream is down.
+
+    After failure_threshold consecutive failures the circuit opens and every
+    call is rejected for reset_timeout seconds. The next call after that is let
+    through as a trial: success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self):
+        """Return True if a call may go upstream now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # Half-open: only one trial request at a time
+            if self._trial_in_flight:
+                return False
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = True
+            return True
+
+    def release_trial(self):
+        """End a half-open trial that never reached the upstream, counting it neither way"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class RoutingClient:
+    """
+    Shared HTTP client for OpenRouteService.
+
+    Keeps a pooled keep-alive session, applies connect/read timeouts to every
+    call, retries rate-limited and transient failures with bounded exponential
+    backoff (honoring Retry-After) and stops calling the upstream while the
+    circuit breaker is open. With a rate limiter every attempt first takes
+    its call from the quota shared by all workers, and a 429 pauses the
+    endpoint for all of them.
+    """
+
+    def __init__(self, base_url='https://api.openrouteservice.org', pool_size=10,
+                 connect_timeout=3.05, read_timeout=30.0, max_retries=3,
+                 backoff_factor=0.5, max_backoff=10.0, circuit_breaker=None, rate_limiter=None):
+        """
+        Args:
+            base_url (str): Scheme and host of the routing service
+            pool_size (int): Maximum number of kept-alive connections per host
+            connect_timeout (float): Seconds to wait for a TCP/TLS connection
+            read_timeout (float): Seconds to wait for response data
+            max_retries (int): Retries after the first attempt
+            backoff_factor (float): First backoff delay in seconds, doubled per retry
+            max_backoff (float): Upper bound of a single backoff delay in seconds
+            circuit_breaker (CircuitBreaker): Breaker shared by all calls
+            rate_limiter (RateLimiter): Upstream quota to take every attempt from, None for no limit
+        """
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.rate_limiter = rate_limiter
+        self.pid = os.getpid()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def post(self, path, json=None, headers=None, timeout=None):
+        """
+        POST to the routing service and return the final requests.Response.
+
+        Non-retryable responses (including 4xx errors) are returned as-is so
+        callers keep their own status handling. Network errors left after the
+        last retry are re-raised; CircuitOpenError is raised while the upstream
+        is considered down and RateLimitExceeded when no quota frees up before
+        the caller's deadline.
+        """
+        url = path if path.startswith('http') else self.base_url + path
+        timeout = timeout or self.timeout
+        if self.rate_limiter is not None:
+            from app.services.rate_limiter import bucket_for
+            bucket = bucket_for(url)
+
+        for attempt in range(self.max_retries + 1):
+            # Before the quota, so calls rejected by an open circuit neither spend nor wait for it
+            if not self.circuit_breaker.allow_request():
+                raise CircuitOpenError(f"Routing service unavailable, circuit open for {url}")
+            if self.rate_limiter is not None:
+                try:
+                    self.rate_limiter.acquire(bucket)
+                except BaseException:
+                    # The call never went out, a half-open trial is left to the next one
+                    self.circuit_breaker.release_trial()
+                    raise
+
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.post(url, json=json, headers=headers, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.circuit_breaker.record_failure()
+                if last_attempt:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            except Exception:
+                # Any other error still ends a half-open trial, or the breaker never closes again
+                self.circuit_breaker.record_failure()
+                raise
+
+            if response.status_code >= 500:
+                self.circuit_breaker.record_failure()
+            else:
+                # The upstream answered, even a 429 means it is alive
+                self.circuit_breaker.record_success()
+
+            if response.status_code == 429 and self.rate_limiter is not None:
+                # Every worker holds off, not just this one
+                pause = self._retry_after(response)
+                self.rate_limiter.penalize(bucket, pause if pause is not None else self._backoff(attempt))
+
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+
+            delay = self._backoff(attempt)
+            retry_after = self._retry_after(response)
+            if retry_after is not None:
+                if retry_after > self.max_backoff:
+                    # Waiting that long would pin the worker, let the caller decide
+                    return response
+                delay = max(delay, retry_after)
+            response.close()
+            time.sleep(delay)
+
+        return response
+
+    def close(self):
+        self.session.close()
+
+    def _backoff(self, attempt):
+        return min(self.backoff_factor * (2 ** attempt), self.max_backoff)
+
+    @staticmethod
+    def _retry_after(response):
+        """Parse a Retry-After header given in seconds or as an HTTP date"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+def create_routing_client(config, rate_limiter=None):
+    """Build a RoutingClient from a Flask config mapping"""
+    return RoutingClient(
+        base_url=config.get('ORS_BASE_URL', 'https://api.openrouteservice.org'),
+        pool_size=config.get('ORS_POOL_SIZE', 10),
+        connect_timeout=config.get('ORS_CONNECT_TIMEOUT', 3.05),
+        read_timeout=config.get('ORS_READ_TIMEOUT', 30.0),
+        max_retries=config.get('ORS_MAX_RETRIES', 3),
+        backoff_factor=config.get('ORS_BACKOFF_FACTOR', 0.5),
+        max_backoff=config.get('ORS_MAX_BACKOFF', 10.0),
+        circuit_breaker=CircuitBreaker(
+            failure_threshold=config.get('ORS_CIRCUIT_FAILURE_THRESHOLD', 5),
+            reset_timeout=config.get('ORS_CIRCUIT_RESET_TIMEOUT', 30.0)
+        ),
+        rate_limiter=rate_limiter
+    )
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_routing_client():
+    """
+    Return the routing client shared by the current worker process.
+
+    Inside an application context the client is built from the app config;
+    outside of one a process-wide client with default settings and no rate
+    limit is used. A client inherited through fork is replaced so pools are
+    never shared between worker processes.
+    """
+    global _default_client
+
+    if has_app_context():
+        client = current_app.extensions.get('routing_client')
+        if client is None or client.pid != os.getpid():
+            from app.services.rate_limiter import get_rate_limiter
+            client = create_routing_client(current_app.config, rate_limiter=get_rate_limiter())
+            current_app.extensions['routing_client'] = client
+        return client
+
+    with _default_client_lock:
+        if _default_client is None or _default_client.pid != os.getpid():
+            from app.config import Config
+            _default_client = create_routing_client(vars(Config))
+        return _default_client
@@ -0,0 +1,178 @@
+"""
+Database catalog of saved map screenshots.
+
+Screenshots are registered when they are saved, so listing them is an
+indexed query instead of a scan of locals/map_screenshots that opens every
+JSON sidecar. Pages are read newest first with keyset pagination over
+(created_at, id): each page costs the same however many screenshots exist.
+"""
+import base64
+import json
+import logging
+import os
+from datetime import datetime
+
+from flask import has_app_context
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models.screenshot import Screenshot
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = '%Y%m%d-%H%M%S'
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursorError(ValueError):
+    """Raised for a page cursor that was not produced by list_screenshots"""
+
+
+def _bounds_columns(bounds):
+    try:
+        north_east = bounds['northEast']
+        south_west = bounds['southWest']
+        return {
+            'north': float(north_east['lat']),
+            'east': float(north_east['lng']),
+            'south': float(south_west['lat']),
+            'west': float(south_west['lng'])
+        }
+    except (KeyError, TypeError, ValueError):
+        return {'north': None, 'east': None, 'south': None, 'west': None}
+
+
+def _parse_timestamp(timestamp):
+    try:
+        return datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def register_screenshot(screenshot_id, timestamp, pois, bounds, deformed=False, commit=True):
+    """
+    Add or update the catalog row of a saved screenshot.
+
+    A catalog failure is logged and does not fail the save; the files on
+    disk remain the source of truth and backfill() can rebuild the rows.
+    """
+    try:
+        screenshot = db.session.get(Screenshot, screenshot_id) or Screenshot(id=screenshot_id)
+        screenshot.created_at = _parse_timestamp(timestamp) or datetime.now().replace(microsecond=0)
+        screenshot.poi_count = len(pois or [])
+        screenshot.deformed = deformed or bool(screenshot.deformed)
+        for name, value in _bounds_columns(bounds or {}).items():
+            setattr(screenshot, name, value)
+        db.session.add(screenshot)
+        if commit:
+            db.session.commit()
+        return screenshot
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.warning("Could not register screenshot %s: %s", screenshot_id, e)
+        return None
+
+
+def mark_deformed(screenshot_id):
+    """Record that the time-deformed map of a screenshot exists"""
+    if not has_app_context():
+        return
+    try:
+        screenshot = db.session.get(Screenshot, screenshot_id)
+        if screenshot is None:
+            return
+        screenshot.deformed = True
+        screenshot.deformed_at = datetime.now()
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.warning("Could not mark screenshot %s as deformed: %s", screenshot_id, e)
+
+
+def encode_cursor(screenshot):
+    raw = f"{screenshot.created_at.strftime(TIMESTAMP_FORMAT)}|{screenshot.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, screenshot_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+        return datetime.strptime(timestamp, TIMESTAMP_FORMAT), screenshot_id
+    except (ValueError, UnicodeError):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+
+
+def parse_bbox(text):
+    """'west,south,east,north' to a tuple of floats"""
+    try:
+        west, south, east, north = (float(part) for part in text.split(','))
+    except ValueError:
+        raise ValueError("bbox must be 'west,south,east,north'")
+    if south > north:
+        raise ValueError("bbox south must not exceed north")
+    return west, south, east, north
+
+
+def list_screenshots(limit=DEFAULT_PAGE_SIZE, cursor=None, bbox=None):
+    """
+    One page of screenshots, newest first.
+
+    Args:
+        limit (int): Page size, capped at MAX_PAGE_SIZE
+        cursor (str): next_cursor of the previous page
+        bbox (tuple): (west, south, east, north); only screenshots whose bounds intersect it,
+            west > east for a box crossing the antimeridian
+
+    Returns:
+        tuple: (list of Screenshot, next_cursor or None on the last page)
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    query = Screenshot.query
+    if cursor:
+        created_at, screenshot_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Screenshot.created_at < created_at,
+            and_(Screenshot.created_at == created_at, Screenshot.id < screenshot_id)
+        ))
+    if bbox is not None:
+        west, south, east, north = bbox
+        query = query.filter(Screenshot.south <= north, Screenshot.north >= south)
+        if west <= east:
+            query = query.filter(Screenshot.west <= east, Screenshot.east >= west)
+        else:
+            # The box crosses the antimeridian, it covers west..180 and -180..east
+            query = query.filter(or_(Screenshot.east >= west, Screenshot.west <= east))
+    rows = query.order_by(Screenshot.created_at.desc(), Screenshot.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+
+def backfill(directory):
+    """
+    Register every screenshot found in directory and return how many were registered.
+
+    Used once for archives saved before the catalog existed; running it again
+    only refreshes the rows.
+    """
+    count = 0
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        screenshot_id = os.path.splitext(filename)[0]
+        if not os.path.exists(os.path.join(directory, f"{screenshot_id}.png")):
+            continue
+        try:
+            with open(os.path.join(directory, filename), 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping %s: %s", filename, e)
+            continue
+        deformed = os.path.exists(os.path.join(directory, f"{screenshot_id}-timedeformed.png"))
+        if register_screenshot(screenshot_id, data.get('timestamp'), data.get('pois'), data.get('bounds'),
+                               deformed=deformed, commit=False) is not None:
+            count += 1
+    db.session.commit()
+    return count
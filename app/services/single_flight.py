@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import weakref
+
+from flask import current_app, has_app_context
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that would do the same work.
+
+    While a call for a key is running, other threads asking for the same key
+    wait for it and receive its result (or its exception) instead of running
+    the function again. Nothing is remembered once the call returns; caching
+    stays with the caller.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {'calls': 0, 'shared': 0}
+
+    def do(self, key, func, *args, **kwargs):
+        """Return func(*args, **kwargs), shared with concurrent callers passing the same key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counters['calls'] += 1
+            else:
+                self._counters['shared'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines on one event loop.
+
+    Waiting callers await the leader's task instead of blocking a thread.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._counters = {'calls': 0, 'shared': 0}
+
+    async def do(self, key, func, *args, **kwargs):
+        """Return await func(*args, **kwargs), shared with concurrent callers passing the same key"""
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func(*args, **kwargs))
+            task.add_done_callback(lambda done: self._calls.pop(key, None))
+            self._counters['calls'] += 1
+        else:
+            self._counters['shared'] += 1
+        # A cancelled caller must not cancel the call the others wait for
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return dict(self._counters, in_flight=len(self._calls))
+
+
+_default_flight = SingleFlight()
+
+
+def get_single_flight():
+    """
+    Return the single-flight group of the current application.
+
+    Outside an application context a process-wide group is used instead.
+    """
+    if not has_app_context():
+        return _default_flight
+    flight = current_app.extensions.get('single_flight')
+    if flight is None:
+        flight = current_app.extensions.setdefault('single_flight', SingleFlight())
+    return flight
+
+
+_loop_flights = weakref.WeakKeyDictionary()
+
+
+def get_async_single_flight():
+    """Return the async single-flight group of the running event loop"""
+    loop = asyncio.get_running_loop()
+    flight = _loop_flights.get(loop)
+    if flight is None:
+        flight = _loop_flights[loop] = AsyncSingleFlight()
+    return flight
@@ -0,0 +1,265 @@
+"""
+Dense travel-time rasters around an origin.
+
+One matrix call from the origin to a square grid of sample points gives
+the travel time to every cell of the surrounding area. Remote backends
+split it into requests of a few dozen points each, so their grid is
+shrunk until it fits in TIME_FIELD_MAX_REQUESTS of them (field_grid_size). The grid is stored
+as whole seconds in a uint16 .npy file opened memory-mapped, so isochrones
+at any threshold are then contoured from it locally (marching squares, see
+geometry.contour_rings) in milliseconds instead of asking the backend again
+for every slider value.
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from flask import current_app, has_app_context
+
+from app.services.distance_matrix import EARTH_RADIUS_M
+from app.services.geometry import contour_rings, nest_rings
+from app.services.routing_client import RoutingServiceError
+
+# Stored for cells the backend could not route to
+NO_DATA = np.iinfo(np.uint16).max
+
+
+class TimeField:
+    """
+    Travel times from one origin to a grid of points.
+
+    seconds[row, col] is the time to the point at latitude north - row * dlat
+    and longitude west + col * dlng, NO_DATA where unreachable.
+    """
+
+    def __init__(self, origin, travel_mode, backend, bounds, minutes, seconds):
+        """
+        Args:
+            origin (tuple): (lat, lng) the times are measured from
+            travel_mode (str): Mode of transport
+            backend (str): Name of the backend that routed the field
+            bounds (tuple): (south, west, north, east) of the outermost samples
+            minutes (int): Travel time the extent was sized for
+            seconds (np.ndarray): uint16 grid of travel times
+        """
+        self.origin = tuple(origin)
+        self.travel_mode = travel_mode
+        self.backend = backend
+        self.bounds = tuple(bounds)
+        self.minutes = minutes
+        self.seconds = seconds
+
+    def metadata(self):
+        return {'origin': list(self.origin), 'mode': self.travel_mode, 'backend': self.backend,
+                'bounds': list(self.bounds), 'minutes': self.minutes}
+
+    def isochrones(self, ranges):
+        """
+        Contour the field at every range in seconds.
+
+        Returns a GeoJSON FeatureCollection in the shape of the backends'
+        isochrones: one feature per range, ascending, with the properties
+        'group_index', 'value' and 'center'.
+        """
+        values = np.where(self.seconds == NO_DATA, np.inf, self.seconds).astype(np.float32)
+        south, west, north, east = self.bounds
+        rows, cols = self.seconds.shape
+        scale = np.array([(east - west) / (cols - 1), -(north - south) / (rows - 1)])
+        offset = np.array([west, north])
+        center = [round(self.origin[1], 6), round(self.origin[0], 6)]
+
+        features = []
+        for value in sorted(ranges):
+            # Rings are nested in grid space; flipping rows to latitudes
+            # mirrors them, so orientations are swapped back afterwards
+            polygons = [
+                [np.round(exterior[::-1] * scale + offset, 6).tolist()]
+                + [np.round(hole[::-1] * scale + offset, 6).tolist() for hole in holes]
+                for exterior, holes in nest_rings(contour_rings(values, value))
+            ]
+            if not polygons:
+                geometry = {'type': 'Polygon', 'coordinates': [[center, center, center, center]]}
+            elif len(polygons) == 1:
+                geometry = {'type': 'Polygon', 'coordinates': polygons[0]}
+            else:
+                geometry = {'type': 'MultiPolygon', 'coordinates': polygons}
+            features.append({
+                'type': 'Feature',
+                'properties': {'group_index': 0, 'value': value, 'center': center},
+                'geometry': geometry
+            })
+        return {'type': 'FeatureCollection', 'features': features}
+
+
+def field_bounds(origin_lat, origin_lng, radius_m):
+    """(south, west, north, east) of the square of half-width radius_m around the origin"""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    dlng = dlat / max(math.cos(math.radians(origin_lat)), 1e-6)
+    return origin_lat - dlat, origin_lng - dlng, origin_lat + dlat, origin_lng + dlng
+
+
+def field_grid_size(backend, grid_size, max_requests):
+    """The largest grid up to grid_size × grid_size the backend routes in at most max_requests requests"""
+    while grid_size > 2 and backend.matrix_requests(1, grid_size ** 2) > max_requests:
+        grid_size -= 1
+    if backend.matrix_requests(1, grid_size ** 2) > max_requests:
+        raise RoutingServiceError(f"{backend.name} backend cannot route a time field in {max_requests} requests")
+    return grid_size
+
+
+def build_time_field(backend, origin_lat, origin_lng, travel_mode, minutes, speed_kmh, grid_size=96):
+    """
+    Route from the origin to grid_size × grid_size points and return the TimeField.
+
+    The square reaches as far as speed_kmh covers in minutes in a straight
+    line; anything beyond it counts as unreachable when contouring.
+    """
+    south, west, north, east = field_bounds(origin_lat, origin_lng, minutes * 60 * speed_kmh / 3.6)
+    lats = np.linspace(north, south, grid_size)
+    lngs = np.linspace(west, east, grid_size)
+    grid_lats, grid_lngs = np.meshgrid(lats, lngs, indexing='ij')
+    points = list(zip(grid_lats.ravel().tolist(), grid_lngs.ravel().tolist()))
+
+    durations = backend.matrix([(origin_lat, origin_lng)], points, travel_mode)[0]
+    seconds = np.full(durations.shape, NO_DATA, dtype=np.uint16)
+    routed = np.isfinite(durations)
+    seconds[routed] = np.clip(np.rint(durations[routed]), 0, NO_DATA - 1)
+    return TimeField((origin_lat, origin_lng), travel_mode, backend.name, (south, west, north, east), minutes,
+                     seconds.reshape(grid_size, grid_size))
+
+
+class TimeFieldStore:
+    """
+    Travel-time fields keyed by origin, travel mode, backend, extent and grid size.
+
+    Each entry is a uint16 .npy file opened memory-mapped plus a small .json
+    file with its bounds, fronted by an in-process LRU of recently used
+    fields. The .npy file is written last, so its presence marks a complete
+    entry.
+    """
+
+    def __init__(self, directory=None, max_memory_entries=32, max_entries=500, precision=4):
+        """
+        Args:
+            directory (str): Folder for the entries, None to keep them in memory only
+            max_memory_entries (int): Maximum number of fields kept in process
+            max_entries (int): Maximum number of entries on disk; the least recently used are removed first
+            precision (int): Decimal places the origin is rounded to in the key (4 is ~11 m)
+        """
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.max_entries = max_entries
+        self.precision = precision
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, origin_lat, origin_lng, travel_mode, backend, minutes, grid_size):
+        origin = (round(float(origin_lat), self.precision), round(float(origin_lng), self.precision))
+        return hashlib.sha1(repr((origin, travel_mode, backend, minutes, grid_size)).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the TimeField stored under key, or None"""
+        with self._lock:
+            field = self._memory.get(key)
+            if field is not None:
+                self._memory.move_to_end(key)
+                return field
+            if not self.directory:
+                return None
+            path = self._path(key)
+            try:
+                with open(path + '.json', 'r') as f:
+                    metadata = json.load(f)
+                seconds = np.load(path + '.npy', mmap_mode='r')
+                # Touched so the least recently used entries are evicted first
+                os.utime(path + '.npy')
+            except (OSError, ValueError):
+                return None
+            field = TimeField(metadata['origin'], metadata['mode'], metadata['backend'],
+                              metadata['bounds'], metadata['minutes'], seconds)
+            self._remember(key, field)
+            return field
+
+    def put(self, key, field):
+        """Store field under key and return it, backed by the stored array"""
+        with self._lock:
+            if self.directory:
+                path = self._path(key)
+                suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(path + '.json' + suffix, 'w') as f:
+                    json.dump(field.metadata(), f)
+                os.replace(path + '.json' + suffix, path + '.json')
+                with open(path + '.npy' + suffix, 'wb') as f:
+                    np.save(f, np.ascontiguousarray(field.seconds, dtype='<u2'), allow_pickle=False)
+                os.replace(path + '.npy' + suffix, path + '.npy')
+                self._evict_files()
+                field = TimeField(field.origin, field.travel_mode, field.backend, field.bounds, field.minutes,
+                                  np.load(path + '.npy', mmap_mode='r'))
+            else:
+                field.seconds.setflags(write=False)
+            self._remember(key, field)
+            return field
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.directory:
+                for name in os.listdir(self.directory):
+                    if name.endswith(('.npy', '.json')):
+                        os.remove(os.path.join(self.directory, name))
+
+    def __len__(self):
+        with self._lock:
+            if self.directory:
+                return sum(1 for name in os.listdir(self.directory) if name.endswith('.npy'))
+            return len(self._memory)
+
+    def _remember(self, key, field):
+        """Insert into the in-process LRU (lock must be held)"""
+        self._memory[key] = field
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_files(self):
+        """Remove the least recently used entries beyond max_entries (lock must be held)"""
+        paths = [os.path.join(self.directory, name[:-4]) for name in os.listdir(self.directory)
+                 if name.endswith('.npy')]
+        if len(paths) <= self.max_entries:
+            return
+        paths.sort(key=lambda path: os.path.getmtime(path + '.npy'))
+        for path in paths[:len(paths) - self.max_entries]:
+            self._memory.pop(os.path.basename(path), None)
+            for suffix in ('.npy', '.json'):
+                try:
+                    os.remove(path + suffix)
+                except OSError:
+                    pass
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+
+def get_time_field_store():
+    """Return the time field store of the current application, None outside one"""
+    if not has_app_context():
+        return None
+    store = current_app.extensions.get('time_field_store')
+    if store is None:
+        config = current_app.config
+        directory = config.get('TIME_FIELD_PATH')
+        if directory is None:
+            directory = os.path.join(current_app.root_path, 'locals', 'time_fields')
+        store = TimeFieldStore(
+            directory=directory or None,
+            max_memory_entries=config.get('TIME_FIELD_MEMORY_ENTRIES', 32),
+            max_entries=config.get('TIME_FIELD_ENTRIES', 500)
+        )
+        current_app.extensions['time_field_store'] = store
+    return store
@@ -1,8 +1,23 @@
-import requests
+import asyncio
+import contextvars
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from flask import current_app
+from app.services.distance_matrix import EARTH_RADIUS_M
+from app.services.geometry import meters_per_pixel, simplify_ring
+from app.services.isochrone_cache import get_isochrone_cache
+from app.services.rate_limiter import RateLimitExceeded
+from app.services.routing_backend import get_routing_backend
+from app.services.routing_client import RoutingServiceError
+from app.services.single_flight import get_async_single_flight, get_single_flight
+from app.services.time_field import build_time_field, field_grid_size, get_time_field_store
+
+ISOCHRONE_COLORS = ['#2c7bb6', '#abd9e9', '#fee090', '#fdae61', '#f46d43', '#d73027']
+MAX_ZOOM = 22
 
-def get_isochrones(origin_lat, origin_lng, travel_times=[5, 10, 15], travel_mode='driving-car'):
+def get_isochrones(origin_lat, origin_lng, travel_times=[5, 10, 15], travel_mode='driving-car', zoom=None):
     """
     Get isochrones (areas reachable within specific time intervals) from a given origin point.
     
@@ -11,64 +26,485 @@ def get_isochrones(origin_lat, origin_lng, travel_times=[5, 10, 15], travel_mode
         origin_lng (float): Longitude of the origin point
         travel_times (list): List of travel times in minutes for isochrone calculation
         travel_mode (str): Mode of transport (driving-car, cycling-regular, foot-walking)
+        zoom (int): Map zoom level the polygons are displayed at; when given they are
+                    simplified and their coordinates rounded to what is visible at it
     
     Returns:
         dict: GeoJSON formatted isochrones or error message
     """
-    # Get API key from application configuration
-    api_key = current_app.config.get('TRAVEL_TIME_API_KEY')
+    # Resolve the configured backend (remote ORS or local road graph)
+    try:
+        backend = get_routing_backend()
+    except RoutingServiceError as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
     
-    if not api_key:
+    # Ranges are requested in ascending order so cached responses can be
+    # shared between requests that list the same times differently
+    travel_times = sorted(set(travel_times))
+    zoom = _display_zoom(zoom)
+    request = (origin_lat, origin_lng, travel_mode, travel_times, backend.name, zoom)
+    
+    try:
+        isochrones = _cached_isochrones(*request)
+        if isochrones is None:
+            # Concurrent identical requests share one upstream call
+            ranges = [t * 60 for t in travel_times]  # The API takes seconds
+            isochrones = get_single_flight().do(_flight_key(backend, travel_mode, ranges, [(origin_lat, origin_lng)]),
+                                                backend.isochrones, origin_lat, origin_lng, ranges, travel_mode)
+            isochrones = _store_isochrones(isochrones, *request)
+        return _decorate_isochrones(isochrones, travel_times)
+    
+    except RateLimitExceeded as e:
         return {
             "status": "error",
-            "message": "No travel time API key configured"
+            "message": str(e),
+            "retry_after": e.retry_after
         }
     
-    # Convert minutes to seconds for the API
-    ranges = [t * 60 for t in travel_times]
+    except RoutingServiceError as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
     
-    # OpenRouteService API endpoint for isochrones
-    url = "https://api.openrouteservice.org/v2/isochrones/" + travel_mode
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Exception: {str(e)}"
+        }
+
+
+async def get_isochrones_async(origin_lat, origin_lng, travel_times=[5, 10, 15], travel_mode='driving-car',
+                               zoom=None):
+    """
+    Asyncio variant of get_isochrones.
     
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json; charset=utf-8'
-    }
+    The upstream call is awaited instead of blocking the worker, and
+    identical calls awaited at the same time on the event loop share it.
+    The SQLite-backed cache is read and written on a worker thread.
+    """
+    try:
+        backend = get_routing_backend()
+    except RoutingServiceError as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
     
-    body = {
-        "locations": [[origin_lng, origin_lat]],  # Note: ORS uses [lng, lat] format
-        "range": ranges,
-        "attributes": ["total_pop"],
-        "location_type": "start",
-        "range_type": "time"
-    }
+    travel_times = sorted(set(travel_times))
+    zoom = _display_zoom(zoom)
+    request = (origin_lat, origin_lng, travel_mode, travel_times, backend.name, zoom)
+    
+    try:
+        isochrones = await asyncio.to_thread(_cached_isochrones, *request)
+        if isochrones is None:
+            ranges = [t * 60 for t in travel_times]
+            isochrones = await get_async_single_flight().do(
+                _flight_key(backend, travel_mode, ranges, [(origin_lat, origin_lng)]),
+                backend.isochrones_async, origin_lat, origin_lng, ranges, travel_mode
+            )
+            isochrones = await asyncio.to_thread(_store_isochrones, isochrones, *request)
+        return _decorate_isochrones(isochrones, travel_times)
+    
+    except RateLimitExceeded as e:
+        return {
+            "status": "error",
+            "message": str(e),
+            "retry_after": e.retry_after
+        }
+    
+    except RoutingServiceError as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+    
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Exception: {str(e)}"
+        }
+
+
+def get_isochrones_batch(origins, travel_times=[5, 10, 15], travel_mode='driving-car', zoom=None):
+    """
+    Get isochrones for many origins with as few upstream calls as possible.
+    
+    Origins that round to the same cache key are computed once, cached ones
+    are not requested at all, and the rest are packed into requests of the
+    largest size the backend accepts (ISOCHRONE_MAX_LOCATIONS for ORS), sent
+    concurrently on ISOCHRONE_BATCH_WORKERS threads. Identical batches
+    requested concurrently by other threads share one upstream call.
+    
+    Args:
+        origins (list): {'lat', 'lng'} dicts, optionally with an 'id'; the
+                        position in the list is used when there is none
+        travel_times, travel_mode, zoom: as for get_isochrones
     
+    Returns:
+        dict: A FeatureCollection of every origin's features, each carrying
+              'origin_id' in its properties, and 'errors' mapping the ids of
+              origins that failed to their message; or an error message
+    """
     try:
-        response = requests.post(url, json=body, headers=headers)
+        plan = _IsochroneBatch(origins, travel_times, travel_mode, zoom)
+    except RoutingServiceError as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+    
+    flight = get_single_flight()
+    backend = plan.backend
+    
+    def run(batch):
+        points = plan.points_of(batch)
+        return flight.do(_flight_key(backend, travel_mode, plan.ranges, points),
+                         backend.isochrones_batch, points, plan.ranges, travel_mode)
+    
+    if len(plan.batches) > 1:
+        executor = _get_batch_executor()
+        # Each batch runs in a copy of this context, keeping the caller's request priority
+        futures = [executor.submit(contextvars.copy_context().run, _outcome, run, batch) for batch in plan.batches]
+        outcomes = [future.result() for future in futures]
+    else:
+        # A single batch is not worth a hand-off to the pool
+        outcomes = [_outcome(run, batch) for batch in plan.batches]
+    return plan.result(outcomes)
+
+
+async def get_isochrones_batch_async(origins, travel_times=[5, 10, 15], travel_mode='driving-car', zoom=None):
+    """
+    Asyncio variant of get_isochrones_batch.
+    
+    The batches are awaited concurrently on the event loop, at most
+    ISOCHRONE_BATCH_WORKERS at a time; cache lookups and writes run on a
+    worker thread.
+    """
+    try:
+        plan = await asyncio.to_thread(_IsochroneBatch, origins, travel_times, travel_mode, zoom)
+    except RoutingServiceError as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+    
+    flight = get_async_single_flight()
+    backend = plan.backend
+    slots = asyncio.Semaphore(current_app.config.get('ISOCHRONE_BATCH_WORKERS', 4))
+    
+    async def run(batch):
+        points = plan.points_of(batch)
+        async with slots:
+            return await flight.do(_flight_key(backend, travel_mode, plan.ranges, points),
+                                   backend.isochrones_batch_async, points, plan.ranges, travel_mode)
+    
+    outcomes = await asyncio.gather(*(_outcome_async(run, batch) for batch in plan.batches))
+    return await asyncio.to_thread(plan.result, outcomes)
+
+
+class _IsochroneBatch:
+    """
+    The upstream work of a multi-origin request.
+    
+    Distinct origins are keyed like the single-origin cache, cached ones are
+    answered from it and the rest are split into batches of the size the
+    backend accepts. result() assembles the response once the batches ran.
+    """
+    
+    def __init__(self, origins, travel_times, travel_mode, zoom):
+        self.backend = get_routing_backend()
+        self.travel_times = sorted(set(travel_times))
+        self.travel_mode = travel_mode
+        self.ranges = [t * 60 for t in self.travel_times]
+        self.zoom = _display_zoom(zoom)
+        cache = _isochrone_cache()
         
-        if response.status_code == 200:
-            isochrones = response.json()
-            # Add colors for visualization
-            colors = ['#2c7bb6', '#abd9e9', '#fee090', '#fdae61', '#f46d43', '#d73027']
-            
-            for i, feature in enumerate(isochrones.get('features', [])):
-                if i < len(colors):
-                    feature['properties']['color'] = colors[i]
-                    # Add the time in minutes for display
-                    feature['properties']['time_minutes'] = travel_times[i]
-                    
-            return isochrones
-        else:
-            return {
-                "status": "error",
-                "message": f"API Error: {response.status_code} - {response.text}"
-            }
+        self.ids = [origin.get('id', index) for index, origin in enumerate(origins)]
+        self.keys = []
+        self.points = {}
+        for origin in origins:
+            lat, lng = float(origin['lat']), float(origin['lng'])
+            if cache is not None:
+                key = cache.make_key(lat, lng, travel_mode, self.travel_times, namespace=self.backend.name)
+            else:
+                key = (round(lat, 6), round(lng, 6))
+            self.keys.append(key)
+            self.points.setdefault(key, (lat, lng))
+        
+        self.results = {}
+        missing = []
+        for key, (lat, lng) in self.points.items():
+            cached = _cached_isochrones(lat, lng, travel_mode, self.travel_times, self.backend.name, self.zoom)
+            if cached is not None:
+                self.results[key] = cached
+            else:
+                missing.append(key)
+        size = max(self.backend.max_isochrone_locations, 1)
+        self.batches = [missing[start:start + size] for start in range(0, len(missing), size)]
+    
+    def points_of(self, batch):
+        return [self.points[key] for key in batch]
+    
+    def result(self, outcomes):
+        """The FeatureCollection from the (collections, error) outcome of every batch"""
+        errors = {}
+        for batch, (collections, error) in zip(self.batches, outcomes):
+            for index, key in enumerate(batch):
+                if error is None and index >= len(collections):
+                    errors[key] = f"No isochrones returned for this origin ({len(collections)} of {len(batch)})"
+                    continue
+                if error is not None:
+                    errors[key] = error
+                    continue
+                isochrones = collections[index]
+                lat, lng = self.points[key]
+                self.results[key] = _store_isochrones(isochrones, lat, lng, self.travel_mode, self.travel_times,
+                                                      self.backend.name, self.zoom)
+        
+        features = []
+        failed = {}
+        for origin_id, key in zip(self.ids, self.keys):
+            if key in errors:
+                failed[str(origin_id)] = errors[key]
+                continue
+            for feature in _decorate_isochrones(self.results[key], self.travel_times)['features']:
+                feature['properties'] = dict(feature.get('properties') or {}, origin_id=origin_id)
+                features.append(feature)
+        return {'type': 'FeatureCollection', 'features': features, 'errors': failed}
+
+
+def _display_zoom(zoom):
+    """The zoom isochrones are simplified for, None when they are served in full"""
+    if zoom is None or not current_app.config.get('ISOCHRONE_SIMPLIFY_ENABLED', True):
+        return None
+    return min(max(int(zoom), 0), MAX_ZOOM)
+
+
+def _isochrone_cache():
+    return get_isochrone_cache() if current_app.config.get('ISOCHRONE_CACHE_ENABLED', True) else None
+
+
+def _flight_key(backend, travel_mode, ranges, points):
+    return ('isochrones', backend.name, travel_mode, tuple(ranges),
+            tuple((round(lat, 6), round(lng, 6)) for lat, lng in points))
+
+
+def _cached_isochrones(lat, lng, travel_mode, travel_times, namespace, zoom):
+    """Cached isochrones ready for display at zoom, or None when they must be routed"""
+    cache = _isochrone_cache()
+    if cache is None:
+        return None
+    if zoom is not None:
+        # Simplified geometries are cached per zoom, next to the full ones
+        cached = cache.get(cache.make_key(lat, lng, travel_mode, travel_times, namespace=namespace, zoom=zoom))
+        if cached is not None:
+            return cached
+    cached = cache.get(cache.make_key(lat, lng, travel_mode, travel_times, namespace=namespace))
+    if cached is not None and zoom is not None:
+        cached = _display_isochrones(cached, cache, lat, lng, travel_mode, travel_times, namespace, zoom)
+    return cached
+
+
+def _store_isochrones(isochrones, lat, lng, travel_mode, travel_times, namespace, zoom):
+    """Cache freshly routed isochrones, undecorated, and return them ready for display at zoom"""
+    cache = _isochrone_cache()
+    if cache is not None:
+        cache.set(cache.make_key(lat, lng, travel_mode, travel_times, namespace=namespace), isochrones)
+        if zoom is not None:
+            return _display_isochrones(isochrones, cache, lat, lng, travel_mode, travel_times, namespace, zoom)
+    elif zoom is not None:
+        return simplify_isochrones(isochrones, zoom, current_app.config.get('ISOCHRONE_SIMPLIFY_PIXELS', 0.5))
+    return isochrones
+
+
+def _display_isochrones(isochrones, cache, lat, lng, travel_mode, travel_times, namespace, zoom):
+    """Simplify isochrones for zoom and cache them under their per-zoom key"""
+    isochrones = simplify_isochrones(isochrones, zoom, current_app.config.get('ISOCHRONE_SIMPLIFY_PIXELS', 0.5))
+    cache.set(cache.make_key(lat, lng, travel_mode, travel_times, namespace=namespace, zoom=zoom), isochrones)
+    return isochrones
+
+
+def _outcome(func, *args):
+    """(result, None) or (None, error message) of func(*args)"""
+    try:
+        return func(*args), None
+    except RoutingServiceError as e:
+        return None, str(e)
+    except Exception as e:
+        return None, f"Exception: {str(e)}"
+
+
+async def _outcome_async(func, *args):
+    """(result, None) or (None, error message) of await func(*args)"""
+    try:
+        return await func(*args), None
+    except RoutingServiceError as e:
+        return None, str(e)
+    except Exception as e:
+        return None, f"Exception: {str(e)}"
+
+
+def _get_batch_executor():
+    """Thread pool for concurrent isochrone batches, one per application"""
+    executor = current_app.extensions.get('isochrone_executor')
+    if executor is None:
+        executor = current_app.extensions.setdefault('isochrone_executor', ThreadPoolExecutor(
+            max_workers=current_app.config.get('ISOCHRONE_BATCH_WORKERS', 4),
+            thread_name_prefix='isochrone-batch'
+        ))
+    return executor
+
+
+def get_field_isochrones(origin_lat, origin_lng, travel_times=[5, 10], travel_mode='driving-car', zoom=None):
+    """
+    Isochrones contoured from the cached travel-time field around the origin.
+    
+    The first request for an origin and mode routes a whole grid of points
+    once (see app/services/time_field.py); later requests at any other times
+    within the field's extent are answered from it without the backend.
+    Fields are sized for TIME_FIELD_MIN_MINUTES, doubled until the largest
+    requested time fits, and a larger cached field is used when one exists.
+    On remote backends the grid is kept within TIME_FIELD_MAX_REQUESTS
+    upstream requests, and a field the rate limit cannot serve is refused
+    before any of them is sent.
+    
+    Returns:
+        dict: GeoJSON formatted isochrones or error message, as get_isochrones
+    """
+    config = current_app.config
+    try:
+        backend = get_routing_backend()
+    except RoutingServiceError as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+    
+    travel_times = sorted(set(travel_times))
+    minutes = config.get('TIME_FIELD_MIN_MINUTES', 15)
+    while minutes < travel_times[-1]:
+        minutes *= 2
+    
+    try:
+        grid_size = field_grid_size(backend, config.get('TIME_FIELD_GRID', 96),
+                                    config.get('TIME_FIELD_MAX_REQUESTS', 4))
+        store = get_time_field_store()
+        field = None
+        for extent in (minutes, minutes * 2, minutes * 4):
+            field = store.get(store.key(origin_lat, origin_lng, travel_mode, backend.name, extent, grid_size))
+            if field is not None:
+                break
+        if field is None:
+            speed_kmh = config.get('TIME_FIELD_SPEEDS_KMH', {}).get(travel_mode, 60)
+            field = build_time_field(backend, origin_lat, origin_lng, travel_mode, minutes, speed_kmh, grid_size)
+            field = store.put(store.key(origin_lat, origin_lng, travel_mode, backend.name, minutes, grid_size), field)
+        
+        isochrones = field.isochrones([t * 60 for t in travel_times])
+        if zoom is not None and config.get('ISOCHRONE_SIMPLIFY_ENABLED', True):
+            isochrones = simplify_isochrones(
+                isochrones, min(max(int(zoom), 0), MAX_ZOOM), config.get('ISOCHRONE_SIMPLIFY_PIXELS', 0.5)
+            )
+        return _decorate_isochrones(isochrones, travel_times)
+    
+    except RateLimitExceeded as e:
+        return {
+            "status": "error",
+            "message": str(e),
+            "retry_after": e.retry_after
+        }
+    
+    except RoutingServiceError as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
     
     except Exception as e:
         return {
             "status": "error",
             "message": f"Exception: {str(e)}"
         }
+
+
+def simplify_isochrones(isochrones, zoom, pixels=0.5):
+    """
+    Simplify isochrone polygons for display at a map zoom level.
+    
+    Vertices that move the outline by less than `pixels` screen pixels at
+    zoom are dropped (Douglas-Peucker in a local metric projection) and the
+    remaining coordinates are rounded to the fewest decimals that keep the
+    same precision. Holes that shrink below a triangle are dropped; outer
+    rings never are.
+    
+    Returns a new FeatureCollection; the input is not modified.
+    """
+    features = []
+    for feature in isochrones.get('features', []):
+        geometry = feature.get('geometry')
+        if geometry and geometry.get('type') in ('Polygon', 'MultiPolygon'):
+            polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+            simplified = [_simplify_polygon(polygon, zoom, pixels) for polygon in polygons]
+            coordinates = simplified if geometry['type'] == 'MultiPolygon' else simplified[0]
+            feature = dict(feature)
+            feature['geometry'] = {'type': geometry['type'], 'coordinates': coordinates}
+        features.append(feature)
+    
+    simplified = dict(isochrones)
+    simplified['features'] = features
+    return simplified
+
+
+def _simplify_polygon(polygon, zoom, pixels):
+    """Simplify the exterior and hole rings of one GeoJSON polygon"""
+    if not polygon or len(polygon[0]) < 4:
+        return polygon
+    exterior = np.asarray(polygon[0], dtype=float)
+    ref_lat = float(exterior[:, 1].mean())
+    tolerance = pixels * float(meters_per_pixel(zoom, ref_lat))
+    # Rounding steps stay below the tolerance (one degree of latitude is ~111 km)
+    decimals = int(min(max(np.ceil(np.log10(111320.0 / tolerance)), 0), 7))
+    scale = np.radians([np.cos(np.radians(ref_lat)) * EARTH_RADIUS_M, EARTH_RADIUS_M])
+    
+    rings = []
+    for i, ring in enumerate(polygon):
+        lnglat = np.asarray(ring, dtype=float)
+        if len(lnglat) < 4:
+            continue
+        kept = np.round(lnglat[simplify_ring(lnglat * scale, tolerance)], decimals)
+        kept = kept[np.r_[True, np.any(kept[1:] != kept[:-1], axis=1)]]
+        if len(kept) < 4:
+            if i > 0:
+                continue
+            # Never drop the outline itself, however small it is at this zoom
+            kept = lnglat
+        rings.append(kept.tolist())
+    return rings
+
+
+def _decorate_isochrones(isochrones, travel_times):
+    """
+    Add display colors and times in minutes to isochrone features.
+    
+    Returns a new FeatureCollection; only the feature and properties
+    dictionaries are copied so cached geometries are shared, not mutated.
+    """
+    features = []
+    for i, feature in enumerate(isochrones.get('features', [])):
+        feature = dict(feature)
+        if i < len(ISOCHRONE_COLORS):
+            feature['properties'] = dict(feature.get('properties') or {})
+            feature['properties']['color'] = ISOCHRONE_COLORS[i]
+            # Add the time in minutes for display
+            feature['properties']['time_minutes'] = travel_times[i] if i < len(travel_times) else None
+        features.append(feature)
+    
+    decorated = dict(isochrones)
+    decorated['features'] = features
+    return decorated
         
         
 from datetime import datetime
@@ -200,67 +636,43 @@ def get_travel_times(origin_lat, origin_lng, destinations=None):
     if not destinations:
         return get_isochrones(origin_lat, origin_lng)
     
-    api_key = current_app.config.get('TRAVEL_TIME_API_KEY')
+    try:
+        backend = get_routing_backend()
+        
+        # Large destination sets are split into tiles the backend accepts
+        durations = backend.matrix([(origin_lat, origin_lng)], destinations, 'driving-car')[0]
+        return _travel_time_results(origin_lat, origin_lng, destinations, durations)
     
-    if not api_key:
+    except RoutingServiceError as e:
         return {
             "status": "error",
-            "message": "No travel time API key configured"
+            "message": str(e)
         }
-    
-    # For specific point-to-point travel times, use ORS matrix API
-    url = "https://api.openrouteservice.org/v2/matrix/driving-car"
-    
-    headers = {
-        'Authorization': f'Bearer {api_key}',  # OpenRouteService requires the "Bearer " prefix
-        'Content-Type': 'application/json; charset=utf-8'
-    }
-    
-    # Prepare locations array starting with origin
-    locations = [[origin_lng, origin_lat]]  # Note: ORS uses [lng, lat] format
-    
-    # Add destination coordinates
-    for dest in destinations:
-        locations.append([dest['lng'], dest['lat']])
-    
-    body = {
-        "locations": locations,
-        "metrics": ["duration"],
-        "sources": [0],  # Index of the origin point
-        "destinations": list(range(1, len(locations)))  # Indices of destination points
-    }
+            
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Exception: {str(e)}"
+        }
+
+
+async def get_travel_times_async(origin_lat, origin_lng, destinations=None):
+    """
+    Asyncio variant of get_travel_times; the matrix tiles are awaited concurrently.
+    """
+    if not destinations:
+        return await get_isochrones_async(origin_lat, origin_lng)
     
     try:
-        response = requests.post(url, json=body, headers=headers)
-        
-        if response.status_code == 200:
-            matrix_data = response.json()
-            
-            # Format the basic response
-            raw_results = {
-                "status": "success",
-                "origin": {"lat": origin_lat, "lng": origin_lng},
-                "results": []
-            }
-            durations = matrix_data.get('durations', [[]])[0]
-            
-            for i, duration in enumerate(durations):
-                if i < len(destinations):
-                    raw_results["results"].append({
-                        "destination": destinations[i],
-                        "duration_seconds": duration,
-                        "duration_minutes": round(duration / 60, 1)
-                    })
-            
-             # Use the processor to normalize data
-            processor = TravelTimeProcessor()
-            return processor.normalize_travel_times(raw_results)
-        
-        else:
-            return {
-                "status": "error",
-                "message": f"API Error: {response.status_code} - {response.text}"
-            }
+        backend = get_routing_backend()
+        durations = (await backend.matrix_async([(origin_lat, origin_lng)], destinations, 'driving-car'))[0]
+        return _travel_time_results(origin_lat, origin_lng, destinations, durations)
+    
+    except RoutingServiceError as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
             
     except Exception as e:
         return {
@@ -268,6 +680,29 @@ def get_travel_times(origin_lat, origin_lng, destinations=None):
             "message": f"Exception: {str(e)}"
         }
 
+
+def _travel_time_results(origin_lat, origin_lng, destinations, durations):
+    """Normalized travel times response for one row of durations"""
+    # Format the basic response
+    raw_results = {
+        "status": "success",
+        "origin": {"lat": origin_lat, "lng": origin_lng},
+        "results": []
+    }
+    
+    for i, duration in enumerate(durations):
+        # Unroutable destinations come back as NaN
+        duration = None if np.isnan(duration) else float(duration)
+        raw_results["results"].append({
+            "destination": destinations[i],
+            "duration_seconds": duration,
+            "duration_minutes": round(duration / 60, 1) if duration is not None else None
+        })
+    
+    # Use the processor to normalize data
+    processor = TravelTimeProcessor()
+    return processor.normalize_travel_times(raw_results)
+
 def get_travel_times_matrix(self, pois):
     """Get matrix of travel times between POIs using OpenRouteService API"""
     url = "https://api.openrouteservice.org/v2/matrix/driving-car"
@@ -0,0 +1,108 @@
+"""
+Streaming writes of uploaded screenshots.
+
+Request bodies are copied to disk in fixed-size chunks, so memory use stays
+at one chunk whatever the image size. Files are written next to their final
+path under a unique .part name and renamed into place only once complete, so
+a half-written upload is never visible under the final name.
+"""
+import os
+import uuid
+
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+class LimitedFile:
+    """
+    Write-only file that refuses to grow beyond max_bytes.
+
+    Checks the PNG signature on the first bytes written when require_png is set.
+    """
+
+    def __init__(self, path, max_bytes, require_png=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.require_png = require_png
+        self.size = 0
+        self._head = b''
+        self._file = open(path, 'xb')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise RequestEntityTooLarge(f"Screenshot exceeds {self.max_bytes} bytes")
+        if self.require_png and len(self._head) < len(PNG_SIGNATURE):
+            self._head += bytes(data[:len(PNG_SIGNATURE) - len(self._head)])
+            if not PNG_SIGNATURE.startswith(self._head):
+                raise BadRequest("Screenshot must be a PNG image")
+        return self._file.write(data)
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        return self._file.flush()
+
+    def read(self, *args):
+        # FileStorage may try to read back; the upload is write-only
+        return b''
+
+    def close(self):
+        self._file.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+
+def part_path(path):
+    """A temporary path next to path that no other upload, in any thread or process, writes to"""
+    return f"{path}.{uuid.uuid4().hex}.part"
+
+
+def stream_to_file(stream, path, max_bytes=None, chunk_size=64 * 1024, require_png=True):
+    """
+    Copy a readable stream to path in chunks and return the number of bytes written.
+
+    Raises RequestEntityTooLarge as soon as max_bytes is exceeded and
+    BadRequest for non-PNG data; the partial file is removed in both cases.
+    """
+    tmp_path = part_path(path)
+    target = LimitedFile(tmp_path, max_bytes, require_png)
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            target.write(chunk)
+        target.close()
+        finish_upload(target, path)
+    except BaseException:
+        discard_upload(target)
+        raise
+    return target.size
+
+
+def finish_upload(target, path):
+    """Move a completely written LimitedFile to its final path"""
+    target.close()
+    if target.size == 0:
+        discard_upload(target)
+        raise BadRequest("Screenshot image is empty")
+    if target.require_png and len(target._head) < len(PNG_SIGNATURE):
+        discard_upload(target)
+        raise BadRequest("Screenshot must be a PNG image")
+    os.replace(target.path, path)
+
+
+def discard_upload(target):
+    target.close()
+    try:
+        os.remove(target.path)
+    except OSError:
+        pass
@@ -0,0 +1,190 @@
+"""
+Raster warping of map screenshots onto the time-based layout.
+
+A thin-plate spline fitted on the POIs maps every point of the time panel
+back to the screenshot position it shows. It is evaluated once on a
+coarse grid over the unit square, so the field does not depend on the
+image size and is cached per POI set and layout. PIL's mesh transform
+then resamples the whole screenshot in one C pass, interpolating the
+field bilinearly inside every grid cell; no full-resolution displacement
+field is ever built.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from flask import current_app, has_app_context
+from PIL import Image
+
+
+def _radial_basis(distances):
+    """Thin-plate kernel r² log r, zero at r = 0"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = distances ** 2 * np.log(distances)
+    return np.where(distances > 0, values, 0.0)
+
+
+def _pairwise_distances(a, b):
+    return np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+
+
+def fit_thin_plate(control, target, smoothing=0.0):
+    """
+    Fit a thin-plate spline taking every control point to its target.
+
+    Returns (weights, affine): N×2 kernel weights and the 3×2 affine part,
+    to be evaluated by thin_plate_transform. A positive smoothing is added
+    to the kernel diagonal, trading exact interpolation for a smoother map;
+    on the unit square the kernel is small, so 1e-4 already relaxes it a lot.
+    """
+    control = np.asarray(control, dtype=float).reshape(-1, 2)
+    target = np.asarray(target, dtype=float).reshape(-1, 2)
+    n = len(control)
+
+    system = np.zeros((n + 3, n + 3))
+    system[:n, :n] = _radial_basis(_pairwise_distances(control, control)) + smoothing * np.eye(n)
+    system[:n, n] = 1
+    system[:n, n + 1:] = control
+    system[n, :n] = 1
+    system[n + 1:, :n] = control.T
+    values = np.zeros((n + 3, 2))
+    values[:n] = target
+
+    try:
+        solution = np.linalg.solve(system, values)
+    except np.linalg.LinAlgError:
+        # Collinear control points leave the affine part underdetermined
+        solution = np.linalg.lstsq(system, values, rcond=None)[0]
+    return solution[:n], solution[n:]
+
+
+def thin_plate_transform(points, control, weights, affine):
+    """Evaluate a spline from fit_thin_plate at points"""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    kernel = _radial_basis(_pairwise_distances(points, np.asarray(control, dtype=float).reshape(-1, 2)))
+    return kernel @ weights + affine[0] + points @ affine[1:]
+
+
+def thin_plate_field(src_points, dst_points, grid_size=64, smoothing=0.0):
+    """
+    Coarse inverse warp from the time layout back to the screenshot.
+
+    src_points and dst_points are the normalized [0, 1] positions of the
+    POIs on the screenshot and in the time layout. Returns a
+    (grid_size + 1)² × 2 array: for every grid node of the unit square in
+    the time layout, the normalized screenshot position it shows.
+    """
+    src = np.asarray(src_points, dtype=float).reshape(-1, 2)
+    dst = np.asarray(dst_points, dtype=float).reshape(-1, 2)
+    # A POI listed twice would make the system singular
+    dst, unique = np.unique(dst, axis=0, return_index=True)
+    src = src[unique]
+
+    axis = np.linspace(0, 1, grid_size + 1)
+    nodes = np.stack(np.meshgrid(axis, axis), axis=-1).reshape(-1, 2)
+    if len(dst) < 3:
+        # Too few points to bend the map, only shift it
+        offset = (src - dst).mean(axis=0) if len(dst) else np.zeros(2)
+        field = nodes + offset
+    else:
+        weights, affine = fit_thin_plate(dst, src, smoothing)
+        field = thin_plate_transform(nodes, dst, weights, affine)
+    return field.reshape(grid_size + 1, grid_size + 1, 2)
+
+
+def warp_screenshot(image, field, size=None, fillcolor=(0, 0, 0)):
+    """
+    Resample image through a field from thin_plate_field.
+
+    The output (size, image.size by default) shows at every pixel the
+    screenshot position the field gives for it; positions outside the
+    screenshot are filled with fillcolor.
+    """
+    width, height = size or image.size
+    cells = field.shape[0] - 1
+    src = field * (image.size[0], image.size[1])
+
+    # Cell boxes need whole pixels; the nodes moved by rounding are followed
+    # to first order along the field so neighbouring cells still line up
+    exact_x, exact_y = np.linspace(0, width, cells + 1), np.linspace(0, height, cells + 1)
+    xs, ys = np.rint(exact_x).astype(int), np.rint(exact_y).astype(int)
+    src = (src + np.gradient(src, exact_y, axis=0) * (ys - exact_y)[:, None, None]
+           + np.gradient(src, exact_x, axis=1) * (xs - exact_x)[None, :, None])
+
+    # Output box of every grid cell and the screenshot quad it samples from,
+    # corners in PIL's order: upper left, lower left, lower right, upper right
+    boxes = np.stack(np.broadcast_arrays(xs[None, :-1], ys[:-1, None], xs[None, 1:], ys[1:, None]), axis=-1)
+    quads = np.concatenate([src[:-1, :-1], src[1:, :-1], src[1:, 1:], src[:-1, 1:]], axis=-1)
+    mesh = list(zip(map(tuple, boxes.reshape(-1, 4).tolist()), map(tuple, quads.reshape(-1, 8).tolist())))
+    return image.transform((width, height), Image.MESH, mesh, Image.BILINEAR, fillcolor=fillcolor)
+
+
+class WarpFieldCache:
+    """
+    In-process LRU of coarse warp fields.
+
+    Keyed by the rounded POI positions on the screenshot and in the layout,
+    the grid size and the smoothing, so re-rendering a layout at another resolution or style reuses its
+    field instead of solving the spline again.
+    """
+
+    def __init__(self, max_entries=32, precision=6):
+        """
+        Args:
+            max_entries (int): Maximum number of fields kept
+            precision (int): Decimal places positions are rounded to in the key
+        """
+        self.max_entries = max_entries
+        self.precision = precision
+        self._fields = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, src_points, dst_points, grid_size, smoothing=0.0):
+        points = np.round(np.concatenate([np.asarray(src_points, dtype=float).reshape(-1, 2),
+                                          np.asarray(dst_points, dtype=float).reshape(-1, 2)]), self.precision)
+        return hashlib.sha1(points.tobytes() + f"{grid_size}:{float(smoothing)!r}".encode('ascii')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            field = self._fields.get(key)
+            if field is not None:
+                self._fields.move_to_end(key)
+            return field
+
+    def put(self, key, field):
+        field = np.array(field)
+        field.setflags(write=False)
+        with self._lock:
+            self._fields[key] = field
+            self._fields.move_to_end(key)
+            while len(self._fields) > self.max_entries:
+                self._fields.popitem(last=False)
+        return field
+
+    def __len__(self):
+        with self._lock:
+            return len(self._fields)
+
+
+def get_warp_field_cache():
+    """Return the warp field cache of the current application, None outside one"""
+    if not has_app_context():
+        return None
+    cache = current_app.extensions.get('warp_fields')
+    if cache is None:
+        cache = WarpFieldCache(max_entries=current_app.config.get('MAP_WARP_CACHE_ENTRIES', 32))
+        current_app.extensions['warp_fields'] = cache
+    return cache
+
+
+def warp_field(src_points, dst_points, grid_size=64, smoothing=0.0):
+    """thin_plate_field, from the application's cache when there is one"""
+    cache = get_warp_field_cache()
+    if cache is None:
+        return thin_plate_field(src_points, dst_points, grid_size, smoothing)
+    key = cache.key(src_points, dst_points, grid_size, smoothing)
+    field = cache.get(key)
+    if field is None:
+        field = cache.put(key, thin_plate_field(src_points, dst_points, grid_size, smoothing))
+    return field
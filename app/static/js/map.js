@@ -1,5 +1,5 @@
 // Display error message when API rate limit is exceeded
-function showRateLimitError(errorMessage = "") {
+function showRateLimitError(errorMessage = "", retryAfter = 60) {
 	console.error(`API Rate limit exceeded: ${errorMessage}`);
 
 	const errorElement = document.getElementById("rate-limit-error");
@@ -12,7 +12,7 @@ function showRateLimitError(errorMessage = "") {
 	}
 
 	// Initialize countdown timer
-	let secondsLeft = 60;
+	let secondsLeft = retryAfter;
 
 	// Update error message content
 	const messageSpan = errorElement.querySelector(".alert-content span");
@@ -112,9 +112,15 @@ const showToast = (msg) => {
 	setTimeout(() => toast.remove(), 3000);
 };
 
+// Origin of the isochrones on display; slider moves redraw them from its
+// cached travel-time field instead of a new isochrone request
+let isochroneOrigin = null;
+
 // Fetch and render isochrones on the map
-const fetchAndDisplayIsochrones = (lat, lng, customTimeMinutes = null) => {
-	showToast("Loading isochrones...");
+const fetchAndDisplayIsochrones = (lat, lng, customTimeMinutes = null, fromField = false) => {
+	if (!fromField) {
+		showToast("Loading isochrones...");
+	}
 
 	// Configure time parameters
 	let timeRanges = [5]; // Default: 5-minute isochrone
@@ -131,9 +137,11 @@ const fetchAndDisplayIsochrones = (lat, lng, customTimeMinutes = null) => {
 		origin_lng: lng,
 		times: timeRanges.join(","),
 		mode: "driving-car",
+		zoom: map.getZoom(),
 	});
 
-	fetch(`/api/isochrones?${params}`)
+	const endpoint = fromField ? "/api/isochrones/field" : "/api/isochrones";
+	return fetch(`${endpoint}?${params}`)
 		.then((response) => {
 			if (!response.ok) {
 				console.error(
@@ -141,8 +149,14 @@ const fetchAndDisplayIsochrones = (lat, lng, customTimeMinutes = null) => {
 				);
 
 				if (response.status === 429 || response.status === 403) {
-					showRateLimitError();
-					throw new Error(`Rate limit exceeded (${response.status})`);
+					// The server says when its shared routing quota frees up
+					const error = new Error(
+						`Rate limit exceeded (${response.status})`
+					);
+					error.retryAfter =
+						parseInt(response.headers.get("Retry-After"), 10) ||
+						undefined;
+					throw error;
 				}
 				throw new Error(`HTTP error! status: ${response.status}`);
 			}
@@ -232,7 +246,10 @@ const fetchAndDisplayIsochrones = (lat, lng, customTimeMinutes = null) => {
 				}
 
 				isochronesShowing = true;
-				showToast(`Displaying travel time isochrones`);
+				isochroneOrigin = { lat, lng };
+				if (!fromField) {
+					showToast(`Displaying travel time isochrones`);
+				}
 			} else {
 				showToast("No isochrone data available");
 			}
@@ -252,7 +269,7 @@ const fetchAndDisplayIsochrones = (lat, lng, customTimeMinutes = null) => {
 				console.log(
 					"Rate limit error detected - showing error message"
 				);
-				showRateLimitError();
+				showRateLimitError("", error.retryAfter);
 			} else {
 				showToast("Failed to load isochrones. Please try again.");
 			}
@@ -265,8 +282,32 @@ const clearIsochrones = () => {
 	isochroneLayers.forEach((layer) => map.removeLayer(layer));
 	isochroneLayers.length = 0;
 	isochronesShowing = false;
+	isochroneOrigin = null;
 };
 
+// Redraw the isochrones on display for the slider value; at most one field
+// request is in flight and the latest slider value is sent when it returns
+let fieldRequestActive = false;
+let fieldRequestQueued = false;
+function redrawIsochronesFromField() {
+	if (!isochroneOrigin) {
+		return;
+	}
+	if (fieldRequestActive) {
+		fieldRequestQueued = true;
+		return;
+	}
+	fieldRequestActive = true;
+	const minutes = parseInt(document.getElementById("time-range").value);
+	fetchAndDisplayIsochrones(isochroneOrigin.lat, isochroneOrigin.lng, minutes, true).finally(() => {
+		fieldRequestActive = false;
+		if (fieldRequestQueued) {
+			fieldRequestQueued = false;
+			redrawIsochronesFromField();
+		}
+	});
+}
+
 // Clear isochrones only if they exist
 function clearJustIsochrones() {
 	if (isochronesShowing) {
@@ -281,31 +322,57 @@ const bounds = [
 	[45.82, 21.31], // Northeast corner
 ];
 
-// Refresh all saved locations from the server
+// Markers and sidebar items of the loaded POIs by id, and the server time
+// of the last refresh; later refreshes only fetch what changed since then
+const loadedPOIs = new Map();
+let poiSyncTime = null;
+
+// Refresh saved locations from the server
 async function refreshSavedLocations() {
 	try {
-		// Clear existing UI elements
-		const poiList = document.getElementById("poi-list");
-		poiList.innerHTML = "";
-
-		markers.forEach((marker) => map.removeLayer(marker));
-		markers.length = 0;
-
-		// Fetch and display locations
-		const response = await fetch("/api/pois");
-		const pois = await response.json();
+		const url = poiSyncTime
+			? `/api/pois?updated_since=${encodeURIComponent(poiSyncTime)}`
+			: "/api/pois";
+		const response = await fetch(url);
+		if (!response.ok) throw new Error(`HTTP error ${response.status}`);
+		const data = await response.json();
+
+		let pois = data;
+		if (poiSyncTime) {
+			data.deleted.forEach(removeLoadedPOI);
+			pois = data.pois;
+		} else {
+			// Clear existing UI elements
+			document.getElementById("poi-list").innerHTML = "";
+			markers.forEach((marker) => map.removeLayer(marker));
+			markers.length = 0;
+			loadedPOIs.clear();
+		}
 
 		pois.forEach((poi) => {
+			removeLoadedPOI(poi.id);
 			const marker = createMarker(poi);
 			markers.push(marker);
-			addToSidebar(poi);
+			loadedPOIs.set(poi.id, { marker, item: addToSidebar(poi) });
 		});
+		poiSyncTime = response.headers.get("X-Sync-Time");
 	} catch (error) {
 		console.error("Error refreshing locations:", error);
 		showToast("Error refreshing locations!");
 	}
 }
 
+// Remove a loaded POI's marker and sidebar item
+function removeLoadedPOI(id) {
+	const loaded = loadedPOIs.get(id);
+	if (!loaded) return;
+	map.removeLayer(loaded.marker);
+	const index = markers.indexOf(loaded.marker);
+	if (index !== -1) markers.splice(index, 1);
+	loaded.item.remove();
+	loadedPOIs.delete(id);
+}
+
 // Create map marker from location data
 function createMarker(location) {
 	const minutes = location.travel_time || 10;
@@ -568,6 +635,7 @@ document.getElementById("poi-form").addEventListener("submit", function (e) {
 // Update time range display when slider changes
 document.getElementById("time-range").addEventListener("input", function () {
 	document.getElementById("time-val").textContent = this.value;
+	redrawIsochronesFromField();
 });
 
 // Handle right-click on map to show isochrones
@@ -979,19 +1047,21 @@ function captureSelectedArea() {
 			backgroundColor: null,
 		})
 			.then(function (canvas) {
-				const imageData = canvas.toDataURL("image/png");
+				// Binary PNG instead of a base64 data URL, the server streams it to disk
+				return new Promise((resolve) => canvas.toBlob(resolve, "image/png"));
+			})
+			.then(function (blob) {
+				const form = new FormData();
+				form.append(
+					"metadata",
+					JSON.stringify({ pois: selectedPOIs, bounds: corners })
+				);
+				form.append("image", blob, "screenshot.png");
 
 				// Send to server
 				fetch("/save-screenshot", {
 					method: "POST",
-					headers: {
-						"Content-Type": "application/json",
-					},
-					body: JSON.stringify({
-						imageData: imageData,
-						pois: selectedPOIs,
-						bounds: corners,
-					}),
+					body: form,
 				})
 					.then((response) => {
 						if (!response.ok) {
@@ -1261,15 +1331,9 @@ function addToSidebar(poi) {
 			});
 
 			if (response.ok) {
+				removeLoadedPOI(poi.id);
 				item.remove();
 
-				const marker = markers.find(
-					(m) =>
-						m.getLatLng().lat === poi.latitude &&
-						m.getLatLng().lng === poi.longitude
-				);
-				if (marker) map.removeLayer(marker);
-
 				showToast("Location deleted");
 			} else {
 				showToast("Failed to delete location");
@@ -1323,5 +1387,6 @@ function addToSidebar(poi) {
 	});
 
 	document.getElementById("poi-list").appendChild(item);
+	return item;
 }
 // Added js formatinh using prettier
@@ -0,0 +1,182 @@
+"""
+Local stand-in for the OpenRouteService API.
+
+Serves /v2/isochrones/<profile> and /v2/matrix/<profile> from a background
+thread so the routing code can be tested and benchmarked offline. Latency and
+failures are configurable per instance:
+
+    with StubORSServer(latency=0.05, failures=[503, 429]) as server:
+        client = RoutingClient(base_url=server.url)
+"""
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Straight-line speeds used to fake travel times, in km/h
+PROFILE_SPEEDS = {
+    'driving-car': 50.0,
+    'cycling-regular': 15.0,
+    'foot-walking': 5.0
+}
+
+
+class StubORSServer:
+    """Threaded HTTP server answering like OpenRouteService"""
+
+    def __init__(self, latency=0.0, failures=None, retry_after=None, down=False):
+        """
+        Args:
+            latency (float): Seconds to sleep before answering each request
+            failures (list): Status codes returned, in order, before requests succeed
+            retry_after (str): Retry-After header value sent with 429 responses
+            down (bool): Answer every request with 503
+        """
+        self.latency = latency
+        self.failures = list(failures or [])
+        self.retry_after = retry_after
+        self.down = down
+        self.request_count = 0
+        self.requests = []
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        stub = self
+
+        class Handler(_StubHandler):
+            server_stub = stub
+
+        self._httpd = _QuietServer(('127.0.0.1', 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def next_failure(self):
+        """Return the status code to fail the next request with, or None"""
+        with self._lock:
+            self.request_count += 1
+            if self.down:
+                return 503
+            if self.failures:
+                return self.failures.pop(0)
+            return None
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients that time out on purpose close the socket mid-response
+        pass
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep connections alive like the real API
+    disable_nagle_algorithm = True  # Headers and body are written separately
+    server_stub = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server_stub
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        with stub._lock:
+            stub.requests.append({'path': self.path, 'body': body})
+
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        failure = stub.next_failure()
+        if failure is not None:
+            headers = {}
+            if failure == 429 and stub.retry_after is not None:
+                headers['Retry-After'] = stub.retry_after
+            self._send(failure, {'error': {'code': failure, 'message': 'stubbed failure'}}, headers)
+            return
+
+        parts = self.path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'v2' or parts[2] not in PROFILE_SPEEDS:
+            self._send(404, {'error': 'not found'})
+            return
+
+        speed = PROFILE_SPEEDS[parts[2]]
+        if parts[1] == 'isochrones':
+            self._send(200, isochrones_response(body, speed))
+        elif parts[1] == 'matrix':
+            self._send(200, matrix_response(body, speed))
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def travel_seconds(a, b, speed_kmh):
+    """Equirectangular travel time in seconds between two [lng, lat] points"""
+    mean_lat = math.radians((a[1] + b[1]) / 2)
+    dx = (b[0] - a[0]) * math.cos(mean_lat)
+    dy = b[1] - a[1]
+    km = 111.32 * math.hypot(dx, dy)
+    return km / speed_kmh * 3600
+
+
+def isochrones_response(body, speed_kmh):
+    """Octagons around each location, one per range, in ascending range order"""
+    features = []
+    for group_index, (lng, lat) in enumerate(body.get('locations', [])):
+        for value in sorted(body.get('range', [])):
+            radius_deg = speed_kmh * value / 3600 / 111.32
+            ring = []
+            for k in range(8):
+                angle = 2 * math.pi * k / 8
+                ring.append([
+                    round(lng + radius_deg * math.cos(angle) / max(math.cos(math.radians(lat)), 1e-6), 6),
+                    round(lat + radius_deg * math.sin(angle), 6)
+                ])
+            ring.append(ring[0])
+            features.append({
+                'type': 'Feature',
+                'properties': {'group_index': group_index, 'value': value, 'center': [lng, lat]},
+                'geometry': {'type': 'Polygon', 'coordinates': [ring]}
+            })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def matrix_response(body, speed_kmh):
+    """Duration matrix between the requested sources and destinations"""
+    locations = body.get('locations', [])
+    sources = body.get('sources') or list(range(len(locations)))
+    destinations = body.get('destinations') or list(range(len(locations)))
+    durations = [
+        [round(travel_seconds(locations[s], locations[d], speed_kmh), 2) for d in destinations]
+        for s in sources
+    ]
+    return {'durations': durations}
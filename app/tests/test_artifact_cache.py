@@ -0,0 +1,161 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from PIL import Image
+
+from app import create_app
+from app.config import Config
+from app.services.artifact_cache import ArtifactCache, artifact_key, file_digest
+from app.services.distance_matrix import fallback_time_matrix
+from app.services.map_deformer import MapDeformer, RENDERER_VERSION, render_options
+from app.services.routing_backend import RoutingBackend
+
+BOUNDS = {'northEast': {'lat': 44.47, 'lng': 26.16}, 'southWest': {'lat': 44.39, 'lng': 26.04}}
+POIS = [{'lat': 44.41, 'lng': 26.06}, {'lat': 44.45, 'lng': 26.10}, {'lat': 44.43, 'lng': 26.14}]
+
+
+class StraightLineBackend(RoutingBackend):
+    """Straight-line times that counts matrix calls"""
+
+    name = 'straight'
+
+    def __init__(self):
+        self.calls = 0
+
+    def matrix(self, sources, destinations, travel_mode='driving-car', known=None):
+        self.calls += 1
+        return fallback_time_matrix([p['lat'] for p in sources], [p['lng'] for p in sources], travel_mode)
+
+
+class TestArtifactCache(unittest.TestCase):
+    """
+    Test suite for the content-addressed cache of rendered maps and the
+    conditional GET support of the image endpoint.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.artifact_dir = os.path.join(self.tmp_dir, 'artifacts')
+
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            ISOCHRONE_CACHE_PATH = ''
+            LAYOUT_STORE_PATH = ''
+            MATRIX_STORE_PATH = ''
+            ARTIFACT_CACHE_PATH = self.artifact_dir
+
+        self.app = create_app(TestConfig)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_key_covers_render_inputs(self):
+        """
+        Test that the key changes with every input the rendered image depends on.
+        """
+        base = artifact_key(POIS, BOUNDS, 'driving-car', 'ors', (800, 600), 1)
+        self.assertEqual(base, artifact_key([dict(p) for p in POIS], BOUNDS, 'driving-car', 'ors', (800, 600), 1))
+        variants = [
+            artifact_key(POIS[::-1], BOUNDS, 'driving-car', 'ors', (800, 600), 1),
+            artifact_key(POIS, {}, 'driving-car', 'ors', (800, 600), 1),
+            artifact_key(POIS, BOUNDS, 'foot-walking', 'ors', (800, 600), 1),
+            artifact_key(POIS, BOUNDS, 'driving-car', 'estimate', (800, 600), 1),
+            artifact_key(POIS, BOUNDS, 'driving-car', 'ors', (801, 600), 1),
+            artifact_key(POIS, BOUNDS, 'driving-car', 'ors', (800, 600), 2),
+            artifact_key(POIS, BOUNDS, 'driving-car', 'ors', (800, 600), 1, 'ab12')
+        ]
+        self.assertNotIn(base, variants)
+
+    def test_size_capped_eviction(self):
+        """
+        Test that least recently used artifacts are removed above the byte cap.
+        """
+        cache = ArtifactCache(self.artifact_dir, max_bytes=250)
+
+        def write(path):
+            with open(path, 'wb') as f:
+                f.write(b'x' * 100)
+
+        cache.put('a', write)
+        cache.put('b', write)
+        os.utime(cache.path('a'), (1, 1))
+        os.utime(cache.path('b'), (2, 2))
+        self.assertIsNotNone(cache.get('a'))  # a is now the most recently used
+        cache.put('c', write)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertLessEqual(cache.stats()['bytes'], 250)
+
+    def test_identical_request_is_not_rendered_again(self):
+        """
+        Test that the second identical deformation returns the stored artifact
+        without routing or rendering.
+        """
+        json_path = os.path.join(self.tmp_dir, 'shot.json')
+        with open(json_path, 'w') as f:
+            json.dump({'pois': POIS, 'bounds': BOUNDS}, f)
+        Image.new('RGB', (160, 120)).save(os.path.join(self.tmp_dir, 'shot.png'))
+
+        backend = StraightLineBackend()
+        with self.app.app_context():
+            first = MapDeformer(backend=backend)
+            output = first.create_time_deformed_map(json_path)
+            second = MapDeformer(backend=backend)
+            self.assertEqual(second.create_time_deformed_map(json_path), output)
+
+        self.assertFalse(first.last_cache_hit)
+        self.assertTrue(second.last_cache_hit)
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual(first.last_artifact_key, second.last_artifact_key)
+        self.assertEqual(first.last_artifact_key,
+                         artifact_key(POIS, BOUNDS, 'driving-car', 'straight', (160, 120), RENDERER_VERSION,
+                                      file_digest(os.path.join(self.tmp_dir, 'shot.png')),
+                                      render_options(self.app.config)))
+        with Image.open(output) as image:
+            self.assertEqual(image.size, (160 * 2 + 50, 120))
+
+        # Same size, different pixels: rendered again
+        Image.new('RGB', (160, 120), (200, 220, 200)).save(os.path.join(self.tmp_dir, 'shot.png'))
+        with self.app.app_context():
+            third = MapDeformer(backend=backend)
+            third.create_time_deformed_map(json_path)
+        self.assertFalse(third.last_cache_hit)
+
+        # Other warp settings: rendered again
+        self.app.config['MAP_WARP_SMOOTHING'] = 0.5
+        with self.app.app_context():
+            fourth = MapDeformer(backend=backend)
+            fourth.create_time_deformed_map(json_path)
+        self.assertFalse(fourth.last_cache_hit)
+        self.assertNotEqual(fourth.last_artifact_key, third.last_artifact_key)
+
+    def test_conditional_get(self):
+        """
+        Test ETag and Last-Modified revalidation of a served artifact.
+        """
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        key = 'f' * 64
+        Image.new('RGB', (4, 4)).save(os.path.join(self.artifact_dir, key + '.png'))
+
+        client = self.app.test_client()
+        response = client.get(f'/api/map-image/{key}.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(key, response.headers['ETag'])
+        self.assertIn('immutable', response.headers['Cache-Control'])
+
+        revalidated = client.get(f'/api/map-image/{key}.png', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        since = client.get(f'/api/map-image/{key}.png',
+                           headers={'If-Modified-Since': response.headers['Last-Modified']})
+        self.assertEqual(since.status_code, 304)
+        self.assertEqual(client.get('/api/map-image/..%2Fconfig.py').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
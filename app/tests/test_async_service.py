@@ -0,0 +1,240 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app import create_app, db
+from app.asgi import AsgiApp
+from app.config import Config
+from app.models.poi import PointOfInterest
+from app.services.matrix_engine import MatrixEngine
+from app.services.single_flight import AsyncSingleFlight
+from app.services.travel_time_service import get_isochrones_async, get_travel_times_async
+from app.tests.stub_ors import StubORSServer
+
+
+async def asgi_request(application, path, query='', method='GET', chunks=(), headers=()):
+    """
+    (status, headers, body, request chunks received, response body messages) of
+    a request sent straight to an ASGI callable.
+
+    The request body is sent as the given chunks.
+    """
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+             'headers': [(b'host', b'localhost')] + list(headers), 'server': ('localhost', 80),
+             'http_version': '1.1'}
+    chunks = list(chunks) or [b'']
+    received = []
+    messages = []
+
+    async def receive():
+        received.append(chunks[len(received)])
+        return {'type': 'http.request', 'body': received[-1], 'more_body': len(received) < len(chunks)}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return messages[0]['status'], dict(messages[0]['headers']), body, len(received), len(messages) - 1
+
+
+async def asgi_get(application, path, query=''):
+    """(status, headers, body) of a GET request sent straight to an ASGI callable"""
+    return (await asgi_request(application, path, query))[:3]
+
+
+class TestAsyncService(unittest.TestCase):
+    """
+    Test suite for the asyncio service layer: concurrent tile and origin
+    fan-out, async single-flight and the ASGI entry point.
+    """
+
+    def setUp(self):
+        self.server = StubORSServer(latency=0.2).start()
+        server_url = self.server.url
+
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            ORS_BASE_URL = server_url
+            TRAVEL_TIME_API_KEY = 'test-key'
+            ISOCHRONE_CACHE_ENABLED = False
+            ISOCHRONE_CACHE_PATH = ''
+            RATE_LIMIT_ENABLED = False
+            RATE_LIMIT_PATH = ''
+            MATRIX_MAX_LOCATIONS = 6
+
+        self.app = create_app(TestConfig)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def run_in_app(self, coroutine):
+        with self.app.app_context():
+            return asyncio.run(coroutine)
+
+    def test_matrix_tiles_are_awaited_concurrently(self):
+        """
+        Test that compute_async awaits at most max_workers tiles at once and
+        assembles the same matrix as compute.
+        """
+        points = [(45.7 + i * 0.01, 21.2) for i in range(12)]
+        fetch = lambda sources, destinations: [[abs(s[1] - d[1]) for d in destinations] for s in sources]
+        in_flight = []
+
+        async def fetch_async(sources, destinations):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.05)
+            in_flight.pop()
+            return fetch(sources, destinations)
+
+        peak = []
+        engine = MatrixEngine(max_locations=6, max_workers=3)
+        matrix = asyncio.run(engine.compute_async(points, points, fetch_async))
+        np.testing.assert_array_equal(matrix, engine.compute(points, points, fetch))
+        self.assertEqual(max(peak), 3)
+
+    def test_origins_and_tiles_fan_out_in_one_loop(self):
+        """
+        Test that isochrones for several origins and a multi-tile matrix each
+        take about one upstream round trip on a single event loop.
+        """
+        async def many_origins():
+            return await asyncio.gather(*(get_isochrones_async(45.7 + i * 0.01, 21.2, [5]) for i in range(6)))
+
+        started = time.perf_counter()
+        results = self.run_in_app(many_origins())
+        self.assertLess(time.perf_counter() - started, 0.6)
+        self.assertTrue(all(len(result['features']) == 1 for result in results))
+
+        destinations = [{'lat': 45.7 + i * 0.01, 'lng': 21.21} for i in range(12)]
+        requests_before = self.server.request_count
+        started = time.perf_counter()
+        times = self.run_in_app(get_travel_times_async(45.7, 21.2, destinations))
+        self.assertLess(time.perf_counter() - started, 0.6)
+        self.assertGreater(self.server.request_count - requests_before, 1)
+        self.assertEqual(len(times['results']), 12)
+
+    def test_slow_cache_does_not_block_the_loop(self):
+        """
+        Test that blocking cache lookups run off the event loop, so concurrent
+        requests wait for a slow cache side by side rather than in turn.
+        """
+        def slow_lookup(*args):
+            time.sleep(0.3)
+            return None
+
+        async def many_origins():
+            return await asyncio.gather(*(get_isochrones_async(45.7 + i * 0.01, 21.2, [5]) for i in range(4)))
+
+        started = time.perf_counter()
+        with mock.patch('app.services.travel_time_service._cached_isochrones', side_effect=slow_lookup):
+            results = self.run_in_app(many_origins())
+        self.assertLess(time.perf_counter() - started, 0.9)
+        self.assertTrue(all(len(result['features']) == 1 for result in results))
+
+    def test_async_single_flight_shares_one_call(self):
+        """
+        Test that coroutines awaiting the same key share one call and its error.
+        """
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            if value == 'fail':
+                raise ValueError(value)
+            return value
+
+        async def main():
+            ok = await asyncio.gather(*(flight.do('ok', slow, 'ok') for _ in range(5)))
+            failed = await asyncio.gather(*(flight.do('fail', slow, 'fail') for _ in range(5)),
+                                          return_exceptions=True)
+            return ok, failed
+
+        ok, failed = asyncio.run(main())
+        self.assertEqual(ok, ['ok'] * 5)
+        self.assertTrue(all(isinstance(error, ValueError) for error in failed))
+        self.assertEqual(calls, ['ok', 'fail'])
+        self.assertEqual(flight.stats(), {'calls': 2, 'shared': 8, 'in_flight': 0})
+
+    def test_asgi_serves_async_and_sync_views(self):
+        """
+        Test that the ASGI entry point answers concurrent async requests in
+        about one round trip and still serves synchronous views and errors.
+        """
+        application = AsgiApp(self.app)
+
+        async def main():
+            return await asyncio.gather(*(
+                asgi_get(application, '/api/isochrones', f'origin_lat={45.7 + i * 0.01}&origin_lng=21.2&times=5')
+                for i in range(8)
+            ))
+
+        started = time.perf_counter()
+        responses = asyncio.run(main())
+        self.assertLess(time.perf_counter() - started, 0.8)
+        for status, headers, body in responses:
+            self.assertEqual(status, 200)
+            self.assertEqual(headers[b'content-type'], b'application/json')
+            self.assertEqual(len(json.loads(body)['features']), 1)
+
+        status, _, body = asyncio.run(asgi_get(application, '/api/isochrones/cache'))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {'enabled': False})
+        self.assertEqual(asyncio.run(asgi_get(application, '/api/isochrones'))[0], 400)
+        self.assertEqual(asyncio.run(asgi_get(application, '/api/missing'))[0], 404)
+
+    def test_asgi_refuses_oversized_bodies(self):
+        """
+        Test that request bodies beyond the limit are refused with 413 without
+        being read to the end, whether declared up front or not.
+        """
+        application = AsgiApp(self.app, max_body_bytes=1000)
+        chunks = [b'x' * 400] * 10
+        status, _, body, received, _ = asyncio.run(asgi_request(application, '/api/pois/bulk', method='POST',
+                                                             chunks=chunks))
+        self.assertEqual((status, received), (413, 3))
+        self.assertIn('1000 bytes', json.loads(body)['error'])
+
+        status, _, _, received, _ = asyncio.run(asgi_request(application, '/api/pois/bulk', method='POST',
+                                                          chunks=chunks, headers=[(b'content-length', b'4000')]))
+        self.assertEqual((status, received), (413, 0))
+
+        batch = json.dumps({'origins': [{'lat': 45.7, 'lng': 21.2}], 'times': [5]}).encode()
+        status, _, body, _, _ = asyncio.run(asgi_request(application, '/api/isochrones/batch', method='POST',
+                                                      chunks=[batch[:20], batch[20:]],
+                                                      headers=[(b'content-type', b'application/json')]))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['errors'], {})
+        self.assertEqual(AsgiApp(self.app).max_body_bytes, self.app.config['SCREENSHOT_MAX_BYTES'] * 4 // 3
+                         + self.app.config['SCREENSHOT_MAX_METADATA_BYTES'])
+
+
+    def test_asgi_streams_sync_responses(self):
+        """
+        Test that a streamed export reaches the client chunk by chunk rather
+        than as one buffered body.
+        """
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all(PointOfInterest(name=f'poi {i}', latitude=45.7 + i * 0.001, longitude=21.2)
+                               for i in range(50))
+            db.session.commit()
+
+        status, headers, body, _, messages = asyncio.run(
+            asgi_request(AsgiApp(self.app), '/api/pois/export', 'format=ndjson&fields=id,name'))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'application/x-ndjson')
+        self.assertEqual([json.loads(line)['id'] for line in body.decode().splitlines()], list(range(1, 51)))
+        self.assertGreater(messages, 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text
+
+from app import create_app, db
+from app.config import Config
+from app.database import engine_options
+
+
+class TestDatabase(unittest.TestCase):
+    """
+    Test suite for the engine settings create_app derives from Config:
+    SQLite pragmas on connect and pool options for server databases.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp_dir.name, 'test.db')
+
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+            SQLITE_CACHE_SIZE_KB = 8192
+
+        self.config_class = TestConfig
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def pragmas(self, config_class):
+        app = create_app(config_class)
+        with app.app_context():
+            values = {name: db.session.execute(text(f'PRAGMA {name}')).scalar()
+                      for name in ('journal_mode', 'synchronous', 'cache_size', 'busy_timeout')}
+            db.session.remove()
+            db.engine.dispose()
+        return values
+
+    def test_sqlite_pragmas(self):
+        """
+        Test that every connection to a SQLite file runs in WAL mode with the configured pragmas.
+        """
+        self.assertEqual(self.pragmas(self.config_class), {
+            'journal_mode': 'wal', 'synchronous': 1, 'cache_size': -8192, 'busy_timeout': 5000
+        })
+
+    def test_sqlite_tuning_disabled(self):
+        """
+        Test that SQLITE_TUNING=False leaves SQLite's defaults alone.
+        """
+        class UntunedConfig(self.config_class):
+            SQLITE_TUNING = False
+
+        values = self.pragmas(UntunedConfig)
+        self.assertEqual((values['journal_mode'], values['synchronous']), ('delete', 2))
+
+    def test_server_pool_options(self):
+        """
+        Test that server databases get pool options and explicit engine options win.
+        """
+        config = {'SQLALCHEMY_DATABASE_URI': 'postgresql://localhost/app', 'DB_POOL_SIZE': 4,
+                  'SQLALCHEMY_ENGINE_OPTIONS': {'pool_recycle': 60}}
+        options = engine_options(config)
+        self.assertEqual((options['pool_size'], options['pool_recycle'], options['pool_pre_ping']), (4, 60, True))
+        self.assertNotIn('pool_size', engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
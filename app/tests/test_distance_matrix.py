@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+
+from app.services.distance_matrix import (
+    equirectangular_matrix, fallback_time_matrix, haversine_matrix, haversine_meters
+)
+from app.services.map_deformer import MapDeformer
+
+
+class TestDistanceMatrix(unittest.TestCase):
+    """
+    Test suite for the vectorized straight-line distance and time matrices.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.lats = rng.uniform(44.35, 44.50, 40)
+        self.lngs = rng.uniform(26.00, 26.20, 40)
+
+    def test_matrices_match_pairwise_haversine(self):
+        """
+        Test both approximations against the pairwise great-circle distance.
+        """
+        expected = haversine_meters(self.lats[:, None], self.lngs[:, None], self.lats[None, :], self.lngs[None, :])
+
+        np.testing.assert_allclose(haversine_matrix(self.lats, self.lngs), expected, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(equirectangular_matrix(self.lats, self.lngs), expected, rtol=1e-3, atol=1e-3)
+        self.assertTrue(np.all(np.diag(haversine_matrix(self.lats, self.lngs)) == 0))
+
+    def test_chunked_and_float32_agree(self):
+        """
+        Test that chunking does not change the result and float32 stays within a second.
+        """
+        full = fallback_time_matrix(self.lats, self.lngs)
+        chunked = fallback_time_matrix(self.lats, self.lngs, chunk_size=7)
+        single = fallback_time_matrix(self.lats, self.lngs, dtype=np.float32, chunk_size=7)
+
+        np.testing.assert_allclose(chunked, full)
+        self.assertEqual(single.dtype, np.float32)
+        np.testing.assert_allclose(single, full, atol=1.0)
+
+    def test_speed_profiles(self):
+        """
+        Test that travel modes use their own speeds and unknown modes drive.
+        """
+        driving = fallback_time_matrix(self.lats, self.lngs, 'driving-car')
+        walking = fallback_time_matrix(self.lats, self.lngs, 'foot-walking')
+        custom = fallback_time_matrix(self.lats, self.lngs, 'foot-walking', speeds={'foot-walking': 4.0})
+
+        np.testing.assert_allclose(walking, driving * 10)
+        np.testing.assert_allclose(custom, walking * 5 / 4)
+        np.testing.assert_allclose(fallback_time_matrix(self.lats, self.lngs, 'unknown'), driving)
+
+    def test_map_deformer_fallback(self):
+        """
+        Test the deformer's fallback: 1.11 km due north at 50 km/h is about 80 s.
+        """
+        pois = [{'lat': 44.40, 'lng': 26.10}, {'lat': 44.41, 'lng': 26.10}]
+        matrix = MapDeformer().create_fallback_time_matrix(pois)
+
+        self.assertEqual(matrix.shape, (2, 2))
+        self.assertAlmostEqual(matrix[0, 1], 1111.95 * 3.6 / 50, delta=0.5)
+        self.assertEqual(matrix[0, 1], matrix[1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import gzip
+import io
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app import create_app, db
+from app.config import Config
+from app.models.poi import PointOfInterest
+from app.services.encoding import decode_polyline, encode_isochrones, encode_polyline
+
+
+class TestEncoding(unittest.TestCase):
+    """
+    Test suite for the compact response encodings: polyline isochrone rings,
+    .npy matrices and gzip compression of large responses.
+    """
+
+    def setUp(self):
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            RESPONSE_COMPRESSION_MIN_BYTES = 256
+
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        for i in range(30):
+            db.session.add(PointOfInterest(name=f'poi {i}', latitude=45.7 + i / 100, longitude=21.2))
+        db.session.commit()
+
+        self.backend = mock.Mock()
+        self.backend.matrix.side_effect = lambda sources, destinations, mode: np.array(
+            [[abs(a['lat'] - b['lat']) * 1e4 if a != b else 0.0 for b in destinations] for a in sources])
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_polyline_round_trip(self):
+        """
+        Test the reference polyline from the format description and a round trip.
+        """
+        coordinates = [[-120.2, 38.5], [-120.95, 40.7], [-126.453, 43.252]]
+        self.assertEqual(encode_polyline(coordinates), '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+        np.testing.assert_allclose(decode_polyline(encode_polyline(coordinates)), coordinates)
+
+        ring = [[21.123456, 45.1], [21.2, 45.2], [21.1, 45.25], [21.123456, 45.1]]
+        collection = {'type': 'FeatureCollection', 'features': [
+            {'type': 'Feature', 'properties': {}, 'geometry': {'type': 'Polygon', 'coordinates': [ring]}}
+        ]}
+        geometry = encode_isochrones(collection, precision=6)['features'][0]['geometry']
+        self.assertEqual(geometry['encoding'], 'polyline6')
+        np.testing.assert_allclose(decode_polyline(geometry['coordinates'][0], precision=6), ring)
+
+    def test_matrix_formats(self):
+        """
+        Test that the matrix endpoint returns the same values as JSON and as .npy.
+        """
+        with mock.patch('app.services.routing_backend.get_routing_backend', return_value=self.backend):
+            as_json = self.client.get('/api/matrix?ids=3,1,2').get_json()
+            as_npy = self.client.get('/api/matrix?ids=3,1,2', headers={'Accept': 'application/x-npy'})
+            missing = self.client.get('/api/matrix?ids=1,999')
+
+        self.assertEqual(as_json['ids'], [3, 1, 2])
+        self.assertEqual(as_npy.mimetype, 'application/x-npy')
+        self.assertEqual(as_npy.headers['X-Poi-Ids'], '3,1,2')
+        matrix = np.load(io.BytesIO(as_npy.get_data()))
+        self.assertEqual(matrix.dtype, np.dtype('<f4'))
+        np.testing.assert_allclose(matrix, as_json['durations'], rtol=1e-6)
+        self.assertEqual(missing.status_code, 404)
+
+    def test_large_responses_are_compressed(self):
+        """
+        Test that large responses are gzipped only for clients that accept it.
+        """
+        with mock.patch('app.services.routing_backend.get_routing_backend', return_value=self.backend):
+            plain = self.client.get('/api/matrix')
+            compressed = self.client.get('/api/matrix', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed.headers['Vary'])
+        self.assertLess(len(compressed.get_data()), len(plain.get_data()))
+        self.assertEqual(gzip.decompress(compressed.get_data()), plain.get_data())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import math
+import threading
+import time
+import unittest
+from unittest import mock
+
+from app import create_app, db
+from app.config import Config
+from app.models.poi import PointOfInterest
+from app.services.routing_backend import ORSBackend
+from app.services.single_flight import SingleFlight
+from app.services.travel_time_service import get_isochrones
+from app.tests.stub_ors import StubORSServer
+
+
+class TestIsochroneBatch(unittest.TestCase):
+    """
+    Test suite for multi-origin isochrones: deduplicated origins packed into
+    upstream batches, and single-flight coalescing of identical requests.
+    """
+
+    def setUp(self):
+        self.server = StubORSServer().start()
+        server_url = self.server.url
+
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            ORS_BASE_URL = server_url
+            TRAVEL_TIME_API_KEY = 'test-key'
+            ISOCHRONE_CACHE_PATH = ''
+            RATE_LIMIT_PATH = ''
+
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            poi = PointOfInterest(name='depot', latitude=45.70, longitude=21.20)
+            db.session.add(poi)
+            db.session.commit()
+            self.poi_id = poi.id
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_origins_are_deduplicated_and_packed(self):
+        """
+        Test that duplicate origins, POIs included, are routed once, in batches
+        of the upstream limit, that every origin gets its own features and that
+        a repeat is answered from the cache.
+        """
+        origins = [{'id': f'depot-{i}', 'lat': 45.70 + (i % 9) * 0.01, 'lng': 21.20} for i in range(12)]
+        body = {'origins': origins, 'poi_ids': [self.poi_id], 'times': [5, 10]}
+        response = self.client.post('/api/isochrones/batch', json=body)
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['errors'], {})
+        self.assertEqual(self.server.request_count, math.ceil(9 / 5))
+        self.assertEqual(max(len(r['body']['locations']) for r in self.server.requests), 5)
+
+        by_origin = {}
+        for feature in data['features']:
+            by_origin.setdefault(feature['properties']['origin_id'], []).append(feature)
+        self.assertEqual(sorted(by_origin), sorted([origin['id'] for origin in origins] + [f'poi:{self.poi_id}']))
+        for origin in origins:
+            features = by_origin[origin['id']]
+            self.assertEqual([f['properties']['time_minutes'] for f in features], [5, 10])
+            self.assertAlmostEqual(features[0]['properties']['center'][1], origin['lat'], places=6)
+
+        self.client.post('/api/isochrones/batch', json=body)
+        self.assertEqual(self.server.request_count, 2)
+
+    def test_failed_batches_are_reported_per_origin(self):
+        """
+        Test that an upstream failure is listed under the origins of its batch only.
+        """
+        self.server.failures = [500]
+        self.app.config['ISOCHRONE_BATCH_WORKERS'] = 1
+        origins = [{'id': i, 'lat': 45.7 + i * 0.01, 'lng': 21.2} for i in range(7)]
+        data = self.client.post('/api/isochrones/batch', json={'origins': origins, 'times': [5]}).get_json()
+        self.assertEqual(sorted(data['errors']), ['0', '1', '2', '3', '4'])
+        self.assertEqual(sorted({f['properties']['origin_id'] for f in data['features']}), [5, 6])
+
+    def test_short_batch_responses_are_reported_per_origin(self):
+        """
+        Test that origins missing from a batch response are listed as errors
+        while the others are still answered.
+        """
+        split = ORSBackend._split_groups
+        drop_last = lambda response, count: split(response, count)[:-1]
+        origins = [{'id': i, 'lat': 45.7 + i * 0.01, 'lng': 21.2} for i in range(7)]
+        with mock.patch.object(ORSBackend, '_split_groups', side_effect=drop_last):
+            response = self.client.post('/api/isochrones/batch', json={'origins': origins, 'times': [5]})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(sorted(data['errors']), ['4', '6'])
+        self.assertEqual(sorted({f['properties']['origin_id'] for f in data['features']}), [0, 1, 2, 3, 5])
+
+    def test_invalid_batches_are_rejected(self):
+        """
+        Test that malformed origins, unknown POIs and oversized batches get an error status.
+        """
+        self.app.config['ISOCHRONE_BATCH_MAX_ORIGINS'] = 2
+        for body, status in (({}, 400), ({'origins': [{'lat': 45.7}]}, 400), ({'poi_ids': [12345]}, 404),
+                             ({'origins': [{'lat': 45.7, 'lng': 21.2}] * 3}, 400),
+                             ({'origins': [{'lat': 45.7, 'lng': 21.2}], 'times': [0]}, 400)):
+            self.assertEqual(self.client.post('/api/isochrones/batch', json=body).status_code, status)
+        self.assertEqual(self.server.request_count, 0)
+
+    def test_single_flight_shares_results_and_errors(self):
+        """
+        Test that concurrent calls with the same key run the function once and
+        all receive its result or its exception.
+        """
+        flight = SingleFlight()
+        calls = []
+
+        def slow(value):
+            calls.append(value)
+            time.sleep(0.1)
+            if value == 'fail':
+                raise ValueError('upstream down')
+            return value
+
+        for value in ('ok', 'fail'):
+            results = []
+
+            def call():
+                try:
+                    results.append(flight.do(value, slow, value))
+                except ValueError as e:
+                    results.append(str(e))
+
+            threads = [threading.Thread(target=call) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            expected = 'upstream down' if value == 'fail' else 'ok'
+            self.assertEqual(results, [expected] * 8)
+        self.assertEqual(calls, ['ok', 'fail'])
+        self.assertEqual(flight.stats(), {'calls': 2, 'shared': 14, 'in_flight': 0})
+
+    def test_concurrent_requests_share_one_upstream_call(self):
+        """
+        Test that identical isochrone requests arriving together reach the upstream once.
+        """
+        self.server.latency = 0.2
+        self.app.config['ISOCHRONE_CACHE_ENABLED'] = False
+        results = []
+
+        def call():
+            with self.app.app_context():
+                results.append(get_isochrones(45.75, 21.23, [5, 10]))
+
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.server.request_count, 1)
+        self.assertTrue(all(len(result['features']) == 2 for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,260 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app import create_app
+from app.config import Config
+from app.services.isochrone_cache import IsochroneCache
+from app.services.routing_client import RoutingClient
+from app.services.travel_time_service import get_isochrones, simplify_isochrones
+
+
+class TestIsochroneCache(unittest.TestCase):
+    """
+    Test suite for the IsochroneCache class.
+
+    These tests verify key quantization, the in-process LRU layer, the SQLite
+    layer that survives a restart, per-entry expiry and the hit/miss counters.
+    """
+
+    def setUp(self):
+        """
+        Set up a temporary directory holding the SQLite file for each test.
+        """
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'cache.sqlite')
+        self.feature_collection = {
+            "type": "FeatureCollection",
+            "features": [{"type": "Feature", "properties": {"value": 300}, "geometry": None}]
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_key_quantization(self):
+        """
+        Test that nearby origins and reordered ranges share a key.
+
+        Origins that differ below the configured precision and range lists in a
+        different order must map to the same key, while another mode must not.
+        """
+        cache = IsochroneCache(precision=3)
+        key = cache.make_key(44.42681, 26.10249, 'driving-car', [10, 5])
+
+        self.assertEqual(key, cache.make_key(44.4268, 26.1025, 'driving-car', [5, 10]))
+        self.assertNotEqual(key, cache.make_key(44.4268, 26.1025, 'foot-walking', [5, 10]))
+
+    def test_disk_layer_survives_restart(self):
+        """
+        Test that entries written by one instance are read by the next one.
+
+        The second instance starts with an empty memory layer, so the first lookup
+        must be served from SQLite and counted as a disk hit.
+        """
+        IsochroneCache(db_path=self.db_path).set('k', self.feature_collection)
+
+        restarted = IsochroneCache(db_path=self.db_path)
+        self.assertEqual(restarted.get('k'), self.feature_collection)
+        self.assertEqual(restarted.stats()['disk_hits'], 1)
+
+        # The disk hit promoted the entry into memory
+        restarted.get('k')
+        self.assertEqual(restarted.stats()['memory_hits'], 1)
+
+    def test_ttl_expiry(self):
+        """
+        Test that expired entries are treated as misses in both layers.
+        """
+        cache = IsochroneCache(db_path=self.db_path)
+        cache.set('k', self.feature_collection, ttl=60)
+
+        with mock.patch('app.services.isochrone_cache.time.time', return_value=time.time() + 120):
+            self.assertIsNone(cache.get('k'))
+
+        stats = cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['disk_entries'], 0)
+
+    def test_size_bounded_eviction(self):
+        """
+        Test that both layers evict the least recently used entries.
+
+        With room for two entries in memory and three on disk, reading 'a' before
+        inserting more keys must keep 'a' and evict 'b' first.
+        """
+        cache = IsochroneCache(db_path=self.db_path, max_memory_entries=2, max_disk_entries=3)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        stats = cache.stats()
+        self.assertEqual(stats['memory_entries'], 2)
+        self.assertEqual(cache.get('a'), 1)
+
+        # 'a' was touched on disk too, so it outlives 'b' there
+        cache.clear()
+        cache = IsochroneCache(db_path=self.db_path, max_memory_entries=2, max_disk_entries=2)
+        cache.set('a', 1)
+        time.sleep(0.01)
+        cache.set('b', 2)
+        time.sleep(0.01)
+        IsochroneCache(db_path=self.db_path).get('a')
+        time.sleep(0.01)
+        cache.set('c', 3)
+
+        fresh = IsochroneCache(db_path=self.db_path)
+        self.assertEqual(fresh.get('a'), 1)
+        self.assertIsNone(fresh.get('b'))
+        self.assertEqual(fresh.stats()['disk_entries'], 2)
+
+
+class TestGetIsochronesCaching(unittest.TestCase):
+    """
+    Test suite for the cache in front of get_isochrones.
+
+    The routing client's POST is patched out so the tests can count how
+    often OpenRouteService would have been called.
+    """
+
+    def setUp(self):
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            TRAVEL_TIME_API_KEY = 'test-key'
+            ISOCHRONE_CACHE_PATH = ''
+
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    def test_repeated_request_served_from_cache(self):
+        """
+        Test that a repeated request does not call the upstream API again.
+
+        The second call lists the ranges in a different order and must still be
+        decorated with colors and minutes matching the ascending ranges.
+        """
+        upstream = mock.Mock(status_code=200)
+        upstream.json.return_value = {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "properties": {"value": 300}, "geometry": None},
+                {"type": "Feature", "properties": {"value": 600}, "geometry": None}
+            ]
+        }
+
+        with mock.patch.object(RoutingClient, 'post', return_value=upstream) as post:
+            first = get_isochrones(44.4268, 26.1025, [5, 10])
+            second = get_isochrones(44.4268, 26.1025, [10, 5])
+
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual([f['properties']['time_minutes'] for f in second['features']], [5, 10])
+        # Decoration must not leak into the cached entry
+        self.assertNotIn('color', upstream.json.return_value['features'][0]['properties'])
+
+    def test_stats_endpoint(self):
+        """
+        Test that /api/isochrones/cache reports the counters, and only that the
+        cache is off when it is disabled, without creating it.
+        """
+        client = self.app.test_client()
+        stats = client.get('/api/isochrones/cache').get_json()
+        self.assertTrue(stats['enabled'])
+        self.assertIn('hit_rate', stats)
+
+        self.app.config['ISOCHRONE_CACHE_ENABLED'] = False
+        self.app.extensions.pop('isochrone_cache', None)
+        self.assertEqual(client.get('/api/isochrones/cache').get_json(), {'enabled': False})
+        self.assertNotIn('isochrone_cache', self.app.extensions)
+
+    def test_zoom_simplifies_and_caches_per_zoom(self):
+        """
+        Test that a zoom level simplifies the polygons and is cached per zoom.
+
+        The full geometry is fetched once and reused for the second zoom level,
+        and a request without zoom still gets every upstream vertex.
+        """
+        upstream = mock.Mock(status_code=200)
+        upstream.json.return_value = circle_collection(44.4268, 26.1025, 0.05, 2000)
+
+        with mock.patch.object(RoutingClient, 'post', return_value=upstream) as post:
+            coarse = get_isochrones(44.4268, 26.1025, [5], zoom=10)
+            fine = get_isochrones(44.4268, 26.1025, [5], zoom=16)
+            full = get_isochrones(44.4268, 26.1025, [5])
+            self.assertEqual(get_isochrones(44.4268, 26.1025, [5], zoom=10), coarse)
+
+        self.assertEqual(post.call_count, 1)
+        sizes = [len(result['features'][0]['geometry']['coordinates'][0]) for result in (coarse, fine, full)]
+        self.assertLess(sizes[0], sizes[1])
+        self.assertLess(sizes[1], sizes[2])
+        self.assertEqual(sizes[2], 2001)
+        self.assertEqual(coarse['features'][0]['properties']['time_minutes'], 5)
+
+
+class TestIsochroneSimplification(unittest.TestCase):
+    """
+    Test suite for zoom-aware isochrone simplification.
+    """
+
+    def test_outline_stays_within_tolerance(self):
+        """
+        Test that the simplified ring is a closed subset of the original within half a pixel.
+
+        At zoom 12 around 45 degrees north a pixel is about 27 m, so the kept
+        vertices of a 5 km circle must all lie within ~14 m of the true radius
+        and use no more than four decimals.
+        """
+        collection = circle_collection(45.0, 21.0, 0.045, 5000, hole_radius=0.00005)
+        result = simplify_isochrones(collection, 12)
+        rings = result['features'][0]['geometry']['coordinates']
+
+        # The hole is far below a pixel and is dropped, the outline is kept and closed
+        self.assertEqual(len(rings), 1)
+        ring = np.asarray(rings[0])
+        self.assertEqual(ring[0].tolist(), ring[-1].tolist())
+        self.assertLess(len(ring), 200)
+        self.assertTrue(np.all(np.round(ring, 4) == ring))
+
+        dx = (ring[:, 0] - 21.0) * np.cos(np.radians(45.0)) * 111320
+        dy = (ring[:, 1] - 45.0) * 111320
+        radius = np.hypot(dx, dy)
+        self.assertLess(np.abs(radius - radius.mean()).max(), 20)
+
+        # The input collection is untouched
+        self.assertEqual(len(collection['features'][0]['geometry']['coordinates'][0]), 5001)
+
+
+def circle_collection(lat, lng, radius_deg, vertices, hole_radius=None):
+    """FeatureCollection with one circular polygon, optionally with a tiny hole at its center"""
+    def ring(radius, clockwise=False):
+        angles = np.linspace(0, 2 * np.pi, vertices + 1)
+        if clockwise:
+            angles = angles[::-1]
+        lngs = lng + radius * np.cos(angles) / np.cos(np.radians(lat))
+        lats = lat + radius * np.sin(angles)
+        coords = np.column_stack([lngs, lats]).round(6)
+        coords[-1] = coords[0]
+        return coords.tolist()
+
+    coordinates = [ring(radius_deg)]
+    if hole_radius:
+        coordinates.append(ring(hole_radius, clockwise=True))
+    return {
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "properties": {"value": 300},
+                      "geometry": {"type": "Polygon", "coordinates": coordinates}}]
+    }
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from flask import current_app
+
+from app import create_app
+from app.config import Config
+from app.services.job_queue import DONE, FAILED, JobQueue, JobStore, QueueFullError
+
+release = threading.Event()
+
+
+def wait_for_release(value):
+    release.wait(5)
+    return {'value': value}
+
+
+def fail(message):
+    raise RuntimeError(message)
+
+
+def app_setting(name):
+    return {'value': current_app.config[name]}
+
+
+def process_id():
+    return {'pid': os.getpid()}
+
+
+def crash():
+    os._exit(1)
+
+
+class TestJobQueue(unittest.TestCase):
+    """
+    Test suite for the deform job queue: deduplication of in-flight jobs, the
+    pending limit, status records and the process pool.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        release.clear()
+
+    def tearDown(self):
+        release.set()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def wait(self, queue, job_id, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = queue.get(job_id)
+            if job['status'] in (DONE, FAILED):
+                return job
+            time.sleep(0.02)
+        self.fail(f"job {job_id} did not finish")
+
+    def test_identical_jobs_are_deduplicated(self):
+        """
+        Test that a second submission with the same key joins the running job.
+        """
+        queue = JobQueue(JobStore(), max_workers=1, use_processes=False)
+        first, created = queue.submit('shot-1', wait_for_release, 1)
+        second, created_again = queue.submit('shot-1', wait_for_release, 2)
+        other, _ = queue.submit('shot-2', wait_for_release, 3)
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(first['id'], second['id'])
+        self.assertNotEqual(first['id'], other['id'])
+
+        release.set()
+        self.assertEqual(self.wait(queue, first['id'])['result'], {'value': 1})
+        self.assertEqual(self.wait(queue, other['id'])['result'], {'value': 3})
+
+        # Once finished the same key starts a fresh job
+        again, created = queue.submit('shot-1', wait_for_release, 4)
+        self.assertTrue(created)
+        self.assertEqual(self.wait(queue, again['id'])['result'], {'value': 4})
+        queue.shutdown()
+
+    def test_pending_limit_and_failures(self):
+        """
+        Test that submissions beyond max_pending are refused and errors are recorded.
+        """
+        queue = JobQueue(JobStore(), max_workers=1, max_pending=2, use_processes=False)
+        queue.submit('a', wait_for_release, 1)
+        queue.submit('b', wait_for_release, 2)
+        with self.assertRaises(QueueFullError):
+            queue.submit('c', wait_for_release, 3)
+        release.set()
+        queue.shutdown()
+
+        failed, _ = queue.submit('d', fail, 'no route')
+        job = self.wait(queue, failed['id'])
+        self.assertEqual(job['status'], FAILED)
+        self.assertEqual(job['error'], 'no route')
+        queue.shutdown()
+
+    def test_status_shared_through_sqlite(self):
+        """
+        Test that another store on the same file sees the job and its result,
+        as a different request worker would.
+        """
+        db_path = os.path.join(self.tmp_dir, 'jobs.sqlite')
+        queue = JobQueue(JobStore(db_path), use_processes=False)
+
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            DEFORM_JOB_MARKER = 'from-app'
+
+        with create_app(TestConfig).app_context():
+            job, _ = queue.submit('cfg', app_setting, 'DEFORM_JOB_MARKER')
+        self.wait(queue, job['id'])
+
+        other = JobStore(db_path)
+        self.assertEqual(other.get(job['id'])['result'], {'value': 'from-app'})
+        self.assertEqual(other.create('cfg')[1], True)
+        queue.shutdown()
+
+    def test_deduplication_across_stores(self):
+        """
+        Test that stores on the same file racing to create one key, as request
+        workers would, end up with a single job.
+        """
+        db_path = os.path.join(self.tmp_dir, 'jobs.sqlite')
+        stores = [JobStore(db_path) for _ in range(8)]
+        start = threading.Barrier(len(stores))
+        results = []
+
+        def create(store):
+            start.wait()
+            results.append(store.create('shared'))
+
+        in_flight = JobStore._in_flight
+
+        def slow_in_flight(store, key):
+            # Widen the gap between the check and the insert
+            found = in_flight(store, key)
+            time.sleep(0.05)
+            return found
+
+        threads = [threading.Thread(target=create, args=(store,)) for store in stores]
+        with mock.patch.object(JobStore, '_in_flight', slow_in_flight):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sum(created for _, created in results), 1)
+        self.assertEqual(len({job['id'] for job, _ in results}), 1)
+
+    def test_process_pool(self):
+        """
+        Test that jobs run in worker processes that build their own application.
+        """
+        db_path = os.path.join(self.tmp_dir, 'jobs.sqlite')
+        queue = JobQueue(JobStore(db_path), max_workers=1, use_processes=True,
+                         worker_config={'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'DEFORM_JOB_MARKER': 'worker'})
+        setting, _ = queue.submit('setting', app_setting, 'DEFORM_JOB_MARKER')
+        pid, _ = queue.submit('pid', process_id)
+
+        self.assertEqual(self.wait(queue, setting['id'])['result'], {'value': 'worker'})
+        job = self.wait(queue, pid['id'])
+        self.assertNotEqual(job['result']['pid'], os.getpid())
+        self.assertIsNotNone(job['started_at'])
+        queue.shutdown()
+
+    def test_crashed_worker_is_replaced(self):
+        """
+        Test that a job whose worker process dies is marked failed and the
+        next submission runs on a fresh pool.
+        """
+        db_path = os.path.join(self.tmp_dir, 'jobs.sqlite')
+        queue = JobQueue(JobStore(db_path), max_workers=1, use_processes=True,
+                         worker_config={'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        crashed, _ = queue.submit('crash', crash)
+        job = self.wait(queue, crashed['id'])
+        self.assertEqual(job['status'], FAILED)
+        self.assertIn('exited', job['error'])
+
+        after, _ = queue.submit('pid', process_id)
+        self.assertEqual(self.wait(queue, after['id'])['status'], DONE)
+        queue.shutdown()
+
+    def test_job_endpoints(self):
+        """
+        Test the status endpoints for unknown jobs and missing screenshots.
+        """
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            DEFORM_JOB_DB_PATH = ''
+            DEFORM_JOB_EXECUTOR = 'thread'
+
+        client = create_app(TestConfig).test_client()
+        self.assertEqual(client.get('/api/deform-jobs/missing').status_code, 404)
+        self.assertEqual(client.get('/api/deform-jobs/missing/result').status_code, 404)
+        self.assertEqual(client.get('/api/deform-map/no-such-shot?async=true').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
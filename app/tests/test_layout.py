@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+from scipy.spatial.distance import cdist
+
+from app.services.layout import compute_layout, landmark_mds, maxmin_landmarks, stress
+from app.services.map_deformer import MapDeformer
+
+
+class TestLayout(unittest.TestCase):
+    """
+    Test suite for the layout solvers behind the time-deformed map.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.points = rng.uniform(0, 1000, (120, 2))
+        self.exact = cdist(self.points, self.points)
+        noise = rng.lognormal(0.0, 0.15, self.exact.shape)
+        self.noisy = self.exact * (noise + noise.T) / 2
+
+    def test_exact_distances_are_recovered(self):
+        """
+        Test that classical and landmark MDS embed Euclidean distances exactly.
+        """
+        for method in ('classical', 'landmark'):
+            result = compute_layout(self.exact, method=method, n_landmarks=20)
+            self.assertLess(result.stress, 1e-6, method)
+            self.assertEqual(result.coords.shape, (120, 2))
+
+    def test_landmark_reads_only_landmark_columns(self):
+        """
+        Test that landmark MDS is unaffected by values outside the landmark rows and columns.
+        """
+        full = landmark_mds(self.exact, 20)
+        landmarks = maxmin_landmarks(self.exact, 20)
+        partial = np.full_like(self.exact, np.nan)
+        partial[:, landmarks] = self.exact[:, landmarks]
+        partial[landmarks, :] = self.exact[landmarks, :]
+        np.testing.assert_allclose(landmark_mds(partial, 20), full)
+
+    def test_smacof_improves_on_warm_start_and_is_stable(self):
+        """
+        Test that geo warm-started SMACOF lowers stress and gives the same layout twice.
+        """
+        start = compute_layout(self.noisy, method='classical')
+        first = compute_layout(self.noisy, method='smacof', reference=self.points)
+        second = compute_layout(self.noisy, method='smacof', reference=self.points)
+
+        self.assertLessEqual(first.stress, start.stress)
+        self.assertGreater(first.iterations, 0)
+        np.testing.assert_array_equal(first.coords, second.coords)
+        self.assertAlmostEqual(first.stress, stress(first.coords, (self.noisy + self.noisy.T) / 2))
+
+    def test_result_is_aligned_with_reference(self):
+        """
+        Test that the layout is rotated and reflected into the reference frame.
+        """
+        mirrored = self.points * [-1, 1]
+        result = compute_layout(self.exact, method='classical', reference=mirrored)
+        np.testing.assert_allclose(result.coords, mirrored, atol=1e-6)
+
+    def test_budgets_are_honoured(self):
+        """
+        Test the iteration budget and the rejection of unknown methods.
+        """
+        result = compute_layout(self.noisy, method='smacof', max_iter=3, eps=0)
+        self.assertEqual(result.iterations, 3)
+        with self.assertRaises(ValueError):
+            compute_layout(self.noisy, method='tsne')
+
+    def test_map_deformer_coordinates(self):
+        """
+        Test that the deformer keeps its normalized output range with a geographic reference.
+        """
+        reference = self.points[:10] / 1000
+        coords = MapDeformer().create_time_deformed_coordinates(self.noisy[:10, :10], reference=reference)
+
+        self.assertEqual(coords.shape, (10, 2))
+        self.assertTrue(np.all((coords >= 0.15 - 1e-9) & (coords <= 0.85 + 1e-9)))
+
+
+if __name__ == '__main__':
+    unittest.main()
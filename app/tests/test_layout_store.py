@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from PIL import Image
+from scipy.spatial.distance import cdist
+
+from app import create_app
+from app.config import Config
+from app.services.distance_matrix import fallback_time_matrix
+from app.services.layout import compute_layout, extend_layout
+from app.services.layout_store import LayoutStore
+from app.services.map_deformer import MapDeformer
+from app.services.routing_backend import RoutingBackend
+
+
+class CountingBackend(RoutingBackend):
+    """Straight-line times that records how many cells each matrix call had to compute"""
+
+    name = 'counting'
+
+    def __init__(self):
+        self.computed = []
+
+    def matrix(self, sources, destinations, travel_mode='driving-car', known=None):
+        lats = [p['lat'] for p in sources]
+        lngs = [p['lng'] for p in sources]
+        matrix = fallback_time_matrix(lats, lngs, travel_mode)
+        if known is None:
+            self.computed.append(matrix.size)
+            return matrix
+        missing = np.isnan(known)
+        self.computed.append(int(missing.sum()))
+        return np.where(missing, matrix, known)
+
+
+class TestLayoutStore(unittest.TestCase):
+    """
+    Test suite for incremental re-layout: the LayoutStore that finds a previously
+    solved, overlapping POI set and extend_layout that places only the new points.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(5)
+        self.pois = [{'lat': float(lat), 'lng': float(lng)}
+                     for lat, lng in zip(rng.uniform(44.40, 44.46, 12), rng.uniform(26.05, 26.15, 12))]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_find_overlapping_entry(self):
+        """
+        Test that a POI set with one added point matches the stored one and that
+        an entry survives a restart of the store.
+        """
+        store = LayoutStore(os.path.join(self.tmp_dir, 'layouts'))
+        matrix = np.arange(100, dtype=float).reshape(10, 10)
+        coords = np.arange(20, dtype=float).reshape(10, 2)
+        store.save(self.pois[:10], 'driving-car', 'ors', matrix, coords)
+
+        reopened = LayoutStore(os.path.join(self.tmp_dir, 'layouts'))
+        new_pois = [self.pois[11]] + self.pois[:10]
+        match = reopened.find(new_pois, 'driving-car', 'ors')
+
+        self.assertIsNotNone(match)
+        self.assertEqual(match.num_new, 1)
+        known = match.known_matrix()
+        self.assertTrue(np.isnan(known[0]).all() and np.isnan(known[:, 0]).all())
+        np.testing.assert_array_equal(known[1:, 1:], matrix)
+        known_coords, fixed = match.known_coords()
+        np.testing.assert_array_equal(known_coords[1:], coords)
+        self.assertEqual(fixed.tolist(), [False] + [True] * 10)
+
+        self.assertIsNone(reopened.find(new_pois, 'foot-walking', 'ors'))
+        self.assertIsNone(reopened.find(self.pois[:1] + self.pois[10:], 'driving-car', 'ors'))
+
+    def test_oldest_entries_are_evicted(self):
+        """
+        Test that the store keeps at most max_entries layouts.
+        """
+        store = LayoutStore(os.path.join(self.tmp_dir, 'layouts'), max_entries=2)
+        for start in range(3):
+            pois = self.pois[start * 4:start * 4 + 4]
+            store.save(pois, 'driving-car', 'ors', np.zeros((4, 4)), np.zeros((4, 2)))
+
+        self.assertEqual(len(store), 2)
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp_dir, 'layouts'))), 2)
+        self.assertIsNone(store.find(self.pois[:4], 'driving-car', 'ors'))
+
+    def test_extend_layout_keeps_fixed_points(self):
+        """
+        Test that a new point is placed where the distances put it while the
+        solved points stay exactly where they were.
+        """
+        points = np.random.default_rng(2).uniform(0, 1000, (30, 2))
+        exact = cdist(points, points)
+        fixed = np.ones(30, dtype=bool)
+        fixed[7] = False
+        coords = points.copy()
+        coords[7] = 0
+
+        result = extend_layout(exact, coords, fixed)
+        np.testing.assert_array_equal(result.coords[fixed], points[fixed])
+        self.assertLess(np.linalg.norm(result.coords[7] - points[7]), 1.0)
+        self.assertEqual(result.method, 'incremental')
+        self.assertLess(result.stress, compute_layout(exact, method='landmark', n_landmarks=5).stress + 1e-3)
+
+    def test_deformer_routes_only_new_pois(self):
+        """
+        Test that deforming a screenshot with one more POI only requests the new
+        row and column and reuses the stored layout.
+        """
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            ISOCHRONE_CACHE_PATH = ''
+            LAYOUT_STORE_PATH = ''
+            MATRIX_STORE_PATH = ''
+            ARTIFACT_CACHE_ENABLED = False
+
+        backend = CountingBackend()
+        bounds = {'northEast': {'lat': 44.47, 'lng': 26.16}, 'southWest': {'lat': 44.39, 'lng': 26.04}}
+        app = create_app(TestConfig)
+        with app.app_context():
+            for name, pois in (('first', self.pois[:10]), ('second', self.pois[:11])):
+                json_path = os.path.join(self.tmp_dir, f'{name}.json')
+                with open(json_path, 'w') as f:
+                    json.dump({'pois': pois, 'bounds': bounds}, f)
+                Image.new('RGB', (200, 150)).save(os.path.join(self.tmp_dir, f'{name}.png'))
+                deformer = MapDeformer(backend=backend)
+                deformer.create_time_deformed_map(json_path)
+
+        self.assertEqual(backend.computed, [100, 21])
+        self.assertEqual(deformer.last_layout.method, 'incremental')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from app.services.matrix_engine import MatrixEngine, ors_tile_fetcher
+from app.services.routing_client import RoutingClient
+from app.tests.stub_ors import StubORSServer, travel_seconds
+
+
+class TestMatrixEngine(unittest.TestCase):
+    """
+    Test suite for the MatrixEngine class.
+
+    These tests verify that arbitrary N×M matrices are split into tiles within
+    the provider limits, fetched concurrently, stitched back in the right
+    place, and that already known cells are not requested again.
+    """
+
+    def setUp(self):
+        """
+        Create a grid of points around Bucharest and a fake tile fetcher that
+        records every tile it is asked for.
+        """
+        self.points = [(44.40 + 0.01 * (i // 10), 26.05 + 0.01 * (i % 10)) for i in range(120)]
+        self.tiles = []
+        self.lock = threading.Lock()
+
+    def fetch_tile(self, source_points, destination_points):
+        with self.lock:
+            self.tiles.append((len(source_points), len(destination_points)))
+        return [[travel_seconds(s, d, 50.0) for d in destination_points] for s in source_points]
+
+    def expected(self, sources, destinations):
+        return np.array([
+            [travel_seconds([s[1], s[0]], [d[1], d[0]], 50.0) for d in destinations]
+            for s in sources
+        ])
+
+    def test_tiles_respect_provider_limits(self):
+        """
+        Test that every tile stays within the location and route limits.
+        """
+        engine = MatrixEngine(max_locations=25, max_routes=100)
+        matrix = engine.compute(self.points[:7], self.points, self.fetch_tile)
+
+        for rows, cols in self.tiles:
+            self.assertLessEqual(rows + cols, 25)
+            self.assertLessEqual(rows * cols, 100)
+        np.testing.assert_allclose(matrix, self.expected(self.points[:7], self.points))
+
+    def test_one_to_many_beyond_single_request(self):
+        """
+        Test that one origin with more destinations than a request allows is
+        answered in full.
+        """
+        engine = MatrixEngine(max_locations=50)
+        matrix = engine.compute(self.points[:1], self.points, self.fetch_tile)
+
+        self.assertEqual(matrix.shape, (1, 120))
+        self.assertEqual(len(self.tiles), 3)
+        self.assertFalse(np.isnan(matrix).any())
+
+    def test_known_cells_are_reused(self):
+        """
+        Test that adding one point to a solved symmetric matrix only fetches the
+        new row and the new column.
+        """
+        engine = MatrixEngine(max_locations=50)
+        points = self.points[:11]
+        known = np.full((11, 11), np.nan)
+        known[:10, :10] = self.expected(points[:10], points[:10])
+
+        matrix = engine.compute(points, points, self.fetch_tile, known=known)
+
+        self.assertEqual(sorted(self.tiles), [(1, 11), (10, 1)])
+        np.testing.assert_allclose(matrix, self.expected(points, points))
+
+    def test_tiles_run_concurrently(self):
+        """
+        Test that tiles are fetched in parallel, up to max_workers at a time.
+        """
+        active = []
+        peak = []
+
+        def slow_fetch(source_points, destination_points):
+            with self.lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with self.lock:
+                active.pop()
+            return self.fetch_tile(source_points, destination_points)
+
+        engine = MatrixEngine(max_locations=10, max_workers=3)
+        engine.compute(self.points[:1], self.points[:45], slow_fetch)
+
+        self.assertEqual(len(self.tiles), 5)
+        self.assertEqual(max(peak), 3)
+
+    def test_against_stub_server(self):
+        """
+        Test the OpenRouteService tile fetcher end to end against the stub server.
+        """
+        engine = MatrixEngine(max_locations=20, max_routes=100, max_workers=4)
+        with StubORSServer() as server:
+            fetch_tile = ors_tile_fetcher(RoutingClient(base_url=server.url), 'test-key')
+            matrix = engine.compute(self.points[:30], self.points[:30], fetch_tile)
+
+        np.testing.assert_allclose(matrix, self.expected(self.points[:30], self.points[:30]), atol=0.01)
+        for request in server.requests:
+            self.assertLessEqual(len(request['body']['locations']), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
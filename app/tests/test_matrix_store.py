@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from app import create_app
+from app.config import Config
+from app.services.map_deformer import MapDeformer
+from app.services.matrix_store import MatrixStore
+from app.tests.test_layout_store import CountingBackend
+
+
+class TestMatrixStore(unittest.TestCase):
+    """
+    Test suite for the MatrixStore that keeps routed matrices per exact POI
+    list, on disk as memory-mapped .npy files behind an in-process LRU.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.tmp_dir, 'matrices')
+        rng = np.random.default_rng(3)
+        self.pois = [{'lat': float(lat), 'lng': float(lng)}
+                     for lat, lng in zip(rng.uniform(44.40, 44.46, 8), rng.uniform(26.05, 26.15, 8))]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_key_and_round_trip(self):
+        """
+        Test that the key depends on order, mode and backend and that a stored
+        matrix is read back memory-mapped by a new store.
+        """
+        store = MatrixStore(self.directory)
+        key = store.key(self.pois, 'driving-car', 'ors')
+        self.assertEqual(key, store.key([dict(p) for p in self.pois], 'driving-car', 'ors'))
+        self.assertNotIn(key, [
+            store.key(self.pois[::-1], 'driving-car', 'ors'),
+            store.key(self.pois, 'foot-walking', 'ors'),
+            store.key(self.pois, 'driving-car', 'local')
+        ])
+
+        matrix = np.arange(64, dtype=float).reshape(8, 8) / 3
+        self.assertIsNone(store.get(key))
+        store.put(key, matrix)
+
+        stored = MatrixStore(self.directory).get(key)
+        self.assertIsInstance(stored, np.memmap)
+        self.assertFalse(stored.flags.writeable)
+        np.testing.assert_array_equal(stored, matrix)
+
+    def test_least_recently_used_files_are_evicted(self):
+        """
+        Test that the store keeps at most max_entries files, dropping the least recently used.
+        """
+        store = MatrixStore(self.directory, max_memory_entries=1, max_entries=2)
+        store.put('a', np.zeros((2, 2)))
+        store.put('b', np.zeros((2, 2)))
+        os.utime(os.path.join(self.directory, 'a.npy'), (1, 1))
+        os.utime(os.path.join(self.directory, 'b.npy'), (2, 2))
+        self.assertIsNotNone(store.get('a'))
+        store.put('c', np.zeros((2, 2)))
+
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.get('b'))
+        self.assertIsNotNone(store.get('a'))
+
+    def test_repeated_poi_set_is_not_routed_again(self):
+        """
+        Test that deforming two screenshots of the same POIs routes the matrix once.
+        """
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            ISOCHRONE_CACHE_PATH = ''
+            LAYOUT_STORE_ENABLED = False
+            MATRIX_STORE_PATH = self.directory
+            ARTIFACT_CACHE_ENABLED = False
+
+        backend = CountingBackend()
+        bounds = {'northEast': {'lat': 44.47, 'lng': 26.16}, 'southWest': {'lat': 44.39, 'lng': 26.04}}
+        app = create_app(TestConfig)
+        with app.app_context():
+            for name in ('first', 'second'):
+                json_path = os.path.join(self.tmp_dir, f'{name}.json')
+                with open(json_path, 'w') as f:
+                    json.dump({'pois': self.pois, 'bounds': bounds}, f)
+                Image.new('RGB', (200, 150)).save(os.path.join(self.tmp_dir, f'{name}.png'))
+                deformer = MapDeformer(backend=backend)
+                deformer.create_time_deformed_map(json_path)
+
+        self.assertEqual(backend.computed, [64])
+        self.assertEqual(deformer.last_matrix_source, 'counting')
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'last_time_matrix.json')))
+
+    def test_unroutable_pairs_are_stored_as_nan(self):
+        """
+        Test that distance estimates for unroutable pairs are used for the map
+        but not written to the store.
+        """
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            ISOCHRONE_CACHE_PATH = ''
+            LAYOUT_STORE_ENABLED = False
+            MATRIX_STORE_PATH = self.directory
+            ARTIFACT_CACHE_ENABLED = False
+
+        class IslandBackend(CountingBackend):
+            def matrix(self, sources, destinations, travel_mode='driving-car', known=None):
+                matrix = super().matrix(sources, destinations, travel_mode, known)
+                matrix[0, 1] = matrix[1, 0] = np.nan
+                return matrix
+
+        bounds = {'northEast': {'lat': 44.47, 'lng': 26.16}, 'southWest': {'lat': 44.39, 'lng': 26.04}}
+        json_path = os.path.join(self.tmp_dir, 'island.json')
+        with open(json_path, 'w') as f:
+            json.dump({'pois': self.pois, 'bounds': bounds}, f)
+        Image.new('RGB', (200, 150)).save(os.path.join(self.tmp_dir, 'island.png'))
+
+        with create_app(TestConfig).app_context():
+            MapDeformer(backend=IslandBackend()).create_time_deformed_map(json_path)
+
+        stored = MatrixStore(self.directory).get(MatrixStore().key(self.pois, 'driving-car', 'counting'))
+        self.assertTrue(np.isnan(stored[0, 1]))
+        self.assertEqual(int(np.isnan(stored).sum()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
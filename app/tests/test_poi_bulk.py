@@ -0,0 +1,129 @@
+import io
+import json
+import unittest
+
+from app import create_app, db
+from app.config import Config
+from app.models.poi import PointOfInterest
+from app.services.poi_bulk import bulk_apply, read_records, validate_batch
+from app.services.poi_index import get_poi_index
+
+
+def ndjson(records):
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+class TestPoiBulk(unittest.TestCase):
+    """
+    Test suite for bulk POI import and export: batch validation, the
+    executemany create/update/delete paths and round trips through CSV,
+    NDJSON and GeoJSON.
+    """
+
+    def setUp(self):
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            POI_BULK_BATCH_SIZE = 7
+            POI_BULK_COMMIT_ROWS = 20
+
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.records = [{'name': f'poi {i}', 'lat': 45.7 + i / 1000, 'lng': 21.2, 'category': 'Cafe'}
+                        for i in range(50)]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_validate_batch(self):
+        """
+        Test that each invalid record gets its first error and valid ones get None.
+        """
+        records = [
+            {'name': 'ok', 'latitude': 45, 'longitude': 21},
+            {'name': 'no position'},
+            {'name': 'north pole plus', 'latitude': 91, 'longitude': 21},
+            {'name': 'x' * 101, 'latitude': 1, 'longitude': 1},
+            {'name': 'bad minutes', 'latitude': 1, 'longitude': 1, 'travel_time': 2.5},
+            {'name': '', 'latitude': 1, 'longitude': 'east'}
+        ]
+        errors = validate_batch(records)
+        self.assertEqual(errors.tolist(), [
+            None,
+            'latitude is required',
+            'latitude must be a number between -90 and 90',
+            'name must be at most 100 characters',
+            'travel_time must be a positive whole number of minutes',
+            'longitude must be a number between -180 and 180'
+        ])
+        self.assertEqual(validate_batch([{'name': 'x'}], require_id=True, require_fields=False).tolist(),
+                         ['id must be a positive integer'])
+
+    def test_create_update_delete(self):
+        """
+        Test the three bulk endpoints, including rejected records and the
+        updated_at stamp and spatial index they keep current.
+        """
+        body = self.records + [{'name': 'bad', 'lat': 100, 'lng': 0}]
+        report = self.client.post('/api/pois/bulk', data=ndjson(body), content_type='application/x-ndjson').get_json()
+        self.assertEqual((report['created'], report['rejected']), (50, 1))
+        self.assertEqual(report['errors'], [{'record': 51, 'error': 'latitude must be a number between -90 and 90'}])
+        self.assertGreater(report['rows_per_second'], 0)
+        self.assertEqual(PointOfInterest.query.count(), 50)
+        self.assertEqual(len(get_poi_index()), 50)
+
+        before = db.session.get(PointOfInterest, 3).updated_at
+        updates = [{'id': 3, 'name': 'renamed'}, {'id': 4, 'lat': 10, 'lng': 10}, {'id': 999, 'name': 'missing'}]
+        report = self.client.put('/api/pois/bulk?format=ndjson', data=ndjson(updates)).get_json()
+        self.assertEqual((report['updated'], report['rejected']), (2, 1))
+        db.session.expire_all()
+        renamed = db.session.get(PointOfInterest, 3)
+        self.assertEqual(renamed.name, 'renamed')
+        self.assertAlmostEqual(renamed.latitude, 45.702)
+        self.assertGreater(renamed.updated_at, before)
+        self.assertEqual(get_poi_index().nearest(10, 10, k=1)[0][0], 4)
+
+        stamped = renamed.updated_at
+        unchanged = [{'id': 3, 'name': 'renamed'}, {'id': 5}]
+        report = self.client.put('/api/pois/bulk?format=ndjson', data=ndjson(unchanged)).get_json()
+        self.assertEqual((report['updated'], report['rejected']), (0, 0))
+        db.session.expire_all()
+        self.assertEqual(db.session.get(PointOfInterest, 3).updated_at, stamped)
+
+        report = self.client.delete('/api/pois/bulk?format=csv', data='id\n1\n2\n2\n999\n').get_json()
+        self.assertEqual((report['deleted'], report['rejected']), (2, 1))
+        delta = self.client.get(f"/api/pois?updated_since={before.isoformat()}").get_json()
+        self.assertEqual(sorted(delta['deleted']), [1, 2])
+
+        self.assertEqual(self.client.post('/api/pois/bulk', data='x', content_type='text/plain').status_code, 400)
+
+    def test_export_round_trips(self):
+        """
+        Test that every export format imports back to the same POIs.
+        """
+        bulk_apply(self.records, 'create')
+        expected = [(p.name, p.latitude, p.longitude, p.category) for p in PointOfInterest.query.order_by('id')]
+
+        for fmt in ('csv', 'ndjson', 'geojson'):
+            exported = self.client.get(f'/api/pois/export?format={fmt}').get_data()
+            PointOfInterest.query.delete()
+            db.session.commit()
+            report = bulk_apply(read_records(io.BytesIO(exported), fmt), 'create')
+            self.assertEqual((report.created, report.rejected), (50, 0), fmt)
+            imported = [(p.name, p.latitude, p.longitude, p.category) for p in PointOfInterest.query.order_by('id')]
+            self.assertEqual(imported, expected, fmt)
+
+        lines = [json.dumps(feature) for feature in
+                 json.loads(self.client.get('/api/pois/export?format=geojson').get_data())['features']]
+        records = list(read_records(io.BytesIO('\n'.join(lines).encode()), 'geojson'))
+        self.assertEqual(len(records), 50)
+        self.assertEqual(self.client.get('/api/pois/export?format=xml').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
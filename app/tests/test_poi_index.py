@@ -0,0 +1,123 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app import create_app, db
+from app.config import Config
+from app.models.poi import PointOfInterest
+from app.services.distance_matrix import haversine_meters
+from app.services.poi_index import PoiIndex, get_poi_index
+
+
+class TestPoiIndex(unittest.TestCase):
+    """
+    Test suite for POI spatial queries: the KD-tree PoiIndex, its sync with
+    committed ORM changes and the bbox, near/radius/k parameters of /api/pois
+    and the straight-line prefilter of /api/travel-times.
+    """
+
+    def setUp(self):
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def add_pois(self, positions):
+        pois = [PointOfInterest(name=f'poi {i}', latitude=lat, longitude=lng) for i, (lat, lng) in enumerate(positions)]
+        db.session.add_all(pois)
+        db.session.commit()
+        return pois
+
+    def test_nearest_matches_brute_force(self):
+        """
+        Test that k-nearest and radius queries return the same POIs and
+        distances as a haversine scan, closest first.
+        """
+        rng = np.random.default_rng(3)
+        lats, lngs = rng.uniform(45.70, 45.82, 500), rng.uniform(21.15, 21.31, 500)
+        index = PoiIndex()
+        index.load(zip(range(500), lats, lngs))
+        distances = haversine_meters(45.75, 21.22, lats, lngs)
+
+        hits = index.nearest(45.75, 21.22, k=10)
+        self.assertEqual([poi_id for poi_id, _ in hits], np.argsort(distances)[:10].tolist())
+        np.testing.assert_allclose([d for _, d in hits], np.sort(distances)[:10], rtol=1e-6)
+
+        hits = index.nearest(45.75, 21.22, radius=1500)
+        self.assertEqual(sorted(poi_id for poi_id, _ in hits), np.flatnonzero(distances <= 1500).tolist())
+        self.assertEqual([d for _, d in hits], sorted(d for _, d in hits))
+
+        self.assertEqual(len(index.nearest(45.75, 21.22, k=10, radius=100)), np.sum(distances <= 100))
+        self.assertEqual(PoiIndex().nearest(45.75, 21.22, k=3), [])
+
+    def test_index_follows_committed_changes(self):
+        """
+        Test that created, moved and deleted POIs are reflected without a
+        reload, and that rolled back changes are not.
+        """
+        first, second = self.add_pois([(45.75, 21.22), (45.76, 21.23)])
+        index = get_poi_index()
+        self.assertEqual(len(index), 2)
+
+        third, = self.add_pois([(45.7501, 21.2201)])
+        self.assertEqual(index.nearest(45.7501, 21.2201, k=1)[0][0], third.id)
+
+        second.latitude, second.longitude = 45.7502, 21.2202
+        db.session.commit()
+        self.assertEqual({poi_id for poi_id, _ in index.nearest(45.7502, 21.2202, radius=20)}, {third.id, second.id})
+
+        db.session.delete(third)
+        db.session.commit()
+        first.latitude = 10.0
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual([poi_id for poi_id, _ in index.nearest(45.75, 21.22, k=3)], [first.id, second.id])
+
+    def test_api_bbox_and_near(self):
+        """
+        Test the bbox and near parameters of /api/pois and their validation.
+        """
+        center, north, far = self.add_pois([(45.75, 21.22), (45.78, 21.22), (46.77, 23.62)])
+
+        response = self.client.get('/api/pois?bbox=21.1,45.7,21.3,45.8')
+        self.assertEqual(sorted(p['id'] for p in response.get_json()), [center.id, north.id])
+        self.assertEqual(len(self.client.get('/api/pois').get_json()), 3)
+
+        nearest = self.client.get('/api/pois?near=45.751,21.22&k=2').get_json()
+        self.assertEqual([p['id'] for p in nearest], [center.id, north.id])
+        self.assertAlmostEqual(nearest[0]['distance_m'], 111.2, delta=1)
+
+        within = self.client.get('/api/pois?near=45.75,21.22&radius=5000').get_json()
+        self.assertEqual([p['id'] for p in within], [center.id, north.id])
+        in_box = self.client.get('/api/pois?near=46.0,22.0&k=1&bbox=21.1,45.7,21.3,45.8').get_json()
+        self.assertEqual([p['id'] for p in in_box], [north.id])
+
+        for query in ('near=45.75,21.22', 'k=3', 'near=45.75', 'bbox=1,2,3'):
+            self.assertEqual(self.client.get(f'/api/pois?{query}').status_code, 400, query)
+
+    def test_travel_times_prefilter(self):
+        """
+        Test that max_minutes only sends POIs a straight line can reach in time to the matrix request.
+        """
+        near, _ = self.add_pois([(45.76, 21.23), (46.77, 23.62)])
+        with mock.patch('app.routes.api.get_travel_times_async', return_value={'status': 'success'}) as get_times:
+            self.client.get('/api/travel-times?origin_lat=45.75&origin_lng=21.22&max_minutes=10')
+            self.client.get('/api/travel-times?origin_lat=45.75&origin_lng=21.22')
+        prefiltered, unfiltered = (call.args[2] for call in get_times.call_args_list)
+        self.assertEqual([d['id'] for d in prefiltered], [near.id])
+        self.assertEqual(len(unfiltered), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import json
+import time
+import unittest
+
+from app import create_app, db
+from app.config import Config
+from app.models.poi import PointOfInterest
+
+
+class TestPoiListing(unittest.TestCase):
+    """
+    Test suite for the /api/pois listing: keyset pages, sparse fieldsets,
+    streamed JSON and NDJSON output and updated_since delta queries.
+    """
+
+    def setUp(self):
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add_all(PointOfInterest(name=f'poi {i}', latitude=45.75 + i / 1000, longitude=21.22,
+                                           category='Cafe') for i in range(25))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_unpaged_listing_is_unchanged(self):
+        """
+        Test that the plain listing still returns every POI as a JSON array of full objects.
+        """
+        response = self.client.get('/api/pois')
+        pois = response.get_json()
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(len(pois), 25)
+        self.assertEqual(set(pois[0]), {'id', 'name', 'latitude', 'longitude', 'category', 'description',
+                                        'travel_time', 'updated_at'})
+        self.assertIn('X-Sync-Time', response.headers)
+
+    def test_keyset_pages_and_fields(self):
+        """
+        Test that following X-Next-Cursor visits every POI once and that fields selects columns.
+        """
+        seen = []
+        url = '/api/pois?limit=10&fields=id,name'
+        while url:
+            response = self.client.get(url)
+            page = response.get_json()
+            self.assertTrue(all(set(poi) == {'id', 'name'} for poi in page))
+            seen.extend(poi['id'] for poi in page)
+            cursor = response.headers.get('X-Next-Cursor')
+            url = f'/api/pois?limit=10&fields=id,name&cursor={cursor}' if cursor else None
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(set(seen)), 25)
+
+        first = self.client.get('/api/pois?limit=10&fields=name')
+        self.assertEqual(set(first.get_json()[0]), {'name'})
+        self.assertIn('rel="next"', first.headers['Link'])
+        for query in ('fields=id,secret', 'limit=0', 'format=xml', 'cursor=abc', 'updated_since=yesterday'):
+            self.assertEqual(self.client.get(f'/api/pois?{query}').status_code, 400, query)
+
+    def test_ndjson(self):
+        """
+        Test that format=ndjson streams one JSON object per line.
+        """
+        response = self.client.get('/api/pois?format=ndjson&fields=id,latitude&bbox=21,45.75,22,45.7545')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(set(lines[0]), {'id', 'latitude'})
+
+    def test_updated_since(self):
+        """
+        Test that a delta query returns only POIs changed or deleted after the previous listing.
+        """
+        sync_time = self.client.get('/api/pois').headers['X-Sync-Time']
+        time.sleep(0.01)
+        changed = db.session.get(PointOfInterest, 3)
+        changed.name = 'renamed'
+        db.session.delete(db.session.get(PointOfInterest, 7))
+        db.session.commit()
+
+        delta = self.client.get(f'/api/pois?updated_since={sync_time}').get_json()
+        self.assertEqual([poi['name'] for poi in delta['pois']], ['renamed'])
+        self.assertEqual(delta['deleted'], [7])
+
+        lines = self.client.get(f'/api/pois?updated_since={sync_time}&format=ndjson').get_data(as_text=True)
+        self.assertEqual([json.loads(line).get('deleted', False) for line in lines.splitlines()], [False, True])
+
+        # A new POI that reuses the deleted id is no longer reported as deleted
+        db.session.add(PointOfInterest(id=7, name='again', latitude=45.0, longitude=21.0))
+        db.session.commit()
+        delta = self.client.get(f'/api/pois?updated_since={sync_time}').get_json()
+        self.assertEqual(delta['deleted'], [])
+        self.assertEqual(sorted(poi['id'] for poi in delta['pois']), [3, 7])
+
+
+if __name__ == '__main__':
+    unittest.main()
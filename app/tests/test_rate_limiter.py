@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from app import create_app
+from app.config import Config
+from app.services.rate_limiter import (BACKGROUND, INTERACTIVE, RateLimiter, RateLimitExceeded, bucket_for,
+                                       current_priority, request_priority)
+from app.services.routing_client import RoutingClient
+from app.tests.stub_ors import StubORSServer
+
+
+def _drain(db_path, attempts):
+    """Take as many isochrone calls as the shared bucket allows right now; run in a child process"""
+    limiter = RateLimiter(db_path, limits={'isochrones': (12, None)})
+    taken = 0
+    for _ in range(attempts):
+        try:
+            limiter.acquire('isochrones', deadline=time.time())
+            taken += 1
+        except RateLimitExceeded:
+            pass
+    return taken
+
+
+class TestRateLimiter(unittest.TestCase):
+    """
+    Test suite for the upstream quota shared by worker processes: token
+    buckets, priority reserve, daily quota, 429 pauses and the API.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'rate_limit.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_bucket_allows_a_burst_then_refills(self):
+        """
+        Test that a bucket hands out its per-minute quota at once, then rejects
+        with the time until the next token, and waits for it when allowed to.
+        """
+        limiter = RateLimiter(limits={'isochrones': (60, None)})
+        for _ in range(60):
+            limiter.acquire('isochrones', deadline=time.time())
+        with self.assertRaises(RateLimitExceeded) as raised:
+            limiter.acquire('isochrones', deadline=time.time())
+        self.assertAlmostEqual(raised.exception.retry_after, 1.0, delta=0.1)
+
+        started = time.time()
+        limiter.acquire('isochrones', deadline=time.time() + 3)
+        self.assertAlmostEqual(time.time() - started, 1.0, delta=0.5)
+        limiter.acquire('matrix', deadline=time.time())  # Not limited
+        self.assertEqual(limiter.stats()['process']['waited'][INTERACTIVE], 1)
+
+    def test_background_calls_leave_a_reserve(self):
+        """
+        Test that background calls stop at the reserve while interactive ones
+        may use it, per minute and per day.
+        """
+        limiter = RateLimiter(limits={'isochrones': (10, None), 'matrix': (None, 5)}, reserve=0.2)
+        for bucket, background, interactive in (('isochrones', 8, 2), ('matrix', 4, 1)):
+            with request_priority(BACKGROUND, deadline=time.time()):
+                self.assertEqual(current_priority()[0], BACKGROUND)
+                for _ in range(background):
+                    limiter.acquire(bucket)
+                self.assertRaises(RateLimitExceeded, limiter.acquire, bucket)
+            for _ in range(interactive):
+                limiter.acquire(bucket, deadline=time.time())
+            self.assertRaises(RateLimitExceeded, limiter.acquire, bucket, deadline=time.time())
+
+        with self.assertRaises(RateLimitExceeded) as raised:
+            limiter.acquire('matrix', deadline=time.time())
+        self.assertGreater(raised.exception.retry_after, 0)
+        self.assertEqual(limiter.stats()['buckets']['matrix']['remaining_today'], 0)
+
+    def test_processes_share_one_budget(self):
+        """
+        Test that worker processes on the same file together get no more than the quota.
+        """
+        context = multiprocessing.get_context('fork')
+        with context.Pool(3) as pool:
+            taken = pool.starmap(_drain, [(self.db_path, 10)] * 3)
+        self.assertEqual(sum(taken), 12)
+        self.assertEqual(RateLimiter(self.db_path, limits={'isochrones': (12, None)}).stats()
+                         ['buckets']['isochrones']['used_today'], 12)
+
+    def test_upstream_429_pauses_every_caller(self):
+        """
+        Test that a 429 with Retry-After blocks the endpoint in the shared
+        bucket, so the next call fails without reaching the upstream.
+        """
+        limiter = RateLimiter(self.db_path, limits={'isochrones': (100, None)})
+        with StubORSServer(failures=[429], retry_after='30') as server:
+            client = RoutingClient(base_url=server.url, max_backoff=1.0, rate_limiter=limiter)
+            self.assertEqual(client.post('/v2/isochrones/driving-car', json={}).status_code, 429)
+            other_worker = RoutingClient(base_url=server.url, rate_limiter=RateLimiter(
+                self.db_path, limits={'isochrones': (100, None)}))
+            with self.assertRaises(RateLimitExceeded) as raised:
+                other_worker.post('/v2/isochrones/driving-car', json={})
+            self.assertAlmostEqual(raised.exception.retry_after, 30, delta=1)
+            self.assertEqual(server.request_count, 1)
+        self.assertEqual(bucket_for('https://api.openrouteservice.org/v2/matrix/foot-walking'), 'matrix')
+
+    def test_api_reports_budget_and_answers_429(self):
+        """
+        Test that an exhausted quota makes /api/isochrones answer 429 with
+        Retry-After, and that /api/rate-limit reports the remaining budget.
+        """
+        with StubORSServer() as server:
+            class TestConfig(Config):
+                TESTING = True
+                SQLALCHEMY_DATABASE_URI = 'sqlite://'
+                ORS_BASE_URL = server.url
+                TRAVEL_TIME_API_KEY = 'test-key'
+                ISOCHRONE_CACHE_PATH = ''
+                RATE_LIMIT_PATH = ''
+                RATE_LIMITS = {'isochrones': (2, 100)}
+                RATE_LIMIT_INTERACTIVE_WAIT = 0
+
+            client = create_app(TestConfig).test_client()
+            for lat, status in ((45.70, 200), (45.71, 200), (45.72, 429)):
+                response = client.get(f'/api/isochrones?origin_lat={lat}&origin_lng=21.2&times=5')
+                self.assertEqual(response.status_code, status)
+            self.assertEqual(response.headers['Retry-After'], '30')
+            self.assertEqual(server.request_count, 2)
+
+            budget = client.get('/api/rate-limit').get_json()
+            self.assertTrue(budget['enabled'])
+            self.assertEqual(budget['buckets']['isochrones']['remaining_today'], 98)
+            self.assertEqual(budget['process']['rejected'], {INTERACTIVE: 1, BACKGROUND: 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.services.map_deformer import MapDeformer
+from app.services.renderer import (canvas_background, draw_gradient_lines, format_travel_times, gradient_segments,
+                                  text_sprite)
+
+
+class TestRenderer(unittest.TestCase):
+    """
+    Test suite for the renderer behind MapDeformer.warp_image: gradient line
+    geometry, cached canvases and sprites, and travel time labels.
+    """
+
+    def test_lines_cover_their_width(self):
+        """
+        Test that a line is drawn along its length and width with its gradient,
+        and leaves the rest of the canvas untouched.
+        """
+        image = Image.new('RGB', (60, 40))
+        draw_gradient_lines(ImageDraw.Draw(image), [[5, 20], [30, 5]], [[55, 20], [30, 35]],
+                            (255, 0, 0), (0, 0, 255), width=3)
+        pixels = np.asarray(image)
+
+        # Horizontal line: rows 19-21 covered, red at the start, blue towards the end
+        self.assertTrue((pixels[19:22, 8, 0] == 255).all())
+        self.assertTrue((pixels[19:22, 52, 2] > 200).all())
+        self.assertTrue((pixels[19:22, 52, 0] < 50).all())
+        self.assertEqual(pixels[[17, 23], 8].max(), 0)
+        # Vertical line is gap free from top to bottom
+        self.assertTrue((pixels[6:34, 30].astype(int).sum(axis=1) > 200).all())
+        self.assertEqual(pixels[37:, :20].max(), 0)
+
+    def test_gradient_segments(self):
+        """
+        Test that every line is split into consecutive segments with interpolated colours.
+        """
+        points, colors = gradient_segments([[0, 0], [10, 10]], [[100, 0], [10, 60]], (0, 0, 0), (100, 200, 250), 5)
+        self.assertEqual(points.shape, (10, 4))
+        self.assertEqual(points[:5].tolist(), [[0, 0, 20, 0], [20, 0, 40, 0], [40, 0, 60, 0],
+                                               [60, 0, 80, 0], [80, 0, 100, 0]])
+        self.assertEqual(points[9].tolist(), [10, 50, 10, 60])
+        self.assertEqual(colors[:5].tolist(), [[0, 0, 0], [20, 40, 50], [40, 80, 100],
+                                               [60, 120, 150], [80, 160, 200]])
+        self.assertEqual(colors[5:].tolist(), colors[:5].tolist())
+
+    def test_warp_image_reuses_cached_canvas(self):
+        """
+        Test that renders share the cached background without modifying it.
+        """
+        deformer = MapDeformer.__new__(MapDeformer)
+        deformer.font_path = None
+        background = canvas_background(120, 90, None).copy()
+        points = np.random.default_rng(1).uniform(0, 1, (6, 2))
+
+        image = deformer.warp_image(Image.new('RGB', (120, 90)), points, points[::-1], np.full((6, 6), 125.0))
+        self.assertEqual(image.size, (290, 90))
+        self.assertNotEqual(image.tobytes(), background.tobytes())
+        self.assertEqual(canvas_background(120, 90, None).tobytes(), background.tobytes())
+        self.assertIs(text_sprite('2m 5s', None, 12), text_sprite('2m 5s', None, 12))
+
+    def test_format_travel_times(self):
+        """
+        Test the edge label format for seconds, minutes and unknown times.
+        """
+        self.assertEqual(format_travel_times([45.7, 125, np.nan]), ['45s', '2m 5s', '?'])
+
+
+if __name__ == '__main__':
+    unittest.main()
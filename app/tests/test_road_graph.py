@@ -0,0 +1,193 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from app import create_app
+from app.config import Config
+from app.services.geometry import point_in_ring, ring_area
+from app.services.road_graph import RoadGraph, haversine_meters
+from app.services.routing_backend import LocalGraphBackend
+from app.services.travel_time_service import get_travel_times
+
+# A 3×3 grid of nodes 0.01° apart. Rows are residential streets, the middle
+# column is a footway, the east column is a one-way (northbound) primary road
+# and a motorway links the south-west and north-east corners directly.
+OSM_EXTRACT = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="44.40" lon="26.10"/>
+  <node id="2" lat="44.40" lon="26.11"/>
+  <node id="3" lat="44.40" lon="26.12"/>
+  <node id="4" lat="44.41" lon="26.10"/>
+  <node id="5" lat="44.41" lon="26.11"/>
+  <node id="6" lat="44.41" lon="26.12"/>
+  <node id="7" lat="44.42" lon="26.10"/>
+  <node id="8" lat="44.42" lon="26.11"/>
+  <node id="9" lat="44.42" lon="26.12"/>
+  <node id="99" lat="45.00" lon="27.00"/>
+  <way id="100"><nd ref="1"/><nd ref="2"/><nd ref="3"/><tag k="highway" v="residential"/></way>
+  <way id="101"><nd ref="4"/><nd ref="5"/><nd ref="6"/><tag k="highway" v="residential"/></way>
+  <way id="102"><nd ref="7"/><nd ref="8"/><nd ref="9"/><tag k="highway" v="residential"/></way>
+  <way id="103"><nd ref="1"/><nd ref="4"/><nd ref="7"/><tag k="highway" v="residential"/></way>
+  <way id="104"><nd ref="2"/><nd ref="5"/><nd ref="8"/><tag k="highway" v="footway"/></way>
+  <way id="105"><nd ref="3"/><nd ref="6"/><nd ref="9"/><tag k="highway" v="primary"/><tag k="oneway" v="yes"/></way>
+  <way id="106"><nd ref="1"/><nd ref="9"/><tag k="highway" v="motorway"/><tag k="maxspeed" v="100"/></way>
+</osm>
+"""
+
+
+class TestRoadGraph(unittest.TestCase):
+    """
+    Test suite for the RoadGraph class and the local routing backend.
+
+    A tiny hand-written OSM extract is imported so travel times can be checked
+    against values computed by hand: per-mode access rules, one-way streets,
+    maxspeed tags and the CSR round trip through an .npz file.
+    """
+
+    def setUp(self):
+        """
+        Write the OSM extract to a temporary directory and import it.
+        """
+        self.tmp_dir = tempfile.mkdtemp()
+        self.osm_path = os.path.join(self.tmp_dir, 'extract.osm')
+        with open(self.osm_path, 'w') as f:
+            f.write(OSM_EXTRACT)
+        self.graph = RoadGraph.from_osm(self.osm_path)
+        self.backend = LocalGraphBackend(self.graph)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def node(self, lat, lng, mode='driving-car'):
+        nodes, _ = self.graph.nearest_nodes([lat], [lng], mode)
+        return nodes[0]
+
+    def test_import_skips_unused_nodes(self):
+        """
+        Test that only nodes referenced by highways end up in the graph.
+        """
+        self.assertEqual(self.graph.num_nodes, 9)
+        self.assertEqual(set(self.graph.modes), {'driving-car', 'cycling-regular', 'foot-walking'})
+
+    def test_mode_access_rules(self):
+        """
+        Test that footways are walkable but not drivable, and motorways the reverse.
+
+        The footway between the two middle nodes is a 1.1 km direct walk, while a
+        car has to detour around it.
+        """
+        south_mid = self.node(44.40, 26.11)
+        north_mid = self.node(44.42, 26.11)
+
+        walking = self.graph.travel_times([south_mid], 'foot-walking')[0, north_mid]
+        meters = haversine_meters(44.40, 26.11, 44.42, 26.11)
+        self.assertAlmostEqual(walking, meters / (5 / 3.6), delta=1.0)
+
+        driving = self.graph.travel_times([south_mid], 'driving-car')[0, north_mid]
+        self.assertGreater(driving, meters / (30 / 3.6))
+
+        # Pedestrians never get the motorway shortcut
+        south_west = self.node(44.40, 26.10, 'foot-walking')
+        north_east = self.node(44.42, 26.12, 'foot-walking')
+        diagonal = haversine_meters(44.40, 26.10, 44.42, 26.12)
+        walked = self.graph.travel_times([south_west], 'foot-walking')[0, north_east]
+        self.assertGreater(walked, diagonal / (5 / 3.6))
+
+    def test_oneway_and_maxspeed(self):
+        """
+        Test that one-way streets only drive northbound and maxspeed is honored.
+        """
+        south_east = self.node(44.40, 26.12)
+        north_east = self.node(44.42, 26.12)
+        times = self.graph.travel_times([south_east, north_east], 'driving-car')
+
+        # Northbound follows the one-way road directly, southbound must detour
+        self.assertLess(times[0, north_east], times[1, south_east])
+
+        south_west = self.node(44.40, 26.10)
+        motorway = haversine_meters(44.40, 26.10, 44.42, 26.12) / (100 / 3.6)
+        self.assertAlmostEqual(self.graph.travel_times([south_west], 'driving-car')[0, north_east],
+                               motorway, delta=1.0)
+
+    def test_npz_round_trip(self):
+        """
+        Test that a graph saved to .npz answers exactly like the imported one.
+        """
+        path = os.path.join(self.tmp_dir, 'graph.npz')
+        self.graph.save(path)
+        loaded = RoadGraph.load(path)
+
+        for mode in self.graph.modes:
+            np.testing.assert_allclose(loaded.travel_times([0], mode), self.graph.travel_times([0], mode))
+
+    def test_backend_matrix_reuses_known_cells(self):
+        """
+        Test the backend's one-to-many matrix and that known cells are kept.
+        """
+        points = [(44.40, 26.10), (44.41, 26.11), (44.42, 26.12)]
+        matrix = self.backend.matrix(points, points, 'driving-car')
+
+        self.assertEqual(matrix.shape, (3, 3))
+        self.assertTrue(np.all(np.diag(matrix) < 1.0))
+        self.assertFalse(np.isnan(matrix).any())
+
+        known = matrix.copy()
+        known[0, 1] = 1234.0
+        known[2, :] = np.nan
+        updated = self.backend.matrix(points, points, 'driving-car', known=known)
+        self.assertEqual(updated[0, 1], 1234.0)
+        np.testing.assert_allclose(updated[2], matrix[2])
+
+    def test_isochrone_bands_from_one_search(self):
+        """
+        Test locally computed isochrones for two bands around the grid center.
+
+        Both bands must be closed polygons containing the origin, listed in
+        ascending order, with the larger band covering more area. The walking
+        range of the small band stops part way along the streets, so its polygon
+        must stay inside the grid.
+        """
+        result = self.backend.isochrones(44.41, 26.11, [900, 300], 'foot-walking')
+        features = result['features']
+
+        self.assertEqual([f['properties']['value'] for f in features], [300, 900])
+        areas = []
+        for feature in features:
+            self.assertEqual(feature['geometry']['type'], 'Polygon')
+            exterior = np.array(feature['geometry']['coordinates'][0])
+            self.assertEqual(exterior[0].tolist(), exterior[-1].tolist())
+            self.assertTrue(point_in_ring((26.11, 44.41), exterior))
+            areas.append(ring_area(exterior))
+
+        self.assertGreater(areas[0], 0)
+        self.assertGreater(areas[1], areas[0])
+        small = np.array(features[0]['geometry']['coordinates'][0])
+        self.assertTrue(np.all((small[:, 0] > 26.10) & (small[:, 0] < 26.12)))
+
+    def test_get_travel_times_with_local_backend(self):
+        """
+        Test that get_travel_times answers from the local graph without an API key.
+        """
+        graph_path = os.path.join(self.tmp_dir, 'graph.npz')
+        self.graph.save(graph_path)
+
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            TRAVEL_TIME_API_KEY = None
+            ROUTING_BACKEND = 'local'
+            ROAD_GRAPH_PATH = graph_path
+
+        app = create_app(TestConfig)
+        with app.app_context():
+            result = get_travel_times(44.40, 26.10, [{'lat': 44.42, 'lng': 26.12}, {'lat': 44.41, 'lng': 26.10}])
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(len(result['results']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
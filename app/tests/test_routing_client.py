@@ -0,0 +1,167 @@
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from app.services.rate_limiter import INTERACTIVE, RateLimiter, RateLimitExceeded
+from app.services.routing_client import CircuitBreaker, CircuitOpenError, RoutingClient
+from app.tests.stub_ors import StubORSServer
+
+
+class TestRoutingClient(unittest.TestCase):
+    """
+    Test suite for the RoutingClient class.
+
+    These tests run the client against the local stub ORS server to verify
+    retries with backoff, Retry-After handling, timeouts and the circuit
+    breaker without touching the real OpenRouteService API.
+    """
+
+    def make_client(self, server, **kwargs):
+        """Create a client with short delays suitable for tests"""
+        options = {
+            'backoff_factor': 0.01,
+            'max_backoff': 0.5,
+            'max_retries': 3,
+            'read_timeout': 2.0
+        }
+        options.update(kwargs)
+        return RoutingClient(base_url=server.url, **options)
+
+    def test_matrix_request_succeeds(self):
+        """
+        Test that a matrix request is answered with one duration row per source.
+        """
+        with StubORSServer() as server:
+            client = self.make_client(server)
+            response = client.post('/v2/matrix/driving-car', json={
+                'locations': [[26.10, 44.43], [26.12, 44.44], [26.15, 44.45]],
+                'sources': [0],
+                'destinations': [1, 2]
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['durations'][0]), 2)
+
+    def test_retries_transient_failures(self):
+        """
+        Test that 503 and 429 responses are retried until the upstream succeeds.
+        """
+        with StubORSServer(failures=[503, 429]) as server:
+            client = self.make_client(server)
+            response = client.post('/v2/isochrones/driving-car', json={
+                'locations': [[26.10, 44.43]],
+                'range': [300]
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(server.request_count, 3)
+
+    def test_honors_retry_after(self):
+        """
+        Test that the delay before a retry is at least the Retry-After value.
+
+        A Retry-After longer than max_backoff is not waited for; the 429 is
+        returned to the caller straight away instead.
+        """
+        with StubORSServer(failures=[429], retry_after='0.3') as server:
+            client = self.make_client(server)
+            started = time.monotonic()
+            response = client.post('/v2/isochrones/driving-car', json={'locations': [], 'range': []})
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(elapsed, 0.3)
+
+        with StubORSServer(failures=[429], retry_after='120') as server:
+            client = self.make_client(server)
+            response = client.post('/v2/isochrones/driving-car', json={'locations': [], 'range': []})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(server.request_count, 1)
+
+    def test_read_timeout(self):
+        """
+        Test that a slow upstream raises a timeout instead of blocking forever.
+        """
+        with StubORSServer(latency=0.5) as server:
+            client = self.make_client(server, read_timeout=0.1, max_retries=0)
+            with self.assertRaises(requests.exceptions.Timeout):
+                client.post('/v2/isochrones/driving-car', json={'locations': [], 'range': []})
+
+    def test_circuit_opens_and_fails_fast(self):
+        """
+        Test that the circuit opens after repeated failures and later recovers.
+
+        While open no request may reach the stub; once the reset timeout has
+        passed a single trial request is let through and closes the circuit.
+        """
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+        with StubORSServer(down=True) as server:
+            client = self.make_client(server, max_retries=1, circuit_breaker=breaker)
+            response = client.post('/v2/isochrones/driving-car', json={'locations': [], 'range': []})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+            calls_before = server.request_count
+            with self.assertRaises(CircuitOpenError):
+                client.post('/v2/isochrones/driving-car', json={'locations': [], 'range': []})
+            self.assertEqual(server.request_count, calls_before)
+
+            server.down = False
+            time.sleep(0.25)
+            response = client.post('/v2/isochrones/driving-car', json={'locations': [], 'range': []})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_unexpected_error_ends_half_open_trial(self):
+        """
+        Test that a trial request failing with an error other than a connection
+        error or timeout reopens the circuit instead of leaving it stuck.
+        """
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+        breaker.record_failure()
+        time.sleep(0.15)
+        with StubORSServer() as server:
+            client = self.make_client(server, max_retries=0, circuit_breaker=breaker)
+            with mock.patch.object(client.session, 'post',
+                                   side_effect=requests.exceptions.ChunkedEncodingError('truncated')):
+                with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                    client.post('/v2/isochrones/driving-car', json={'locations': [], 'range': []})
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+            time.sleep(0.15)
+            response = client.post('/v2/isochrones/driving-car', json={'locations': [], 'range': []})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_open_circuit_does_not_spend_quota(self):
+        """
+        Test that an open circuit fails fast without taking or waiting for a
+        call from an empty bucket, and that a half-open trial refused by the
+        limiter leaves the trial to the next call.
+        """
+        limiter = RateLimiter(limits={'isochrones': (1, None)}, max_wait={INTERACTIVE: 1.0})
+        limiter.acquire('isochrones')
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+        breaker.record_failure()
+        with StubORSServer() as server:
+            client = self.make_client(server, circuit_breaker=breaker, rate_limiter=limiter)
+            started = time.perf_counter()
+            with self.assertRaises(CircuitOpenError):
+                client.post('/v2/isochrones/driving-car', json={'locations': [], 'range': []})
+            self.assertLess(time.perf_counter() - started, 0.5)
+            self.assertEqual(limiter.stats()['buckets']['isochrones']['used_today'], 1)
+
+            time.sleep(0.25)
+            with self.assertRaises(RateLimitExceeded):
+                client.post('/v2/isochrones/driving-car', json={'locations': [], 'range': []})
+            self.assertEqual(server.request_count, 0)
+        self.assertTrue(breaker.allow_request())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from PIL import Image
+
+from app import create_app, db
+from app.config import Config
+from app.services.screenshot_catalog import (backfill, list_screenshots, mark_deformed, parse_bbox,
+                                            register_screenshot)
+
+
+def bounds(south, west, north, east):
+    return {'northEast': {'lat': north, 'lng': east}, 'southWest': {'lat': south, 'lng': west}}
+
+
+class TestScreenshotCatalog(unittest.TestCase):
+    """
+    Test suite for the screenshot catalog: registration at save time, keyset
+    paginated listing with the bounding box filter and the backfill of
+    existing screenshot folders.
+    """
+
+    def setUp(self):
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_pages_are_newest_first_without_gaps(self):
+        """
+        Test that following next_cursor visits every screenshot once, newest
+        first, including two saved in the same second.
+        """
+        for minute in range(6):
+            register_screenshot(f'map-screenshot-20250101-10{minute:02d}00', f'20250101-10{minute:02d}00', [], {})
+        register_screenshot('map-screenshot-20250101-100500-2', '20250101-100500', [{'lat': 1, 'lng': 2}], {})
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = list_screenshots(limit=3, cursor=cursor)
+            self.assertLessEqual(len(page), 3)
+            seen.extend(screenshot.id for screenshot in page)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen[:2], ['map-screenshot-20250101-100500-2', 'map-screenshot-20250101-100500'])
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+        response = self.client.get('/api/screenshots?limit=2')
+        body = response.get_json()
+        self.assertEqual([s['id'] for s in body['screenshots']], seen[:2])
+        self.assertEqual(body['screenshots'][0]['poiCount'], 1)
+        following = self.client.get(f"/api/screenshots?limit=2&cursor={body['next_cursor']}").get_json()
+        self.assertEqual([s['id'] for s in following['screenshots']], seen[2:4])
+
+        self.assertEqual(self.client.get('/api/screenshots?cursor=garbage').status_code, 400)
+
+    def test_bbox_filter(self):
+        """
+        Test that only screenshots whose bounds intersect the box are listed.
+        """
+        register_screenshot('bucharest', '20250101-100000', [], bounds(44.40, 26.00, 44.50, 26.20))
+        register_screenshot('cluj', '20250101-110000', [], bounds(46.70, 23.50, 46.80, 23.70))
+        register_screenshot('no-bounds', '20250101-120000', [], {})
+
+        page, _ = list_screenshots(bbox=(26.10, 44.45, 26.30, 44.60))
+        self.assertEqual([s.id for s in page], ['bucharest'])
+
+        body = self.client.get('/api/screenshots?bbox=20,40,30,50').get_json()
+        self.assertEqual([s['id'] for s in body['screenshots']], ['cluj', 'bucharest'])
+        self.assertEqual(self.client.get('/api/screenshots?bbox=1,2,3').status_code, 400)
+
+        # A box across the antimeridian matches bounds on either side of it
+        register_screenshot('fiji', '20250101-130000', [], bounds(-18.20, 177.30, -17.50, 178.60))
+        register_screenshot('samoa', '20250101-140000', [], bounds(-14.10, -172.80, -13.40, -171.40))
+        page, _ = list_screenshots(bbox=parse_bbox('170,-20,-170,-10'))
+        self.assertEqual([s.id for s in page], ['samoa', 'fiji'])
+
+    def test_save_registers_and_deform_marks(self):
+        """
+        Test that /save-screenshot adds the screenshot to the listing and that
+        mark_deformed flips its timeDeformed flag.
+        """
+        screenshot_dir = os.path.join(self.app.root_path, 'locals', 'map_screenshots')
+        before = set(os.listdir(screenshot_dir))
+        image = io.BytesIO()
+        Image.new('RGB', (32, 32)).save(image, format='PNG')
+        try:
+            response = self.client.post('/save-screenshot', data=image.getvalue(), content_type='image/png',
+                                        headers={'X-Screenshot-Metadata': json.dumps({
+                                            'pois': [{'lat': 44.43, 'lng': 26.10}] * 2,
+                                            'bounds': bounds(44.4, 26.0, 44.5, 26.2)
+                                        })})
+            self.assertEqual(response.status_code, 200)
+            screenshot_id = os.path.splitext(response.get_json()['filename'])[0]
+
+            listed = self.client.get('/api/screenshots').get_json()['screenshots']
+            self.assertEqual(listed[0]['id'], screenshot_id)
+            self.assertEqual(listed[0]['poiCount'], 2)
+            self.assertFalse(listed[0]['timeDeformed'])
+
+            mark_deformed(screenshot_id)
+            listed = self.client.get('/api/screenshots').get_json()['screenshots']
+            self.assertTrue(listed[0]['timeDeformed'])
+        finally:
+            for name in set(os.listdir(screenshot_dir)) - before:
+                os.remove(os.path.join(screenshot_dir, name))
+
+    def test_backfill(self):
+        """
+        Test that backfill registers screenshots with a PNG and skips other JSON files.
+        """
+        for name, deformed in (('map-screenshot-20250101-100000', True), ('map-screenshot-20250102-100000', False)):
+            with open(os.path.join(self.tmp_dir, f'{name}.json'), 'w') as f:
+                json.dump({'timestamp': name[-15:], 'pois': [{'lat': 1, 'lng': 1}], 'bounds': {}}, f)
+            Image.new('RGB', (8, 8)).save(os.path.join(self.tmp_dir, f'{name}.png'))
+            if deformed:
+                Image.new('RGB', (8, 8)).save(os.path.join(self.tmp_dir, f'{name}-timedeformed.png'))
+        with open(os.path.join(self.tmp_dir, 'last_time_matrix.json'), 'w') as f:
+            json.dump({'matrix': []}, f)
+
+        self.assertEqual(backfill(self.tmp_dir), 2)
+        self.assertEqual(backfill(self.tmp_dir), 2)
+        page, cursor = list_screenshots()
+        self.assertIsNone(cursor)
+        self.assertEqual([(s.id, s.deformed) for s in page], [
+            ('map-screenshot-20250102-100000', False),
+            ('map-screenshot-20250101-100000', True)
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
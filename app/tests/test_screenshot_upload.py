@@ -0,0 +1,137 @@
+import base64
+import io
+import json
+import os
+import threading
+import unittest
+
+from PIL import Image
+
+from app import create_app
+from app.config import Config
+
+
+def png_bytes(width=64, height=48):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (10, 20, 30)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class TestScreenshotUpload(unittest.TestCase):
+    """
+    Test suite for /save-screenshot: the streamed multipart and raw PNG uploads,
+    the original JSON data URL form and the size limit enforced while reading.
+    """
+
+    def setUp(self):
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            SCREENSHOT_MAX_BYTES = 200 * 1024
+            SCREENSHOT_CHUNK_SIZE = 1024
+
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.screenshot_dir = os.path.join(self.app.root_path, 'locals', 'map_screenshots')
+        self.before = set(os.listdir(self.screenshot_dir))
+        self.metadata = {'pois': [{'lat': 44.43, 'lng': 26.10}], 'bounds': {'northEast': {'lat': 44.5, 'lng': 26.2}}}
+
+    def tearDown(self):
+        for name in set(os.listdir(self.screenshot_dir)) - self.before:
+            os.remove(os.path.join(self.screenshot_dir, name))
+
+    def assertSaved(self, response, image):
+        self.assertEqual(response.status_code, 200, response.get_json())
+        body = response.get_json()
+        with open(os.path.join(self.screenshot_dir, body['filename']), 'rb') as f:
+            self.assertEqual(f.read(), image)
+        with open(os.path.join(self.screenshot_dir, body['metadata'])) as f:
+            saved = json.load(f)
+        self.assertEqual(saved['pois'], self.metadata['pois'])
+        self.assertEqual(saved['bounds'], self.metadata['bounds'])
+        return body
+
+    def test_multipart_upload(self):
+        """
+        Test the multipart form used by map.js.
+        """
+        image = png_bytes()
+        response = self.client.post('/save-screenshot', data={
+            'metadata': json.dumps(self.metadata),
+            'image': (io.BytesIO(image), 'screenshot.png', 'image/png')
+        }, content_type='multipart/form-data')
+        self.assertSaved(response, image)
+
+    def test_raw_upload_and_unique_names(self):
+        """
+        Test a raw PNG body with header metadata; two uploads in the same second get distinct names.
+        """
+        image = png_bytes()
+        headers = {'X-Screenshot-Metadata': json.dumps(self.metadata)}
+        first = self.assertSaved(self.client.post('/save-screenshot', data=image, content_type='image/png',
+                                                  headers=headers), image)
+        second = self.assertSaved(self.client.post('/save-screenshot', data=image, content_type='image/png',
+                                                   headers=headers), image)
+        self.assertNotEqual(first['filename'], second['filename'])
+
+    def test_concurrent_uploads(self):
+        """
+        Test that uploads racing in the same second each keep their own file.
+        """
+        images = [png_bytes(width=64 + i) for i in range(8)]
+        headers = {'X-Screenshot-Metadata': json.dumps(self.metadata)}
+        start = threading.Barrier(len(images))
+        responses = {}
+
+        def upload(image):
+            client = self.app.test_client()
+            start.wait()
+            responses[image] = client.post('/save-screenshot', data=image, content_type='image/png',
+                                           headers=headers)
+
+        threads = [threading.Thread(target=upload, args=(image,)) for image in images]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        names = {self.assertSaved(response, image)['filename'] for image, response in responses.items()}
+        self.assertEqual(len(names), len(images))
+        self.assertFalse([name for name in os.listdir(self.screenshot_dir) if name.endswith('.part')])
+
+    def test_json_data_url_still_accepted(self):
+        """
+        Test backward compatibility with the base64 data URL body.
+        """
+        image = png_bytes()
+        response = self.client.post('/save-screenshot', json={
+            'imageData': 'data:image/png;base64,' + base64.b64encode(image).decode('ascii'),
+            **self.metadata
+        })
+        self.assertSaved(response, image)
+
+    def test_limits_and_validation(self):
+        """
+        Test that oversized and non-PNG uploads are refused and leave no files behind.
+        """
+        too_big = png_bytes() + b'\0' * (300 * 1024)
+
+        raw = self.client.post('/save-screenshot', data=too_big, content_type='image/png')
+        self.assertEqual(raw.status_code, 413)
+        multipart = self.client.post('/save-screenshot', data={
+            'metadata': '{}',
+            'image': (io.BytesIO(too_big), 'screenshot.png', 'image/png')
+        }, content_type='multipart/form-data')
+        self.assertEqual(multipart.status_code, 413)
+
+        not_png = self.client.post('/save-screenshot', data=b'GIF89a' + b'\0' * 100, content_type='image/png')
+        self.assertEqual(not_png.status_code, 400)
+        bad_metadata = self.client.post('/save-screenshot', data=png_bytes(), content_type='image/png',
+                                        headers={'X-Screenshot-Metadata': 'not json'})
+        self.assertEqual(bad_metadata.status_code, 400)
+
+        self.assertEqual(set(os.listdir(self.screenshot_dir)), self.before)
+
+
+if __name__ == '__main__':
+    unittest.main()
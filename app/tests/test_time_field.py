@@ -0,0 +1,181 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app import create_app
+from app.config import Config
+from app.services.distance_matrix import haversine_matrix
+from app.services.geometry import contour_rings, nest_rings, point_in_ring, ring_area
+from app.services.routing_backend import RoutingBackend
+from app.services.time_field import NO_DATA, TimeFieldStore, build_time_field
+from app.tests.stub_ors import StubORSServer
+
+ORIGIN = (45.75, 21.23)
+
+
+class RadialBackend(RoutingBackend):
+    """Straight-line times at 36 km/h, unreachable beyond max_meters; counts matrix calls"""
+
+    name = 'radial'
+
+    def __init__(self, max_meters=np.inf):
+        self.max_meters = max_meters
+        self.calls = 0
+
+    def matrix(self, sources, destinations, travel_mode='driving-car', known=None):
+        self.calls += 1
+        lats = lambda points: [p['lat'] if isinstance(p, dict) else p[0] for p in points]
+        lngs = lambda points: [p['lng'] if isinstance(p, dict) else p[1] for p in points]
+        meters = haversine_matrix(lats(sources), lngs(sources), lats(destinations), lngs(destinations))
+        return np.where(meters <= self.max_meters, meters / 10.0, np.nan)
+
+
+class TestTimeField(unittest.TestCase):
+    """
+    Test suite for travel-time fields: marching squares contouring, the uint16
+    field store and the /api/isochrones/field endpoint that answers slider
+    moves without routing again.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_contour_of_a_cone_is_a_circle(self):
+        """
+        Test that the contour of a distance cone encloses the area of its circle.
+        """
+        y, x = np.mgrid[0:100, 0:100]
+        rings = contour_rings(np.hypot(x - 50, y - 50), 30)
+        self.assertEqual(len(rings), 1)
+        np.testing.assert_array_equal(rings[0][0], rings[0][-1])
+        self.assertAlmostEqual(abs(ring_area(rings[0])), np.pi * 30 ** 2, delta=5)
+
+    def test_unreachable_cells_become_holes(self):
+        """
+        Test that unreachable cells inside the reachable area are cut out as a
+        clockwise hole of a counter-clockwise exterior, and that separate areas
+        become separate polygons.
+        """
+        y, x = np.mgrid[0:100, 0:100]
+        values = np.hypot(x - 50, y - 50)
+        values[values < 10] = np.nan
+        polygons = nest_rings(contour_rings(values, 30))
+        self.assertEqual(len(polygons), 1)
+        exterior, holes = polygons[0]
+        self.assertEqual(len(holes), 1)
+        self.assertGreater(ring_area(exterior), 0)
+        self.assertLess(ring_area(holes[0]), 0)
+        self.assertTrue(point_in_ring((50, 50), holes[0]))
+
+        twin = np.minimum(np.hypot(x - 25, y - 50), np.hypot(x - 75, y - 50))
+        self.assertEqual(len(nest_rings(contour_rings(twin, 10))), 2)
+
+    def test_saddles_follow_the_cell_centre(self):
+        """
+        Test that a saddle cell joins its inside corners only when its centre is inside.
+        """
+        values = np.array([[0.0, 2.0], [2.0, 0.0]])
+        self.assertEqual(len(contour_rings(values, 0.5)), 2)
+        self.assertEqual(len(contour_rings(values, 1.5)), 1)
+
+    def test_field_isochrones_match_the_backend_reach(self):
+        """
+        Test that a field contours into nested, ascending isochrones whose extent
+        matches the straight-line reach of the backend.
+        """
+        field = build_time_field(RadialBackend(), *ORIGIN, 'driving-car', 15, 60, grid_size=64)
+        self.assertEqual(field.seconds.dtype, np.uint16)
+        self.assertEqual(field.seconds.shape, (64, 64))
+
+        isochrones = field.isochrones([600, 300])
+        self.assertEqual([f['properties']['value'] for f in isochrones['features']], [300, 600])
+        for feature, meters in zip(isochrones['features'], (3000, 6000)):
+            ring = np.array(feature['geometry']['coordinates'][0])
+            self.assertGreater(ring_area(ring), 0)
+            half_width = (ring[:, 1].max() - ring[:, 1].min()) / 2 * 111195
+            self.assertAlmostEqual(half_width, meters, delta=meters * 0.05)
+
+    def test_store_round_trip_is_memory_mapped(self):
+        """
+        Test that a stored field is read back from a uint16 memory map with its
+        unreachable cells and bounds intact.
+        """
+        field = build_time_field(RadialBackend(max_meters=2000), *ORIGIN, 'foot-walking', 15, 6, grid_size=16)
+        store = TimeFieldStore(os.path.join(self.tmp_dir, 'fields'))
+        key = store.key(*ORIGIN, 'foot-walking', 'radial', 15, 16)
+        store.put(key, field)
+
+        loaded = TimeFieldStore(os.path.join(self.tmp_dir, 'fields')).get(key)
+        self.assertIsInstance(loaded.seconds, np.memmap)
+        np.testing.assert_array_equal(loaded.seconds, field.seconds)
+        self.assertTrue((loaded.seconds == NO_DATA).any())
+        self.assertEqual(loaded.bounds, field.bounds)
+        self.assertEqual(len(store), 1)
+
+    def test_slider_values_reuse_the_field(self):
+        """
+        Test that the endpoint routes once per origin and mode and answers other
+        times from the cached field, building a larger one only beyond its extent.
+        """
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            TIME_FIELD_PATH = ''
+            TIME_FIELD_GRID = 32
+
+        backend = RadialBackend()
+        client = create_app(TestConfig).test_client()
+        with mock.patch('app.services.travel_time_service.get_routing_backend', return_value=backend):
+            for minutes in (5, 10, 12):
+                response = client.get(f'/api/isochrones/field?origin_lat={ORIGIN[0]}&origin_lng={ORIGIN[1]}'
+                                      f'&times={minutes // 2},{minutes}')
+                self.assertEqual(response.status_code, 200)
+                features = response.get_json()['features']
+                self.assertEqual([f['properties']['time_minutes'] for f in features], [minutes // 2, minutes])
+            self.assertEqual(backend.calls, 1)
+
+            client.get(f'/api/isochrones/field?origin_lat={ORIGIN[0]}&origin_lng={ORIGIN[1]}&times=20')
+            self.assertEqual(backend.calls, 2)
+            client.get(f'/api/isochrones/field?origin_lat={ORIGIN[0]}&origin_lng={ORIGIN[1]}&times=3')
+            self.assertEqual(backend.calls, 2)
+
+        self.assertEqual(client.get('/api/isochrones/field?origin_lat=45.7').status_code, 400)
+        self.assertEqual(client.get('/api/isochrones/field?origin_lat=45.7&origin_lng=21.2&times=0').status_code, 400)
+
+    def test_remote_fields_fit_the_request_budget(self):
+        """
+        Test that a field routed by OpenRouteService costs at most
+        TIME_FIELD_MAX_REQUESTS matrix requests, and that one the rate limit
+        cannot serve is refused with 429 before any of them is sent.
+        """
+        with StubORSServer() as server:
+            class TestConfig(Config):
+                TESTING = True
+                SQLALCHEMY_DATABASE_URI = 'sqlite://'
+                ORS_BASE_URL = server.url
+                TRAVEL_TIME_API_KEY = 'test-key'
+                TIME_FIELD_PATH = ''
+                ISOCHRONE_CACHE_PATH = ''
+                RATE_LIMIT_PATH = ''
+                RATE_LIMITS = {'matrix': (6, None)}
+                RATE_LIMIT_INTERACTIVE_WAIT = 0
+
+            client = create_app(TestConfig).test_client()
+            response = client.get(f'/api/isochrones/field?origin_lat={ORIGIN[0]}&origin_lng={ORIGIN[1]}&times=5')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(server.request_count, 4)
+
+            response = client.get('/api/isochrones/field?origin_lat=45.8&origin_lng=21.3&times=5')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(server.request_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from app import create_app
+from app.config import Config
+from app.services.map_deformer import MapDeformer
+from app.services.warp import (fit_thin_plate, get_warp_field_cache, thin_plate_field, thin_plate_transform,
+                               warp_field, warp_screenshot)
+
+POINTS = np.array([[0.2, 0.2], [0.8, 0.3], [0.5, 0.9], [0.1, 0.7], [0.6, 0.55]])
+
+
+def gradient_image(width, height):
+    """RGB image whose red and green channels encode x and y"""
+    x = np.linspace(0, 255, width)[None, :].repeat(height, axis=0)
+    y = np.linspace(0, 255, height)[:, None].repeat(width, axis=1)
+    return Image.fromarray(np.stack([x, y, np.full_like(x, 128)], axis=-1).astype(np.uint8))
+
+
+class TestWarp(unittest.TestCase):
+    """
+    Test suite for the thin-plate spline raster warp of map screenshots and
+    the cache of its coarse fields.
+    """
+
+    def test_spline_passes_through_control_points(self):
+        """
+        Test that the fitted spline takes every control point to its target.
+        """
+        rng = np.random.default_rng(0)
+        control, target = rng.uniform(0, 1, (40, 2)), rng.uniform(0, 1, (40, 2))
+        weights, affine = fit_thin_plate(control, target)
+        np.testing.assert_allclose(thin_plate_transform(control, control, weights, affine), target, atol=1e-8)
+
+    def test_identical_layout_leaves_image_unchanged(self):
+        """
+        Test that a layout equal to the geographic positions reproduces the screenshot.
+        """
+        image = gradient_image(160, 100)
+        field = thin_plate_field(POINTS, POINTS, grid_size=8)
+        self.assertEqual(field.shape, (9, 9, 2))
+        warped = np.asarray(warp_screenshot(image, field)).astype(int)
+        self.assertLessEqual(np.abs(warped - np.asarray(image)).max(), 2)
+
+    def test_pois_land_on_their_time_positions(self):
+        """
+        Test that the screenshot pixel under each POI is drawn at its time-based
+        position, at any output resolution.
+        """
+        image = gradient_image(320, 200)
+        dst = np.array([[0.3, 0.25], [0.7, 0.2], [0.55, 0.8], [0.2, 0.6], [0.5, 0.45]])
+        field = thin_plate_field(POINTS, dst)
+        for size in ((320, 200), (640, 400)):
+            warped = np.asarray(warp_screenshot(image, field, size)).astype(int)
+            source = np.asarray(image).astype(int)
+            for (sx, sy), (dx, dy) in zip(POINTS * (320, 200), dst * size):
+                expected = source[int(sy), int(sx), :2]
+                self.assertLessEqual(np.abs(warped[int(dy), int(dx), :2] - expected).max(), 4)
+
+    def test_outside_screenshot_is_filled(self):
+        """
+        Test that positions mapped outside the screenshot get the fill colour.
+        """
+        field = thin_plate_field([[0.5, 0.5]], [[0.1, 0.5]], grid_size=4)
+        warped = np.asarray(warp_screenshot(gradient_image(100, 100), field, fillcolor=(1, 2, 3)))
+        self.assertEqual(warped[50, 95].tolist(), [1, 2, 3])
+        self.assertEqual(warped[50, 10, 0], np.asarray(gradient_image(100, 100))[50, 50, 0])
+
+    def test_fields_are_cached_per_layout(self):
+        """
+        Test that the application reuses the field of a layout and solves a new one
+        when the layout or the smoothing changes.
+        """
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+        with create_app(TestConfig).app_context():
+            first = warp_field(POINTS, POINTS[::-1])
+            self.assertIs(warp_field(POINTS, POINTS[::-1]), first)
+            self.assertIsNot(warp_field(POINTS, POINTS), first)
+            self.assertIsNot(warp_field(POINTS, POINTS[::-1], smoothing=0.5), first)
+            self.assertEqual(len(get_warp_field_cache()), 3)
+            self.assertFalse(first.flags.writeable)
+
+    def test_warp_image_shows_the_screenshot(self):
+        """
+        Test that the time panel of the rendered map shows the warped screenshot
+        while the geographic panel keeps its plain grid.
+        """
+        deformer = MapDeformer.__new__(MapDeformer)
+        deformer.font_path = None
+        image = gradient_image(200, 150)
+        rendered = np.asarray(deformer.warp_image(image, POINTS, POINTS))
+
+        # Blue channel 128 comes from the screenshot only
+        self.assertGreater((rendered[60:140, 250:440, 2] == 128).mean(), 0.5)
+        self.assertLess((rendered[60:140, 10:190, 2] == 128).mean(), 0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
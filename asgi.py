@@ -0,0 +1,5 @@
+from app import create_app
+from app.asgi import AsgiApp
+
+# ASGI entry point, e.g. uvicorn asgi:application (run.py serves WSGI)
+application = AsgiApp(create_app())
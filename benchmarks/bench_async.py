@@ -0,0 +1,82 @@
+"""
+Compare a synchronous WSGI worker with the ASGI entry point under load.
+
+    python -m benchmarks.bench_async --requests 40 --latency 0.2
+
+Runs against the local stub of OpenRouteService with the given latency per
+upstream request. The WSGI run serves the isochrone requests one after the
+other, as a single sync worker does; the ASGI run sends all of them at once
+to asgi.AsgiApp on one event loop, where the async views keep the upstream
+calls in flight together.
+"""
+import argparse
+import asyncio
+import time
+
+from app import create_app
+from app.asgi import AsgiApp
+from app.config import Config
+from app.services import async_routing
+from app.tests.stub_ors import StubORSServer
+
+
+async def _get(application, path, query):
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(),
+             'headers': [(b'host', b'localhost')], 'server': ('localhost', 80)}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    await application(scope, receive, send)
+    return sent[0]['status']
+
+
+async def _load(application, queries):
+    statuses = await asyncio.gather(*(_get(application, '/api/isochrones', query) for query in queries))
+    await async_routing.close_async_clients()
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds per upstream request')
+    args = parser.parse_args()
+
+    queries = [f"origin_lat={45.70 + (i % 10) * 0.01}&origin_lng={21.20 + (i // 10) * 0.01}&times=5,10"
+               for i in range(args.requests)]
+
+    with StubORSServer(latency=args.latency) as server:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            ORS_BASE_URL = server.url
+            TRAVEL_TIME_API_KEY = 'bench-key'
+            ISOCHRONE_CACHE_ENABLED = False
+            RATE_LIMIT_ENABLED = False  # The stub has no quota
+
+        app = create_app(BenchConfig)
+        transport = 'httpx' if async_routing.httpx is not None else 'threads'
+        print(f"async upstream transport: {transport}")
+        print(f"{'run':>5} {'upstream':>9} {'seconds':>8} {'req/s':>7}")
+
+        client = app.test_client()
+        started = time.perf_counter()
+        for query in queries:
+            client.get(f'/api/isochrones?{query}')
+        elapsed = time.perf_counter() - started
+        print(f"{'wsgi':>5} {server.request_count:>9} {elapsed:>8.2f} {len(queries) / elapsed:>7.1f}")
+
+        server.request_count = 0
+        started = time.perf_counter()
+        statuses = asyncio.run(_load(AsgiApp(app), queries))
+        elapsed = time.perf_counter() - started
+        assert all(status == 200 for status in statuses), statuses
+        print(f"{'asgi':>5} {server.request_count:>9} {elapsed:>8.2f} {len(queries) / elapsed:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
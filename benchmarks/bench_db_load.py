@@ -0,0 +1,114 @@
+"""
+Concurrent read/write load against the POI API on a SQLite file.
+
+    python -m benchmarks.bench_db_load --workers 4 --writers 1 --seconds 10
+
+Each worker is a separate process with its own app, as gunicorn workers
+are. Readers page through GET /api/pois?limit=100, writers POST single
+POIs. The run is repeated with SQLite's defaults (rollback journal,
+synchronous=FULL, SQLITE_TUNING=False) and with the tuned engine settings
+from app/database.py, and reports throughput, latency percentiles and the
+requests that failed, typically with "database is locked".
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app import create_app, db
+from app.config import Config
+from app.services.poi_bulk import bulk_apply
+
+
+def config_class(path, tuned):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLITE_TUNING = tuned
+        # The untuned run keeps sqlite3's own 5 s busy timeout
+        SQLITE_BUSY_TIMEOUT = 5
+        POI_INDEX_MAX_AGE = 3600
+    return BenchConfig
+
+
+def seed(path, rows, tuned):
+    app = create_app(config_class(path, tuned))
+    with app.app_context():
+        db.create_all()
+        rng = np.random.default_rng(0)
+        bulk_apply([{'name': f'POI {i}', 'latitude': float(lat), 'longitude': float(lng), 'category': 'Cafe'}
+                    for i, (lat, lng) in enumerate(zip(rng.uniform(45.70, 45.82, rows),
+                                                       rng.uniform(21.15, 21.31, rows)))], 'create')
+        db.engine.dispose()
+
+
+def worker(path, tuned, role, seconds, results):
+    app = create_app(config_class(path, tuned))
+    client = app.test_client()
+    latencies, errors = [], 0
+    rng = np.random.default_rng(os.getpid())
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'write':
+                response = client.post('/api/pois', json={
+                    'name': 'load', 'latitude': float(rng.uniform(45.70, 45.82)),
+                    'longitude': float(rng.uniform(21.15, 21.31)), 'category': 'Cafe'})
+            else:
+                response = client.get(f'/api/pois?limit=100&cursor={int(rng.integers(0, 5000))}')
+            # Drain streamed listings so the request context is closed
+            response.get_data()
+            response.close()
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors += 1
+    results.put((role, latencies, errors))
+
+
+def run(path, tuned, readers, writers, seconds):
+    results = multiprocessing.Queue()
+    roles = ['read'] * readers + ['write'] * writers
+    processes = [multiprocessing.Process(target=worker, args=(path, tuned, role, seconds, results))
+                 for role in roles]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    summary = {}
+    for role in ('read', 'write'):
+        latencies = np.concatenate([np.asarray(l) for r, l, _ in collected if r == role] or [np.empty(0)])
+        errors = sum(e for r, _, e in collected if r == role)
+        p50, p99 = (np.percentile(latencies, [50, 99]) * 1000) if len(latencies) else (0, 0)
+        summary[role] = (len(latencies) / seconds, p50, p99, errors)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='reader processes')
+    parser.add_argument('--writers', type=int, default=1, help='writer processes')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=5000, help='POIs seeded before the run')
+    args = parser.parse_args()
+
+    print(f"{'settings':>9} {'role':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for tuned in (False, True):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'bench.db')
+            seed(path, args.rows, tuned)
+            summary = run(path, tuned, args.workers, args.writers, args.seconds)
+        for role, (rate, p50, p99, errors) in summary.items():
+            print(f"{'tuned' if tuned else 'default':>9} {role:>6} {rate:>8.0f} {p50:>8.1f} {p99:>8.1f} {errors:>7}")
+
+
+if __name__ == '__main__':
+    main()
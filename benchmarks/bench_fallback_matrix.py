@@ -0,0 +1,67 @@
+"""
+Compare the original per-pair loop with the vectorized fallback time matrix.
+
+    python -m benchmarks.bench_fallback_matrix --sizes 10 100 1000 5000
+
+Random POIs are spread over a city-sized box. The loop is timed on at most
+--loop-rows rows and scaled up, since every row costs the same; those timings
+are marked with '~'.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.distance_matrix import fallback_time_matrix
+
+
+def loop_time_matrix(coords, rows=None):
+    """The fallback matrix as MapDeformer computed it before vectorization"""
+    n = len(coords)
+    dist_matrix = np.zeros((n, n))
+    for i in range(n if rows is None else rows):
+        for j in range(n):
+            lat1, lon1 = coords[i]
+            lat2, lon2 = coords[j]
+            dx = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
+            dy = lat2 - lat1
+            dist = 111.3 * np.sqrt(dx*dx + dy*dy)
+            dist_matrix[i, j] = dist * 72
+    return dist_matrix
+
+
+def best_of(call, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--loop-rows', type=int, default=50, help='rows timed for the loop before scaling up')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'POIs':>6} {'loop':>12} {'float64':>10} {'float32':>10} {'chunked':>10} {'speedup':>9}")
+    for n in args.sizes:
+        coords = np.column_stack([rng.uniform(44.35, 44.50, n), rng.uniform(26.00, 26.20, n)])
+        lats, lngs = coords[:, 0], coords[:, 1]
+
+        rows = min(n, args.loop_rows)
+        loop = best_of(lambda: loop_time_matrix(coords, rows), 1) * n / rows
+        vec64 = best_of(lambda: fallback_time_matrix(lats, lngs), args.repeat)
+        vec32 = best_of(lambda: fallback_time_matrix(lats, lngs, dtype=np.float32), args.repeat)
+        chunked = best_of(lambda: fallback_time_matrix(lats, lngs, dtype=np.float32, chunk_size=1024), args.repeat)
+
+        marker = '~' if rows < n else ' '
+        print(f"{n:>6} {marker}{loop * 1000:>9.1f} ms {vec64 * 1000:>7.2f} ms {vec32 * 1000:>7.2f} ms "
+              f"{chunked * 1000:>7.2f} ms {loop / vec64:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
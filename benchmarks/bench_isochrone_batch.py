@@ -0,0 +1,53 @@
+"""
+Compare one isochrone request per origin with the batch endpoint.
+
+    python -m benchmarks.bench_isochrone_batch --origins 50 --latency 0.2
+
+Runs against the local stub of OpenRouteService with the given latency per
+upstream request. The sequential run calls /api/isochrones once per depot;
+the batch run posts all of them to /api/isochrones/batch, which packs them
+into requests of ISOCHRONE_MAX_LOCATIONS origins sent in parallel.
+"""
+import argparse
+import time
+
+from app import create_app
+from app.config import Config
+from app.tests.stub_ors import StubORSServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--origins', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds per upstream request')
+    parser.add_argument('--workers', type=int, default=4, help='ISOCHRONE_BATCH_WORKERS')
+    args = parser.parse_args()
+
+    origins = [{'id': i, 'lat': 45.70 + (i % 10) * 0.01, 'lng': 21.20 + (i // 10) * 0.01}
+               for i in range(args.origins)]
+
+    with StubORSServer(latency=args.latency) as server:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            ORS_BASE_URL = server.url
+            TRAVEL_TIME_API_KEY = 'bench-key'
+            ISOCHRONE_CACHE_ENABLED = False
+            RATE_LIMIT_ENABLED = False  # The stub has no quota
+            ISOCHRONE_BATCH_WORKERS = args.workers
+
+        client = create_app(BenchConfig).test_client()
+        print(f"{'run':>10} {'upstream':>9} {'seconds':>8}")
+
+        started = time.perf_counter()
+        for origin in origins:
+            client.get(f"/api/isochrones?origin_lat={origin['lat']}&origin_lng={origin['lng']}&times=5,10")
+        print(f"{'sequential':>10} {server.request_count:>9} {time.perf_counter() - started:>8.2f}")
+
+        server.request_count = 0
+        started = time.perf_counter()
+        client.post('/api/isochrones/batch', json={'origins': origins, 'times': [5, 10]})
+        print(f"{'batch':>10} {server.request_count:>9} {time.perf_counter() - started:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
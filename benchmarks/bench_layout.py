@@ -0,0 +1,44 @@
+"""
+Compare the layout solvers on synthetic travel-time matrices.
+
+    python -m benchmarks.bench_layout --sizes 50 200 1000 3000
+
+Points are scattered over a city, travel times are straight-line times with
+multiplicative road noise. Each solver reports stress-1 and wall time; sklearn
+is skipped above --sklearn-max points because its random restarts dominate.
+"""
+import argparse
+
+import numpy as np
+
+from app.services.distance_matrix import fallback_time_matrix
+from app.services.layout import compute_layout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 1000, 3000])
+    parser.add_argument('--sklearn-max', type=int, default=500)
+    parser.add_argument('--time-budget', type=float, default=5.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'POIs':>6} {'method':>10} {'stress':>8} {'seconds':>9} {'iters':>6}")
+    for n in args.sizes:
+        lats = rng.uniform(44.35, 44.50, n)
+        lngs = rng.uniform(26.00, 26.20, n)
+        noise = rng.lognormal(0.0, 0.2, (n, n))
+        times = fallback_time_matrix(lats, lngs) * (noise + noise.T) / 2
+        reference = np.column_stack([lngs, -lats])
+
+        runs = [('classical', None), ('landmark', None), ('smacof', reference), ('auto', None)]
+        if n <= args.sklearn_max:
+            runs.append(('sklearn', None))
+        for method, ref in runs:
+            result = compute_layout(times, method=method, reference=ref, time_budget=args.time_budget)
+            label = method + ('+geo' if ref is not None else '')
+            print(f"{n:>6} {label:>10} {result.stress:>8.4f} {result.seconds:>9.3f} {result.iterations:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare creating POIs one request at a time with the bulk import.
+
+    python -m benchmarks.bench_poi_bulk --rows 20000 --single-rows 500
+
+Both paths write to a fresh SQLite file. The single-row path replays what
+POST /api/pois does per POI (one ORM insert and one commit); it is timed on
+--single-rows rows, since every row costs the same. The bulk path streams
+the same records as NDJSON through the importer.
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app import create_app, db
+from app.config import Config
+from app.models.poi import PointOfInterest
+from app.services.poi_bulk import bulk_apply, read_records
+
+
+def make_records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lats, lngs = rng.uniform(45.70, 45.82, n), rng.uniform(21.15, 21.31, n)
+    return [{'name': f'POI {i}', 'latitude': float(lat), 'longitude': float(lng), 'category': 'Cafe'}
+            for i, (lat, lng) in enumerate(zip(lats, lngs))]
+
+
+def single_rows(records):
+    started = time.perf_counter()
+    for record in records:
+        db.session.add(PointOfInterest(**record))
+        db.session.commit()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--single-rows', type=int, default=500, help='rows timed for the single-row path')
+    parser.add_argument('--batch-size', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            db.create_all()
+            records = make_records(args.rows)
+
+            single = single_rows(records[:args.single_rows])
+            single_rate = args.single_rows / single
+
+            body = io.BytesIO(''.join(json.dumps(record) + '\n' for record in records).encode('utf-8'))
+            report = bulk_apply(read_records(body, 'ndjson'), 'create', batch_size=args.batch_size)
+
+            print(f"{'path':>12} {'rows':>8} {'seconds':>9} {'rows/s':>10}")
+            print(f"{'single-row':>12} {args.single_rows:>8} {single:>9.2f} {single_rate:>10.0f}")
+            print(f"{'bulk':>12} {report.created:>8} {report.seconds:>9.2f} {report.rows_per_second:>10.0f}")
+            print(f"speedup {report.rows_per_second / single_rate:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
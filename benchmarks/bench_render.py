@@ -0,0 +1,96 @@
+"""
+Time MapDeformer.warp_image at increasing POI counts.
+
+    python -m benchmarks.bench_render --size 1600x1000 --pois 10 100 1000
+
+Each count is rendered once with cold renderer caches and then --repeat
+times warm. For comparison the per-element PIL drawing the renderer
+replaced (ten draw.line calls per gradient edge, two ellipses and a
+measured text per POI, a rectangle and text per label, the grid line by
+line and the fonts loaded per call) is timed on the same points.
+"""
+import argparse
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from app.services import renderer
+from app.services.map_deformer import MapDeformer
+
+
+def legacy_render(width, height, src, dst, times):
+    image = Image.new('RGB', (width * 2 + 50, height), (20, 22, 30))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    step = min(width, height) // 20
+    for offset in (0, width + 50):
+        for x in range(0, width, step):
+            draw.line([(offset + x, 0), (offset + x, height)], fill=(40, 42, 50))
+        for y in range(0, height, step):
+            draw.line([(offset, y), (offset + width, y)], fill=(40, 42, 50))
+    n = len(src)
+    for points, offset, line_width in ((src, 0, 3), (dst, width + 50, 4)):
+        pixels = points * (width, height) + (offset, 0)
+        for i in range(n):
+            p1, p2 = pixels[i], pixels[(i + 1) % n]
+            for k in range(10):
+                a, b = p1 + (p2 - p1) * k / 10, p1 + (p2 - p1) * (k + 1) / 10
+                draw.line([tuple(map(int, a)), tuple(map(int, b))], fill=(200, 60, 60), width=line_width)
+            if offset:
+                mid = (p1 + p2) / 2
+                label = f"{int(times[i] // 60)}m {int(times[i] % 60)}s"
+                box = draw.textbbox((0, 0), label, font=font)
+                draw.rectangle((mid[0] - 20, mid[1] - 8, mid[0] + 20, mid[1] + 8), fill=(0, 0, 0), outline=(255, 255, 255))
+                draw.text((mid[0] - (box[2] - box[0]) / 2, mid[1] - 6), label, fill=(255, 255, 255), font=font)
+        for i, (x, y) in enumerate(pixels.astype(int).tolist()):
+            draw.ellipse((x - 12, y - 12, x + 12, y + 12), outline=(220, 53, 69), width=2)
+            draw.ellipse((x - 10, y - 10, x + 10, y + 10), fill=(180, 30, 45))
+            box = draw.textbbox((0, 0), str(i + 1), font=font)
+            draw.text((x - (box[2] - box[0]) / 2, y - 6), str(i + 1), fill=(255, 255, 255), font=font)
+    return image
+
+
+def clear_caches():
+    for cached in (renderer.load_font, renderer.canvas_background,
+                   renderer.marker_sprite, renderer.numbered_marker, renderer.text_sprite):
+        cached.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', default='1600x1000', help='screenshot size, WIDTHxHEIGHT')
+    parser.add_argument('--pois', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    width, height = (int(value) for value in args.size.split('x'))
+
+    deformer = MapDeformer()
+    screenshot = Image.new('RGB', (width, height))
+    rng = np.random.default_rng(0)
+
+    print(f"{'POIs':>6} {'cold ms':>9} {'warm ms':>9} {'legacy ms':>10} {'speedup':>8}")
+    for n in args.pois:
+        src, dst = rng.uniform(0, 1, (n, 2)), rng.uniform(0.1, 0.9, (n, 2))
+        matrix = rng.uniform(30, 1800, (n, n))
+
+        clear_caches()
+        started = time.perf_counter()
+        deformer.warp_image(screenshot, src, dst, matrix)
+        cold = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            deformer.warp_image(screenshot, src, dst, matrix)
+        warm = (time.perf_counter() - started) / args.repeat
+
+        times = matrix[np.arange(n), (np.arange(n) + 1) % n]
+        started = time.perf_counter()
+        legacy_render(width, height, src, dst, times)
+        legacy = time.perf_counter() - started
+
+        print(f"{n:>6} {cold * 1000:>9.0f} {warm * 1000:>9.0f} {legacy * 1000:>10.0f} {legacy / warm:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare bare requests.post calls with the pooled RoutingClient.
+
+Runs offline against the stub ORS server in app/tests/stub_ors.py:
+
+    python -m benchmarks.bench_routing_client --requests 200 --latency 0.005
+
+It reports the mean latency of sequential calls with and without a kept-alive
+connection pool, and how long callers wait once the upstream goes down with and
+without the circuit breaker.
+"""
+import argparse
+import time
+
+import requests
+
+from app.services.routing_client import CircuitBreaker, CircuitOpenError, RoutingClient
+from app.tests.stub_ors import StubORSServer
+
+BODY = {
+    'locations': [[26.10, 44.43], [26.12, 44.44], [26.15, 44.45]],
+    'metrics': ['duration']
+}
+
+
+def time_calls(call, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        call()
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help='calls per scenario')
+    parser.add_argument('--latency', type=float, default=0.005, help='stub server latency in seconds')
+    args = parser.parse_args()
+
+    with StubORSServer(latency=args.latency) as server:
+        url = server.url + '/v2/matrix/driving-car'
+        bare = time_calls(lambda: requests.post(url, json=BODY, timeout=30), args.requests)
+
+        client = RoutingClient(base_url=server.url)
+        client.post('/v2/matrix/driving-car', json=BODY)  # Warm the pool
+        pooled = time_calls(lambda: client.post('/v2/matrix/driving-car', json=BODY), args.requests)
+
+    print(f"Sequential matrix calls ({args.requests}, stub latency {args.latency * 1000:.1f} ms)")
+    print(f"  requests.post  : {bare * 1000:8.2f} ms/call")
+    print(f"  RoutingClient  : {pooled * 1000:8.2f} ms/call  ({bare / pooled:.2f}x)")
+
+    with StubORSServer(latency=args.latency, down=True) as server:
+        url = server.url + '/v2/matrix/driving-car'
+        # Without a breaker every caller waits for the full retry schedule
+        client = RoutingClient(base_url=server.url, backoff_factor=0.05,
+                               circuit_breaker=CircuitBreaker(failure_threshold=10 ** 9))
+        no_breaker = time_calls(lambda: client.post('/v2/matrix/driving-car', json=BODY), 10)
+
+        client = RoutingClient(base_url=server.url, backoff_factor=0.05,
+                               circuit_breaker=CircuitBreaker(failure_threshold=5, reset_timeout=60))
+
+        def guarded_call():
+            try:
+                client.post('/v2/matrix/driving-car', json=BODY)
+            except CircuitOpenError:
+                pass
+
+        with_breaker = time_calls(guarded_call, 10)
+
+    print("Upstream down (503), 10 calls")
+    print(f"  retries only   : {no_breaker * 1000:8.2f} ms/call")
+    print(f"  circuit breaker: {with_breaker * 1000:8.2f} ms/call")
+
+
+if __name__ == '__main__':
+    main()
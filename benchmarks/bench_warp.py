@@ -0,0 +1,62 @@
+"""
+Time the thin-plate spline warp of a screenshot onto the time layout.
+
+    python -m benchmarks.bench_warp --size 3840x2160 --pois 10 100 1000
+
+For each POI count the coarse field is solved once (fit ms), then the
+screenshot is resampled through it (remap ms) and the full render with a
+cached field is timed (render ms), as a second render of the same layout
+at another style would be.
+"""
+import argparse
+import time
+
+import numpy as np
+from PIL import Image
+
+from app import create_app
+from app.config import Config
+from app.services.map_deformer import MapDeformer
+from app.services.warp import thin_plate_field, warp_screenshot
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', default='3840x2160', help='screenshot size, WIDTHxHEIGHT')
+    parser.add_argument('--pois', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--grid', type=int, default=64, help='grid cells per side of the coarse field')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    width, height = (int(value) for value in args.size.split('x'))
+
+    rng = np.random.default_rng(0)
+    screenshot = Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        MAP_WARP_GRID = args.grid
+
+    deformer = MapDeformer()
+    print(f"{'POIs':>6} {'fit ms':>8} {'remap ms':>9} {'render ms':>10}")
+    with create_app(BenchConfig).app_context():
+        for n in args.pois:
+            src = rng.uniform(0, 1, (n, 2))
+            dst = np.clip(src + rng.normal(0, 0.05, (n, 2)), 0.1, 0.9)
+
+            field, fit = timed(lambda: thin_plate_field(src, dst, args.grid), 1)
+            _, remap = timed(lambda: warp_screenshot(screenshot, field), args.repeat)
+            deformer.warp_image(screenshot, src, dst)
+            _, render = timed(lambda: deformer.warp_image(screenshot, src, dst), args.repeat)
+
+            print(f"{n:>6} {fit * 1000:>8.0f} {remap * 1000:>9.0f} {render * 1000:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()